@@ -1,29 +1,46 @@
+import asyncio
+import bisect
 import json
 import re
-from datetime import datetime, timedelta, date
-from collections import defaultdict
+from datetime import datetime, timedelta
 import uuid
 import logging
+import os
+import time
+from collections import OrderedDict
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
+    CommandHandler,
     ContextTypes,
     ConversationHandler,
-    CallbackQueryHandler,
     MessageHandler,
     filters,
     Application,
     JobQueue, # Importado para tipagem
 )
 
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.date import DateTrigger
-
-# Configuração de logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
+import relogio
+from caixa_saida import get_caixa_saida
+from callbacks import RoteadorCallbacks, decodificar, montar
+from espacos import arquivo_do_espaco, espaco_atual
+from intervalos import AnaliseRotina
+from rotinas import (
+    DIAS_DA_SEMANA_ORDEM,
+    IndiceSemanal,
+    MINUTOS_POR_DIA,
+    TarefaRotina,
+    TipoTarefa,
+    formatar_duracao,
+    horario_para_minutos,
+    inserir_tarefa,
+    minuto_da_semana,
+    minutos_para_horario,
+    RotinasRepositorio,
+    tarefas_do_dia,
+    tarefas_por_dia,
 )
+
 logger = logging.getLogger(__name__)
 
 # --- Constantes de Estado da Conversa ---
@@ -35,62 +52,156 @@ AGUARDANDO_MOTIVO_NAO_CONCLUIDA = 4
 DELETAR_TAREFA_AVULSA = 5
 
 # --- Helpers de persistência de Rotinas Semanais ---
-ROTINAS_FILE = 'rotinas_semanais_data.json'
+# Arquivo JSON do formato antigo: importado para o banco na primeira inicialização
+ROTINAS_FILE = os.getenv('ROTINAS_FILE', 'rotinas_semanais_data.json')
+ROTINAS_DB = os.getenv('ROTINAS_DB', os.path.splitext(ROTINAS_FILE)[0] + '.sqlite3')
+# Snapshot das rotinas (snapshot.py, ex: exportado de outro deploy): tem preferência sobre o JSON
+ROTINAS_SNAPSHOT = os.getenv('ROTINAS_SNAPSHOT', os.path.splitext(ROTINAS_FILE)[0] + '.snap')
+# Limite do cache de rotinas em memória, em tarefas (~260 bytes cada)
+ROTINAS_CACHE_TAREFAS = int(os.getenv('ROTINAS_CACHE_TAREFAS', '50000'))
 TASKS_FILE = 'tasks_data.json' # Novo arquivo para persistir tarefas avulsas se não usar PicklePersistence
 
-def carregar_rotinas():
-    """Carrega as rotinas agendadas de um arquivo JSON."""
-    try:
-        with open(ROTINAS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return defaultdict(dict, {k: defaultdict(list, v) for k, v in data.items()})
-    except FileNotFoundError:
-        logger.info(f"Arquivo {ROTINAS_FILE} não encontrado. Iniciando com rotinas vazias.")
-        return defaultdict(dict)
-    except json.JSONDecodeError as e:
-        logger.error(f"Erro ao decodificar JSON do arquivo {ROTINAS_FILE}: {e}. Retornando rotinas vazias.")
-        return defaultdict(dict)
-    except Exception as e:
-        logger.error(f"Erro inesperado ao carregar rotinas do arquivo {ROTINAS_FILE}: {e}. Retornando rotinas vazias.")
-        return defaultdict(dict)
-
-def salvar_rotinas(data):
-    """Salva as rotinas agendadas em um arquivo JSON."""
-    try:
-        with open(ROTINAS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-    except IOError as e:
-        logger.error(f"Erro de I/O ao salvar rotinas no arquivo {ROTINAS_FILE}: {e}")
-    except Exception as e:
-        logger.error(f"Erro inesperado ao salvar rotinas no arquivo {ROTINAS_FILE}: {e}")
-
-# Carrega as rotinas ao iniciar o módulo
-rotinas_agendadas = carregar_rotinas()
+# As rotinas ficam no banco e são carregadas por usuário no primeiro acesso (ver RotinasRepositorio).
+# O banco é aberto em segundo plano depois que o polling começa (ver start_all_scheduled_jobs);
+# handlers que dependem dele chamam `await aguardar_rotinas()` antes de usar get_repositorio().
+# Com vários bots no processo (multibot.py) cada um tem o seu banco: repositório e evento de
+# carga são por espaço (espacos.espaco_atual).
+_repositorios = {}
+_rotinas_prontas = {}
+# Updates de chats diferentes são processados em paralelo (ver concorrencia.py): toda mutação
+# das rotinas de um usuário e a gravação no banco acontecem com este lock.
+rotinas_lock = asyncio.Lock()
+
+def get_repositorio() -> RotinasRepositorio:
+    """Retorna o repositório de rotinas do bot atual (disponível depois de `aguardar_rotinas()`)."""
+    return _repositorios.get(espaco_atual.get())
+
+def _evento_rotinas() -> asyncio.Event:
+    espaco = espaco_atual.get()
+    evento = _rotinas_prontas.get(espaco)
+    if evento is None:
+        evento = _rotinas_prontas[espaco] = asyncio.Event()
+    return evento
+
+def usar_repositorio(repositorio: RotinasRepositorio) -> None:
+    """Define o repositório do bot atual e libera quem está em `aguardar_rotinas()`."""
+    _repositorios[espaco_atual.get()] = repositorio
+    _evento_rotinas().set()
+
+def abrir_repositorio(espaco: str = "") -> RotinasRepositorio:
+    """Abre o banco de rotinas, importando o snapshot ou o JSON antigo se o banco ainda não existir."""
+    arquivo_json = arquivo_do_espaco(ROTINAS_FILE, espaco)
+    arquivo_db = arquivo_do_espaco(ROTINAS_DB, espaco)
+    arquivo_snapshot = arquivo_do_espaco(ROTINAS_SNAPSHOT, espaco)
+    novo = not os.path.exists(arquivo_db)
+    repositorio = RotinasRepositorio(arquivo_db, ROTINAS_CACHE_TAREFAS)
+    if novo and os.path.exists(arquivo_snapshot):
+        try:
+            importados = repositorio.importar_snapshot(arquivo_snapshot)
+            logger.info("%s usuários importados de %s para %s.", importados, arquivo_snapshot, arquivo_db)
+        except ValueError as e:
+            logger.error("Erro ao importar rotinas do snapshot %s: %s. Iniciando com o banco vazio.", arquivo_snapshot, e)
+    elif novo and os.path.exists(arquivo_json):
+        try:
+            importados = repositorio.importar_json(arquivo_json)
+            os.replace(arquivo_json, f"{arquivo_json}.importado")
+            logger.info("%s usuários importados de %s para %s.", importados, arquivo_json, arquivo_db)
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.error("Erro ao importar rotinas do arquivo %s: %s. Iniciando com o banco vazio.", arquivo_json, e)
+    return repositorio
+
+async def aguardar_rotinas():
+    """Espera o carregamento inicial das rotinas (retorna na hora depois que ele terminou)."""
+    evento = _evento_rotinas()
+    if not evento.is_set():
+        await evento.wait()
+
+# Objeto do APScheduler para gerenciar os jobs de rotina semanal (criado no primeiro uso).
+# É um só por processo: no modo multibot os JobQueues de todos os bots também usam este scheduler.
+_scheduler = None
+
+def get_scheduler():
+    """Retorna o AsyncIOScheduler do processo, criando-o na primeira chamada."""
+    global _scheduler
+    if _scheduler is None:
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+        _scheduler = AsyncIOScheduler()
+    return _scheduler
+
+# Tipos dos jobs de rotina: cada job guarda só (chat_id, tarefa_id, tipo) e a tarefa é buscada
+# no repositório quando ele dispara (ver disparar_job_rotina)
+JOB_ROTINA = "rotina"
+JOB_LIVRE = "livre"
+JOB_RESUMO = "resumo"
+
+# AgendaManager de cada espaço, usado pelos jobs para achar o bot e os métodos de envio
+_agendas = {}
+# Ids dos jobs de rotina agendados por chat, por espaço: o reagendamento de um usuário remove
+# os dele sem percorrer todos os jobs do scheduler
+_jobs_por_chat = {}
+
+# CronTriggers compartilhados entre os jobs com o mesmo horário: o trigger não guarda estado
+# (o próximo disparo fica no job), e cada um ocupa ~2 KB e é caro de montar
+_triggers = {}
+
+def _trigger_semanal(dias, hora: int, minuto: int):
+    """CronTrigger de `dias` (int ou "0,2,4") às hora:minuto, no fuso do scheduler."""
+    chave = (dias, hora, minuto)
+    trigger = _triggers.get(chave)
+    if trigger is None:
+        from apscheduler.triggers.cron import CronTrigger
+        trigger = _triggers[chave] = CronTrigger(
+            day_of_week=dias, hour=hora, minute=minuto, timezone=get_scheduler().timezone
+        )
+    return trigger
 
-# Mapeamento para garantir a ordem dos dias da semana
-DIAS_DA_SEMANA_ORDEM = [
-    "Segunda-feira", "Terça-feira", "Quarta-feira", "Quinta-feira",
-    "Sexta-feira", "Sábado", "Domingo"
-]
+def _indice_jobs() -> dict:
+    espaco = espaco_atual.get()
+    indice = _jobs_por_chat.get(espaco)
+    if indice is None:
+        indice = _jobs_por_chat[espaco] = {}
+    return indice
 
-# Objeto do APScheduler para gerenciar os jobs de rotina semanal
-scheduler = AsyncIOScheduler()
+async def disparar_job_rotina(chat_id: int, tarefa_id, tipo: str, espaco: str = "") -> None:
+    """
+    Função de todos os jobs de rotina do APScheduler. Tarefa que foi apagada depois do
+    agendamento é ignorada; editada, é notificada como está agora. Como os argumentos são só
+    valores simples, o job também pode ir para um jobstore persistente.
+    """
+    # Os jobs do APScheduler não herdam o espaço de quem os agendou
+    espaco_atual.set(espaco)
+    agenda_manager = _agendas.get(espaco)
+    if agenda_manager is None:
+        logger.warning("Job de rotina (%s) de %s disparou sem AgendaManager no espaço %r.", tipo, chat_id, espaco)
+        return
+    if tipo == JOB_RESUMO:
+        await agenda_manager._send_daily_digest(chat_id, agenda_manager.bot)
+        return
+    await aguardar_rotinas()
+    tarefa = next((t for t in await get_repositorio().obter(chat_id) if t.id == tarefa_id), None)
+    if tarefa is None:
+        logger.info("Tarefa %s de %s não existe mais: lembrete ignorado.", tarefa_id, chat_id)
+        return
+    if tipo == JOB_ROTINA:
+        await agenda_manager._send_routine_notification(chat_id, tarefa, agenda_manager.bot)
+    else:
+        await agenda_manager._send_free_period_notification(chat_id, tarefa, agenda_manager.bot)
 
 # --- Helpers de Parse da Rotina ---
 def parse_rotina_textual(texto_rotina):
     """
-    Analisa o texto de uma rotina semanal e o converte em uma estrutura de dados,
-    incluindo duração e tipos de compromisso (horário fixo, dia livre, etc.).
+    Analisa o texto de uma rotina semanal e o converte em uma lista de TarefaRotina
+    (ordenada por dia), incluindo horários e tipos de compromisso (horário fixo, dia livre, etc.).
     """
-    rotina_parsed = {}
+    tarefas = []
     dias_da_semana_map = {
-        "segunda-feira": "Segunda-feira",
-        "terça-feira": "Terça-feira",
-        "quarta-feira": "Quarta-feira",
-        "quinta-feira": "Quinta-feira",
-        "sexta-feira": "Sexta-feira",
-        "sábado": "Sábado",
-        "domingo": "Domingo"
+        "segunda-feira": 0,
+        "terça-feira": 1,
+        "quarta-feira": 2,
+        "quinta-feira": 3,
+        "sexta-feira": 4,
+        "sábado": 5,
+        "domingo": 6
     }
 
     blocos_dias = re.split(
@@ -98,114 +209,366 @@ def parse_rotina_textual(texto_rotina):
         texto_rotina, flags=re.MULTILINE
     )
 
+    padrao_tarefa_horario = re.compile(r'(\d{1,2}h\d{2})\s*–\s*(\d{1,2}h\d{2}):\s*(.*)')
+    padrao_tarefa_livre_com_horario = re.compile(
+        r'(.*(?:Livre|Descanso|Pausa|Tempo livre|Relax|Lazer)(?: completo| total)?.*?)'
+        r'(?:até\s*(\d{1,2}h\d{2})|\s*(\d{1,2}h\d{2})\s*-\s*(\d{1,2}h\d{2})|)$',
+        re.IGNORECASE
+    )
+    padrao_tarefa_periodo = re.compile(r'^(Manhã|Tarde|Noite|Dia|Fim de Semana):\s*(.*)', re.IGNORECASE)
+
     for i in range(1, len(blocos_dias), 2):
         dia_bruto = blocos_dias[i].strip()
         conteudo_dia = blocos_dias[i+1].strip()
 
-        dia_normalizado = next((dias_da_semana_map[k] for k in dias_da_semana_map if k in dia_bruto.lower()), None)
+        dia = next((dias_da_semana_map[k] for k in dias_da_semana_map if k in dia_bruto.lower()), None)
+        if dia is None:
+            continue
+
+        for linha in conteudo_dia.split('\n'):
+            linha = linha.strip()
+            # "⭐" no começo da linha marca a tarefa como importante (lembrete mantido no modo resumo)
+            importante = linha.startswith("⭐")
+            if importante:
+                linha = linha.lstrip("⭐").strip()
+            if not linha:
+                continue
+
+            match_horario = padrao_tarefa_horario.match(linha)
+            if match_horario:
+                tarefas.append(TarefaRotina(
+                    dia, TipoTarefa.HORARIO_FIXO, match_horario.group(3).strip(),
+                    inicio=horario_para_minutos(match_horario.group(1)),
+                    fim=horario_para_minutos(match_horario.group(2)),
+                    importante=importante,
+                ))
+                continue
+
+            match_livre_com_horario = padrao_tarefa_livre_com_horario.match(linha)
+            if match_livre_com_horario:
+                descricao_base = match_livre_com_horario.group(1).strip()
+                inicio_livre, fim_livre = None, None
+
+                if match_livre_com_horario.group(2):
+                    fim_livre = match_livre_com_horario.group(2).replace('h', ':')
+                    descricao_final = f"{descricao_base} (até {fim_livre})"
+                elif match_livre_com_horario.group(3) and match_livre_com_horario.group(4):
+                    inicio_livre = match_livre_com_horario.group(3).replace('h', ':')
+                    fim_livre = match_livre_com_horario.group(4).replace('h', ':')
+                    descricao_final = f"{descricao_base} ({inicio_livre} - {fim_livre})"
+                else:
+                    descricao_final = descricao_base
+
+                tarefas.append(TarefaRotina(
+                    dia, TipoTarefa.PERIODO_LIVRE, descricao_final,
+                    inicio=horario_para_minutos(inicio_livre),
+                    fim=horario_para_minutos(fim_livre),
+                    importante=importante,
+                ))
+                continue
+
+            match_periodo = padrao_tarefa_periodo.match(linha)
+            if match_periodo:
+                tarefas.append(TarefaRotina(
+                    dia, TipoTarefa.PERIODO_GERAL, match_periodo.group(2).strip(),
+                    periodo=match_periodo.group(1).capitalize(),
+                    importante=importante,
+                ))
+                continue
+
+            tarefas.append(TarefaRotina(dia, TipoTarefa.DESCRICAO_SIMPLES, linha, importante=importante))
+
+    # Um mesmo dia pode aparecer em mais de um bloco: ordenação estável por dia
+    tarefas.sort(key=lambda t: t.dia)
+    return tarefas
+
+# --- Renderização paginada de "Gerenciar Rotinas" ---
+# Cada dia da semana vira um fragmento (cabeçalho + uma linha e um botão por tarefa + resumo de
+# conflitos e horários livres) guardado em cache até as tarefas daquele dia mudarem. A divisão
+# em páginas e a análise de intervalos também ficam em cache, e abrir ou paginar a tela só
+# junta as linhas da página pedida.
+MAX_CARACTERES_PAGINA = 3500  # o Telegram aceita 4096; sobra espaço para cabeçalho e rodapé
+MAX_TAREFAS_PAGINA = 12  # uma linha de botões (apagar, importante) por tarefa
+MAX_USUARIOS_FRAGMENTOS = 2000
+MAX_DESCRICAO_LISTAGEM = 500  # uma descrição enorme sozinha não pode estourar a página
+MAX_CONFLITOS_AVISO = 5  # conflitos listados ao adicionar uma rotina
+# Por dia, no resumo da tela e no resumo diário: com os limites, o resumo de um dia fica abaixo
+# de ~1100 caracteres e cabe numa página junto com a última tarefa
+MAX_CONFLITOS_DIA = 5
+MAX_LIVRES_DIA = 10
+CABECALHO_GERENCIAR = "✨ *Suas Rotinas Semanais Detalhadas:*\n\n"
+
+# (espaço, chat_id) -> {"dias": {dia: (cabecalho, [(linha, [botões]), ...], resumo)},
+#             "paginas": [[(dia, ini, fim), ...], ...] ou None, "analise": AnaliseRotina ou None}
+_fragmentos_rotina = OrderedDict()
+
+def _linha_tarefa(tarefa: TarefaRotina) -> str:
+    duracao = tarefa.duracao
+    duracao_info = f" _({duracao})_" if duracao else ""
+    descricao = tarefa.descricao
+    if len(descricao) > MAX_DESCRICAO_LISTAGEM:
+        descricao = descricao[:MAX_DESCRICAO_LISTAGEM] + "…"
+    if tarefa.importante:
+        duracao_info += " ⭐"
+    if tarefa.tipo is TipoTarefa.HORARIO_FIXO:
+        return f"  ⏰ `{tarefa.inicio_str or '??:??'}-{tarefa.fim_str or '??:??'}`: {descricao or 'Tarefa sem descrição'}{duracao_info}\n"
+    if tarefa.tipo is TipoTarefa.PERIODO_LIVRE:
+        horario_livre_info = ""
+        if tarefa.inicio is not None and tarefa.fim is not None:
+            horario_livre_info = f"`{tarefa.inicio_str}-{tarefa.fim_str}`: "
+        return f"  🍃 {horario_livre_info}{descricao or 'Período livre'}{duracao_info}\n"
+    if tarefa.tipo is TipoTarefa.PERIODO_GERAL:
+        return f"  💡 *{tarefa.periodo or 'Período'}*: {descricao or 'Descrição geral'}\n"
+    return f"  - {descricao or 'Tarefa sem descrição'}\n"
+
+def _linha_conflito(tarefa: TarefaRotina, outra: TarefaRotina) -> str:
+    return (f"  ⚠️ Conflito: `{tarefa.inicio_str}-{tarefa.fim_str}` {tarefa.descricao[:60]} × "
+            f"`{outra.inicio_str}-{outra.fim_str}` {outra.descricao[:60]}\n")
+
+def _resumo_dia(dia_idx: int, analise: AnaliseRotina) -> str:
+    conflitos = analise.conflitos_do_dia(dia_idx)
+    partes = [_linha_conflito(tarefa, outra) for tarefa, outra in conflitos[:MAX_CONFLITOS_DIA]]
+    if len(conflitos) > MAX_CONFLITOS_DIA:
+        partes.append(f"  _… e mais {len(conflitos) - MAX_CONFLITOS_DIA} conflito(s)_\n")
+    livres = analise.livres[dia_idx]
+    if livres:
+        horarios = ", ".join(f"`{minutos_para_horario(inicio)}-{minutos_para_horario(fim)}`"
+                             for inicio, fim in livres[:MAX_LIVRES_DIA])
+        if len(livres) > MAX_LIVRES_DIA:
+            horarios += f" _e mais {len(livres) - MAX_LIVRES_DIA}_"
+        partes.append(f"  🕊️ Livre: {horarios}\n")
+    return "".join(partes)
+
+def _renderizar_dia(dia_idx: int, tarefas_dia: list, analise: AnaliseRotina) -> tuple:
+    dia = DIAS_DA_SEMANA_ORDEM[dia_idx]
+    itens = [
+        (_linha_tarefa(tarefa), [
+            InlineKeyboardButton(f"🗑️ Apagar {dia} ({idx+1})", callback_data=montar("rotinas_apagar", dia_idx, tarefa.id)),
+            InlineKeyboardButton("★ Importante" if tarefa.importante else "☆ Importante",
+                                 callback_data=montar("rotinas_importante", dia_idx, tarefa.id)),
+        ])
+        for idx, tarefa in enumerate(tarefas_dia)
+    ]
+    return f"*{dia}*\n", itens, _resumo_dia(dia_idx, analise)
+
+def _paginar(dias: dict) -> list:
+    """Divide os fragmentos em páginas respeitando os limites de caracteres e de botões."""
+    paginas, atual, caracteres, quantidade = [], [], 0, 0
+    for dia in sorted(dias):
+        cabecalho, itens, resumo = dias[dia]
+        inicio = 0
+        for i, (linha, _) in enumerate(itens):
+            # Cabeçalho do dia (e a linha em branco depois dele) entra no custo da primeira tarefa da
+            # página; o resumo do dia, no da última tarefa
+            custo = len(linha) + (len(cabecalho) + 1 if i == inicio else 0) + (len(resumo) if i == len(itens) - 1 else 0)
+            if quantidade and (quantidade >= MAX_TAREFAS_PAGINA or caracteres + custo > MAX_CARACTERES_PAGINA):
+                if i > inicio:
+                    atual.append((dia, inicio, i))
+                paginas.append(atual)
+                atual, caracteres, quantidade, inicio = [], 0, 0, i
+                custo = len(linha) + len(cabecalho) + 1 + (len(resumo) if i == len(itens) - 1 else 0)
+            caracteres += custo
+            quantidade += 1
+        atual.append((dia, inicio, len(itens)))
+    if atual:
+        paginas.append(atual)
+    return paginas
+
+def _entrada_fragmentos(chat_id: int) -> dict:
+    chave = (espaco_atual.get(), chat_id)
+    entrada = _fragmentos_rotina.get(chave)
+    if entrada is None:
+        entrada = _fragmentos_rotina[chave] = {"dias": {}, "paginas": None, "analise": None}
+        while len(_fragmentos_rotina) > MAX_USUARIOS_FRAGMENTOS:
+            _fragmentos_rotina.popitem(last=False)
+    else:
+        _fragmentos_rotina.move_to_end(chave)
+    return entrada
+
+def _analise_da_entrada(entrada: dict, tarefas: list) -> AnaliseRotina:
+    if entrada["analise"] is None:
+        entrada["analise"] = AnaliseRotina(tarefas)
+    return entrada["analise"]
+
+def analise_rotina(chat_id: int, tarefas: list) -> AnaliseRotina:
+    """Conflitos e horários livres do usuário (calculados só depois que as rotinas mudam)."""
+    return _analise_da_entrada(_entrada_fragmentos(chat_id), tarefas)
+
+def _fragmentos_do_usuario(chat_id: int, tarefas: list) -> dict:
+    entrada = _entrada_fragmentos(chat_id)
+    dias = entrada["dias"]
+    if entrada["paginas"] is None:
+        analise = _analise_da_entrada(entrada, tarefas)
+        for dia_idx, tarefas_dia in tarefas_por_dia(tarefas):
+            if dia_idx not in dias:
+                dias[dia_idx] = _renderizar_dia(dia_idx, tarefas_dia, analise)
+        entrada["paginas"] = _paginar(dias)
+    return entrada
+
+def invalidar_fragmentos(chat_id: int, dias=None) -> None:
+    """Descarta os fragmentos dos `dias` alterados (ou de todos), a paginação e a análise do usuário."""
+    entrada = _fragmentos_rotina.get((espaco_atual.get(), chat_id))
+    if entrada is None:
+        return
+    if dias is None:
+        entrada["dias"].clear()
+    else:
+        for dia in dias:
+            # Uma tarefa que atravessa a meia-noite muda conflitos e horários livres dos dias vizinhos
+            for afetado in (dia - 1, dia, dia + 1):
+                entrada["dias"].pop(afetado % 7, None)
+    entrada["paginas"] = None
+    entrada["analise"] = None
+
+def montar_pagina_rotinas(chat_id: int, tarefas: list, pagina: int) -> tuple:
+    """Retorna (texto, teclado, página efetiva, total de páginas) da tela de gerenciamento."""
+    entrada = _fragmentos_do_usuario(chat_id, tarefas)
+    paginas = entrada["paginas"]
+    total = len(paginas)
+    pagina = min(max(pagina, 0), total - 1)
+
+    partes = [CABECALHO_GERENCIAR]
+    keyboard_botoes = []
+    for dia, inicio, fim in paginas[pagina]:
+        cabecalho, itens, resumo = entrada["dias"][dia]
+        partes.append(cabecalho if inicio == 0 else f"{cabecalho[:-1]} _(cont.)_\n")
+        for linha, botoes in itens[inicio:fim]:
+            partes.append(linha)
+            keyboard_botoes.append(botoes)
+        if fim == len(itens):
+            partes.append(resumo)
+        partes.append("\n")
+
+    if total > 1:
+        partes.append(f"📄 Página {pagina + 1}/{total}")
+        navegacao = []
+        if pagina > 0:
+            navegacao.append(InlineKeyboardButton("⬅️ Anterior", callback_data=montar("rotinas_pagina", pagina - 1)))
+        if pagina < total - 1:
+            navegacao.append(InlineKeyboardButton("Próxima ➡️", callback_data=montar("rotinas_pagina", pagina + 1)))
+        keyboard_botoes.append(navegacao)
+    keyboard_botoes.append([InlineKeyboardButton("↩️ Voltar ao Menu de Rotinas", callback_data="rotinas_menu")])
+    return "".join(partes), InlineKeyboardMarkup(keyboard_botoes), pagina, total
+
+
+# --- Índice semanal das rotinas (/agora e /proximo) ---
+# Um IndiceSemanal por usuário, montado na primeira consulta e mantido em cache LRU. As
+# alterações em adicionar_rotina_processar/apagar_tarefa atualizam o índice já montado
+# em vez de descartá-lo.
+MAX_USUARIOS_INDICE = 5000
+
+# (espaço, chat_id) -> IndiceSemanal
+_indices_semanais = OrderedDict()
+
+def indice_semanal(chat_id: int, tarefas: list) -> IndiceSemanal:
+    """Índice das rotinas do usuário (montado a partir de `tarefas` se ainda não está em cache)."""
+    chave = (espaco_atual.get(), chat_id)
+    indice = _indices_semanais.get(chave)
+    if indice is None:
+        indice = _indices_semanais[chave] = IndiceSemanal(tarefas)
+        while len(_indices_semanais) > MAX_USUARIOS_INDICE:
+            _indices_semanais.popitem(last=False)
+    else:
+        _indices_semanais.move_to_end(chave)
+    return indice
+
+def atualizar_indice_semanal(chat_id: int, adicionadas=(), removidas=()) -> None:
+    """Aplica ao índice em cache as tarefas incluídas/removidas (sem índice, nada a fazer)."""
+    indice = _indices_semanais.get((espaco_atual.get(), chat_id))
+    if indice is None:
+        return
+    for tarefa in removidas:
+        indice.remover(tarefa)
+    for tarefa in adicionadas:
+        indice.inserir(tarefa)
+
+def minuto_da_semana_atual() -> int:
+    # Hora local, a mesma que o APScheduler usa para disparar os lembretes das rotinas
+    agora = relogio.agora()
+    return minuto_da_semana(agora.weekday(), agora.hour * 60 + agora.minute)
+
+
+# --- Índice por horário das tarefas avulsas ---
+# user_data['tasks'] fica ordenada por 'scheduled_time' (ISO 8601, que ordena como texto),
+# então um intervalo de datas é encontrado por busca binária.
+
+def _horario_tarefa(task: dict) -> str:
+    return task['scheduled_time']
+
+def inserir_tarefa_avulsa(tasks: list, task: dict) -> None:
+    """Insere mantendo a lista ordenada por horário."""
+    bisect.insort(tasks, task, key=_horario_tarefa)
+
+# Marca em user_data que 'tasks' já está ordenada (listas gravadas antes do índice não estão)
+CHAVE_TAREFAS_ORDENADAS = 'tasks_ordenadas'
+
+def tarefas_ordenadas(user_data: dict) -> list:
+    """user_data['tasks'] ordenada por horário. Listas antigas são ordenadas uma única vez."""
+    tasks = user_data.get('tasks', [])
+    if tasks and not user_data.get(CHAVE_TAREFAS_ORDENADAS):
+        tasks.sort(key=_horario_tarefa)
+        user_data[CHAVE_TAREFAS_ORDENADAS] = True
+    return tasks
+
+def faixa_tarefas_avulsas(tasks: list, inicio: datetime = None, fim: datetime = None) -> range:
+    """Índices de `tasks` (ordenada) com horário em [inicio, fim). Limites None são abertos."""
+    primeiro = bisect.bisect_left(tasks, inicio.isoformat(), key=_horario_tarefa) if inicio else 0
+    ultimo = bisect.bisect_left(tasks, fim.isoformat(), key=_horario_tarefa) if fim else len(tasks)
+    return range(primeiro, max(primeiro, ultimo))
+
+
+# --- Modo resumo diário ---
+# Opt-in por chat: chat_data[CHAVE_RESUMO_DIARIO] guarda o horário do resumo (minutos desde a
+# meia-noite). Nesse modo o chat recebe um único resumo do dia e só os lembretes das tarefas ⭐.
+CHAVE_RESUMO_DIARIO = 'resumo_diario'
+RESUMO_HORA_PADRAO = horario_para_minutos(os.getenv('RESUMO_HORA_PADRAO', '07:00')) or 7 * 60
+MAX_TAREFAS_RESUMO = 40
+# O Telegram recusa mensagens com mais de 4096 caracteres (BadRequest, que a caixa de saída
+# descarta): o resumo é cortado numa quebra de linha antes disso
+MAX_CARACTERES_RESUMO = 4000
+AVISO_RESUMO_CORTADO = "  _… (resumo cortado; veja tudo em Gerenciar Rotinas)_\n"
+USO_RESUMO = "Uso: /resumo ativar [HH:MM] ou /resumo desativar"
+USO_LEMBRAR = "Uso: /lembrar <minutos> <descrição>, ex: /lembrar 30 ligar pro cliente"
+MAX_MINUTOS_LEMBRETE = 7 * 24 * 60
+
+def hora_resumo_diario(chat_data) -> int:
+    """Horário do resumo diário do chat, ou None se o modo resumo está desligado."""
+    return (chat_data or {}).get(CHAVE_RESUMO_DIARIO)
+
+def _chave_horario(tarefa: TarefaRotina) -> tuple:
+    # Tarefas sem horário (períodos gerais, descrições) vão para o fim, na ordem em que foram cadastradas
+    return (tarefa.inicio is None, tarefa.inicio or 0)
+
+def montar_resumo_diario(chat_id: int, tarefas: list, dia: int) -> str:
+    """Texto do resumo do `dia` (None se o dia não tem tarefas), numa passada pelas tarefas do dia."""
+    tarefas_dia = sorted(tarefas_do_dia(tarefas, dia), key=_chave_horario)
+    if not tarefas_dia:
+        return None
+    partes = [f"☀️ *Bom dia! Sua rotina de hoje ({DIAS_DA_SEMANA_ORDEM[dia]}):*\n\n"]
+    partes.extend(_linha_tarefa(tarefa) for tarefa in tarefas_dia[:MAX_TAREFAS_RESUMO])
+    if len(tarefas_dia) > MAX_TAREFAS_RESUMO:
+        partes.append(f"  _… e mais {len(tarefas_dia) - MAX_TAREFAS_RESUMO}_\n")
+    partes.append(_resumo_dia(dia, analise_rotina(chat_id, tarefas)))
+    rodape = "\n⭐ Tarefas importantes: você recebe o lembrete na hora." if any(
+        tarefa.importante for tarefa in tarefas_dia) else ""
+    texto = "".join(partes)
+    if len(texto) + len(rodape) > MAX_CARACTERES_RESUMO:
+        # Cada linha fecha a própria formatação: cortar numa quebra de linha mantém o Markdown válido
+        corte = texto.rfind("\n", 0, MAX_CARACTERES_RESUMO - len(rodape) - len(AVISO_RESUMO_CORTADO))
+        texto = texto[:corte + 1] + AVISO_RESUMO_CORTADO
+    return texto + rodape
 
-        if dia_normalizado:
-            tarefas_do_dia = []
-            padrao_tarefa_horario = re.compile(r'(\d{1,2}h\d{2})\s*–\s*(\d{1,2}h\d{2}):\s*(.*)')
-            padrao_tarefa_livre_com_horario = re.compile(
-                r'(.*(?:Livre|Descanso|Pausa|Tempo livre|Relax|Lazer)(?: completo| total)?.*?)'
-                r'(?:até\s*(\d{1,2}h\d{2})|\s*(\d{1,2}h\d{2})\s*-\s*(\d{1,2}h\d{2})|)$',
-                re.IGNORECASE
-            )
-            padrao_tarefa_periodo = re.compile(r'^(Manhã|Tarde|Noite|Dia|Fim de Semana):\s*(.*)', re.IGNORECASE)
-
-            for linha in conteudo_dia.split('\n'):
-                linha = linha.strip()
-                if not linha:
-                    continue
-
-                match_horario = padrao_tarefa_horario.match(linha)
-                if match_horario:
-                    inicio = match_horario.group(1).replace('h', ':')
-                    fim = match_horario.group(2).replace('h', ':')
-                    descricao = match_horario.group(3).strip()
-                    try:
-                        dt_inicio = datetime.strptime(inicio, "%H:%M")
-                        dt_fim = datetime.strptime(fim, "%H:%M")
-                        if dt_fim < dt_inicio:
-                            dt_fim += timedelta(days=1)
-                        duracao_minutos = int((dt_fim - dt_inicio).total_seconds() / 60)
-                        duracao_str = f"{duracao_minutos // 60}h {duracao_minutos % 60}m" if duracao_minutos >= 60 else f"{duracao_minutos}m"
-                    except ValueError:
-                        duracao_str = "N/A"
-
-                    tarefas_do_dia.append({
-                        "id": uuid.uuid4().hex,
-                        "tipo": "horario_fixo",
-                        "inicio": inicio,
-                        "fim": fim,
-                        "descricao": descricao,
-                        "duracao": duracao_str
-                    })
-                    continue
-
-                match_livre_com_horario = padrao_tarefa_livre_com_horario.match(linha)
-                if match_livre_com_horario:
-                    descricao_base = match_livre_com_horario.group(1).strip()
-                    inicio_livre, fim_livre, duracao_str = None, None, None
-                    
-                    if match_livre_com_horario.group(2):
-                        fim_livre = match_livre_com_horario.group(2).replace('h', ':')
-                        descricao_final = f"{descricao_base} (até {fim_livre})"
-                    elif match_livre_com_horario.group(3) and match_livre_com_horario.group(4):
-                        inicio_livre = match_livre_com_horario.group(3).replace('h', ':')
-                        fim_livre = match_livre_com_horario.group(4).replace('h', ':')
-                        try:
-                            dt_inicio = datetime.strptime(inicio_livre, "%H:%M")
-                            dt_fim = datetime.strptime(fim_livre, "%H:%M")
-                            if dt_fim < dt_inicio:
-                                dt_fim += timedelta(days=1)
-                            duracao_minutos = int((dt_fim - dt_inicio).total_seconds() / 60)
-                            duracao_str = f"{duracao_minutos // 60}h {duracao_minutos % 60}m" if duracao_minutos >= 60 else f"{duracao_minutos}m"
-                        except ValueError:
-                            duracao_str = "N/A"
-                        descricao_final = f"{descricao_base} ({inicio_livre} - {fim_livre})"
-                    else:
-                        descricao_final = descricao_base
-
-                    tarefas_do_dia.append({
-                        "id": uuid.uuid4().hex,
-                        "tipo": "periodo_livre",
-                        "descricao": descricao_final,
-                        "inicio_sugerido": inicio_livre,
-                        "fim_sugerido": fim_livre,
-                        "duracao": duracao_str
-                    })
-                    continue
-
-                match_periodo = padrao_tarefa_periodo.match(linha)
-                if match_periodo:
-                    periodo = match_periodo.group(1).capitalize()
-                    desc = match_periodo.group(2).strip()
-                    tarefas_do_dia.append({
-                        "id": uuid.uuid4().hex,
-                        "tipo": "periodo_geral",
-                        "periodo": periodo,
-                        "descricao": desc
-                    })
-                    continue
-
-                tarefas_do_dia.append({
-                    "id": uuid.uuid4().hex,
-                    "tipo": "descricao_simples",
-                    "descricao": linha
-                })
-
-            if tarefas_do_dia:
-                rotina_parsed[dia_normalizado] = tarefas_do_dia
-                
-    return rotina_parsed
 
 class AgendaManager:
     def __init__(self, application: Application):
         self.application = application
         self.bot = application.bot
         self.job_queue = application.job_queue
+        # O scheduler é do processo: no modo multibot os ids dos jobs levam o espaço do bot
+        self.espaco = espaco_atual.get()
+        self.prefixo_jobs = f"{self.espaco}:" if self.espaco else ""
+        self.caixa_saida = get_caixa_saida()
+        _agendas[self.espaco] = self
 
     # --- Métodos de Rotinas Semanais (APScheduler) ---
 
@@ -225,14 +588,15 @@ class AgendaManager:
             await update.message.reply_text(text, parse_mode='Markdown', reply_markup=reply_markup)
         return MENU_ROTINAS
 
-    async def gerenciar_rotinas(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-        """Exibe as rotinas agendadas e opções para gerenciá-las."""
+    async def gerenciar_rotinas(self, update: Update, context: ContextTypes.DEFAULT_TYPE, pagina: int = 0) -> int:
+        """Exibe as rotinas agendadas (uma página por vez) e opções para gerenciá-las."""
         query = update.callback_query
         await query.answer()
-        chat_id = str(query.message.chat_id)
+        chat_id = query.message.chat_id
 
-        user_rotinas = rotinas_agendadas.get(chat_id, {})
-        if not user_rotinas or all(not tarefas for tarefas in user_rotinas.values()):
+        await aguardar_rotinas()
+        user_rotinas = await get_repositorio().obter(chat_id)
+        if not user_rotinas:
             keyboard = [[InlineKeyboardButton("↩️ Voltar", callback_data="rotinas_menu")]]
             reply_markup = InlineKeyboardMarkup(keyboard)
             await query.edit_message_text(
@@ -242,34 +606,8 @@ class AgendaManager:
             )
             return MENU_ROTINAS
 
-        mensagem = "✨ *Suas Rotinas Semanais Detalhadas:*\n\n"
-        keyboard_botoes = []
-
-        for dia in DIAS_DA_SEMANA_ORDEM:
-            if dia in user_rotinas and user_rotinas[dia]:
-                mensagem += f"*{dia}*\n"
-                for idx, tarefa in enumerate(user_rotinas[dia]):
-                    duracao_info = f" _({tarefa.get('duracao', 'N/A')})_" if tarefa.get('duracao') else ""
-                    
-                    if tarefa['tipo'] == "horario_fixo":
-                        mensagem += f"  ⏰ `{tarefa.get('inicio', '??:??')}-{tarefa.get('fim', '??:??')}`: {tarefa.get('descricao', 'Tarefa sem descrição')}{duracao_info}\n"
-                    elif tarefa['tipo'] == "periodo_livre":
-                        horario_livre_info = ""
-                        if tarefa.get('inicio_sugerido') and tarefa.get('fim_sugerido'):
-                             horario_livre_info = f"`{tarefa.get('inicio_sugerido', '??:??')}-{tarefa.get('fim_sugerido', '??:??')}`: "
-                        mensagem += f"  🍃 {horario_livre_info}{tarefa.get('descricao', 'Período livre')}{duracao_info}\n"
-                    elif tarefa['tipo'] == "periodo_geral":
-                        mensagem += f"  💡 *{tarefa.get('periodo', 'Período')}*: {tarefa.get('descricao', 'Descrição geral')}\n"
-                    else:
-                        mensagem += f"  - {tarefa.get('descricao', 'Tarefa sem descrição')}\n"
-                        
-                    keyboard_botoes.append(
-                        [InlineKeyboardButton(f"🗑️ Apagar {dia} ({idx+1})", callback_data=f"rotinas_apagar_{dia}_{tarefa['id']}")]
-                    )
-                mensagem += "\n"
-
-        keyboard_botoes.append([InlineKeyboardButton("↩️ Voltar ao Menu de Rotinas", callback_data="rotinas_menu")])
-        reply_markup = InlineKeyboardMarkup(keyboard_botoes)
+        mensagem, reply_markup, pagina, _ = montar_pagina_rotinas(chat_id, user_rotinas, pagina)
+        context.user_data['rotinas_pagina'] = pagina
 
         await query.edit_message_text(
             mensagem,
@@ -278,6 +616,14 @@ class AgendaManager:
         )
         return GERENCIAR_ROTINAS
 
+    async def paginar_rotinas(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+        """Botões ⬅️/➡️ da tela de gerenciamento (callback "rotinas_pagina:<n>")."""
+        try:
+            pagina = int(context.args[0])
+        except (IndexError, ValueError):
+            pagina = 0
+        return await self.gerenciar_rotinas(update, context, pagina)
+
     async def adicionar_rotina_preparar(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         """Prepara o bot para receber o texto da nova rotina."""
         query = update.callback_query
@@ -292,7 +638,8 @@ class AgendaManager:
             "Eu sou inteligente e consigo entender: \n"
             "✅ *Horários fixos*: `10h30 – 11h00: Café + alongamento`\n"
             "✅ *Períodos livres*: `Livre até 14h`, `Noite: Relax total`\n"
-            "✅ *Descrições gerais de período*: `Manhã: Estudos focados`\n\n"
+            "✅ *Descrições gerais de período*: `Manhã: Estudos focados`\n"
+            "⭐ *Importante*: comece a linha com ⭐ para manter o lembrete no modo /resumo\n\n"
             "```\n📆 Minha Nova Rotina\n"
             "🟡 Segunda-feira\n"
             "10h30 – 11h00: Café + alongamento\n"
@@ -314,10 +661,11 @@ class AgendaManager:
             await update.message.reply_text("🤔 Não entendi. Por favor, use os botões do menu 'Rotinas Semanais' para adicionar ou gerenciar.")
             return MENU_ROTINAS
 
-        chat_id = str(update.message.chat_id)
+        chat_id = update.message.chat_id
         texto_rotina = update.message.text
         
         try:
+            await aguardar_rotinas()
             rotina_processada = parse_rotina_textual(texto_rotina)
             if not rotina_processada:
                 await update.message.reply_text(
@@ -327,29 +675,34 @@ class AgendaManager:
                 )
                 return AGUARDANDO_ROTINA_TEXTO
 
-            if chat_id not in rotinas_agendadas:
-                rotinas_agendadas[chat_id] = defaultdict(list)
-            
-            for dia, tarefas in rotina_processada.items():
-                for nova_tarefa in tarefas:
-                    # Verifica se uma tarefa idêntica já existe (ignora o ID para esta verificação)
-                    tarefa_existe = any(
-                        t.get('descricao') == nova_tarefa.get('descricao') and
-                        t.get('inicio') == nova_tarefa.get('inicio') and
-                        t.get('fim') == nova_tarefa.get('fim') and
-                        t.get('tipo') == nova_tarefa.get('tipo')
-                        for t in rotinas_agendadas[chat_id][dia]
-                    )
-                    if not tarefa_existe:
-                        rotinas_agendadas[chat_id][dia].append(nova_tarefa)
-            
-            salvar_rotinas(rotinas_agendadas)
+            async with rotinas_lock:
+                user_rotinas = await get_repositorio().obter(chat_id)
+                # Ignora tarefas idênticas às já existentes (sem comparar o ID)
+                existentes = {t.chave_duplicata() for t in user_rotinas}
+                adicionadas = []
+                for nova_tarefa in rotina_processada:
+                    chave = nova_tarefa.chave_duplicata()
+                    if chave not in existentes:
+                        existentes.add(chave)
+                        inserir_tarefa(user_rotinas, nova_tarefa)
+                        adicionadas.append(nova_tarefa)
+                invalidar_fragmentos(chat_id, {t.dia for t in adicionadas})
+                atualizar_indice_semanal(chat_id, adicionadas=adicionadas)
+                conflitos = analise_rotina(chat_id, user_rotinas).conflitos_com(adicionadas)
+
+                await get_repositorio().salvar(chat_id, user_rotinas)
             del context.user_data['aguardando_rotina_texto']
 
+            aviso_conflitos = ""
+            if conflitos:
+                aviso_conflitos = f"\n\n*Atenção: {len(conflitos)} conflito(s) de horário.*\n" + "".join(
+                    _linha_conflito(tarefa, outra) for tarefa, outra in conflitos[:MAX_CONFLITOS_AVISO]
+                )
             await update.message.reply_text(
                 "🎉 *Rotina semanal adicionada com sucesso!* Ela será seu guia a cada semana. "
                 "Prepare-se para receber os lembretes! 🔔"
                 "\n\nUse 'Gerenciar Rotinas' para ver tudo que você agendou. 👀"
+                f"{aviso_conflitos}"
             , parse_mode='Markdown')
             
             await self.reschedule_all_user_jobs(chat_id, self.bot)
@@ -357,7 +710,7 @@ class AgendaManager:
             return await self.start_rotinas_menu(update, context)
 
         except Exception as e:
-            logger.error(f"Erro ao processar rotina para {chat_id}: {e}", exc_info=True)
+            logger.error("Erro ao processar rotina para %s: %s", chat_id, e, exc_info=True)
             await update.message.reply_text(
                 f"❌ Algo deu errado ao processar sua rotina: `{e}`. "
                 "Verifique se o formato está correto e tente novamente, por favor. 🙏",
@@ -369,170 +722,213 @@ class AgendaManager:
         """Apaga uma tarefa específica da rotina do usuário."""
         query = update.callback_query
         await query.answer()
-        chat_id = str(query.message.chat_id)
+        chat_id = query.message.chat_id
 
-        _, _, dia_str, tarefa_id = query.data.split('_')
+        # callback "rotinas_apagar:<dia>:<id>" (já decodificado pelo roteador)
+        dia_str, tarefa_id = context.args[0], context.args[-1]
+        dia = int(dia_str) if dia_str.isdigit() else None
         
-        user_rotinas = rotinas_agendadas.get(chat_id, {})
         tarefa_encontrada = False
-        dia_da_tarefa = None
         tarefa_removida_descricao = "Tarefa"
 
-        for dia_nome in DIAS_DA_SEMANA_ORDEM:
-            if dia_nome in user_rotinas:
-                for i, tarefa in enumerate(user_rotinas[dia_nome]):
-                    if tarefa.get('id') == tarefa_id:
-                        tarefa_removida_descricao = tarefa.get('descricao', 'Tarefa')
-                        user_rotinas[dia_nome].pop(i)
-                        tarefa_encontrada = True
-                        dia_da_tarefa = dia_nome
-                        break
-                if tarefa_encontrada:
+        await aguardar_rotinas()
+        async with rotinas_lock:
+            user_rotinas = await get_repositorio().obter(chat_id)
+            for i, tarefa in enumerate(user_rotinas):
+                if tarefa.id == tarefa_id and (dia is None or tarefa.dia == dia):
+                    tarefa_removida_descricao = tarefa.descricao or 'Tarefa'
+                    user_rotinas.pop(i)
+                    invalidar_fragmentos(chat_id, [tarefa.dia])
+                    atualizar_indice_semanal(chat_id, removidas=[tarefa])
+                    tarefa_encontrada = True
                     break
-        
-        if tarefa_encontrada:
-            if dia_da_tarefa and not user_rotinas[dia_da_tarefa]:
-                del user_rotinas[dia_da_tarefa]
-            
-            if not user_rotinas:
-                del rotinas_agendadas[chat_id]
 
-            salvar_rotinas(rotinas_agendadas)
-            
-            # Remove o job agendado correspondente do APScheduler
-            job_id = f"rotina_notificacao_{chat_id}_{tarefa_id}"
-            if scheduler.get_job(job_id):
-                scheduler.remove_job(job_id)
-                logger.info(f"Job APScheduler {job_id} removido.")
-            job_id_livre = f"rotina_livre_notificacao_{chat_id}_{tarefa_id}"
-            if scheduler.get_job(job_id_livre):
-                scheduler.remove_job(job_id_livre)
-                logger.info(f"Job APScheduler {job_id_livre} removido.")
+            if tarefa_encontrada:
+                await get_repositorio().salvar(chat_id, user_rotinas)
 
+        if tarefa_encontrada:
+            # O reagendamento abaixo remove o job da tarefa apagada junto com os outros do usuário
             await query.edit_message_text(f"🗑️ Tarefa removida: _{tarefa_removida_descricao}_. Certo! ✅")
             
             await self.reschedule_all_user_jobs(chat_id, self.bot)
         else:
             await query.edit_message_text("Essa tarefa não foi encontrada ou já foi removida. Tente novamente listando as rotinas. 🤔")
         
-        return await self.gerenciar_rotinas(update, context)
+        return await self.gerenciar_rotinas(update, context, context.user_data.get('rotinas_pagina', 0))
 
     # --- Lógica de Agendamento de Rotinas (APScheduler) ---
 
-    async def reschedule_all_user_jobs(self, chat_id: str, bot_instance: ContextTypes.DEFAULT_TYPE):
+    async def marcar_importante(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+        """Botão ☆/★ da tela de gerenciamento: alterna a marca de tarefa importante."""
+        chat_id = update.callback_query.message.chat_id
+        # callback "rotinas_importante:<dia>:<id>" (já decodificado pelo roteador)
+        dia_str, tarefa_id = context.args[0], context.args[-1]
+        dia = int(dia_str) if dia_str.isdigit() else None
+
+        await aguardar_rotinas()
+        async with rotinas_lock:
+            user_rotinas = await get_repositorio().obter(chat_id)
+            candidatas = tarefas_do_dia(user_rotinas, dia) if dia is not None else user_rotinas
+            tarefa = next((t for t in candidatas if t.id == tarefa_id), None)
+            if tarefa is not None:
+                tarefa.importante = not tarefa.importante
+                invalidar_fragmentos(chat_id, [tarefa.dia])
+                await get_repositorio().salvar(chat_id, user_rotinas)
+
+        # Só o modo resumo depende da marca: no modo normal todas as tarefas já têm lembrete
+        if tarefa is not None and hora_resumo_diario(context.chat_data) is not None:
+            await self.reschedule_all_user_jobs(chat_id, self.bot)
+        return await self.gerenciar_rotinas(update, context, context.user_data.get('rotinas_pagina', 0))
+
+    async def reschedule_all_user_jobs(self, chat_id: int, bot_instance: ContextTypes.DEFAULT_TYPE, user_rotinas=None):
         """
         Remove todos os jobs de APScheduler agendados para um usuário e os reagenda com as rotinas atuais.
-        Chamado após adicionar/remover rotinas.
+        Chamado após adicionar/remover rotinas. `user_rotinas` evita a consulta ao repositório
+        quando o chamador já tem as tarefas (agendamento inicial).
         """
-        logger.info(f"Reagendando jobs de rotina para o chat_id: {chat_id}")
-        # Remove todos os jobs antigos deste usuário do APScheduler
-        for job in scheduler.get_jobs():
-            if job.id.startswith(f"rotina_notificacao_{chat_id}_") or job.id.startswith(f"rotina_livre_notificacao_{chat_id}_"):
-                try:
-                    scheduler.remove_job(job.id)
-                    logger.info(f"Job APScheduler {job.id} removido durante reagendamento.")
-                except Exception as e:
-                    logger.error(f"Erro ao remover job {job.id}: {e}")
+        from apscheduler.jobstores.base import JobLookupError
+
+        logger.info("Reagendando jobs de rotina para o chat_id: %s", chat_id)
+        scheduler = get_scheduler()
+        prefixo = self.prefixo_jobs
+        # Remove os jobs antigos deste usuário, pelo índice de jobs por chat
+        indice_jobs = _indice_jobs()
+        for job_id in indice_jobs.pop(chat_id, ()):
+            try:
+                scheduler.remove_job(job_id)
+            except JobLookupError:
+                # Removido por fora (ex: scheduler.remove_all_jobs()): nada a fazer
+                logger.debug("Job %s já não estava no scheduler.", job_id)
         
-        user_rotinas = rotinas_agendadas.get(chat_id)
+        if user_rotinas is None:
+            user_rotinas = await get_repositorio().obter(chat_id)
         if not user_rotinas:
-            logger.info(f"Nenhuma rotina encontrada para {chat_id}. Nenhum job APScheduler agendado.")
+            logger.info("Nenhuma rotina encontrada para %s. Nenhum job APScheduler agendado.", chat_id)
             return
 
-        for dia_nome in DIAS_DA_SEMANA_ORDEM:
-            if dia_nome in user_rotinas:
-                dia_idx = DIAS_DA_SEMANA_ORDEM.index(dia_nome)
-                
-                for tarefa in user_rotinas[dia_nome]:
-                    if tarefa['tipo'] == "horario_fixo":
-                        inicio_str = tarefa.get('inicio')
-                        if not inicio_str:
-                            logger.warning(f"Tarefa {tarefa.get('id', 'N/A')} para o chat {chat_id} não possui horário de início. Pulando agendamento APScheduler.")
-                            continue
-
-                        try:
-                            hour = int(inicio_str.split(':')[0])
-                            minute = int(inicio_str.split(':')[1])
-                        except (ValueError, IndexError) as e:
-                            logger.error(f"Erro ao parsear horário de início '{inicio_str}' da tarefa {tarefa.get('id', 'N/A')} para o chat {chat_id}: {e}. Pulando agendamento APScheduler.")
-                            continue
-
-                        job_id = f"rotina_notificacao_{chat_id}_{tarefa['id']}"
-                        
-                        scheduler.add_job(
-                            self._send_routine_notification,
-                            'cron',
-                            day_of_week=dia_idx,
-                            hour=hour,
-                            minute=minute,
-                            id=job_id,
-                            args=[chat_id, tarefa, bot_instance],
-                            misfire_grace_time=60
-                        )
-                        logger.info(f"APScheduler job '{job_id}' agendado para {dia_nome} às {hour:02d}:{minute:02d}.")
-                    elif tarefa['tipo'] == "periodo_livre" and tarefa.get('fim_sugerido'):
-                        fim_str = tarefa.get('fim_sugerido')
-                        if not fim_str:
-                            logger.warning(f"Período livre {tarefa.get('id', 'N/A')} para o chat {chat_id} não possui horário de fim sugerido. Pulando agendamento APScheduler.")
-                            continue
-
-                        try:
-                            hour = int(fim_str.split(':')[0])
-                            minute = int(fim_str.split(':')[1])
-                        except (ValueError, IndexError) as e:
-                            logger.error(f"Erro ao parsear horário de fim '{fim_str}' do período livre {tarefa.get('id', 'N/A')} para o chat {chat_id}: {e}. Pulando agendamento APScheduler.")
-                            continue
-                        
-                        job_id_livre = f"rotina_livre_notificacao_{chat_id}_{tarefa['id']}"
-                        
-                        scheduler.add_job(
-                            self._send_free_period_notification,
-                            'cron',
-                            day_of_week=dia_idx,
-                            hour=hour,
-                            minute=minute,
-                            id=job_id_livre,
-                            args=[chat_id, tarefa, bot_instance],
-                            misfire_grace_time=60
-                        )
-                        logger.info(f"APScheduler job '{job_id_livre}' agendado para {dia_nome} às {hour:02d}:{minute:02d} (fim período livre).")
-
-
-    async def _send_routine_notification(self, chat_id: str, tarefa: dict, bot_instance: ContextTypes.DEFAULT_TYPE):
+        job_ids = []
+        # Só no modo multibot o job precisa dizer de qual bot é
+        kwargs_job = {"espaco": self.espaco} if self.espaco else None
+        hora_resumo = hora_resumo_diario(self.application.chat_data.get(chat_id))
+        if hora_resumo is not None:
+            # Modo resumo: um job por chat, nos dias que têm tarefas
+            dias_com_tarefas = sorted({tarefa.dia for tarefa in user_rotinas})
+            hour, minute = divmod(hora_resumo, 60)
+            job_id = f"{prefixo}rotina_resumo_{chat_id}"
+            scheduler.add_job(
+                disparar_job_rotina,
+                _trigger_semanal(",".join(map(str, dias_com_tarefas)), hour, minute),
+                id=job_id,
+                args=(chat_id, None, JOB_RESUMO),
+                kwargs=kwargs_job,
+                misfire_grace_time=600
+            )
+            job_ids.append(job_id)
+            logger.info("Resumo diário de %s agendado para %02d:%02d.", chat_id, hour, minute)
+
+        for tarefa in user_rotinas:
+            if hora_resumo is not None and not tarefa.importante:
+                continue
+            dia_nome = tarefa.dia_nome
+            if tarefa.tipo is TipoTarefa.HORARIO_FIXO:
+                if tarefa.inicio is None:
+                    logger.warning("Tarefa %s para o chat %s não possui horário de início válido. Pulando agendamento APScheduler.", tarefa.id, chat_id)
+                    continue
+
+                hour, minute = divmod(tarefa.inicio, 60)
+                job_id = f"{prefixo}rotina_notificacao_{chat_id}_{tarefa.id}"
+
+                scheduler.add_job(
+                    disparar_job_rotina,
+                    _trigger_semanal(tarefa.dia, hour, minute),
+                    id=job_id,
+                    args=(chat_id, tarefa.id, JOB_ROTINA),
+                    kwargs=kwargs_job,
+                    misfire_grace_time=60
+                )
+                job_ids.append(job_id)
+                logger.info("APScheduler job '%s' agendado para %s às %02d:%02d.", job_id, dia_nome, hour, minute)
+            elif tarefa.tipo is TipoTarefa.PERIODO_LIVRE and tarefa.fim is not None:
+                hour, minute = divmod(tarefa.fim, 60)
+                job_id_livre = f"{prefixo}rotina_livre_notificacao_{chat_id}_{tarefa.id}"
+
+                scheduler.add_job(
+                    disparar_job_rotina,
+                    _trigger_semanal(tarefa.dia, hour, minute),
+                    id=job_id_livre,
+                    args=(chat_id, tarefa.id, JOB_LIVRE),
+                    kwargs=kwargs_job,
+                    misfire_grace_time=60
+                )
+                job_ids.append(job_id_livre)
+                logger.info("APScheduler job '%s' agendado para %s às %02d:%02d (fim período livre).", job_id_livre, dia_nome, hour, minute)
+        if job_ids:
+            indice_jobs[chat_id] = job_ids
+
+
+    async def _notificar(self, chave: str, chat_id, texto: str, bot_instance, botoes=None) -> None:
+        """
+        Entrega uma notificação pela caixa de saída durável (ver caixa_saida.py), que tenta de
+        novo após falhas e reinícios. `chave` identifica a ocorrência: repetida, não reenvia.
+        Sem caixa de saída (ex: AgendaManager montado fora de construir_aplicacao) envia direto.
+        """
+        if self.caixa_saida is not None:
+            await self.caixa_saida.registrar(chave, chat_id, texto, parse_mode='Markdown', botoes=botoes)
+            return
+        reply_markup = None
+        if botoes:
+            reply_markup = InlineKeyboardMarkup([
+                [InlineKeyboardButton(rotulo, callback_data=dados) for rotulo, dados in linha] for linha in botoes
+            ])
+        await bot_instance.send_message(chat_id=chat_id, text=texto, parse_mode='Markdown', reply_markup=reply_markup)
+
+    async def _send_routine_notification(self, chat_id: int, tarefa: TarefaRotina, bot_instance: ContextTypes.DEFAULT_TYPE):
         """Envia a notificação da tarefa de rotina ao usuário (via APScheduler)."""
         try:
-            descricao = tarefa.get('descricao', 'Sua tarefa de rotina')
-            duracao_info = f" ({tarefa.get('duracao', 'N/A')})" if tarefa.get('duracao') else ""
-            
-            keyboard = [
-                [InlineKeyboardButton("✅ Concluída!", callback_data=f"rotinas_concluir_{tarefa.get('id', 'unknown_id')}")],
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-
-            await bot_instance.send_message(
-                chat_id=chat_id,
-                text=f"🔔 *ATENÇÃO! Sua próxima tarefa de rotina começa AGORA:*\n\n"
-                     f"⏰ `{tarefa.get('inicio', '??:??')}-{tarefa.get('fim', '??:??')}`: _{descricao}_{duracao_info}\n\n"
-                     f"Já concluiu? Me avise para eu registrar! 👇",
-                parse_mode='Markdown',
-                reply_markup=reply_markup
+            descricao = tarefa.descricao or 'Sua tarefa de rotina'
+            duracao = tarefa.duracao
+            duracao_info = f" ({duracao})" if duracao else ""
+
+            await self._notificar(
+                f"rotina:{chat_id}:{tarefa.id}:{relogio.agora().date().isoformat()}",
+                chat_id,
+                f"🔔 *ATENÇÃO! Sua próxima tarefa de rotina começa AGORA:*\n\n"
+                f"⏰ `{tarefa.inicio_str or '??:??'}-{tarefa.fim_str or '??:??'}`: _{descricao}_{duracao_info}\n\n"
+                f"Já concluiu? Me avise para eu registrar! 👇",
+                bot_instance,
+                botoes=[[("✅ Concluída!", montar("rotinas_concluir", tarefa.id))]],
             )
-            logger.info(f"Notificação de rotina enviada para {chat_id} para tarefa {tarefa.get('id')}")
+            logger.info("Notificação de rotina registrada para %s para tarefa %s", chat_id, tarefa.id)
         except Exception as e:
-            logger.error(f"Erro ao enviar notificação de rotina para {chat_id}: {e}", exc_info=True)
+            logger.error("Erro ao enviar notificação de rotina para %s: %s", chat_id, e, exc_info=True)
 
-    async def _send_free_period_notification(self, chat_id: str, tarefa: dict, bot_instance: ContextTypes.DEFAULT_TYPE):
+    async def _send_free_period_notification(self, chat_id: int, tarefa: TarefaRotina, bot_instance: ContextTypes.DEFAULT_TYPE):
         """Envia uma notificação informando que o usuário está livre (via APScheduler)."""
         try:
-            await bot_instance.send_message(
-                chat_id=chat_id,
-                text=f"🥳 *Ótima notícia!* Seu período de _{tarefa.get('descricao', 'tempo livre')}_ termina agora. "
-                     "Você está *livre* para o que quiser! Que tal um descanso? ☕",
-                parse_mode='Markdown'
+            await self._notificar(
+                f"livre:{chat_id}:{tarefa.id}:{relogio.agora().date().isoformat()}",
+                chat_id,
+                f"🥳 *Ótima notícia!* Seu período de _{tarefa.descricao or 'tempo livre'}_ termina agora. "
+                "Você está *livre* para o que quiser! Que tal um descanso? ☕",
+                bot_instance,
             )
-            logger.info(f"Notificação de período livre enviada para {chat_id} para tarefa {tarefa.get('id')}")
+            logger.info("Notificação de período livre registrada para %s para tarefa %s", chat_id, tarefa.id)
+        except Exception as e:
+            logger.error("Erro ao enviar notificação de período livre para %s: %s", chat_id, e, exc_info=True)
+
+    async def _send_daily_digest(self, chat_id: int, bot_instance: ContextTypes.DEFAULT_TYPE):
+        """Envia o resumo das rotinas do dia (modo resumo diário, via APScheduler)."""
+        # Os jobs do APScheduler não herdam o espaço de quem os agendou
+        espaco_atual.set(self.espaco)
+        try:
+            await aguardar_rotinas()
+            texto = montar_resumo_diario(chat_id, await get_repositorio().obter(chat_id), relogio.agora().weekday())
+            if texto is None:
+                return
+            await self._notificar(f"resumo:{chat_id}:{relogio.agora().date().isoformat()}", chat_id, texto, bot_instance)
+            logger.info("Resumo diário registrado para %s", chat_id)
         except Exception as e:
-            logger.error(f"Erro ao enviar notificação de período livre para {chat_id}: {e}", exc_info=True)
+            logger.error("Erro ao enviar resumo diário para %s: %s", chat_id, e, exc_info=True)
 
     async def concluir_tarefa_notificada_rotina(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """
@@ -544,9 +940,9 @@ class AgendaManager:
         chat_id = str(query.message.chat_id)
         
         try:
-            _, _, tarefa_id = query.data.split('_')
+            (tarefa_id,) = context.args
         except ValueError:
-            logger.error(f"Erro ao extrair tarefa_id do callback_data: {query.data}")
+            logger.error("Erro ao extrair tarefa_id do callback_data: %s", query.data)
             await query.edit_message_text("Ops! Não consegui identificar a tarefa de rotina. Tente novamente! 😕")
             return
 
@@ -556,9 +952,9 @@ class AgendaManager:
                 f"Sua próxima notificação chegará no horário! 🔔",
                 parse_mode='Markdown'
             )
-            logger.info(f"Tarefa de rotina {tarefa_id} marcada como concluída para {chat_id}")
+            logger.info("Tarefa de rotina %s marcada como concluída para %s", tarefa_id, chat_id)
         except Exception as e:
-            logger.error(f"Erro ao concluir tarefa de rotina notificada para {chat_id}: {e}", exc_info=True)
+            logger.error("Erro ao concluir tarefa de rotina notificada para %s: %s", chat_id, e, exc_info=True)
             await query.edit_message_text("Ops! Não consegui marcar como concluída agora. Tente novamente! 😕")
 
 
@@ -576,7 +972,7 @@ class AgendaManager:
         task_id = uuid.uuid4().hex
         
         # Calcula o horário de agendamento
-        run_at = datetime.now() + timedelta(minutes=delay_minutes)
+        run_at = relogio.agora() + timedelta(minutes=delay_minutes)
 
         task = {
             'id': task_id,
@@ -585,13 +981,14 @@ class AgendaManager:
             'completed': False,
             'not_completed_reason': None
         }
-        context.user_data['tasks'].append(task)
+        inserir_tarefa_avulsa(tarefas_ordenadas(context.user_data), task)
         
-        # Agenda o job com JobQueue
+        # Agenda o job com JobQueue (com user_id, o job vê o user_data em que a tarefa foi guardada)
         self.job_queue.run_once(
             self._send_one_off_task_notification,
             run_at,
-            chat_id=chat_id,
+            chat_id=update.effective_chat.id,
+            user_id=update.effective_user.id,
             data={'task_id': task_id, 'description': description},
             name=f"one_off_task_{chat_id}_{task_id}"
         )
@@ -599,7 +996,7 @@ class AgendaManager:
         await update.message.reply_text(
             f"✅ Lembrete para '{description}' agendado para daqui a {delay_minutes} minutos ({run_at.strftime('%H:%M')})."
         )
-        logger.info(f"Tarefa avulsa '{description}' agendada para {chat_id} em {delay_minutes} minutos.")
+        logger.info("Tarefa avulsa '%s' agendada para %s em %s minutos.", description, chat_id, delay_minutes)
 
 
     async def _send_one_off_task_notification(self, context: ContextTypes.DEFAULT_TYPE):
@@ -611,37 +1008,35 @@ class AgendaManager:
         task_id = job.data['task_id']
         description = job.data['description']
 
-        user_tasks = context.application.user_data.get(chat_id, {}).get('tasks', [])
+        user_tasks = (context.user_data or {}).get('tasks', [])
         task_found = False
         for task in user_tasks:
             if task['id'] == task_id:
                 task_found = True
                 if task['completed']:
-                    logger.info(f"Tarefa {task_id} para {chat_id} já concluída. Não enviando notificação.")
+                    logger.info("Tarefa %s para %s já concluída. Não enviando notificação.", task_id, chat_id)
                     return
                 break
         
         if not task_found:
-            logger.warning(f"Tarefa {task_id} não encontrada para {chat_id}. Possivelmente já foi removida.")
+            logger.warning("Tarefa %s não encontrada para %s. Possivelmente já foi removida.", task_id, chat_id)
             return
 
-        keyboard = [
-            [InlineKeyboardButton("✅ Concluída!", callback_data=f"task_complete_{task_id}")],
-            [InlineKeyboardButton("❌ Não Concluída", callback_data=f"task_not_complete_{task_id}")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
         try:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=f"🔔 *Lembrete!* Hora de: _{description}_\n\n"
-                     "Marque como concluída ou me diga o motivo se não conseguiu. 👇",
-                parse_mode='Markdown',
-                reply_markup=reply_markup
+            await self._notificar(
+                f"avulsa:{chat_id}:{task_id}",
+                chat_id,
+                f"🔔 *Lembrete!* Hora de: _{description}_\n\n"
+                "Marque como concluída ou me diga o motivo se não conseguiu. 👇",
+                context.bot,
+                botoes=[
+                    [("✅ Concluída!", montar("task_complete", task_id))],
+                    [("❌ Não Concluída", montar("task_not_complete", task_id))],
+                ],
             )
-            logger.info(f"Notificação de tarefa avulsa enviada para {chat_id}: {description}")
+            logger.info("Notificação de tarefa avulsa registrada para %s: %s", chat_id, description)
         except Exception as e:
-            logger.error(f"Erro ao enviar notificação de tarefa avulsa para {chat_id}: {e}", exc_info=True)
+            logger.error("Erro ao enviar notificação de tarefa avulsa para %s: %s", chat_id, e, exc_info=True)
 
 
     async def handle_task_completion(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -649,7 +1044,7 @@ class AgendaManager:
         query = update.callback_query
         await query.answer()
         chat_id = str(query.message.chat_id)
-        task_id = query.data.split('_')[2]
+        task_id = decodificar(query.data)[1][0]
 
         user_tasks = context.user_data.get('tasks', [])
         task_found = False
@@ -665,7 +1060,7 @@ class AgendaManager:
             # Remove todos os jobs agendados para esta tarefa específica
             for job in context.job_queue.get_jobs_by_name(f"one_off_task_{chat_id}_{task_id}"):
                 job.schedule_removal()
-            logger.info(f"Tarefa avulsa {task_id} para {chat_id} marcada como concluída e jobs removidos.")
+            logger.info("Tarefa avulsa %s para %s marcada como concluída e jobs removidos.", task_id, chat_id)
         else:
             await query.edit_message_text("Essa tarefa não foi encontrada ou já foi concluída/removida. 🤔")
 
@@ -674,7 +1069,7 @@ class AgendaManager:
         query = update.callback_query
         await query.answer()
         chat_id = str(query.message.chat_id)
-        task_id = query.data.split('_')[2]
+        task_id = decodificar(query.data)[1][0]
 
         user_tasks = context.user_data.get('tasks', [])
         task_found = False
@@ -721,7 +1116,7 @@ class AgendaManager:
             # Remove todos os jobs agendados para esta tarefa específica
             for job in context.job_queue.get_jobs_by_name(f"one_off_task_{chat_id}_{task_id}"):
                 job.schedule_removal()
-            logger.info(f"Motivo de não conclusão registrado para tarefa avulsa {task_id} para {chat_id} e jobs removidos.")
+            logger.info("Motivo de não conclusão registrado para tarefa avulsa %s para %s e jobs removidos.", task_id, chat_id)
         else:
             await update.message.reply_text("Essa tarefa não foi encontrada ou já foi concluída/removida. 🤔")
         
@@ -734,7 +1129,7 @@ class AgendaManager:
         
         upcoming_tasks = [
             task for task in user_tasks 
-            if not task['completed'] and datetime.fromisoformat(task['scheduled_time']) > datetime.now()
+            if not task['completed'] and datetime.fromisoformat(task['scheduled_time']) > relogio.agora()
         ]
         upcoming_tasks.sort(key=lambda x: x['scheduled_time'])
 
@@ -812,7 +1207,7 @@ class AgendaManager:
             scheduled_dt = datetime.fromisoformat(task['scheduled_time'])
             keyboard.append([InlineKeyboardButton(
                 f"❌ {task['description']} ({scheduled_dt.strftime('%d/%m %H:%M')})",
-                callback_data=f"confirm_delete_task_{task['id']}"
+                callback_data=montar("confirm_delete_task", task['id'])
             )])
         
         keyboard.append([InlineKeyboardButton("↩️ Voltar", callback_data="main_menu_return")])
@@ -825,7 +1220,7 @@ class AgendaManager:
         """Solicita confirmação antes de apagar uma tarefa avulsa."""
         query = update.callback_query
         await query.answer()
-        task_id = query.data.split('_')[3] # confirm_delete_task_TASKID
+        task_id = context.args[0] # confirm_delete_task:TASKID
 
         context.user_data['task_to_delete_id'] = task_id
 
@@ -837,8 +1232,8 @@ class AgendaManager:
                 break
 
         keyboard = [
-            [InlineKeyboardButton("✅ Sim, Apagar", callback_data="execute_delete_task_yes")],
-            [InlineKeyboardButton("❌ Não, Voltar", callback_data="execute_delete_task_no")]
+            [InlineKeyboardButton("✅ Sim, Apagar", callback_data=montar("execute_delete_task", "yes"))],
+            [InlineKeyboardButton("❌ Não, Voltar", callback_data=montar("execute_delete_task", "no"))]
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -855,7 +1250,7 @@ class AgendaManager:
         await query.answer()
         chat_id = str(query.message.chat_id)
         
-        if query.data == "execute_delete_task_no":
+        if context.args == ["no"]:
             del context.user_data['task_to_delete_id']
             await query.edit_message_text("Exclusão cancelada. Voltando ao menu principal. ↩️")
             return ConversationHandler.END # Ou um estado apropriado
@@ -878,7 +1273,7 @@ class AgendaManager:
             jobs = context.job_queue.get_jobs_by_name(f"one_off_task_{chat_id}_{task_id_to_delete}")
             for job in jobs:
                 job.schedule_removal()
-            logger.info(f"Tarefa avulsa {task_id_to_delete} para {chat_id} removida e jobs JobQueue cancelados.")
+            logger.info("Tarefa avulsa %s para %s removida e jobs JobQueue cancelados.", task_id_to_delete, chat_id)
         else:
             await query.edit_message_text("Essa tarefa não foi encontrada ou já foi removida. 🤔")
         
@@ -886,53 +1281,180 @@ class AgendaManager:
 
     # --- Configuração do ConversationHandler ---
 
+    # --- Consultas rápidas da rotina (/agora e /proximo) ---
+
+    async def _indice_do_chat(self, chat_id: int) -> IndiceSemanal:
+        await aguardar_rotinas()
+        return indice_semanal(chat_id, await get_repositorio().obter(chat_id))
+
+    async def comando_agora(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """/agora: tarefas da rotina em andamento e o que ainda falta hoje."""
+        chat_id = update.effective_chat.id
+        try:
+            indice = await self._indice_do_chat(chat_id)
+        except Exception as e:
+            logger.error("Erro ao consultar a rotina de %s para /agora: %s", chat_id, e, exc_info=True)
+            await update.message.reply_text("Ops! Não consegui consultar sua rotina agora. Tente novamente mais tarde. 😥")
+            return
+        if not indice:
+            await update.message.reply_text("Você ainda não tem tarefas com horário na sua rotina semanal. Adicione pelo menu 🗓️ Rotinas Semanais!")
+            return
+
+        minuto = minuto_da_semana_atual()
+        dia, minutos_hoje = divmod(minuto, MINUTOS_POR_DIA)
+        partes = [f"🕒 *Agora* ({DIAS_DA_SEMANA_ORDEM[dia]}, {minutos_hoje // 60:02d}:{minutos_hoje % 60:02d})\n"]
+        atuais = indice.atuais(minuto)
+        partes.extend(_linha_tarefa(tarefa) for tarefa in atuais)
+        if not atuais:
+            partes.append("  Nada da sua rotina neste momento. 😌\n")
+
+        restantes = indice.restante_do_dia(minuto)
+        partes.append("\n📋 *Ainda hoje:*\n")
+        partes.extend(_linha_tarefa(tarefa) for tarefa in restantes[:MAX_TAREFAS_PAGINA])
+        if len(restantes) > MAX_TAREFAS_PAGINA:
+            partes.append(f"  _… e mais {len(restantes) - MAX_TAREFAS_PAGINA}_\n")
+        if not restantes:
+            partes.append("  Mais nada por hoje. Bom descanso! 🌙\n")
+        await update.message.reply_text("".join(partes), parse_mode='Markdown')
+
+    async def comando_proximo(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """/proximo: a próxima tarefa da rotina e quanto falta para ela."""
+        chat_id = update.effective_chat.id
+        try:
+            indice = await self._indice_do_chat(chat_id)
+        except Exception as e:
+            logger.error("Erro ao consultar a rotina de %s para /proximo: %s", chat_id, e, exc_info=True)
+            await update.message.reply_text("Ops! Não consegui consultar sua rotina agora. Tente novamente mais tarde. 😥")
+            return
+        proxima = indice.proxima(minuto_da_semana_atual())
+        if proxima is None:
+            await update.message.reply_text("Você ainda não tem tarefas com horário na sua rotina semanal. Adicione pelo menu 🗓️ Rotinas Semanais!")
+            return
+        tarefa, faltam = proxima
+        await update.message.reply_text(
+            f"⏭️ *Próxima tarefa* ({tarefa.dia_nome}, em {formatar_duracao(faltam)}):\n{_linha_tarefa(tarefa)}",
+            parse_mode='Markdown'
+        )
+
+    async def comando_resumo(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """/resumo [ativar [HH:MM] | desativar]: modo resumo diário das notificações de rotina."""
+        chat_id = update.effective_chat.id
+        args = [arg.lower() for arg in context.args or []]
+        if not args:
+            hora = hora_resumo_diario(context.chat_data)
+            estado = f"ativo, às {minutos_para_horario(hora)}" if hora is not None else "desativado"
+            await update.message.reply_text(
+                f"📰 Modo resumo diário: *{estado}*.\n\n"
+                "Nele você recebe um único resumo da rotina do dia pela manhã, e lembretes na hora só "
+                "das tarefas marcadas com ⭐ (em 'Gerenciar Rotinas').\n\n" + USO_RESUMO,
+                parse_mode='Markdown'
+            )
+            return
+
+        if args[0] == "ativar":
+            hora = horario_para_minutos(args[1]) if len(args) > 1 else RESUMO_HORA_PADRAO
+            if hora is None:
+                await update.message.reply_text(USO_RESUMO)
+                return
+            context.chat_data[CHAVE_RESUMO_DIARIO] = hora
+            resposta = (f"📰 Modo resumo ativado! Todo dia às {minutos_para_horario(hora)} chega o resumo da sua rotina, "
+                        "e só as tarefas ⭐ continuam com lembrete na hora.")
+        elif args[0] == "desativar":
+            context.chat_data.pop(CHAVE_RESUMO_DIARIO, None)
+            resposta = "🔔 Modo resumo desativado. Você volta a receber um lembrete para cada tarefa da rotina."
+        else:
+            await update.message.reply_text(USO_RESUMO)
+            return
+
+        try:
+            await aguardar_rotinas()
+            await self.reschedule_all_user_jobs(chat_id, self.bot)
+        except Exception as e:
+            logger.error("Erro ao reagendar rotinas de %s para /resumo: %s", chat_id, e, exc_info=True)
+            await update.message.reply_text("Ops! Não consegui atualizar seus lembretes agora. Tente novamente mais tarde. 😥")
+            return
+        await update.message.reply_text(resposta)
+
+    async def comando_lembrar(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """/lembrar <minutos> <descrição>: cria a tarefa avulsa direto, sem passar pelos menus."""
+        args = context.args or []
+        minutos = int(args[0]) if args and args[0].isdigit() else 0
+        descricao = " ".join(args[1:])
+        if not 0 < minutos <= MAX_MINUTOS_LEMBRETE or not descricao:
+            await update.message.reply_text(USO_LEMBRAR)
+            return
+        await self.create_one_off_task(update, context, descricao, minutos)
+
+    def get_comandos_rotina_handlers(self) -> list:
+        """Handlers de /agora, /proximo, /resumo e /lembrar."""
+        return [
+            CommandHandler("agora", self.comando_agora),
+            CommandHandler("proximo", self.comando_proximo),
+            CommandHandler("resumo", self.comando_resumo),
+            CommandHandler("lembrar", self.comando_lembrar),
+        ]
+
     def get_agenda_conversation_handler(self) -> ConversationHandler:
         """
         Retorna o ConversationHandler para a funcionalidade de Agenda (Rotinas e Tarefas Avulsas).
         """
+        # Cada estado tem um único RoteadorCallbacks: o callback_data é roteado pelo prefixo (ver callbacks.py)
         return ConversationHandler(
             entry_points=[
-                CallbackQueryHandler(self.start_rotinas_menu, pattern="^open_rotinas_semanais_menu$"),
-                CallbackQueryHandler(self.list_upcoming_tasks, pattern="^open_tasks_menu$"), # Novo entry point para tarefas avulsas
+                RoteadorCallbacks({
+                    "open_rotinas_semanais_menu": self.start_rotinas_menu,
+                    "open_tasks_menu": self.list_upcoming_tasks, # Novo entry point para tarefas avulsas
+                }),
             ],
             states={
                 MENU_ROTINAS: [
-                    CallbackQueryHandler(self.gerenciar_rotinas, pattern="^rotinas_gerenciar$"),
-                    CallbackQueryHandler(self.adicionar_rotina_preparar, pattern="^rotinas_adicionar$"),
-                    CallbackQueryHandler(self.start_rotinas_menu, pattern="^rotinas_menu$"),
-                    # Handler para concluir tarefas de rotina (notificações do APScheduler)
-                    CallbackQueryHandler(self.concluir_tarefa_notificada_rotina, pattern=r"^rotinas_concluir_.*$"),
+                    RoteadorCallbacks({
+                        "rotinas_gerenciar": self.gerenciar_rotinas,
+                        "rotinas_adicionar": self.adicionar_rotina_preparar,
+                        "rotinas_menu": self.start_rotinas_menu,
+                        # Concluir tarefas de rotina (notificações do APScheduler)
+                        "rotinas_concluir": self.concluir_tarefa_notificada_rotina,
+                    }),
                 ],
                 AGUARDANDO_ROTINA_TEXTO: [
                     MessageHandler(filters.TEXT & ~filters.COMMAND, self.adicionar_rotina_processar),
-                    CallbackQueryHandler(self.start_rotinas_menu, pattern="^rotinas_menu$"),
+                    RoteadorCallbacks({"rotinas_menu": self.start_rotinas_menu}),
                 ],
                 GERENCIAR_ROTINAS: [
-                    CallbackQueryHandler(self.apagar_tarefa, pattern=r"^rotinas_apagar_.*$"),
-                    CallbackQueryHandler(self.start_rotinas_menu, pattern="^rotinas_menu$"),
+                    RoteadorCallbacks({
+                        "rotinas_apagar": self.apagar_tarefa,
+                        "rotinas_importante": self.marcar_importante,
+                        "rotinas_pagina": self.paginar_rotinas,
+                        "rotinas_menu": self.start_rotinas_menu,
+                    }),
                 ],
                 LISTAR_TAREFAS_AVULSAS: [
-                    # Handler para adicionar tarefa avulsa (ainda precisa de um fluxo de input)
-                    # CallbackQueryHandler(self.add_one_off_task_preparar, pattern="^add_one_off_task$"), 
-                    CallbackQueryHandler(self.list_completed_tasks, pattern="^list_completed_tasks$"), # Exemplo
-                    CallbackQueryHandler(self.initiate_delete_task, pattern="^initiate_delete_task$"), # Exemplo
-                    CallbackQueryHandler(self.list_upcoming_tasks, pattern="^list_upcoming_tasks$"),
-                    CallbackQueryHandler(self.start_rotinas_menu, pattern="^rotinas_menu$"), # Voltar para menu de rotinas
-                    CallbackQueryHandler(self.list_upcoming_tasks, pattern="^main_menu_return$"), # Para voltar ao próprio menu de tarefas
+                    RoteadorCallbacks({
+                        # "add_one_off_task" ainda precisa de um fluxo de input
+                        "list_completed_tasks": self.list_completed_tasks, # Exemplo
+                        "initiate_delete_task": self.initiate_delete_task, # Exemplo
+                        "list_upcoming_tasks": self.list_upcoming_tasks,
+                        "rotinas_menu": self.start_rotinas_menu, # Voltar para menu de rotinas
+                        "main_menu_return": self.list_upcoming_tasks, # Para voltar ao próprio menu de tarefas
+                    }),
                 ],
                 AGUARDANDO_MOTIVO_NAO_CONCLUIDA: [
                     MessageHandler(filters.TEXT & ~filters.COMMAND, self.process_not_completed_reason),
                 ],
                 DELETAR_TAREFA_AVULSA: [
-                    CallbackQueryHandler(self.confirm_delete_task, pattern=r"^confirm_delete_task_.*$"),
-                    CallbackQueryHandler(self.execute_delete_task, pattern=r"^execute_delete_task_.*$"),
-                    # Fallback para caso o usuário cancele ou queira voltar
-                    CallbackQueryHandler(self.list_upcoming_tasks, pattern="^main_menu_return$"), 
+                    RoteadorCallbacks({
+                        "confirm_delete_task": self.confirm_delete_task,
+                        "execute_delete_task": self.execute_delete_task,
+                        # Fallback para caso o usuário cancele ou queira voltar
+                        "main_menu_return": self.list_upcoming_tasks,
+                    }),
                 ]
             },
             fallbacks=[
-                CallbackQueryHandler(self.start_rotinas_menu, pattern="^rotinas_menu$"),
-                CallbackQueryHandler(self.list_upcoming_tasks, pattern="^main_menu_return$"), # Para o caso de estar no fluxo de tarefas avulsas
+                RoteadorCallbacks({
+                    "rotinas_menu": self.start_rotinas_menu,
+                    "main_menu_return": self.list_upcoming_tasks, # Para o caso de estar no fluxo de tarefas avulsas
+                }),
                 # Adicione outros fallbacks gerais se necessário
             ],
             map_to_parent={
@@ -943,18 +1465,37 @@ class AgendaManager:
 # Função para iniciar o agendamento de todas as rotinas existentes (ao iniciar o bot)
 async def start_all_scheduled_jobs(application: Application):
     """
-    Função chamada uma vez na inicialização do bot para agendar todas as rotinas salvas
-    com APScheduler.
+    Carrega as rotinas salvas e agenda todas com APScheduler.
+    Roda em segundo plano logo após a inicialização do bot, sem atrasar o início do polling.
     """
+    scheduler = get_scheduler()
     if not scheduler.running:
         scheduler.start()
         logger.info("APScheduler iniciado.")
 
+    espaco = espaco_atual.get()
+    inicio = time.perf_counter()
+    repositorio = None
+    try:
+        # Abertura do banco (e importação do JSON antigo) fora do loop de eventos
+        repositorio = await asyncio.to_thread(abrir_repositorio, espaco)
+    finally:
+        # Mesmo com erro de leitura os handlers precisam ser liberados
+        if repositorio is None:
+            repositorio = RotinasRepositorio(":memory:", ROTINAS_CACHE_TAREFAS)
+        usar_repositorio(repositorio)
+    logger.info("Banco de rotinas %s aberto em %.2fs.", arquivo_do_espaco(ROTINAS_DB, espaco), time.perf_counter() - inicio)
+
     logger.info("Agendando rotinas semanais existentes para todos os usuários...")
     # Criar uma instância dummy de AgendaManager para acessar reschedule_all_user_jobs
     # sem precisar de um Update/Context real
     agenda_manager_dummy = AgendaManager(application) 
-    
-    for chat_id in rotinas_agendadas.keys():
-        await agenda_manager_dummy.reschedule_all_user_jobs(chat_id, application.bot)
-    logger.info("Agendamento inicial de rotinas semanais concluído.")
+
+    # Percorre o banco em lotes sem encher o cache: só os jobs ficam em memória
+    usuarios = 0
+    async for chat_id, tarefas in repositorio.iterar_todos():
+        await agenda_manager_dummy.reschedule_all_user_jobs(chat_id, application.bot, tarefas)
+        usuarios += 1
+        # Devolve o loop aos updates entre um usuário e outro
+        await asyncio.sleep(0)
+    logger.info("Agendamento inicial de rotinas semanais concluído (%s usuários).", usuarios)
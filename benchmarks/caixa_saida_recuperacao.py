@@ -0,0 +1,152 @@
+"""
+Notificações durante uma queda do Telegram e depois de um reinício, com a caixa de saída
+durável (caixa_saida.py) vs o envio direto de antes.
+
+- queda: N lembretes disparam com a Bot API fora do ar por alguns segundos. Conta quantos
+  chegam depois da volta, em quanto tempo, quantas tentativas foram feitas durante a queda
+  e o maior atraso do loop de eventos (tarefa que acorda a cada 10 ms).
+- reinicio: N lembretes registrados, o processo "cai" no meio da entrega (drenador
+  cancelado sem fechar nada) e uma nova caixa de saída abre o mesmo arquivo.
+
+O bot é falso: cada envio leva 20 ms e cada mensagem entregue é contada pela chave, para
+detectar duplicatas.
+
+Exemplo (a partir da raiz do repositório):
+    python benchmarks/caixa_saida_recuperacao.py --notificacoes 500 --envios-por-segundo 100
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from telegram.error import NetworkError  # noqa: E402
+
+import caixa_saida  # noqa: E402
+
+LATENCIA_ENVIO = 0.02
+
+
+class BotFalso:
+    def __init__(self):
+        self.fora_do_ar = False
+        self.entregues = Counter()  # texto (único por notificação) -> vezes
+        self.tentativas_fora_do_ar = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(LATENCIA_ENVIO)
+        if self.fora_do_ar:
+            self.tentativas_fora_do_ar += 1
+            raise NetworkError("httpx.ConnectError: All connection attempts failed")
+        self.entregues[text] += 1
+
+
+async def _medir_atraso_loop(parar: asyncio.Event, atrasos: list):
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(0.01)
+        atrasos.append(time.perf_counter() - inicio - 0.01)
+
+
+async def _ate_esvaziar(caixa, limite: float = 120) -> None:
+    fim = time.perf_counter() + limite
+    while caixa.estatisticas()["caixa_saida_pendentes"] and time.perf_counter() < fim:
+        await asyncio.sleep(0.01)
+
+
+async def queda_direto(notificacoes: int) -> dict:
+    """Como era: send_message direto, a exceção é logada e o lembrete se perde."""
+    bot = BotFalso()
+    bot.fora_do_ar = True
+    for i in range(notificacoes):
+        try:
+            await bot.send_message(1000 + i, f"lembrete {i}")
+        except NetworkError:
+            pass
+    bot.fora_do_ar = False
+    return {"modo": "envio_direto", "cenario": "queda", "notificacoes": notificacoes,
+            "entregues": sum(bot.entregues.values()), "perdidas": notificacoes - len(bot.entregues)}
+
+
+async def queda_caixa(notificacoes: int, segundos_fora: float, caminho: str, taxa: float) -> dict:
+    bot = BotFalso()
+    caixa = caixa_saida.CaixaSaida(bot, caminho, taxa)
+    await caixa.iniciar()
+    parar, atrasos = asyncio.Event(), []
+    medidor = asyncio.create_task(_medir_atraso_loop(parar, atrasos))
+
+    bot.fora_do_ar = True
+    for i in range(notificacoes):
+        await caixa.registrar(f"rotina:{1000 + i}:t{i}:hoje", 1000 + i, f"lembrete {i}")
+    await asyncio.sleep(segundos_fora)
+    bot.fora_do_ar = False
+    volta = time.perf_counter()
+    await _ate_esvaziar(caixa)
+    drenagem = time.perf_counter() - volta
+
+    parar.set()
+    await medidor
+    await caixa.parar()
+    return {
+        "modo": "caixa_saida", "cenario": "queda", "notificacoes": notificacoes,
+        "segundos_fora_do_ar": segundos_fora,
+        "entregues": len(bot.entregues), "duplicadas": sum(n - 1 for n in bot.entregues.values()),
+        "tentativas_durante_queda": bot.tentativas_fora_do_ar,
+        "drenagem_s": round(drenagem, 2), "envios_por_s": round(len(bot.entregues) / drenagem, 1),
+        "atraso_max_loop_ms": round(max(atrasos) * 1000, 1),
+    }
+
+
+async def reinicio_caixa(notificacoes: int, caminho: str, taxa: float) -> dict:
+    bot = BotFalso()
+    caixa = caixa_saida.CaixaSaida(bot, caminho, taxa)
+    await caixa.iniciar()
+    for i in range(notificacoes):
+        await caixa.registrar(f"rotina:{1000 + i}:t{i}:hoje", 1000 + i, f"lembrete {i}")
+    while len(bot.entregues) < notificacoes // 2:
+        await asyncio.sleep(0.01)
+    # Queda do processo: o drenador morre no meio de um lote, o arquivo não é fechado
+    caixa._drenador.cancel()
+    antes = len(bot.entregues)
+
+    nova = caixa_saida.CaixaSaida(bot, caminho, taxa)
+    await nova.iniciar()
+    recuperadas = nova.estatisticas()["caixa_saida_pendentes"]
+    # O job que disparou antes da queda dispara de novo após o reinício: a chave o ignora
+    for i in range(notificacoes):
+        await nova.registrar(f"rotina:{1000 + i}:t{i}:hoje", 1000 + i, f"lembrete {i}")
+    await _ate_esvaziar(nova)
+    await nova.parar()
+    return {
+        "modo": "caixa_saida", "cenario": "reinicio", "notificacoes": notificacoes,
+        "entregues_antes_da_queda": antes, "pendentes_recuperadas": recuperadas,
+        "entregues": len(bot.entregues), "duplicadas": sum(n - 1 for n in bot.entregues.values()),
+        "registros_repetidos_ignorados": nova.duplicadas_ignoradas,
+    }
+
+
+async def executar(args) -> list:
+    diretorio = tempfile.mkdtemp(prefix="caixa_saida_")
+    return [
+        await queda_direto(args.notificacoes),
+        await queda_caixa(args.notificacoes, args.segundos_fora, os.path.join(diretorio, "queda.jsonl"),
+                          args.envios_por_segundo),
+        await reinicio_caixa(args.notificacoes, os.path.join(diretorio, "reinicio.jsonl"), args.envios_por_segundo),
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Caixa de saída: queda da Bot API e reinício")
+    parser.add_argument("--notificacoes", type=int, default=500)
+    parser.add_argument("--segundos-fora", type=float, default=5.0)
+    parser.add_argument("--envios-por-segundo", type=float, default=100.0)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    print(json.dumps(asyncio.run(executar(args)), indent=2, ensure_ascii=False))
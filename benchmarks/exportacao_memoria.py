@@ -0,0 +1,82 @@
+"""
+Pico de memória do /exportar com um histórico grande de tarefas avulsas: a exportação em
+streaming (exportacao.py) vs montar o arquivo inteiro numa string antes de enviar.
+
+Exemplo (a partir da raiz do repositório):
+    python benchmarks/exportacao_memoria.py --tarefas 200000
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from tempfile import SpooledTemporaryFile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import exportacao  # noqa: E402
+
+
+def gerar_tarefas(n: int) -> list:
+    inicio = datetime(2024, 1, 1)
+    return [
+        {
+            'id': uuid.uuid4().hex,
+            'description': f"Tarefa avulsa número {i} com uma descrição de tamanho realista",
+            'scheduled_time': (inicio + timedelta(minutes=37 * i)).isoformat(),
+            'completed': i % 3 == 0,
+            'not_completed_reason': "Sem tempo" if i % 3 == 1 else None,
+        }
+        for i in range(n)
+    ]
+
+
+def antigo(tasks: list, inicio: datetime, fim: datetime) -> int:
+    """Filtra percorrendo tudo e monta o CSV inteiro em memória."""
+    filtradas = [t for t in tasks if inicio.isoformat() <= t['scheduled_time'] < fim.isoformat()]
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=exportacao.COLUNAS_CSV, extrasaction='ignore')
+    escritor.writeheader()
+    for t in filtradas:
+        escritor.writerow({"registro": "tarefa", "id": t['id'], "descricao": t['description'],
+                           "agendada_para": t['scheduled_time'], "concluida": t['completed'],
+                           "motivo_nao_conclusao": t['not_completed_reason']})
+    return len(buffer.getvalue().encode("utf-8"))
+
+
+def streaming(tasks: list, inicio: datetime, fim: datetime) -> int:
+    with SpooledTemporaryFile(max_size=exportacao.EXPORTACAO_MAX_MEMORIA, mode="w+b") as arquivo:
+        linhas = exportacao.linhas_csv(exportacao.registros_tarefas(tasks, inicio, fim))
+        return asyncio.run(exportacao.escrever_exportacao(arquivo, linhas))
+
+
+def medir(funcao, tasks, inicio, fim) -> dict:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    tamanho = funcao(tasks, inicio, fim)
+    duracao = time.perf_counter() - t0
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"modo": funcao.__name__, "bytes_arquivo": tamanho, "pico_memoria_kb": pico // 1024,
+            "duracao_ms": round(duracao * 1000, 1)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pico de memória da exportação de tarefas")
+    parser.add_argument("--tarefas", type=int, default=200_000)
+    args = parser.parse_args()
+    tasks = gerar_tarefas(args.tarefas)
+    resultados = {}
+    for nome, (inicio, fim) in {
+        "historico_completo": (datetime(2000, 1, 1), datetime(2100, 1, 1)),
+        "um_mes": (datetime(2024, 6, 1), datetime(2024, 7, 1)),
+    }.items():
+        resultados[nome] = [medir(funcao, tasks, inicio, fim) for funcao in (antigo, streaming)]
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
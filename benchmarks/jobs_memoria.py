@@ -0,0 +1,97 @@
+"""
+Memória dos jobs de rotina do APScheduler e custo de reagendar um usuário com muitos jobs no
+scheduler.
+
+Agenda as rotinas sintéticas de N usuários como no início do bot (start_all_scheduled_jobs:
+tarefas lidas do banco e passadas ao reschedule_all_user_jobs, fora do cache do repositório),
+com o scheduler rodando, e mede o RSS por 100 mil jobs.
+Depois reagenda alguns usuários, como quando alguém edita a rotina, e mede o tempo de cada.
+
+Exemplo (a partir da raiz do repositório):
+    python benchmarks/jobs_memoria.py --usuarios 10000 --tarefas 10
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import agenda  # noqa: E402
+from rotinas import RotinasRepositorio, TarefaRotina, TipoTarefa, inserir_tarefa  # noqa: E402
+
+DESCRICOES = ["Academia", "Estudo Python", "Almoço", "Reunião", "Leitura", "Inglês", "Caminhada"]
+
+
+def rss_kb() -> int:
+    with open("/proc/self/status") as f:
+        for linha in f:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1])
+    return 0
+
+
+def gerar_rotina(rng: random.Random, tarefas: int) -> list:
+    rotina = []
+    for _ in range(tarefas):
+        inicio = rng.randint(6 * 60, 21 * 60) // 15 * 15
+        inserir_tarefa(rotina, TarefaRotina(rng.randrange(7), TipoTarefa.HORARIO_FIXO,
+                                            f"{rng.choice(DESCRICOES)} {rng.randint(1, 10**6)}",
+                                            inicio=inicio, fim=inicio + 45))
+    return rotina
+
+
+async def medir(usuarios: int, tarefas: int, reagendamentos: int) -> dict:
+    rng = random.Random(42)
+    scheduler = agenda.get_scheduler()
+    scheduler.start()
+    agenda.usar_repositorio(RotinasRepositorio(":memory:"))
+    bot = SimpleNamespace()
+    gerente = agenda.AgendaManager(SimpleNamespace(bot=bot, job_queue=None, chat_data={}))
+
+    gc.collect()
+    rss_antes = rss_kb()
+    inicio = time.perf_counter()
+    for chat_id in range(1, usuarios + 1):
+        # Como no iterar_todos do início: as tarefas não ficam no cache do repositório
+        await gerente.reschedule_all_user_jobs(chat_id, bot, gerar_rotina(rng, tarefas))
+    agendamento = time.perf_counter() - inicio
+    gc.collect()
+    rss_depois = rss_kb()
+    jobs = len(scheduler.get_jobs())
+
+    # Edição de rotina com o scheduler cheio: remove e recria os jobs de um usuário
+    tempos = []
+    for chat_id in rng.sample(range(1, usuarios + 1), reagendamentos):
+        rotina = gerar_rotina(rng, tarefas)
+        await agenda.get_repositorio().salvar(chat_id, rotina)
+        inicio = time.perf_counter()
+        await gerente.reschedule_all_user_jobs(chat_id, bot)
+        tempos.append(time.perf_counter() - inicio)
+    scheduler.shutdown(wait=False)
+    return {
+        "usuarios": usuarios,
+        "jobs": jobs,
+        "agendamento_inicial_s": round(agendamento, 2),
+        "rss_mb": round((rss_depois - rss_antes) / 1024, 1),
+        "rss_por_100k_jobs_mb": round((rss_depois - rss_antes) / 1024 * 100_000 / jobs, 1),
+        "bytes_por_job": round((rss_depois - rss_antes) * 1024 / jobs),
+        "reagendar_um_usuario_ms": round(sum(tempos) / len(tempos) * 1000, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memória dos jobs de rotina e custo do reagendamento")
+    parser.add_argument("--usuarios", type=int, default=10_000)
+    parser.add_argument("--tarefas", type=int, default=10, help="tarefas (jobs) por usuário")
+    parser.add_argument("--reagendamentos", type=int, default=50)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    print(json.dumps(asyncio.run(medir(args.usuarios, args.tarefas, args.reagendamentos)), indent=2))
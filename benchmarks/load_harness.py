@@ -0,0 +1,239 @@
+"""
+Harness de carga: sobe o fake_bot_api em processo, inicia o bot (main.py) apontando para ele
+e simula usuários em malha fechada (cada usuário só envia o próximo update depois da resposta
+do anterior). Reporta vazão e latência (p50/p90/p99) por cenário, e o custo por update do
+processo do bot: CPU (Linux, via /proc) e linhas de log escritas.
+
+Exemplos (a partir da raiz do repositório):
+    python benchmarks/load_harness.py --usuarios 50 --duracao 30
+    python benchmarks/load_harness.py --usuarios 200 --pesados 5 --shards 4
+    # logging síncrono e sem amostragem, para comparar com o padrão (fila + amostragem)
+    python benchmarks/load_harness.py --usuarios 50 --env LOG_FILA=0 --env LOG_AMOSTRAGEM_MAX=0
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from fake_bot_api import FakeBotAPI, gerar_update_callback, gerar_update_mensagem  # noqa: E402
+
+TOKEN = "harness"
+TIMEOUT_RESPOSTA = 30  # segundos
+
+# Sequências de ações repetidas por cada tipo de usuário: ("msg", texto) ou ("cb", callback_data)
+FLUXO_LEVE = [
+    ("msg", "/start"),
+    ("cb", "open_pomodoro_menu"),
+    ("cb", "pomodoro_status"),
+    ("cb", "pomodoro_configurar"),
+    ("cb", "pomodoro_menu"),
+    ("cb", "main_menu_return"),
+]
+
+
+def gerar_rotina_grande(linhas_por_dia: int = 16) -> str:
+    """Texto de rotina semanal no formato aceito por parse_rotina_textual (~4 KB, limite do Telegram)."""
+    dias = ["Segunda-feira", "Terça-feira", "Quarta-feira", "Quinta-feira", "Sexta-feira", "Sábado", "Domingo"]
+    partes = []
+    for dia in dias:
+        partes.append(f"🟡 {dia}")
+        for i in range(linhas_por_dia):
+            h = 6 + i
+            partes.append(f"{h:02d}h00 – {h:02d}h45: Tarefa {random.randint(1, 99)}")
+        partes.append("Noite: Lazer")
+    return "\n".join(partes)[:4000]
+
+
+def fluxo_pesado():
+    return [
+        ("msg", "/start"),
+        ("cb", "open_rotinas_semanais_menu"),
+        ("cb", "rotinas_adicionar"),
+        ("msg", gerar_rotina_grande()),
+        ("cb", "rotinas_gerenciar"),
+        ("cb", "rotinas_menu"),
+        ("cb", "main_menu_return"),
+    ]
+
+
+def gerar_arquivo_rotinas(caminho: str, num_usuarios: int, tarefas_por_dia: int = 6) -> None:
+    """Grava um rotinas_semanais_data.json sintético com `num_usuarios` usuários."""
+    dias = ["Segunda-feira", "Terça-feira", "Quarta-feira", "Quinta-feira", "Sexta-feira", "Sábado", "Domingo"]
+    dados = {}
+    for u in range(num_usuarios):
+        dados[str(1_000_000 + u)] = {
+            dia: [
+                {"id": f"{u:016x}{d:08x}{i:08x}", "tipo": "horario_fixo", "inicio": f"{8 + i:02d}:00",
+                 "fim": f"{8 + i:02d}:45", "descricao": f"Tarefa {i}", "duracao": "45m"}
+                for i in range(tarefas_por_dia)
+            ]
+            for d, dia in enumerate(dias)
+        }
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(dados, f, indent=4, ensure_ascii=False)
+
+
+class Harness:
+    def __init__(self, porta: int):
+        self.api = FakeBotAPI(port=porta)
+        self.api.on_chamada = self._on_chamada
+        self._pendentes = {}  # chat_id -> Future
+        self.latencias = defaultdict(list)  # cenário -> [segundos]
+        self.timeouts = 0
+
+    def _on_chamada(self, metodo, chat_id, params):
+        futuro = self._pendentes.get(chat_id)
+        if futuro is not None and not futuro.done():
+            futuro.set_result(time.perf_counter())
+
+    async def enviar_e_aguardar(self, chat_id: int, acao) -> float:
+        tipo, valor = acao
+        update = gerar_update_mensagem(chat_id, valor) if tipo == "msg" else gerar_update_callback(chat_id, valor)
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendentes[chat_id] = futuro
+        inicio = time.perf_counter()
+        self.api.injetar(TOKEN, update)
+        try:
+            fim = await asyncio.wait_for(futuro, TIMEOUT_RESPOSTA)
+        finally:
+            self._pendentes.pop(chat_id, None)
+        return fim - inicio
+
+    async def usuario(self, chat_id: int, cenario: str, fim_teste: float):
+        while time.perf_counter() < fim_teste:
+            fluxo = FLUXO_LEVE if cenario == "leve" else fluxo_pesado()
+            for acao in fluxo:
+                if time.perf_counter() >= fim_teste:
+                    return
+                try:
+                    self.latencias[cenario].append(await self.enviar_e_aguardar(chat_id, acao))
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+
+
+def _cpu_segundos(pid: int) -> float:
+    """CPU (usuário + sistema) do processo e dos filhos vivos (workers do modo sharded). 0 fora do Linux."""
+    try:
+        pids = [pid]
+        for arquivo in os.listdir("/proc"):
+            if arquivo.isdigit():
+                try:
+                    with open(f"/proc/{arquivo}/stat") as f:
+                        campos = f.read().rsplit(")", 1)[1].split()
+                except OSError:
+                    continue
+                if int(campos[1]) == pid:
+                    pids.append(int(arquivo))
+        total = 0
+        for p in pids:
+            with open(f"/proc/{p}/stat") as f:
+                campos = f.read().rsplit(")", 1)[1].split()
+            total += int(campos[11]) + int(campos[12])
+        return total / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError):
+        return 0.0
+
+
+def _linhas_log(caminho: str) -> int:
+    with open(caminho, "rb") as f:
+        return sum(bloco.count(b"\n") for bloco in iter(lambda: f.read(1 << 16), b""))
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def resumo(harness: Harness, duracao: float) -> dict:
+    resultado = {"duracao_s": round(duracao, 2), "timeouts": harness.timeouts, "cenarios": {}}
+    total = 0
+    for cenario, valores in harness.latencias.items():
+        total += len(valores)
+        resultado["cenarios"][cenario] = {
+            "updates": len(valores),
+            "p50_ms": round(_percentil(valores, 50) * 1000, 1),
+            "p90_ms": round(_percentil(valores, 90) * 1000, 1),
+            "p99_ms": round(_percentil(valores, 99) * 1000, 1),
+            "max_ms": round(max(valores) * 1000, 1),
+            "media_ms": round(statistics.mean(valores) * 1000, 1),
+        }
+    resultado["updates_total"] = total
+    resultado["updates_por_s"] = round(total / duracao, 1) if duracao else 0
+    resultado["chamadas_api"] = dict(harness.api.contagem_metodos)
+    return resultado
+
+
+async def executar(args) -> dict:
+    harness = Harness(args.porta)
+    await harness.api.start()
+
+    diretorio = tempfile.mkdtemp(prefix="harness_")
+    if args.usuarios_rotina:
+        gerar_arquivo_rotinas(os.path.join(diretorio, "rotinas_semanais_data.json"), args.usuarios_rotina)
+    env = dict(
+        os.environ,
+        BOT_TOKEN=TOKEN,
+        BOT_API_BASE_URL=f"http://127.0.0.1:{args.porta}/bot",
+        BOT_SHARDS=str(args.shards),
+        **dict(v.split("=", 1) for v in args.env),
+    )
+    caminho_log = os.path.join(diretorio, "bot.log")
+    log = open(caminho_log, "wb")
+    inicio_processo = time.perf_counter()
+    processo = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(RAIZ, "main.py"), cwd=diretorio, env=env, stdout=log, stderr=log
+    )
+    try:
+        # Aquecimento: espera todos os shards responderem
+        await harness.enviar_e_aguardar(1, ("msg", "/start"))
+        primeira_resposta = time.perf_counter() - inicio_processo
+        for chat_id in range(2, args.shards * 4 + 1):
+            await harness.enviar_e_aguardar(chat_id, ("msg", "/start"))
+        print(f"Primeira resposta {primeira_resposta:.2f}s após iniciar o processo (log em {diretorio}/bot.log)", file=sys.stderr)
+        harness.latencias.clear()
+        harness.api.contagem_metodos.clear()
+        cpu_inicio = _cpu_segundos(processo.pid)
+        linhas_inicio = _linhas_log(caminho_log)
+
+        inicio = time.perf_counter()
+        fim_teste = inicio + args.duracao
+        usuarios = [harness.usuario(10_000 + i, "leve", fim_teste) for i in range(args.usuarios)]
+        usuarios += [harness.usuario(90_000 + i, "pesado", fim_teste) for i in range(args.pesados)]
+        await asyncio.gather(*usuarios)
+        resultado = resumo(harness, time.perf_counter() - inicio)
+        resultado["primeira_resposta_s"] = round(primeira_resposta, 2)
+        updates = max(resultado["updates_total"], 1)
+        # O listener de log escreve em outra thread: dá um instante para a fila esvaziar
+        await asyncio.sleep(0.5)
+        resultado["cpu_bot_ms_por_update"] = round((_cpu_segundos(processo.pid) - cpu_inicio) * 1000 / updates, 3)
+        resultado["linhas_log_por_update"] = round((_linhas_log(caminho_log) - linhas_inicio) / updates, 2)
+        return resultado
+    finally:
+        processo.terminate()
+        await processo.wait()
+        log.close()
+        await harness.api.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Harness de carga contra o fake_bot_api")
+    parser.add_argument("--usuarios", type=int, default=50, help="usuários leves (menus/Pomodoro)")
+    parser.add_argument("--pesados", type=int, default=0, help="usuários que colam rotinas grandes")
+    parser.add_argument("--duracao", type=float, default=20.0, help="segundos de carga")
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--porta", type=int, default=8099)
+    parser.add_argument("--usuarios-rotina", type=int, default=0, help="pré-carrega um arquivo de rotinas com N usuários")
+    parser.add_argument("--env", action="append", default=[], help="VAR=valor extra para o processo do bot")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(executar(args)), indent=2, ensure_ascii=False))
@@ -0,0 +1,95 @@
+"""
+Custo do logging na thread do loop de eventos, por tick do timer Pomodoro e por update.
+
+- tick: o logger.debug do laço de 1 Hz com DEBUG desligado (f-string formatada à toa vs
+  modelo preguiçoso).
+- update: as linhas INFO típicas de um callback (três do handler e uma do httpx), escritas
+  num arquivo por um StreamHandler síncrono (o antigo logging.basicConfig) vs a fila com
+  amostragem de log_assincrono.py.
+
+O número reportado é o tempo gasto por quem loga; a escrita feita pela thread do listener
+não conta.
+
+Exemplo (a partir da raiz do repositório):
+    python benchmarks/logging_overhead.py --repeticoes 20000
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import log_assincrono  # noqa: E402
+
+logger = logging.getLogger("pomodoro")
+logger_httpx = logging.getLogger("httpx")
+
+
+def _formatar_tempo(segundos):
+    return f"{segundos // 60:02d}:{segundos % 60:02d}"
+
+
+def tick_antes(chat_id, restante):
+    logger.debug(f"Mensagem de status atualizada para chat {chat_id}. Tempo restante: {_formatar_tempo(restante)}")
+
+
+def tick_depois(chat_id, restante):
+    logger.debug("Mensagem de status atualizada para chat %s. Tempo restante: %ss", chat_id, restante)
+
+
+def update_antes(chat_id, _):
+    logger.info(f"Callback 'pomodoro_status' recebido para chat {chat_id}.")
+    logger.info(f"Instância Pomodoro obtida para chat {chat_id}.")
+    logger.info(f"Status do Pomodoro exibido/atualizado para chat {chat_id}. Mensagem ID: {chat_id * 7}")
+    logger_httpx.info('HTTP Request: POST http://api/bot/editMessageText "HTTP/1.1 200 OK"')
+
+
+def update_depois(chat_id, _):
+    logger.info("Callback 'pomodoro_status' recebido para chat %s.", chat_id)
+    logger.info("Instância Pomodoro obtida para chat %s.", chat_id)
+    logger.info("Status do Pomodoro exibido/atualizado para chat %s. Mensagem ID: %s", chat_id, chat_id * 7)
+    logger_httpx.info('HTTP Request: %s %s "%s %d %s"', "POST", "http://api/bot/editMessageText", "HTTP/1.1", 200, "OK")
+
+
+def configurar(modo: str, arquivo) -> None:
+    raiz = logging.getLogger()
+    if modo == "antes":
+        log_assincrono.parar_logging()
+        for handler in list(raiz.handlers):
+            raiz.removeHandler(handler)
+        logging.basicConfig(format=log_assincrono.FORMATO_PADRAO, level=logging.INFO, stream=arquivo, force=True)
+    else:
+        log_assincrono.configurar_logging(stream=arquivo, nivel="INFO", forcar=True)
+
+
+def medir(funcao, repeticoes: int) -> float:
+    inicio = time.perf_counter()
+    for i in range(repeticoes):
+        funcao(1000 + i % 500, 1500 - i % 1500)
+    return (time.perf_counter() - inicio) / repeticoes * 1e6
+
+
+def executar(repeticoes: int) -> dict:
+    resultado = {}
+    with tempfile.TemporaryFile("w") as arquivo:
+        for modo, tick, update in (("antes", tick_antes, update_antes), ("depois", tick_depois, update_depois)):
+            configurar(modo, arquivo)
+            resultado[modo] = {
+                "us_por_tick": round(medir(tick, repeticoes), 3),
+                "us_por_update": round(medir(update, repeticoes), 2),
+            }
+        log_assincrono.parar_logging()
+    resultado["repeticoes"] = repeticoes
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Custo do logging por tick e por update")
+    parser.add_argument("--repeticoes", type=int, default=20_000)
+    args = parser.parse_args()
+    print(json.dumps(executar(args.repeticoes), indent=2, ensure_ascii=False))
@@ -0,0 +1,134 @@
+"""
+Memória (RSS) de N bots: todos num processo (BOTS_CONFIG, ver multibot.py) vs um processo
+por bot (BOT_TOKEN), contra o fake_bot_api.
+
+Cada bot recebe o mesmo aquecimento (alguns usuários passando pelos menus e pelo Pomodoro e
+uma rotina colada) e o RSS é lido de /proc/<pid>/status (só Linux) com os bots ociosos.
+
+Exemplo (a partir da raiz do repositório):
+    python benchmarks/multibot_memoria.py --bots 4 --usuarios 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from fake_bot_api import FakeBotAPI, gerar_update_callback, gerar_update_mensagem  # noqa: E402
+
+TIMEOUT_RESPOSTA = 30  # segundos
+ROTINA = "🟡 Segunda-feira\n" + "\n".join(f"{h:02d}h00 – {h:02d}h45: Tarefa {h}" for h in range(6, 22))
+FLUXO = [
+    ("msg", "/start"),
+    ("cb", "open_pomodoro_menu"),
+    ("cb", "pomodoro_status"),
+    ("cb", "main_menu_return"),
+    ("cb", "open_rotinas_semanais_menu"),
+    ("cb", "rotinas_adicionar"),
+    ("msg", ROTINA),
+    ("cb", "rotinas_gerenciar"),
+]
+
+
+class Clientes:
+    """Usuários sintéticos: cada um espera a resposta do bot antes da próxima ação."""
+
+    def __init__(self, porta: int):
+        self.api = FakeBotAPI(port=porta)
+        self.api.on_chamada = self._on_chamada
+        self._pendentes = {}  # chat_id -> Future
+
+    def _on_chamada(self, metodo, chat_id, params):
+        futuro = self._pendentes.get(chat_id)
+        if futuro is not None and not futuro.done():
+            futuro.set_result(None)
+
+    async def enviar_e_aguardar(self, token: str, chat_id: int, acao) -> None:
+        tipo, valor = acao
+        update = gerar_update_mensagem(chat_id, valor) if tipo == "msg" else gerar_update_callback(chat_id, valor)
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendentes[chat_id] = futuro
+        self.api.injetar(token, update)
+        try:
+            await asyncio.wait_for(futuro, TIMEOUT_RESPOSTA)
+        finally:
+            self._pendentes.pop(chat_id, None)
+
+    async def aquecer(self, token: str, primeiro_chat: int, usuarios: int) -> None:
+        async def usuario(chat_id):
+            for acao in FLUXO:
+                await self.enviar_e_aguardar(token, chat_id, acao)
+        await asyncio.gather(*(usuario(primeiro_chat + i) for i in range(usuarios)))
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for linha in f:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1]) / 1024
+    return 0.0
+
+
+async def _iniciar(env_extra: dict, porta: int, diretorio: str, log):
+    env = dict(os.environ, BOT_API_BASE_URL=f"http://127.0.0.1:{porta}/bot", **env_extra)
+    return await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(RAIZ, "main.py"), cwd=diretorio, env=env, stdout=log, stderr=log
+    )
+
+
+async def medir(modo: str, bots: int, usuarios: int, porta: int) -> dict:
+    clientes = Clientes(porta)
+    await clientes.api.start()
+    tokens = [f"{100 + i}:bot{i}" for i in range(bots)]
+    diretorio = tempfile.mkdtemp(prefix=f"multibot_{modo}_")
+    log = open(os.path.join(diretorio, "bot.log"), "wb")
+    processos = []
+    try:
+        inicio = time.perf_counter()
+        if modo == "um_processo":
+            config = [{"nome": f"marca{i}", "token": token} for i, token in enumerate(tokens)]
+            processos.append(await _iniciar({"BOTS_CONFIG": json.dumps(config)}, porta, diretorio, log))
+        else:
+            for i, token in enumerate(tokens):
+                # Cada processo no seu diretório, como implantações separadas
+                subdiretorio = os.path.join(diretorio, f"marca{i}")
+                os.makedirs(subdiretorio)
+                processos.append(await _iniciar({"BOT_TOKEN": token}, porta, subdiretorio, log))
+        await asyncio.gather(*(clientes.enviar_e_aguardar(token, 1 + i, ("msg", "/start")) for i, token in enumerate(tokens)))
+        pronto = time.perf_counter() - inicio
+        rss_ocioso = sum(rss_mb(p.pid) for p in processos)
+
+        await asyncio.gather(*(clientes.aquecer(token, 10_000 * (i + 1), usuarios) for i, token in enumerate(tokens)))
+        await asyncio.sleep(1)
+        rss = sum(rss_mb(p.pid) for p in processos)
+        return {
+            "modo": modo,
+            "bots": bots,
+            "processos": len(processos),
+            "todos_prontos_s": round(pronto, 2),
+            "rss_apos_inicio_mb": round(rss_ocioso, 1),
+            "rss_apos_aquecimento_mb": round(rss, 1),
+            "rss_por_bot_mb": round(rss / bots, 1),
+        }
+    finally:
+        for processo in processos:
+            processo.terminate()
+        await asyncio.gather(*(p.wait() for p in processos))
+        log.close()
+        await clientes.api.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RSS de N bots num processo vs N processos")
+    parser.add_argument("--bots", type=int, default=4)
+    parser.add_argument("--usuarios", type=int, default=20, help="usuários de aquecimento por bot")
+    parser.add_argument("--porta", type=int, default=8097)
+    args = parser.parse_args()
+    resultados = [asyncio.run(medir(modo, args.bots, args.usuarios, args.porta + i))
+                  for i, modo in enumerate(("um_processo_por_bot", "um_processo"))]
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
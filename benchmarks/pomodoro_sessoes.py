@@ -0,0 +1,83 @@
+"""
+Memória das sessões Pomodoro: N usuários tocam em 🍅 (uma ação cada), uma fração continua
+ativa e a varredura do PomodoroSessionRegistry desidrata o resto.
+
+Mede com tracemalloc o que fica vivo depois dos toques e depois da varredura, e confere que
+chat_data continua copiável por deepcopy (o que a PicklePersistence faz a cada flush).
+
+Exemplo (a partir da raiz do repositório):
+    python benchmarks/pomodoro_sessoes.py --usuarios 50000 --ativos 0.02
+"""
+import argparse
+import asyncio
+import copy
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from types import SimpleNamespace
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from pomodoro import PomodoroSessionRegistry  # noqa: E402
+
+
+def _update(chat_id: int):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id), effective_user=SimpleNamespace(id=chat_id))
+
+
+async def medir(usuarios: int, fracao_ativos: float) -> dict:
+    chat_data = defaultdict(dict)
+    app_falsa = SimpleNamespace(chat_data=chat_data, job_queue=None, mark_data_for_update_persistence=lambda **_: None)
+    registro = PomodoroSessionRegistry(app_falsa, ttl_ocioso=60)
+    bot = object()
+    n_ativos = int(usuarios * fracao_ativos)
+
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+
+    for chat_id in range(usuarios):
+        context = SimpleNamespace(bot=bot, user_data={}, chat_data=chat_data[chat_id])
+        sessao = registro.obter(_update(chat_id), context)
+        # Cada usuário muda uma configuração, para que o estado desidratado não seja vazio
+        await sessao.configurar("foco", 20 + chat_id % 30)
+        registro.salvar(sessao, context.chat_data)
+    depois_toques = tracemalloc.get_traced_memory()[0] - base
+
+    # Os ativos tocaram de novo agora; os demais estão parados há mais que o TTL
+    agora = time.monotonic()
+    for chat_id in range(usuarios):
+        registro.existente(chat_id).ultimo_uso = agora if chat_id < n_ativos else agora - 3600
+    removidas = registro.varrer(agora)
+    gc.collect()
+    depois_varredura = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    copy.deepcopy(dict(chat_data))
+    # Reidratação preserva a configuração
+    ultimo = usuarios - 1
+    sessao = registro.obter(_update(ultimo), SimpleNamespace(bot=bot, user_data={}, chat_data=chat_data[ultimo]))
+    assert sessao.foco_tempo == (20 + ultimo % 30) * 60
+
+    return {
+        "usuarios": usuarios,
+        "sessoes_ativas_apos_varredura": len(registro._ativas) - 1,
+        "desidratadas": removidas,
+        "memoria_apos_toques_mb": round(depois_toques / 2**20, 1),
+        "memoria_apos_varredura_mb": round(depois_varredura / 2**20, 1),
+        "bytes_liberados_por_sessao_desidratada": round((depois_toques - depois_varredura) / max(removidas, 1)),
+        "chat_data_deepcopy_ok": True,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memória das sessões Pomodoro com desidratação por ociosidade")
+    parser.add_argument("--usuarios", type=int, default=50_000)
+    parser.add_argument("--ativos", type=float, default=0.02, help="fração de usuários ainda ativos na varredura")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(medir(args.usuarios, args.ativos)), indent=2, ensure_ascii=False))
@@ -0,0 +1,77 @@
+"""
+Chamadas à Bot API por ciclo Pomodoro completo (foco + pausa), separadas por método.
+
+As fases duram 1 s (uma edição de contagem por fase) e o bot é falso: conta as chamadas e
+devolve uma mensagem com id novo a cada envio. O que muda entre as versões é o custo das
+trocas de fase; as edições da contagem regressiva são as mesmas.
+
+Exemplo (a partir da raiz do repositório):
+    python benchmarks/pomodoro_transicoes.py --ciclos 8
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from collections import Counter
+from itertools import count
+from types import SimpleNamespace
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from pomodoro import Pomodoro  # noqa: E402
+
+
+class BotFalso:
+    def __init__(self):
+        self.chamadas = Counter()
+        self.notificacoes = 0
+        self._ids = count(1)
+
+    async def send_message(self, *args, **kwargs):
+        self.chamadas["sendMessage"] += 1
+        if not kwargs.get("disable_notification"):
+            self.notificacoes += 1
+        return SimpleNamespace(message_id=next(self._ids))
+
+    async def edit_message_text(self, *args, **kwargs):
+        self.chamadas["editMessageText"] += 1
+        return SimpleNamespace(message_id=kwargs.get("message_id"))
+
+    async def delete_message(self, *args, **kwargs):
+        self.chamadas["deleteMessage"] += 1
+        return True
+
+
+async def medir(ciclos: int, silencioso: bool) -> dict:
+    bot = BotFalso()
+    sessao = Pomodoro(bot=bot, chat_id=1)
+    sessao.foco_tempo = sessao.pausa_curta_tempo = sessao.pausa_longa_tempo = 1
+    if hasattr(sessao, "transicao_silenciosa"):
+        sessao.transicao_silenciosa = silencioso
+    await sessao.iniciar()
+    while sessao.historico_ciclos_completados < ciclos or sessao.estado != "foco":
+        await asyncio.sleep(0.05)
+    await sessao.pausar()
+    # Desconta a mensagem de status enviada por iniciar()
+    bot.chamadas["sendMessage"] -= 1
+    bot.notificacoes -= 1
+    return {
+        "modo": "silencioso" if silencioso else "com_notificacao",
+        "ciclos": ciclos,
+        "chamadas_por_ciclo": {metodo: round(n / ciclos, 2) for metodo, n in sorted(bot.chamadas.items())},
+        "total_por_ciclo": round(sum(bot.chamadas.values()) / ciclos, 2),
+        "mensagens_novas_por_ciclo": round(bot.chamadas["sendMessage"] / ciclos, 2),
+        "notificacoes_por_ciclo": round(bot.notificacoes / ciclos, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chamadas à API por ciclo Pomodoro")
+    parser.add_argument("--ciclos", type=int, default=8)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    resultados = [asyncio.run(medir(args.ciclos, silencioso)) for silencioso in (False, True)]
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
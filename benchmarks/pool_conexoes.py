@@ -0,0 +1,137 @@
+"""
+Long-polling e rajadas de envios disputando conexões: um pool pequeno e compartilhado vs os
+pools separados e dimensionados de conexoes.py.
+
+Um Bot faz o getUpdates em laço enquanto "timers" disparam rajadas de send_message contra o
+fake_bot_api (cada resposta atrasa --latencia). No meio das rajadas chegam updates; mede-se:
+- latência dos envios (p50/p99) e duração de cada rajada;
+- atraso na entrega dos updates (injeção -> retorno do getUpdates);
+- métricas de espera por vaga de cada pool (RequisicaoMedida.estatisticas);
+- conexões TCP abertas no servidor (reuso do keep-alive).
+
+Exemplo (a partir da raiz do repositório):
+    python benchmarks/pool_conexoes.py --rajadas 5 --envios 300 --latencia 0.05
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from telegram import Bot  # noqa: E402
+from telegram.error import TimedOut  # noqa: E402
+
+import conexoes  # noqa: E402
+from fake_bot_api import FakeBotAPI, gerar_update_mensagem  # noqa: E402
+
+TOKEN = "123:pool"
+TIMEOUT_POLLING = 2
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return round(valores[min(len(valores) - 1, int(len(valores) * p))] * 1000, 1) if valores else 0.0
+
+
+def _montar(modo: str, pool_pequeno: int):
+    if modo == "compartilhado":
+        # Uma só instância para o getUpdates e os envios, como um pool único e pequeno
+        requisicao = conexoes.RequisicaoMedida("compartilhado", pool_pequeno)
+        return requisicao, requisicao
+    return conexoes.nova_requisicao_saida(), conexoes.nova_requisicao_updates()
+
+
+async def _polling(bot: Bot, entregues: dict, parar: asyncio.Event, falhas: list):
+    offset = 0
+    while not parar.is_set():
+        try:
+            updates = await bot.get_updates(offset=offset, timeout=TIMEOUT_POLLING)
+        except TimedOut:
+            falhas.append(time.perf_counter())
+            continue
+        agora = time.perf_counter()
+        for update in updates:
+            entregues[update.message.text] = agora
+            offset = update.update_id + 1
+
+
+async def medir(modo: str, args) -> dict:
+    api = FakeBotAPI(port=args.porta, latencia=args.latencia)
+    await api.start()
+    saida, updates = _montar(modo, args.pool_pequeno)
+    bot = Bot(TOKEN, base_url=f"http://127.0.0.1:{args.porta}/bot", request=saida, get_updates_request=updates)
+    await bot.initialize()
+
+    parar, entregues, injetados, falhas_polling = asyncio.Event(), {}, {}, []
+    poller = asyncio.create_task(_polling(bot, entregues, parar, falhas_polling))
+    await asyncio.sleep(0.2)
+
+    latencias, timeouts, duracoes = [], 0, []
+
+    async def enviar(chat_id):
+        nonlocal timeouts
+        inicio = time.perf_counter()
+        try:
+            await bot.send_message(chat_id, "⏰ lembrete")
+        except TimedOut:
+            timeouts += 1
+            return
+        latencias.append(time.perf_counter() - inicio)
+
+    async def injetar_durante(rajada):
+        for i in range(5):
+            texto = f"update {rajada}.{i}"
+            injetados[texto] = time.perf_counter()
+            api.injetar(TOKEN, gerar_update_mensagem(1, texto))
+            await asyncio.sleep(0.05)
+
+    for rajada in range(args.rajadas):
+        inicio = time.perf_counter()
+        await asyncio.gather(injetar_durante(rajada), *(enviar(1000 + i) for i in range(args.envios)))
+        duracoes.append(time.perf_counter() - inicio)
+        await asyncio.sleep(0.3)
+
+    await asyncio.sleep(TIMEOUT_POLLING)
+    parar.set()
+    await poller
+    atrasos = [entregues[t] - injetados[t] for t in injetados if t in entregues]
+    metricas = conexoes.estatisticas()
+    conexoes_servidor = api.conexoes_total
+    await bot.shutdown()
+    await api.stop()
+    conexoes._pools.clear()
+    return {
+        "modo": modo,
+        "envios": args.rajadas * args.envios,
+        "envios_timeout": timeouts,
+        "envio_p50_ms": _percentil(latencias, 0.5),
+        "envio_p99_ms": _percentil(latencias, 0.99),
+        "rajada_media_s": round(sum(duracoes) / len(duracoes), 2),
+        "updates_entregues": f"{len(atrasos)}/{len(injetados)}",
+        "update_atraso_p50_ms": _percentil(atrasos, 0.5),
+        "update_atraso_max_ms": _percentil(atrasos, 1.0),
+        "getupdates_timeouts": len(falhas_polling),
+        "conexoes_tcp_abertas": conexoes_servidor,
+        **{nome: valor for nome, valor in metricas.items() if not nome.endswith("_em_uso")},
+    }
+
+
+async def executar(args) -> list:
+    return [await medir(modo, args) for modo in ("compartilhado", "separados")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pool único e pequeno vs pools separados de conexoes.py")
+    parser.add_argument("--rajadas", type=int, default=5)
+    parser.add_argument("--envios", type=int, default=300, help="send_message simultâneos por rajada")
+    parser.add_argument("--latencia", type=float, default=0.05, help="atraso de cada resposta da API falsa (s)")
+    parser.add_argument("--pool-pequeno", type=int, default=8, help="tamanho do pool único no modo compartilhado")
+    parser.add_argument("--porta", type=int, default=8098)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    print(json.dumps(asyncio.run(executar(args)), indent=2, ensure_ascii=False))
@@ -0,0 +1,169 @@
+"""
+Reprodução de uma gravação de updates (GRAVAR_UPDATES, ver gravacao.py) contra o
+fake_bot_api, para comparar a latência de versões do bot com a forma real da carga.
+
+Sobe o fake_bot_api, inicia o bot (o main.py de --main, por padrão o deste repositório) e
+injeta cada update no instante gravado dividido por --velocidade (1 = tempo real, 10 = dez
+vezes mais rápido, 0 = o mais rápido possível, sem esperar entre updates).
+
+Latência = injeção do update -> primeira chamada do bot à API no mesmo chat. Updates do mesmo
+chat são atendidos em ordem, então cada chamada é atribuída ao update mais antigo ainda sem
+resposta do chat; updates que não geram chamada em TIMEOUT_RESPOSTA segundos contam como
+"sem_resposta" (ex: mensagens que eram só mídia, removida na gravação).
+
+Exemplos (a partir da raiz do repositório):
+    # gravar uma sessão do harness de carga e reproduzir 10x mais rápido
+    python benchmarks/load_harness.py --usuarios 20 --duracao 30 --env GRAVAR_UPDATES=/tmp/updates.jsonl.gz
+    python benchmarks/replay_updates.py /tmp/updates.jsonl.gz --velocidade 10
+    # outra versão do bot (ex: um git worktree) com a mesma gravação
+    python benchmarks/replay_updates.py /tmp/updates.jsonl.gz --velocidade 0 --main ../versao_antiga/main.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from fake_bot_api import FakeBotAPI, gerar_update_mensagem  # noqa: E402
+from gravacao import ler_gravacao  # noqa: E402
+from sharding import extrair_chat_id  # noqa: E402
+
+TOKEN = "replay"
+TIMEOUT_RESPOSTA = 30  # segundos
+CHAT_AQUECIMENTO = 1  # fora da faixa dos pseudônimos da gravação
+
+
+def tipo_do_update(update: dict) -> str:
+    if "callback_query" in update:
+        return "callback"
+    texto = update.get("message", {}).get("text", "")
+    if texto.startswith("/"):
+        return "comando"
+    return "texto" if texto else "outro"
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))] * 1000, 1) if ordenados else 0.0
+
+
+class Reprodutor:
+    def __init__(self, porta: int):
+        self.api = FakeBotAPI(port=porta)
+        self.api.on_chamada = self._on_chamada
+        self._pendentes = defaultdict(deque)  # chat_id -> deque[(injetado_em, tipo)]
+        self._aquecido = asyncio.Event()
+        self.latencias = defaultdict(list)  # tipo -> [segundos]
+        self.sem_resposta = 0
+
+    def _on_chamada(self, metodo, chat_id, params):
+        if chat_id == CHAT_AQUECIMENTO:
+            self._aquecido.set()
+        fila = self._pendentes.get(chat_id)
+        if fila:
+            injetado_em, tipo = fila.popleft()
+            self.latencias[tipo].append(time.perf_counter() - injetado_em)
+
+    def _descartar_vencidos(self) -> None:
+        limite = time.perf_counter() - TIMEOUT_RESPOSTA
+        for fila in self._pendentes.values():
+            while fila and fila[0][0] < limite:
+                fila.popleft()
+                self.sem_resposta += 1
+
+    def injetar(self, update: dict) -> None:
+        update = {chave: valor for chave, valor in update.items() if chave != "update_id"}
+        for payload in update.values():
+            # A data gravada é a de produção: o bot vê updates "de agora"
+            if isinstance(payload, dict) and "date" in payload:
+                payload["date"] = int(time.time())
+        self._pendentes[extrair_chat_id(update)].append((time.perf_counter(), tipo_do_update(update)))
+        self.api.injetar(TOKEN, update)
+
+    async def aquecer(self) -> None:
+        self.api.injetar(TOKEN, gerar_update_mensagem(CHAT_AQUECIMENTO, "/start"))
+        await asyncio.wait_for(self._aquecido.wait(), TIMEOUT_RESPOSTA)
+
+    async def reproduzir(self, caminho: str, velocidade: float, limite: int) -> float:
+        inicio = time.perf_counter()
+        for n, (instante, update) in enumerate(ler_gravacao(caminho)):
+            if limite and n >= limite:
+                break
+            if velocidade > 0:
+                espera = inicio + instante / velocidade - time.perf_counter()
+                if espera > 0:
+                    await asyncio.sleep(espera)
+            elif n % 100 == 0:
+                # Velocidade máxima: ainda cede o loop para o servidor falso responder
+                await asyncio.sleep(0)
+            self.injetar(update)
+            if n % 1000 == 0:
+                self._descartar_vencidos()
+        fim = time.perf_counter() + TIMEOUT_RESPOSTA
+        while any(self._pendentes.values()) and time.perf_counter() < fim:
+            await asyncio.sleep(0.05)
+        self._descartar_vencidos()
+        return time.perf_counter() - inicio
+
+
+async def executar(args) -> dict:
+    reprodutor = Reprodutor(args.porta)
+    await reprodutor.api.start()
+    diretorio = tempfile.mkdtemp(prefix="replay_")
+    env = dict(
+        os.environ,
+        BOT_TOKEN=TOKEN,
+        BOT_API_BASE_URL=f"http://127.0.0.1:{args.porta}/bot",
+        **dict(v.split("=", 1) for v in args.env),
+    )
+    env.pop("GRAVAR_UPDATES", None)
+    log = open(os.path.join(diretorio, "bot.log"), "wb")
+    processo = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.abspath(args.main), cwd=diretorio, env=env, stdout=log, stderr=log
+    )
+    try:
+        await reprodutor.aquecer()
+        reprodutor.api.contagem_metodos.clear()
+        duracao = await reprodutor.reproduzir(args.arquivo, args.velocidade, args.limite)
+        todas = [v for valores in reprodutor.latencias.values() for v in valores]
+        return {
+            "arquivo": args.arquivo,
+            "main": os.path.abspath(args.main),
+            "velocidade": args.velocidade or "max",
+            "duracao_s": round(duracao, 2),
+            "updates_respondidos": len(todas),
+            "sem_resposta": reprodutor.sem_resposta,
+            "updates_por_s": round(len(todas) / duracao, 1) if duracao else 0,
+            "p50_ms": _percentil(todas, 50),
+            "p99_ms": _percentil(todas, 99),
+            "por_tipo": {
+                tipo: {"updates": len(valores), "p50_ms": _percentil(valores, 50),
+                       "p90_ms": _percentil(valores, 90), "p99_ms": _percentil(valores, 99),
+                       "max_ms": _percentil(valores, 100)}
+                for tipo, valores in sorted(reprodutor.latencias.items())
+            },
+            "chamadas_api": dict(reprodutor.api.contagem_metodos),
+        }
+    finally:
+        processo.terminate()
+        await processo.wait()
+        log.close()
+        await reprodutor.api.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reproduz uma gravação de updates contra o fake_bot_api")
+    parser.add_argument("arquivo", help="arquivo gravado com GRAVAR_UPDATES (.jsonl ou .jsonl.gz)")
+    parser.add_argument("--velocidade", type=float, default=1.0, help="1 = tempo real, 10 = 10x, 0 = máxima")
+    parser.add_argument("--limite", type=int, default=0, help="reproduz só os N primeiros updates")
+    parser.add_argument("--main", default=os.path.join(RAIZ, "main.py"), help="main.py da versão a medir")
+    parser.add_argument("--porta", type=int, default=8096)
+    parser.add_argument("--env", action="append", default=[], help="VAR=valor extra para o processo do bot")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(executar(args)), indent=2, ensure_ascii=False))
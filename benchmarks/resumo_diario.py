@@ -0,0 +1,107 @@
+"""
+Notificações de rotina por dia: um lembrete por tarefa (modo normal) vs o modo resumo diário
+(um resumo por dia + os lembretes das tarefas ⭐).
+
+Agenda as rotinas sintéticas de N usuários com o reschedule_all_user_jobs de verdade (o
+APScheduler não é iniciado; os jobs ficam pendentes), conta quantas vezes cada job dispara
+numa semana pelos próprios triggers e divide por 7. Depois dispara os jobs de um dia contra
+um bot falso para conferir as chamadas à API.
+
+Exemplo (a partir da raiz do repositório):
+    python benchmarks/resumo_diario.py --usuarios 200 --importantes 0.1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import agenda  # noqa: E402
+from rotinas import RotinasRepositorio, TarefaRotina, TipoTarefa, inserir_tarefa  # noqa: E402
+
+TAREFAS_POR_DIA = 12
+
+
+class BotFalso:
+    def __init__(self):
+        self.chamadas = Counter()
+
+    async def send_message(self, *args, **kwargs):
+        self.chamadas["sendMessage"] += 1
+
+
+def gerar_rotina(fracao_importantes: float) -> list:
+    tarefas = []
+    for dia in range(7):
+        for i in range(TAREFAS_POR_DIA):
+            inicio = 7 * 60 + i * 60
+            inserir_tarefa(tarefas, TarefaRotina(dia, TipoTarefa.HORARIO_FIXO, f"Tarefa {i}", inicio=inicio,
+                                                 fim=inicio + 45, importante=random.random() < fracao_importantes))
+        inserir_tarefa(tarefas, TarefaRotina(dia, TipoTarefa.PERIODO_LIVRE, "Livre", inicio=None, fim=22 * 60))
+    return tarefas
+
+
+def disparos_na_semana(job, inicio: datetime) -> int:
+    fim = inicio + timedelta(days=7)
+    disparos, anterior = 0, None
+    proximo = job.trigger.get_next_fire_time(None, inicio)
+    while proximo is not None and proximo < fim:
+        disparos += 1
+        anterior = proximo
+        proximo = job.trigger.get_next_fire_time(anterior, anterior + timedelta(seconds=1))
+    return disparos
+
+
+async def medir(usuarios: int, fracao_importantes: float, resumo: bool) -> dict:
+    random.seed(7)
+    scheduler = agenda.get_scheduler()
+    scheduler.remove_all_jobs()
+    agenda.usar_repositorio(RotinasRepositorio(":memory:"))
+    bot = BotFalso()
+    chat_data = {}
+    gerente = agenda.AgendaManager(SimpleNamespace(bot=bot, job_queue=None, chat_data=chat_data))
+    for chat_id in range(1, usuarios + 1):
+        if resumo:
+            chat_data[chat_id] = {agenda.CHAVE_RESUMO_DIARIO: 7 * 60}
+        tarefas = gerar_rotina(fracao_importantes)
+        await agenda.get_repositorio().salvar(chat_id, tarefas)
+        await gerente.reschedule_all_user_jobs(chat_id, bot, tarefas)
+
+    segunda = datetime.now().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+    segunda -= timedelta(days=segunda.weekday())
+    jobs = scheduler.get_jobs()
+    por_semana = sum(disparos_na_semana(job, segunda) for job in jobs)
+
+    # Dispara os jobs de hoje contra o bot falso
+    hoje = datetime.now().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+    for job in jobs:
+        proximo = job.trigger.get_next_fire_time(None, hoje)
+        if proximo is not None and proximo < hoje + timedelta(days=1):
+            await job.func(*job.args, **job.kwargs)
+    scheduler.remove_all_jobs()
+    return {
+        "modo": "resumo_diario" if resumo else "lembrete_por_tarefa",
+        "usuarios": usuarios,
+        "jobs_agendados": len(jobs),
+        "notificacoes_por_dia": round(por_semana / 7),
+        "notificacoes_por_usuario_dia": round(por_semana / 7 / usuarios, 2),
+        "send_message_hoje": bot.chamadas["sendMessage"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Notificações por dia: lembretes por tarefa vs resumo diário")
+    parser.add_argument("--usuarios", type=int, default=200)
+    parser.add_argument("--importantes", type=float, default=0.1, help="fração das tarefas marcadas com ⭐")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    resultados = [asyncio.run(medir(args.usuarios, args.importantes, resumo)) for resumo in (False, True)]
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
@@ -0,0 +1,127 @@
+"""
+Custo de roteamento de um callback_query: cadeia de CallbackQueryHandler com regex (como os
+handlers eram registrados antes) vs RoteadorCallbacks (callbacks.py).
+
+Para cada cenário simula a sequência de check_update que a Application faz para um usuário num
+dado estado de conversa: handler global de main_menu_return, depois o ConversationHandler da
+agenda e o do Pomodoro (entry_points, ou handlers do estado atual + fallbacks).
+
+Exemplo (a partir da raiz do repositório):
+    python benchmarks/roteamento_callbacks.py
+"""
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from telegram import Update  # noqa: E402
+from telegram.ext import CallbackQueryHandler  # noqa: E402
+
+import agenda  # noqa: E402
+from callbacks import RoteadorCallbacks  # noqa: E402
+from fake_bot_api import gerar_update_callback  # noqa: E402
+from pomodoro import PomodoroManager  # noqa: E402
+
+REPETICOES = 20_000
+
+
+async def _nada(update, context):
+    return None
+
+
+def _cadeia(padroes):
+    return [CallbackQueryHandler(_nada, pattern=p) for p in padroes]
+
+
+# Registro antigo, na mesma ordem em que os handlers eram avaliados
+ANTIGO = {
+    "global": _cadeia(["^main_menu_return$"]),
+    "agenda_entrada": _cadeia(["^open_rotinas_semanais_menu$", "^open_tasks_menu$"]),
+    "agenda_GERENCIAR": _cadeia([r"^rotinas_apagar_.*$", "^rotinas_menu$"]),
+    "agenda_LISTAR": _cadeia([
+        "^list_completed_tasks$", "^initiate_delete_task$", "^list_upcoming_tasks$", "^rotinas_menu$", "^main_menu_return$",
+    ]),
+    "agenda_fallbacks": _cadeia(["^rotinas_menu$", "^main_menu_return$"]),
+    "pomodoro_entrada": _cadeia(["^open_pomodoro_menu$"]),
+    "pomodoro_MENU": _cadeia([
+        "^pomodoro_iniciar$", "^pomodoro_pausar$", "^pomodoro_parar$", "^pomodoro_status$", "^pomodoro_configurar$", "^pomodoro_menu$",
+    ]),
+    "pomodoro_CONFIG": _cadeia(["^config_foco$", "^config_pausa_curta$", "^config_pausa_longa$", "^config_ciclos$", "^pomodoro_menu$"]),
+    "pomodoro_fallbacks": _cadeia(["^main_menu_return$"]),
+}
+
+
+def _novo() -> dict:
+    """Os roteadores reais, tirados dos ConversationHandlers montados pelo bot."""
+    app_falsa = SimpleNamespace(bot=None, job_queue=None)
+    conv_agenda = agenda.AgendaManager(app_falsa).get_agenda_conversation_handler()
+    conv_pomodoro = PomodoroManager(app_falsa).get_pomodoro_conversation_handler()
+    so_roteadores = lambda handlers: [h for h in handlers if isinstance(h, RoteadorCallbacks)]  # noqa: E731
+    return {
+        "global": [RoteadorCallbacks({"main_menu_return": _nada})],
+        "agenda_entrada": so_roteadores(conv_agenda.entry_points),
+        "agenda_GERENCIAR": so_roteadores(conv_agenda.states[agenda.GERENCIAR_ROTINAS]),
+        "agenda_LISTAR": so_roteadores(conv_agenda.states[agenda.LISTAR_TAREFAS_AVULSAS]),
+        "agenda_fallbacks": so_roteadores(conv_agenda.fallbacks),
+        "pomodoro_entrada": so_roteadores(conv_pomodoro.entry_points),
+        "pomodoro_MENU": so_roteadores(conv_pomodoro.states[PomodoroManager.POMODORO_MENU_STATE]),
+        "pomodoro_CONFIG": so_roteadores(conv_pomodoro.states[PomodoroManager.CONFIG_MENU_STATE]),
+        "pomodoro_fallbacks": so_roteadores(conv_pomodoro.fallbacks),
+    }
+
+
+TAREFA_ID = "0123456789abcdef0123456789abcdef"
+
+# (nome, callback_data no formato antigo, no formato novo, grupos avaliados em sequência)
+CENARIOS = [
+    ("main_menu_return", "main_menu_return", "main_menu_return", ["global"]),
+    ("pomodoro_status (menu Pomodoro)", "pomodoro_status", "pomodoro_status",
+     ["global", "agenda_entrada", "pomodoro_MENU"]),
+    ("config ciclos (config Pomodoro)", "config_ciclos", "pomodoro_config:ciclos",
+     ["global", "agenda_entrada", "pomodoro_CONFIG"]),
+    ("apagar tarefa (gerenciar rotinas)", f"rotinas_apagar_Quarta-feira_{TAREFA_ID}", f"rotinas_apagar:2:{TAREFA_ID}",
+     ["global", "agenda_GERENCIAR"]),
+    ("rotinas_menu (tarefas avulsas)", "rotinas_menu", "rotinas_menu",
+     ["global", "agenda_LISTAR"]),
+    ("botão sem handler (pior caso)", "open_settings_menu", "open_settings_menu",
+     ["global", "agenda_LISTAR", "agenda_fallbacks", "pomodoro_MENU", "pomodoro_fallbacks"]),
+]
+
+
+def rotear(tabela: dict, grupos: list, update: Update):
+    for grupo in grupos:
+        for handler in tabela[grupo]:
+            resultado = handler.check_update(update)
+            if resultado is not None and resultado is not False:
+                return handler, resultado
+    return None
+
+
+def medir(tabela: dict, grupos: list, update: Update) -> float:
+    inicio = time.perf_counter()
+    for _ in range(REPETICOES):
+        rotear(tabela, grupos, update)
+    return (time.perf_counter() - inicio) / REPETICOES * 1e9
+
+
+if __name__ == "__main__":
+    novo = _novo()
+    resultados = []
+    for nome, data_antigo, data_novo, grupos in CENARIOS:
+        update_antigo = Update.de_json(dict(gerar_update_callback(1, data_antigo), update_id=1), None)
+        update_novo = Update.de_json(dict(gerar_update_callback(1, data_novo), update_id=1), None)
+        # Os roteadores também precisam aceitar os botões antigos já enviados aos usuários
+        for update in (update_novo, update_antigo):
+            achou_antigo = rotear(ANTIGO, grupos, update_antigo) is not None
+            assert (rotear(novo, grupos, update) is not None) == achou_antigo, (nome, update.callback_query.data)
+        resultados.append({
+            "cenario": nome,
+            "regex_ns": round(medir(ANTIGO, grupos, update_antigo)),
+            "tabela_ns": round(medir(novo, grupos, update_novo)),
+            "tabela_botao_antigo_ns": round(medir(novo, grupos, update_antigo)),
+        })
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
@@ -0,0 +1,87 @@
+"""
+Custo de responder /agora e /proximo: varrendo as rotinas no formato do JSON (todos os dias,
+parse de cada "HH:MM" e ordenação a cada consulta) vs o IndiceSemanal (busca binária sobre
+os minutos da semana já ordenados).
+
+Exemplo (a partir da raiz do repositório):
+    python benchmarks/rotina_agora.py --tarefas 200 --consultas 20000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from rotinas import (  # noqa: E402
+    MINUTOS_POR_SEMANA, IndiceSemanal, TarefaRotina, TipoTarefa, horario_para_minutos,
+    inserir_tarefa, minuto_da_semana, tarefas_para_json, DIAS_DA_SEMANA_ORDEM,
+)
+
+
+def gerar_tarefas(quantidade: int) -> list:
+    tarefas = []
+    for _ in range(quantidade):
+        inicio = random.randrange(24 * 60)
+        fim = (inicio + random.randrange(15, 180)) % (24 * 60)
+        inserir_tarefa(tarefas, TarefaRotina(random.randrange(7), TipoTarefa.HORARIO_FIXO, "Tarefa", inicio=inicio, fim=fim))
+    return tarefas
+
+
+def varredura(dias: dict, minuto: int):
+    """Como seria sem índice: percorre todos os dias, converte os horários e ordena."""
+    entradas = []
+    for dia_nome, lista in dias.items():
+        dia = DIAS_DA_SEMANA_ORDEM.index(dia_nome)
+        for dados in lista:
+            inicio = horario_para_minutos(dados.get("inicio"))
+            if inicio is not None:
+                entradas.append((minuto_da_semana(dia, inicio), dados))
+    entradas.sort(key=lambda e: e[0])
+    for inicio, dados in entradas:
+        if inicio > minuto:
+            return dados, inicio - minuto
+    return entradas[0][1], entradas[0][0] + MINUTOS_POR_SEMANA - minuto
+
+
+def medir(tarefas: int, consultas: int) -> dict:
+    random.seed(42)
+    lista = gerar_tarefas(tarefas)
+    dias = json.loads(json.dumps(tarefas_para_json(lista)))
+    minutos = [random.randrange(MINUTOS_POR_SEMANA) for _ in range(consultas)]
+
+    inicio = time.perf_counter()
+    for minuto in minutos:
+        varredura(dias, minuto)
+    tempo_varredura = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    indice = IndiceSemanal(lista)
+    montagem = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    for minuto in minutos:
+        indice.proxima(minuto)
+        indice.atuais(minuto)
+        indice.restante_do_dia(minuto)
+    tempo_indice = time.perf_counter() - inicio
+
+    for minuto in minutos[:200]:
+        assert indice.proxima(minuto)[1] == varredura(dias, minuto)[1]
+    return {
+        "tarefas": tarefas,
+        "consultas": consultas,
+        "varredura_us_por_consulta": round(tempo_varredura / consultas * 1e6, 1),
+        "indice_us_por_consulta_agora_proximo_resto": round(tempo_indice / consultas * 1e6, 1),
+        "indice_montagem_ms": round(montagem * 1000, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/agora e /proximo: varredura vs IndiceSemanal")
+    parser.add_argument("--tarefas", type=int, default=200)
+    parser.add_argument("--consultas", type=int, default=20_000)
+    args = parser.parse_args()
+    print(json.dumps(medir(args.tarefas, args.consultas), indent=2, ensure_ascii=False))
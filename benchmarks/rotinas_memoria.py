@@ -0,0 +1,112 @@
+"""
+Compara a memória (RSS) das rotinas semanais carregadas no formato antigo (defaultdicts de
+dicts, como o carregar_rotinas original) e no formato compacto de rotinas.py.
+
+Cada formato roda num subprocesso próprio, para que um não contamine a medição do outro.
+
+Exemplo (a partir da raiz do repositório):
+    python benchmarks/rotinas_memoria.py --usuarios 100000 --tarefas 10
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from rotinas import DIAS_DA_SEMANA_ORDEM, rotinas_de_json  # noqa: E402
+
+DESCRICOES_COMUNS = [
+    "Café + alongamento", "Estudo Python", "Academia", "Almoço", "Revisar caderno", "Reunião",
+    "Leitura", "Inglês", "Meditação", "Trabalho focado", "Caminhada", "Jantar", "Projeto pessoal",
+]
+
+
+def rss_kb() -> int:
+    with open("/proc/self/status") as f:
+        for linha in f:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1])
+    return 0
+
+
+def gerar_usuario(rng: random.Random, tarefas: int) -> str:
+    """JSON de um usuário no formato do arquivo de rotinas (como o json.load produziria)."""
+    dias = defaultdict(list)
+    for _ in range(tarefas):
+        dia = rng.choice(DIAS_DA_SEMANA_ORDEM)
+        h = rng.randint(6, 21)
+        m = rng.choice((0, 15, 30, 45))
+        # Um terço das descrições é livre (única por usuário), o resto se repete entre usuários
+        descricao = rng.choice(DESCRICOES_COMUNS) if rng.random() < 0.66 else f"Tarefa {rng.randint(1, 10**6)}"
+        dias[dia].append({
+            "id": uuid.UUID(int=rng.getrandbits(128), version=4).hex,
+            "tipo": "horario_fixo",
+            "inicio": f"{h:02d}:{m:02d}",
+            "fim": f"{h + 1:02d}:{m:02d}",
+            "descricao": descricao,
+            "duracao": "1h 0m",
+        })
+    return json.dumps(dias, ensure_ascii=False)
+
+
+def medir(formato: str, usuarios: int, tarefas: int) -> dict:
+    rng = random.Random(42)
+    blobs = [gerar_usuario(rng, tarefas) for _ in range(usuarios)]
+    gc.collect()
+    antes = rss_kb()
+    inicio = time.perf_counter()
+
+    rotinas = {}
+    for i, blob in enumerate(blobs):
+        chat_id = str(1_000_000 + i)
+        dados = json.loads(blob)
+        if formato == "dict":
+            rotinas[chat_id] = defaultdict(list, dados)
+        else:
+            rotinas.update(rotinas_de_json({chat_id: dados}))
+
+    duracao = time.perf_counter() - inicio
+    del blobs
+    gc.collect()
+    depois = rss_kb()
+    return {
+        "formato": formato,
+        "usuarios": usuarios,
+        "tarefas_por_usuario": tarefas,
+        "rss_rotinas_mb": round((depois - antes) / 1024, 1),
+        "bytes_por_tarefa": round((depois - antes) * 1024 / (usuarios * tarefas), 1),
+        "carga_s": round(duracao, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RSS das rotinas: formato antigo vs compacto")
+    parser.add_argument("--usuarios", type=int, default=100_000)
+    parser.add_argument("--tarefas", type=int, default=10, help="tarefas por usuário")
+    parser.add_argument("--formato", choices=("dict", "compacto"), help="uso interno (subprocesso)")
+    args = parser.parse_args()
+
+    if args.formato:
+        print(json.dumps(medir(args.formato, args.usuarios, args.tarefas)))
+        sys.exit(0)
+
+    resultados = []
+    for formato in ("dict", "compacto"):
+        saida = subprocess.run(
+            [sys.executable, __file__, "--formato", formato, "--usuarios", str(args.usuarios), "--tarefas", str(args.tarefas)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        resultados.append(json.loads(saida))
+    antigo, compacto = resultados
+    print(json.dumps({
+        "resultados": resultados,
+        "reducao_rss": f"{(1 - compacto['rss_rotinas_mb'] / antigo['rss_rotinas_mb']) * 100:.0f}%",
+    }, indent=2, ensure_ascii=False))
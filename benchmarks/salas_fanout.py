@@ -0,0 +1,97 @@
+"""
+Custo de um Pomodoro sincronizado para N chats: uma sessão Pomodoro por chat (um timer e uma
+edição de mensagem por segundo cada) vs uma sala de foco (salas.py: um timer, difusão só nas
+trocas de fase).
+
+As fases são encurtadas para segundos (foco de 25 s em vez de 25 min) e o bot é falso, só
+conta as chamadas à API. Com as durações reais as edições por segundo do modo por chat
+crescem 60x, as mensagens da sala continuam as mesmas.
+
+Exemplo (a partir da raiz do repositório):
+    python benchmarks/salas_fanout.py --participantes 200 --duracao 30
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from pomodoro import Pomodoro  # noqa: E402
+from salas import SalasManager  # noqa: E402
+
+FOCO_S, PAUSA_CURTA_S, PAUSA_LONGA_S = 25, 5, 15
+
+
+class BotFalso:
+    def __init__(self):
+        self.chamadas = Counter()
+
+    async def send_message(self, *args, **kwargs):
+        self.chamadas["sendMessage"] += 1
+        return SimpleNamespace(message_id=1)
+
+    async def edit_message_text(self, *args, **kwargs):
+        self.chamadas["editMessageText"] += 1
+        return SimpleNamespace(message_id=1)
+
+    async def delete_message(self, *args, **kwargs):
+        self.chamadas["deleteMessage"] += 1
+        return True
+
+
+async def por_chat(participantes: int, duracao: float, bot: BotFalso) -> None:
+    sessoes = []
+    for chat_id in range(1, participantes + 1):
+        sessao = Pomodoro(bot=bot, chat_id=chat_id)
+        sessao.foco_tempo, sessao.pausa_curta_tempo, sessao.pausa_longa_tempo = FOCO_S, PAUSA_CURTA_S, PAUSA_LONGA_S
+        await sessao.iniciar()
+        sessoes.append(sessao)
+    await asyncio.sleep(duracao)
+    for sessao in sessoes:
+        await sessao.pausar()
+
+
+async def sala_unica(participantes: int, duracao: float, bot: BotFalso) -> None:
+    tarefas = set()
+    app_falsa = SimpleNamespace(bot=bot, create_task=lambda coro: tarefas.add(asyncio.ensure_future(coro)))
+    # Sem limite de taxa: o bot falso responde na hora e as fases do teste duram segundos
+    gerenciador = SalasManager(app_falsa, envios_por_segundo=1e9)
+    sala = gerenciador.criar(1)
+    sala.foco_tempo, sala.pausa_curta_tempo, sala.pausa_longa_tempo = FOCO_S, PAUSA_CURTA_S, PAUSA_LONGA_S
+    for chat_id in range(2, participantes + 1):
+        gerenciador.entrar(chat_id, sala.codigo)
+    await gerenciador.iniciar(sala)
+    await asyncio.sleep(duracao)
+    await gerenciador.pausar(sala)
+    await asyncio.gather(*tarefas)
+
+
+async def medir(modo, participantes: int, duracao: float) -> dict:
+    bot = BotFalso()
+    cpu = time.process_time()
+    await modo(participantes, duracao, bot)
+    return {
+        "modo": modo.__name__,
+        "participantes": participantes,
+        "chamadas_api": dict(bot.chamadas),
+        "total_chamadas": sum(bot.chamadas.values()),
+        "chamadas_por_participante": round(sum(bot.chamadas.values()) / participantes, 1),
+        "cpu_s": round(time.process_time() - cpu, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pomodoro por chat vs sala de foco compartilhada")
+    parser.add_argument("--participantes", type=int, default=200)
+    parser.add_argument("--duracao", type=float, default=30, help="segundos simulados de cada modo")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    resultados = [asyncio.run(medir(modo, args.participantes, args.duracao)) for modo in (por_chat, sala_unica)]
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
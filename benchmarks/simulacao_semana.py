@@ -0,0 +1,246 @@
+"""
+Simulação de uma semana inteira de lembretes de rotina e de horas de Pomodoro num relógio
+virtual (relogio.RelogioVirtual), em segundos de tempo real.
+
+Agenda as rotinas sintéticas de N usuários como o bot (reschedule_all_user_jobs; parte dos
+usuários no modo resumo diário, com algumas tarefas importantes) e inicia P sessões de
+Pomodoro com configurações e inícios diferentes. O scheduler não é iniciado: o APScheduler 3
+lê datetime.now() por dentro, então a simulação percorre os triggers dos jobs em ordem e
+dispara cada job no seu instante, depois de avançar o relógio virtual até ele (o que acorda os
+temporizadores do Pomodoro que vencem antes).
+
+Cada envio ao bot falso é anotado com o instante virtual. No fim, compara com o esperado,
+calculado direto das rotinas e das configurações:
+- cada lembrete (🔔 início, 🥳 fim de período livre, ☀️ resumo) no minuto exato, uma vez;
+- cada troca de fase de cada Pomodoro no segundo exato.
+Qualquer diferença aparece em "divergencias" e o processo sai com código 1.
+
+Serve também de benchmark do subsistema de agendamento: disparos e despertares por segundo.
+
+Exemplo (a partir da raiz do repositório):
+    python benchmarks/simulacao_semana.py --usuarios 10000 --tarefas 10 --pomodoros 50 --horas-pomodoro 4
+"""
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import agenda  # noqa: E402
+import relogio  # noqa: E402
+from pomodoro import Pomodoro  # noqa: E402
+from rotinas import RotinasRepositorio, TarefaRotina, TipoTarefa, inserir_tarefa  # noqa: E402
+
+INICIO = datetime(2026, 10, 19)  # uma segunda-feira, 00:00
+SEMANA = timedelta(days=7)
+CHAT_POMODORO_BASE = 10_000_000
+DESCRICOES = ["Academia", "Estudo Python", "Almoço", "Reunião", "Leitura", "Inglês", "Caminhada"]
+# (foco, pausa curta, pausa longa) em minutos e ciclos até a pausa longa
+CONFIGS_POMODORO = [(25, 5, 15, 4), (50, 10, 20, 2), (45, 15, 30, 3), (1, 1, 2, 2)]
+PREFIXOS = [
+    ("🔔", "rotina"), ("🥳", "livre"), ("☀️", "resumo"),
+    ("🌟", "inicio"), ("☕", "pausa_curta"), ("🎉 UAU", "pausa_longa"), ("🚀", "foco"),
+]
+
+
+class BotFalso:
+    """Anota (segundos virtuais desde INICIO, chat_id, tipo) de cada send_message."""
+
+    def __init__(self):
+        self.enviados = []
+        self._ids = itertools.count(1)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        tipo = next((tipo for prefixo, tipo in PREFIXOS if text.startswith(prefixo)), "outro")
+        self.enviados.append(((relogio.agora() - INICIO).total_seconds(), chat_id, tipo))
+        return SimpleNamespace(message_id=next(self._ids))
+
+    async def edit_message_text(self, **kwargs):
+        return SimpleNamespace(message_id=kwargs.get("message_id"))
+
+    async def delete_message(self, **kwargs):
+        return True
+
+
+def gerar_rotina(rng: random.Random, tarefas: int, importantes: float) -> list:
+    rotina = []
+    for _ in range(tarefas):
+        inicio = rng.randint(0, 23 * 60) // 15 * 15
+        tipo = TipoTarefa.PERIODO_LIVRE if rng.random() < 0.2 else TipoTarefa.HORARIO_FIXO
+        inserir_tarefa(rotina, TarefaRotina(rng.randrange(7), tipo, f"{rng.choice(DESCRICOES)} {rng.randint(1, 10**6)}",
+                                            inicio=inicio, fim=inicio + 45, importante=rng.random() < importantes))
+    return rotina
+
+
+def lembretes_esperados(chat_id: int, rotina: list, hora_resumo) -> Counter:
+    """(chat, tipo, minuto da semana) de cada lembrete que a rotina deve gerar numa semana."""
+    esperados = Counter()
+    if hora_resumo is not None:
+        for dia in {tarefa.dia for tarefa in rotina}:
+            esperados[(chat_id, "resumo", dia * 1440 + hora_resumo)] += 1
+    for tarefa in rotina:
+        if hora_resumo is not None and not tarefa.importante:
+            continue
+        if tarefa.tipo is TipoTarefa.HORARIO_FIXO:
+            esperados[(chat_id, "rotina", tarefa.dia * 1440 + tarefa.inicio)] += 1
+        else:
+            esperados[(chat_id, "livre", tarefa.dia * 1440 + tarefa.fim)] += 1
+    return esperados
+
+
+def transicoes_esperadas(chat_id: int, inicio: int, config: tuple, parada: float) -> Counter:
+    """(chat, tipo, segundo) de cada mensagem de uma sessão de Pomodoro até `parada`."""
+    foco, curta, longa = (minutos * 60 for minutos in config[:3])
+    ciclos_longa = config[3]
+    esperadas = Counter({(chat_id, "inicio", inicio): 1})
+    instante, ciclos = inicio + foco, 0
+    while instante < parada:
+        ciclos += 1
+        pausa_longa = ciclos % ciclos_longa == 0
+        esperadas[(chat_id, "pausa_longa" if pausa_longa else "pausa_curta", instante)] += 1
+        instante += longa if pausa_longa else curta
+        if instante >= parada:
+            break
+        esperadas[(chat_id, "foco", instante)] += 1
+        instante += foco
+    return esperadas
+
+
+def _divergencias(esperado: Counter, observado: Counter, limite: int = 10) -> list:
+    faltando = esperado - observado
+    sobrando = observado - esperado
+    return (
+        [f"faltou {chave} x{n}" for chave, n in itertools.islice(sorted(faltando.items()), limite)]
+        + [f"sobrou {chave} x{n}" for chave, n in itertools.islice(sorted(sobrando.items()), limite)]
+    ), sum(faltando.values()) + sum(sobrando.values())
+
+
+async def simular(args) -> dict:
+    rng = random.Random(args.semente)
+    virtual = relogio.RelogioVirtual(INICIO)
+    relogio.usar_relogio(virtual)
+    scheduler = agenda.get_scheduler()
+    repositorio = RotinasRepositorio(":memory:", max_tarefas_cache=args.usuarios * args.tarefas * 2)
+    agenda.usar_repositorio(repositorio)
+    bot = BotFalso()
+    chat_data = {}
+    gerente = agenda.AgendaManager(SimpleNamespace(bot=bot, job_queue=None, chat_data=chat_data))
+
+    # Rotinas e lembretes esperados
+    esperados = Counter()
+    inicio = time.perf_counter()
+    for chat_id in range(1, args.usuarios + 1):
+        rotina = gerar_rotina(rng, args.tarefas, args.importantes)
+        hora_resumo = None
+        if rng.random() < args.resumo:
+            hora_resumo = rng.choice([6 * 60, 7 * 60, 7 * 60 + 30])
+            chat_data[chat_id] = {agenda.CHAVE_RESUMO_DIARIO: hora_resumo}
+        await repositorio.salvar(chat_id, rotina)
+        await gerente.reschedule_all_user_jobs(chat_id, bot, rotina)
+        esperados.update(lembretes_esperados(chat_id, rotina, hora_resumo))
+    agendamento = time.perf_counter() - inicio
+
+    # Fila dos disparos pelos triggers, no fuso do scheduler (o mesmo cálculo do APScheduler)
+    inicio_fuso = INICIO.astimezone(scheduler.timezone)
+    fim = INICIO + SEMANA
+    fila, sequencia = [], itertools.count()
+    jobs = scheduler.get_jobs()
+    for job in jobs:
+        disparo = job.trigger.get_next_fire_time(None, inicio_fuso)
+        if disparo is not None:
+            heapq.heappush(fila, (datetime.fromtimestamp(disparo.timestamp()), next(sequencia), disparo, job))
+
+    # Pomodoros: cada sessão começa em algum segundo da primeira hora e para depois de --horas-pomodoro
+    parada = args.horas_pomodoro * 3600 + 0.5  # fora dos segundos inteiros, sem empate com as trocas de fase
+    sessoes = []
+
+    async def rodar_sessao(chat_id: int, inicio_sessao: int, config: tuple) -> None:
+        await relogio.dormir(inicio_sessao)
+        sessao = Pomodoro(bot=bot, chat_id=chat_id)
+        sessao.foco_tempo, sessao.pausa_curta_tempo, sessao.pausa_longa_tempo = (minutos * 60 for minutos in config[:3])
+        sessao.ciclos_para_pausa_longa = config[3]
+        sessoes.append(sessao)
+        await sessao.iniciar()
+
+    async def parar_sessoes() -> None:
+        await relogio.dormir(parada)
+        for sessao in sessoes:
+            if sessao._timer_task:
+                sessao._timer_task.cancel()
+
+    for n in range(args.pomodoros):
+        chat_id, inicio_sessao, config = CHAT_POMODORO_BASE + n, rng.randrange(1, 3600), rng.choice(CONFIGS_POMODORO)
+        esperados.update(transicoes_esperadas(chat_id, inicio_sessao, config, parada))
+        asyncio.create_task(rodar_sessao(chat_id, inicio_sessao, config))
+    asyncio.create_task(parar_sessoes())
+    await asyncio.sleep(0)
+
+    disparos = 0
+    inicio = time.perf_counter()
+    while fila and fila[0][0] < fim:
+        instante = fila[0][0]
+        await virtual.avancar_ate(instante)
+        while fila and fila[0][0] == instante:
+            _, _, disparo, job = heapq.heappop(fila)
+            await job.func(*job.args, **job.kwargs)
+            disparos += 1
+            proximo = job.trigger.get_next_fire_time(disparo, disparo)
+            if proximo is not None:
+                heapq.heappush(fila, (datetime.fromtimestamp(proximo.timestamp()), next(sequencia), proximo, job))
+    await virtual.avancar_ate(fim)
+    simulacao = time.perf_counter() - inicio
+
+    observados = Counter()
+    for segundos, chat_id, tipo in bot.enviados:
+        if chat_id >= CHAT_POMODORO_BASE:
+            observados[(chat_id, tipo, segundos)] += 1
+        elif segundos % 60:
+            observados[(chat_id, tipo, f"{segundos}s (fora do minuto)")] += 1
+        else:
+            observados[(chat_id, tipo, int(segundos // 60))] += 1
+    divergencias, total_divergencias = _divergencias(esperados, observados)
+    relogio.usar_relogio(relogio.RelogioReal())
+    return {
+        "usuarios": args.usuarios,
+        "jobs": len(jobs),
+        "pomodoros": args.pomodoros,
+        "semana_virtual": f"{INICIO:%Y-%m-%d %H:%M} -> {fim:%Y-%m-%d %H:%M}",
+        "agendamento_s": round(agendamento, 2),
+        "simulacao_s": round(simulacao, 2),
+        "disparos": disparos,
+        "disparos_por_s": round(disparos / simulacao) if simulacao else 0,
+        "despertares": virtual.despertares,
+        "despertares_por_s": round(virtual.despertares / simulacao) if simulacao else 0,
+        "mensagens": len(bot.enviados),
+        "mensagens_esperadas": sum(esperados.values()),
+        "por_tipo": dict(sorted(Counter(tipo for _, _, tipo in bot.enviados).items())),
+        "total_divergencias": total_divergencias,
+        "divergencias": divergencias,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Uma semana de rotinas e Pomodoros no relógio virtual")
+    parser.add_argument("--usuarios", type=int, default=10_000)
+    parser.add_argument("--tarefas", type=int, default=10, help="tarefas de rotina por usuário")
+    parser.add_argument("--resumo", type=float, default=0.2, help="fração dos usuários no modo resumo diário")
+    parser.add_argument("--importantes", type=float, default=0.1, help="fração das tarefas marcadas como importantes")
+    parser.add_argument("--pomodoros", type=int, default=50, help="sessões de Pomodoro simultâneas")
+    parser.add_argument("--horas-pomodoro", type=float, default=4, help="duração virtual das sessões de Pomodoro")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    resultado = asyncio.run(simular(args))
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    sys.exit(1 if resultado["total_divergencias"] else 0)
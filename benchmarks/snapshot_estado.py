@@ -0,0 +1,176 @@
+"""
+Tamanho e tempo de carga do estado do bot: formatos atuais (pickle do PicklePersistence e JSON
+de rotinas com indent=4) vs o snapshot msgpack de snapshot.py, com e sem compressão.
+
+Gera o estado sintético de N usuários:
+- persistência: user_data com tarefas avulsas, chat_data com a sessão de Pomodoro desidratada
+  e o modo resumo, estados de conversa (chaves em tupla);
+- rotinas: T tarefas por usuário.
+Para cada formato mede o tamanho do arquivo, a carga completa, o tempo até o primeiro usuário
+estar disponível (leitura em fluxo; o pickle e o JSON só entregam no fim) e, nas rotinas, a
+importação para o banco (importar_json vs importar_snapshot). Confere que a carga devolve o
+mesmo estado que foi gravado.
+
+Exemplo (a partir da raiz do repositório):
+    python benchmarks/snapshot_estado.py --usuarios 100000 --tarefas 10
+"""
+import argparse
+import json
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import snapshot  # noqa: E402
+from rotinas import (  # noqa: E402
+    RotinasRepositorio, TarefaRotina, TipoTarefa, inserir_tarefa, rotinas_de_json, rotinas_para_json,
+)
+
+DESCRICOES = ["Academia", "Estudo Python", "Almoço", "Reunião", "Leitura", "Inglês", "Caminhada"]
+
+
+def gerar_persistencia(rng: random.Random, usuarios: int) -> dict:
+    agora = datetime(2026, 10, 19, 8, 0)
+    user_data, chat_data, conversas = {}, {}, {}
+    for chat_id in range(1, usuarios + 1):
+        dados = {}
+        if rng.random() < 0.5:
+            dados["tasks"] = [{
+                "id": uuid.UUID(int=rng.getrandbits(128)).hex,
+                "description": f"{rng.choice(DESCRICOES)} {rng.randint(1, 10**6)}",
+                "scheduled_time": (agora + timedelta(minutes=rng.randint(1, 10**5))).isoformat(),
+                "completed": rng.random() < 0.5,
+                "not_completed_reason": None,
+            } for _ in range(rng.randint(1, 6))]
+        if rng.random() < 0.05:
+            dados["config_type"] = "foco"
+        user_data[chat_id] = dados
+        dados_chat = {}
+        if rng.random() < 0.3:
+            dados_chat["pomodoro"] = {"foco_tempo": 50 * 60, "estado": "pausado", "tempo_restante": rng.randint(1, 3000),
+                                      "ciclos_completados": rng.randint(0, 8), "historico_foco_total": rng.randint(0, 10**5)}
+        if rng.random() < 0.2:
+            dados_chat["resumo_diario"] = 7 * 60
+        if dados_chat:
+            chat_data[chat_id] = dados_chat
+        if rng.random() < 0.1:
+            conversas.setdefault("agenda", {})[(chat_id, chat_id)] = rng.randint(0, 5)
+    return {"user_data": user_data, "chat_data": chat_data, "bot_data": {}, "callback_data": None,
+            "conversations": conversas}
+
+
+def gerar_rotinas(rng: random.Random, usuarios: int, tarefas: int) -> dict:
+    rotinas = {}
+    for chat_id in range(1, usuarios + 1):
+        rotina = []
+        for _ in range(tarefas):
+            inicio = rng.randint(6 * 60, 21 * 60) // 15 * 15
+            tipo = TipoTarefa.PERIODO_LIVRE if rng.random() < 0.2 else TipoTarefa.HORARIO_FIXO
+            inserir_tarefa(rotina, TarefaRotina(rng.randrange(7), tipo, f"{rng.choice(DESCRICOES)} {rng.randint(1, 10**6)}",
+                                                inicio=inicio, fim=inicio + 45, importante=rng.random() < 0.1))
+        rotinas[chat_id] = rotina
+    return rotinas
+
+
+def _medir(carregar, repeticoes: int) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        carregar()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return round(melhor, 3)
+
+
+def _primeiro(gerador) -> float:
+    inicio = time.perf_counter()
+    next(iter(gerador))
+    return round((time.perf_counter() - inicio) * 1000, 2)
+
+
+def _mb(caminho: str) -> float:
+    return round(os.path.getsize(caminho) / 1024 / 1024, 2)
+
+
+def medir_persistencia(dados: dict, diretorio: str, repeticoes: int) -> dict:
+    arquivo_pickle = os.path.join(diretorio, "bot_persistence")
+    inicio = time.perf_counter()
+    with open(arquivo_pickle, "wb") as f:
+        pickle.dump(dados, f, protocol=pickle.HIGHEST_PROTOCOL)
+    gravacao = time.perf_counter() - inicio
+
+    def carregar_pickle():
+        with open(arquivo_pickle, "rb") as f:
+            return pickle.load(f)
+
+    resultado = {"pickle": {"mb": _mb(arquivo_pickle), "carga_s": _medir(carregar_pickle, repeticoes),
+                            "gravacao_s": round(gravacao, 3)}}
+    for comprimir in (True, False):
+        arquivo = os.path.join(diretorio, f"bot_persistence_{comprimir}.snap")
+        inicio = time.perf_counter()
+        snapshot.gravar_persistencia(arquivo, dados, comprimir=comprimir)
+        gravacao = time.perf_counter() - inicio
+        assert snapshot.ler_persistencia(arquivo) == dados, "snapshot de persistência diferente do original"
+        resultado["snapshot_zlib" if comprimir else "snapshot"] = {
+            "mb": _mb(arquivo),
+            "carga_s": _medir(lambda: snapshot.ler_persistencia(arquivo), repeticoes),
+            "primeiro_usuario_ms": _primeiro(snapshot.ler_snapshot(arquivo)),
+            "gravacao_s": round(gravacao, 3),
+        }
+    return resultado
+
+
+def medir_rotinas(rotinas: dict, diretorio: str, repeticoes: int) -> dict:
+    arquivo_json = os.path.join(diretorio, "rotinas_semanais_data.json")
+    with open(arquivo_json, "w", encoding="utf-8") as f:
+        json.dump(rotinas_para_json(rotinas), f, indent=4, ensure_ascii=False)
+
+    def carregar_json():
+        with open(arquivo_json, "r", encoding="utf-8") as f:
+            return rotinas_de_json(json.load(f))
+
+    def importar(metodo, caminho):
+        banco = os.path.join(diretorio, f"rotinas_{time.perf_counter_ns()}.sqlite3")
+        repositorio = RotinasRepositorio(banco)
+        inicio = time.perf_counter()
+        getattr(repositorio, metodo)(caminho)
+        duracao = time.perf_counter() - inicio
+        repositorio.fechar()
+        return round(duracao, 3)
+
+    resultado = {"json_indent4": {"mb": _mb(arquivo_json), "carga_s": _medir(carregar_json, repeticoes),
+                                  "importar_banco_s": importar("importar_json", arquivo_json)}}
+    original = rotinas_para_json(rotinas)
+    for comprimir in (True, False):
+        arquivo = os.path.join(diretorio, f"rotinas_{comprimir}.snap")
+        snapshot.gravar_rotinas(arquivo, rotinas.items(), comprimir)
+        assert rotinas_para_json(dict(snapshot.ler_rotinas(arquivo))) == original, "snapshot de rotinas diferente do original"
+        resultado["snapshot_zlib" if comprimir else "snapshot"] = {
+            "mb": _mb(arquivo),
+            "carga_s": _medir(lambda: dict(snapshot.ler_rotinas(arquivo)), repeticoes),
+            "primeiro_usuario_ms": _primeiro(snapshot.ler_rotinas(arquivo)),
+            "importar_banco_s": importar("importar_snapshot", arquivo),
+        }
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pickle/JSON vs snapshot msgpack: tamanho e tempo de carga")
+    parser.add_argument("--usuarios", type=int, default=100_000)
+    parser.add_argument("--tarefas", type=int, default=10, help="tarefas de rotina por usuário")
+    parser.add_argument("--repeticoes", type=int, default=3, help="cargas por formato (vale a melhor)")
+    args = parser.parse_args()
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory(prefix="snapshot_") as diretorio:
+        resultado = {
+            "usuarios": args.usuarios,
+            "persistencia": medir_persistencia(gerar_persistencia(rng, args.usuarios), diretorio, args.repeticoes),
+            "rotinas": medir_rotinas(gerar_rotinas(rng, args.usuarios, args.tarefas), diretorio, args.repeticoes),
+        }
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
@@ -0,0 +1,330 @@
+"""
+Caixa de saída durável para as notificações (lembretes de rotina, períodos livres, resumo
+diário e tarefas avulsas).
+
+A notificação é gravada num arquivo JSONL só de acréscimos antes de qualquer tentativa de
+envio, e um drenador a entrega em lotes, na ordem de chegada, passando por um limitador de
+taxa. Cada envio bem-sucedido acrescenta uma linha "enviada" com a mesma chave. Assim, uma
+falha da Bot API ou um reinício não perdem o lembrete: na próxima carga o que não tem linha
+"enviada" volta para a fila.
+
+- Chave de idempotência: quem registra dá uma chave por ocorrência (ex: tarefa + data).
+  Registrar de novo uma chave pendente ou já enviada não faz nada, então um job que dispara
+  duas vezes não gera mensagem repetida. O Telegram não deduplica envios: quem cair entre o
+  sendMessage e a gravação da linha "enviada" é reenviado, no máximo uma mensagem por envio
+  em voo (até TAMANHO_LOTE).
+- Falhas: erro de rede (Telegram fora do ar) e 429 pausam o drenador inteiro, com espera
+  crescente até CAIXA_SAIDA_ESPERA_MAXIMA; o lote volta para a frente da fila. Forbidden
+  (usuário bloqueou o bot) e BadRequest descartam a notificação. Notificações mais velhas
+  que CAIXA_SAIDA_VALIDADE segundos são descartadas em vez de entregues com atraso.
+- Depois de uma queda a fila acumulada sai no ritmo do limitador (CAIXA_SAIDA_ENVIOS_POR_SEGUNDO),
+  com no máximo TAMANHO_LOTE envios em paralelo, sem monopolizar o loop de eventos.
+
+O arquivo é reescrito (compactado) na carga e quando a fila esvazia depois de muitas linhas:
+ficam as pendentes e as chaves enviadas há menos de CAIXA_SAIDA_RETENCAO segundos. Escritas e
+compactação rodam numa thread, fora do loop de eventos; as linhas que chegam durante uma escrita
+saem juntas na seguinte.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest, Forbidden, RetryAfter
+
+from espacos import arquivo_do_espaco, espaco_atual
+
+logger = logging.getLogger(__name__)
+
+CAIXA_SAIDA_FILE = os.getenv('CAIXA_SAIDA_FILE', 'notificacoes_pendentes.jsonl')
+# Ritmo de entrega (a Bot API aceita ~30 mensagens/s por bot)
+CAIXA_SAIDA_ENVIOS_POR_SEGUNDO = float(os.getenv('CAIXA_SAIDA_ENVIOS_POR_SEGUNDO', '25'))
+# Idade máxima (segundos) de uma notificação ainda entregue
+CAIXA_SAIDA_VALIDADE = int(os.getenv('CAIXA_SAIDA_VALIDADE', str(6 * 3600)))
+# Por quanto tempo (segundos) uma chave enviada continua bloqueando um novo registro igual
+CAIXA_SAIDA_RETENCAO = int(os.getenv('CAIXA_SAIDA_RETENCAO', str(48 * 3600)))
+CAIXA_SAIDA_ESPERA_MAXIMA = 60  # segundos entre tentativas com o Telegram fora do ar
+TAMANHO_LOTE = 25
+# Linhas acrescentadas desde a última compactação a partir das quais o arquivo é reescrito
+MAX_LINHAS_SEM_COMPACTAR = 10_000
+
+
+class Notificacao:
+    __slots__ = ('chave', 'chat_id', 'texto', 'parse_mode', 'botoes', 'criada')
+
+    def __init__(self, chave: str, chat_id, texto: str, parse_mode: Optional[str] = None,
+                 botoes=None, criada: Optional[float] = None):
+        self.chave = chave
+        self.chat_id = chat_id
+        self.texto = texto
+        self.parse_mode = parse_mode
+        self.botoes = botoes  # [[(texto, callback_data), ...], ...]
+        self.criada = time.time() if criada is None else criada
+
+    def to_dict(self) -> dict:
+        dados = {"op": "nova", "chave": self.chave, "chat_id": self.chat_id, "texto": self.texto, "criada": self.criada}
+        if self.parse_mode:
+            dados["parse_mode"] = self.parse_mode
+        if self.botoes:
+            dados["botoes"] = self.botoes
+        return dados
+
+    @classmethod
+    def from_dict(cls, dados: dict) -> "Notificacao":
+        return cls(dados["chave"], dados["chat_id"], dados["texto"], dados.get("parse_mode"),
+                   dados.get("botoes"), dados["criada"])
+
+    def teclado(self) -> Optional[InlineKeyboardMarkup]:
+        if not self.botoes:
+            return None
+        return InlineKeyboardMarkup([
+            [InlineKeyboardButton(texto, callback_data=dados) for texto, dados in linha] for linha in self.botoes
+        ])
+
+
+class CaixaSaida:
+    """Fila durável de notificações de um bot e o drenador que as entrega."""
+
+    def __init__(self, bot, caminho: str, envios_por_segundo: float = CAIXA_SAIDA_ENVIOS_POR_SEGUNDO):
+        from salas import LimitadorTaxa
+
+        self.bot = bot
+        self.caminho = caminho
+        self.limitador = LimitadorTaxa(envios_por_segundo)
+        self._pendentes: "OrderedDict[str, Notificacao]" = OrderedDict()
+        self._enviadas: Dict[str, float] = {}  # chave -> horário do envio
+        self._arquivo = None
+        self._duravel = False  # o arquivo foi carregado e recebe as linhas novas
+        self._linhas_sem_compactar = 0
+        # Linhas ainda não gravadas; quem as acrescenta espera a escrita em lote (ver _descarregar)
+        self._buffer = []
+        self._escrita_lock = asyncio.Lock()
+        self._pronta = asyncio.Event()
+        self._acordar = asyncio.Event()
+        self._drenador: Optional[asyncio.Task] = None
+        self._espera = 0.0
+        self.enviadas = 0
+        self.descartadas = 0
+        self.duplicadas_ignoradas = 0
+        self.falhas_transitorias = 0
+
+    # --- Arquivo ---
+
+    def _carregar(self) -> None:
+        """Reconstrói a fila a partir do arquivo e o reescreve compactado (roda numa thread)."""
+        if os.path.exists(self.caminho):
+            with open(self.caminho, encoding="utf-8") as f:
+                for numero, linha in enumerate(f, 1):
+                    try:
+                        dados = json.loads(linha)
+                        op, chave = dados.get("op"), dados.get("chave")
+                        nova = Notificacao.from_dict(dados) if op == "nova" else None
+                    except (ValueError, KeyError, TypeError, AttributeError):
+                        # Última linha cortada por uma queda no meio da escrita (ou registro malformado)
+                        logger.warning("Linha %s inválida em %s ignorada.", numero, self.caminho)
+                        continue
+                    if nova is not None:
+                        if chave not in self._enviadas:
+                            self._pendentes[chave] = nova
+                    elif op in ("enviada", "descartada"):
+                        self._pendentes.pop(chave, None)
+                        self._enviadas[chave] = dados.get("em", 0)
+        self._enviadas = self._enviadas_retidas()
+        self._reescrever(self._enviadas, list(self._pendentes.values()))
+
+    def _enviadas_retidas(self) -> Dict[str, float]:
+        limite = time.time() - CAIXA_SAIDA_RETENCAO
+        return {chave: em for chave, em in self._enviadas.items() if em >= limite}
+
+    def _reescrever(self, enviadas: Dict[str, float], pendentes: list) -> None:
+        """Reescreve o arquivo só com as chaves retidas e as pendentes (roda numa thread)."""
+        temporario = f"{self.caminho}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            for chave, em in enviadas.items():
+                f.write(json.dumps({"op": "enviada", "chave": chave, "em": em}) + "\n")
+            for notificacao in pendentes:
+                f.write(json.dumps(notificacao.to_dict(), ensure_ascii=False) + "\n")
+        # Se a escrita do temporário falhar, o arquivo atual continua aberto e recebendo linhas
+        if self._arquivo is not None:
+            self._arquivo.close()
+        os.replace(temporario, self.caminho)
+        self._arquivo = open(self.caminho, "a", encoding="utf-8")
+
+    def _escrever(self, linhas: list) -> None:
+        """Acrescenta as linhas ao arquivo (roda numa thread)."""
+        self._arquivo.writelines(linhas)
+        # Chega ao sistema operacional antes do envio: sobrevive a uma queda do processo
+        self._arquivo.flush()
+
+    async def _compactar(self) -> None:
+        async with self._escrita_lock:
+            self._enviadas = self._enviadas_retidas()
+            # As linhas já no buffer estão refletidas nas filas copiadas aqui; as que chegarem
+            # durante a reescrita ficam para a próxima escrita
+            no_buffer = len(self._buffer)
+            await asyncio.to_thread(self._reescrever, dict(self._enviadas), list(self._pendentes.values()))
+            del self._buffer[:no_buffer]
+            self._linhas_sem_compactar = len(self._buffer)
+
+    async def _acrescentar(self, dados: dict) -> None:
+        """Enfileira a linha e só retorna quando ela foi gravada."""
+        if not self._duravel:
+            return
+        self._buffer.append(json.dumps(dados, ensure_ascii=False) + "\n")
+        self._linhas_sem_compactar += 1
+        await self._descarregar()
+
+    async def _descarregar(self) -> None:
+        # Escrita em grupo: quem chega durante uma escrita espera a vez e grava de uma só vez tudo
+        # o que acumulou; se outro já gravou as suas linhas, encontra o buffer vazio e segue
+        async with self._escrita_lock:
+            if not self._buffer or self._arquivo is None:
+                return
+            linhas, self._buffer = self._buffer, []
+            await asyncio.to_thread(self._escrever, linhas)
+
+    # --- Ciclo de vida ---
+
+    async def iniciar(self) -> None:
+        try:
+            await asyncio.to_thread(self._carregar)
+            self._duravel = True
+            if self._pendentes:
+                logger.info("%s notificações pendentes recuperadas de %s.", len(self._pendentes), self.caminho)
+        except Exception as e:
+            # Sem o arquivo as notificações continuam saindo, só sem durabilidade; o arquivo
+            # existente não é compactado (nem perdido) enquanto não puder ser lido
+            logger.error("Erro ao carregar a caixa de saída %s: %s. Notificações seguem só em memória.",
+                         self.caminho, e, exc_info=True)
+        finally:
+            # Quem chama registrar() espera por isto: nunca pode ficar sem ser liberado
+            self._pronta.set()
+        self._drenador = asyncio.create_task(self._drenar())
+
+    async def parar(self) -> None:
+        if self._drenador is not None:
+            self._drenador.cancel()
+            try:
+                await self._drenador
+            except asyncio.CancelledError:
+                pass
+            self._drenador = None
+        await self._descarregar()
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+    # --- Registro ---
+
+    async def registrar(self, chave: str, chat_id, texto: str, parse_mode: Optional[str] = None, botoes=None) -> bool:
+        """Grava a notificação e acorda o drenador. Retorna False se a chave já era conhecida."""
+        await self._pronta.wait()
+        if chave in self._pendentes or chave in self._enviadas:
+            self.duplicadas_ignoradas += 1
+            return False
+        notificacao = Notificacao(chave, chat_id, texto, parse_mode, botoes)
+        # Entra na fila já (um registro concorrente da mesma chave é ignorado), mas o drenador só
+        # é acordado depois que a linha foi gravada
+        self._pendentes[chave] = notificacao
+        await self._acrescentar(notificacao.to_dict())
+        self._acordar.set()
+        return True
+
+    async def _marcar(self, notificacao: Notificacao, op: str, motivo: Optional[str] = None) -> None:
+        agora = time.time()
+        dados = {"op": op, "chave": notificacao.chave, "em": agora}
+        if motivo:
+            dados["motivo"] = motivo
+        self._pendentes.pop(notificacao.chave, None)
+        self._enviadas[notificacao.chave] = agora
+        await self._acrescentar(dados)
+
+    # --- Drenagem ---
+
+    async def _enviar(self, notificacao: Notificacao) -> bool:
+        """Entrega uma notificação. Retorna False em falha transitória (fica na fila)."""
+        if time.time() - notificacao.criada > CAIXA_SAIDA_VALIDADE:
+            logger.warning("Notificação %s expirada antes da entrega. Descartada.", notificacao.chave)
+            await self._marcar(notificacao, "descartada", "expirada")
+            self.descartadas += 1
+            return True
+        await self.limitador.aguardar()
+        try:
+            await self.bot.send_message(
+                chat_id=notificacao.chat_id, text=notificacao.texto,
+                parse_mode=notificacao.parse_mode, reply_markup=notificacao.teclado(),
+            )
+        except RetryAfter as e:
+            self._espera = max(self._espera, float(e.retry_after))
+            return False
+        except (Forbidden, BadRequest) as e:
+            logger.warning("Notificação %s para %s descartada: %s", notificacao.chave, notificacao.chat_id, e)
+            await self._marcar(notificacao, "descartada", str(e))
+            self.descartadas += 1
+            return True
+        except Exception as e:
+            logger.warning("Falha ao enviar a notificação %s: %s. Nova tentativa depois.", notificacao.chave, e)
+            return False
+        await self._marcar(notificacao, "enviada")
+        self.enviadas += 1
+        return True
+
+    async def _drenar(self) -> None:
+        espera_falha = 0.0
+        while True:
+            try:
+                if not self._pendentes:
+                    if self._duravel and self._linhas_sem_compactar > MAX_LINHAS_SEM_COMPACTAR:
+                        await self._compactar()
+                    self._acordar.clear()
+                    await self._acordar.wait()
+                    continue
+
+                lote = [self._pendentes[chave] for chave in list(self._pendentes)[:TAMANHO_LOTE]]
+                self._espera = 0.0
+                resultados = await asyncio.gather(*(self._enviar(notificacao) for notificacao in lote))
+                if all(resultados):
+                    espera_falha = 0.0
+                    continue
+
+                # Telegram fora do ar ou limite atingido: o lote segue na frente da fila
+                self.falhas_transitorias += resultados.count(False)
+                espera_falha = min(max(espera_falha * 2, 1.0), CAIXA_SAIDA_ESPERA_MAXIMA)
+                espera = max(self._espera, espera_falha)
+                logger.warning("%s notificações não enviadas. Nova tentativa em %.0fs (%s na fila).",
+                               resultados.count(False), espera, len(self._pendentes))
+            except Exception as e:
+                # Ex: disco cheio ao gravar ou compactar. O drenador não pode morrer: tenta de novo
+                espera_falha = min(max(espera_falha * 2, 1.0), CAIXA_SAIDA_ESPERA_MAXIMA)
+                espera = espera_falha
+                logger.error("Erro no drenador da caixa de saída %s: %s. Nova tentativa em %.0fs.",
+                             self.caminho, e, espera, exc_info=True)
+            await asyncio.sleep(espera)
+
+    def estatisticas(self) -> dict:
+        return {
+            "caixa_saida_pendentes": len(self._pendentes),
+            "caixa_saida_enviadas": self.enviadas,
+            "caixa_saida_descartadas": self.descartadas,
+            "caixa_saida_duplicadas_ignoradas": self.duplicadas_ignoradas,
+            "caixa_saida_falhas_transitorias": self.falhas_transitorias,
+        }
+
+
+# espaço do bot -> CaixaSaida (ver espacos.py)
+_caixas: Dict[str, CaixaSaida] = {}
+
+
+def instalar_caixa_saida(application) -> CaixaSaida:
+    """Cria a caixa de saída da aplicação (o arquivo é carregado em iniciar(), no post_init)."""
+    espaco = espaco_atual.get()
+    caixa = _caixas[espaco] = CaixaSaida(application.bot, arquivo_do_espaco(CAIXA_SAIDA_FILE, espaco))
+    return caixa
+
+
+def get_caixa_saida() -> Optional[CaixaSaida]:
+    return _caixas.get(espaco_atual.get())
@@ -0,0 +1,115 @@
+"""
+Roteamento de callback_data por tabela.
+
+Formato: "prefixo" ou "prefixo:arg1:arg2" (no máximo 64 bytes, limite do Telegram). A chave
+de roteamento é o prefixo (tudo antes do primeiro ':'), procurado num dict: o custo não cresce
+com a quantidade de botões. Os argumentos são decodificados uma única vez e entregues ao
+callback em `context.args`.
+
+Botões enviados antes deste formato (ex: "rotinas_apagar_Segunda-feira_<id>") continuam
+funcionando: os formatos antigos com argumentos são traduzidos em `decodificar`.
+"""
+from typing import Callable, Dict, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import BaseHandler
+
+SEPARADOR = ":"
+MAX_BYTES_CALLBACK = 64
+
+# Formatos antigos "prefixo_<args>" -> (prefixo novo, função que extrai os argumentos do resto).
+# Ordenados do mais longo para o mais curto ("task_not_complete_" antes de "task_complete_").
+_DIAS_LEGADOS = {
+    "Segunda-feira": "0", "Terça-feira": "1", "Quarta-feira": "2", "Quinta-feira": "3",
+    "Sexta-feira": "4", "Sábado": "5", "Domingo": "6",
+}
+
+
+def _legado_apagar(resto: str) -> tuple:
+    # "<Dia>_<id>": o id (uuid hex) nunca contém '_', então o corte é pelo último
+    dia, _, tarefa_id = resto.rpartition("_")
+    return _DIAS_LEGADOS.get(dia, dia), tarefa_id
+
+
+_LEGADOS = sorted(
+    [
+        ("rotinas_apagar_", "rotinas_apagar", _legado_apagar),
+        ("rotinas_concluir_", "rotinas_concluir", lambda resto: (resto,)),
+        ("rotinas_pagina_", "rotinas_pagina", lambda resto: (resto,)),
+        ("confirm_delete_task_", "confirm_delete_task", lambda resto: (resto,)),
+        ("execute_delete_task_", "execute_delete_task", lambda resto: (resto,)),
+        ("task_not_complete_", "task_not_complete", lambda resto: (resto,)),
+        ("task_complete_", "task_complete", lambda resto: (resto,)),
+        ("config_", "pomodoro_config", lambda resto: (resto,)),
+    ],
+    key=lambda item: len(item[0]),
+    reverse=True,
+)
+_PREFIXOS_LEGADOS = tuple(antigo for antigo, _, _ in _LEGADOS)
+
+
+def montar(prefixo: str, *args) -> str:
+    """Monta o callback_data "prefixo:arg1:arg2". Levanta ValueError se passar de 64 bytes."""
+    data = SEPARADOR.join((prefixo, *map(str, args))) if args else prefixo
+    if len(data.encode("utf-8")) > MAX_BYTES_CALLBACK:
+        raise ValueError(f"callback_data com mais de {MAX_BYTES_CALLBACK} bytes: {data!r}")
+    return data
+
+
+def decodificar_legado(data: str) -> Optional[Tuple[str, tuple]]:
+    """Traduz um callback_data no formato antigo "prefixo_<args>". Retorna None se não for um."""
+    if not data.startswith(_PREFIXOS_LEGADOS):
+        return None
+    for antigo, novo, extrair in _LEGADOS:
+        if data.startswith(antigo):
+            return novo, extrair(data[len(antigo):])
+    return None
+
+
+def decodificar(data: str) -> Tuple[str, tuple]:
+    """callback_data -> (prefixo, argumentos). Entende também os formatos antigos."""
+    prefixo, sep, resto = data.partition(SEPARADOR)
+    if sep:
+        return prefixo, tuple(resto.split(SEPARADOR))
+    return decodificar_legado(data) or (data, ())
+
+
+class RoteadorCallbacks(BaseHandler):
+    """
+    Handler único que substitui uma sequência de CallbackQueryHandler com regex.
+    `rotas` mapeia prefixo -> callback(update, context); os argumentos chegam em context.args.
+    Funciona dentro dos estados, entry_points e fallbacks de um ConversationHandler.
+    """
+
+    __slots__ = ("rotas",)
+
+    def __init__(self, rotas: Dict[str, Callable], block: bool = True):
+        super().__init__(self._sem_rota, block=block)
+        self.rotas = rotas
+
+    @staticmethod
+    async def _sem_rota(update, context):
+        # Nunca chamado: handle_update despacha direto para o callback da rota
+        return None
+
+    def check_update(self, update: object) -> Optional[tuple]:
+        if not isinstance(update, Update) or update.callback_query is None:
+            return None
+        data = update.callback_query.data
+        if not isinstance(data, str):
+            return None
+        prefixo, sep, resto = data.partition(SEPARADOR)
+        callback = self.rotas.get(prefixo)
+        if callback is not None:
+            return callback, tuple(resto.split(SEPARADOR)) if sep else ()
+        if not sep:
+            # Só botões antigos (ou de outra tabela) chegam aqui
+            legado = decodificar_legado(data)
+            if legado is not None and legado[0] in self.rotas:
+                return self.rotas[legado[0]], legado[1]
+        return None
+
+    async def handle_update(self, update, application, check_result, context):
+        callback, args = check_result
+        context.args = list(args)
+        return await callback(update, context)
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+import os
+
+from telegram import Update
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+# Máximo de updates sendo processados ao mesmo tempo (de chats diferentes)
+MAX_UPDATES_CONCORRENTES = int(os.getenv("BOT_CONCURRENT_UPDATES", "64"))
+# Teto de updates aceitos em voo pelo PTB (inclui os que aguardam o lock do próprio chat).
+# Fica bem acima do limite acima para que um chat inundando o bot não ocupe as vagas dos outros.
+MAX_UPDATES_EM_VOO = 4096
+
+
+def _chave_do_update(update: object):
+    """Chave de serialização: o chat do update (ou o usuário, para updates sem chat)."""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_chat:
+        return update.effective_chat.id
+    if update.effective_user:
+        return update.effective_user.id
+    return None
+
+
+class ChatSerializedApplication(Application):
+    """
+    Application que processa updates de chats diferentes em paralelo, mas mantém os updates
+    de um mesmo chat estritamente em ordem (um lock FIFO por chat).
+
+    O lock do chat é obtido antes da vaga global, assim updates esperando pelo próprio chat
+    não bloqueiam os demais usuários.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._limite_global = asyncio.Semaphore(MAX_UPDATES_CONCORRENTES)
+        # chat_id -> [lock, quantidade de updates usando/aguardando o lock]
+        self._locks_por_chat = {}
+
+    async def process_update(self, update: object) -> None:
+        chave = _chave_do_update(update)
+        if chave is None:
+            async with self._limite_global:
+                await super().process_update(update)
+            return
+
+        entrada = self._locks_por_chat.get(chave)
+        if entrada is None:
+            entrada = self._locks_por_chat[chave] = [asyncio.Lock(), 0]
+        entrada[1] += 1
+        try:
+            async with entrada[0]:
+                async with self._limite_global:
+                    await super().process_update(update)
+        finally:
+            entrada[1] -= 1
+            if entrada[1] == 0:
+                # Ninguém mais usa o lock deste chat: libera a memória
+                del self._locks_por_chat[chave]
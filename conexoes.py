@@ -0,0 +1,152 @@
+"""
+Pools de conexões HTTP com a Bot API: um para o long-polling (getUpdates) e outro para as
+chamadas de saída (send_message, edit_message_text, ... dos handlers, timers e jobs).
+
+O getUpdates fica pendurado até ~10 s numa conexão; separado, ele nunca ocupa a vaga de um
+envio e os envios não atrasam o polling. Os dois pools têm tamanho, keep-alive, timeouts e
+versão HTTP configuráveis por variáveis de ambiente (HTTP/2 exige
+`python-telegram-bot[http2]`; multiplexa os envios em poucas conexões).
+
+A RequisicaoMedida controla as vagas do pool com um semáforo do mesmo tamanho, antes do
+httpx, e mede quanto cada chamada esperou por uma vaga. Esperas frequentes ou longas (ver
+`estatisticas()`, no /debug_profile) indicam que o pool é o gargalo.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Dict
+
+import httpx
+from telegram.error import TimedOut
+from telegram.request import BaseRequest, HTTPXRequest
+
+from espacos import espaco_atual
+
+logger = logging.getLogger(__name__)
+
+# Chamadas simultâneas de saída (o PTB usa 256 por padrão)
+POOL_SAIDA = int(os.getenv('BOT_POOL_SAIDA', '128'))
+# O long-polling faz uma chamada por vez
+POOL_UPDATES = int(os.getenv('BOT_POOL_UPDATES', '1'))
+# Segundos que uma conexão ociosa continua aberta para ser reaproveitada (httpx usa 5)
+KEEPALIVE = float(os.getenv('BOT_KEEPALIVE', '60'))
+TIMEOUT_CONEXAO = float(os.getenv('BOT_TIMEOUT_CONEXAO', '5'))
+TIMEOUT_LEITURA = float(os.getenv('BOT_TIMEOUT_LEITURA', '10'))
+TIMEOUT_ESCRITA = float(os.getenv('BOT_TIMEOUT_ESCRITA', '10'))
+# Espera máxima por uma vaga no pool antes de desistir com TimedOut
+TIMEOUT_POOL = float(os.getenv('BOT_TIMEOUT_POOL', '5'))
+HTTP_VERSION_SAIDA = "2" if os.getenv('BOT_HTTP2', '0') == '1' else "1.1"
+
+# Esperas recentes guardadas por pool para os percentis
+AMOSTRAS_ESPERA = 1024
+
+
+class RequisicaoMedida(HTTPXRequest):
+    """HTTPXRequest com keep-alive configurável e métrica de espera por vaga no pool."""
+
+    def __init__(self, nome: str, tamanho: int, keepalive: float = KEEPALIVE, http_version: str = "1.1",
+                 connect_timeout: float = TIMEOUT_CONEXAO, read_timeout: float = TIMEOUT_LEITURA,
+                 write_timeout: float = TIMEOUT_ESCRITA, pool_timeout: float = TIMEOUT_POOL):
+        super().__init__(connection_pool_size=tamanho, connect_timeout=connect_timeout, read_timeout=read_timeout,
+                         write_timeout=write_timeout, pool_timeout=pool_timeout, http_version=http_version)
+        # O HTTPXRequest não expõe o keep-alive: refaz o cliente (ainda sem conexões) com ele
+        self._client_kwargs["limits"] = httpx.Limits(
+            max_connections=tamanho, max_keepalive_connections=tamanho, keepalive_expiry=keepalive
+        )
+        self._client = self._build_client()
+        self.nome = nome
+        self.tamanho = tamanho
+        self._vagas = asyncio.Semaphore(tamanho)
+        self._esperas = deque(maxlen=AMOSTRAS_ESPERA)
+        self.chamadas = 0
+        self.chamadas_com_espera = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.em_uso = 0
+        self.pico_em_uso = 0
+        self.timeouts_pool = 0
+
+    async def initialize(self) -> None:
+        # Só os pools em uso aparecem no diagnóstico (o builder pode trocar um já criado)
+        _pools[self.nome] = self
+        await super().initialize()
+
+    async def _obter_vaga(self, pool_timeout) -> None:
+        if not self._vagas.locked():
+            await self._vagas.acquire()
+            self._esperas.append(0.0)
+            return
+        if pool_timeout is BaseRequest.DEFAULT_NONE:
+            pool_timeout = self._client.timeout.pool
+        inicio = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._vagas.acquire(), pool_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts_pool += 1
+            raise TimedOut(
+                f"Pool timeout: as {self.tamanho} conexões do pool '{self.nome}' estão ocupadas. "
+                "A chamada *não* foi enviada ao Telegram."
+            ) from None
+        espera = time.perf_counter() - inicio
+        self._esperas.append(espera)
+        self.chamadas_com_espera += 1
+        self.espera_total += espera
+        self.espera_maxima = max(self.espera_maxima, espera)
+
+    async def do_request(self, url: str, method: str, request_data=None,
+                         read_timeout=BaseRequest.DEFAULT_NONE, write_timeout=BaseRequest.DEFAULT_NONE,
+                         connect_timeout=BaseRequest.DEFAULT_NONE, pool_timeout=BaseRequest.DEFAULT_NONE):
+        await self._obter_vaga(pool_timeout)
+        self.chamadas += 1
+        self.em_uso += 1
+        self.pico_em_uso = max(self.pico_em_uso, self.em_uso)
+        try:
+            return await super().do_request(url, method, request_data, read_timeout, write_timeout,
+                                            connect_timeout, pool_timeout)
+        finally:
+            self.em_uso -= 1
+            self._vagas.release()
+
+    def estatisticas(self) -> dict:
+        esperas = sorted(self._esperas)
+
+        def percentil(p):
+            return round(esperas[min(len(esperas) - 1, int(len(esperas) * p))] * 1000, 2) if esperas else 0.0
+
+        prefixo = f"pool_{self.nome}"
+        return {
+            f"{prefixo}_tamanho": self.tamanho,
+            f"{prefixo}_chamadas": self.chamadas,
+            f"{prefixo}_chamadas_com_espera": self.chamadas_com_espera,
+            f"{prefixo}_espera_media_ms": round(self.espera_total / max(self.chamadas, 1) * 1000, 3),
+            f"{prefixo}_espera_p50_ms": percentil(0.5),
+            f"{prefixo}_espera_p99_ms": percentil(0.99),
+            f"{prefixo}_espera_max_ms": round(self.espera_maxima * 1000, 2),
+            f"{prefixo}_em_uso": self.em_uso,
+            f"{prefixo}_pico_em_uso": self.pico_em_uso,
+            f"{prefixo}_timeouts": self.timeouts_pool,
+        }
+
+
+# nome -> pool inicializado, para o diagnóstico (os de updates levam o espaço do bot no nome)
+_pools: Dict[str, RequisicaoMedida] = {}
+
+
+def nova_requisicao_saida(classe=RequisicaoMedida) -> RequisicaoMedida:
+    """Pool das chamadas de saída (no modo multibot é um só, de todos os bots)."""
+    return classe("saida", POOL_SAIDA, http_version=HTTP_VERSION_SAIDA)
+
+
+def nova_requisicao_updates() -> RequisicaoMedida:
+    """Pool do long-polling do bot atual. O PTB soma o timeout do getUpdates ao de leitura."""
+    espaco = espaco_atual.get()
+    return RequisicaoMedida(f"updates_{espaco}" if espaco else "updates", POOL_UPDATES)
+
+
+def estatisticas() -> dict:
+    contagens = {}
+    for pool in _pools.values():
+        contagens.update(pool.estatisticas())
+    return contagens
@@ -0,0 +1,193 @@
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import tracemalloc
+from datetime import datetime
+
+from telegram import Update
+from telegram.ext import CommandHandler, ContextTypes
+
+import agenda
+import caixa_saida
+import conexoes
+import limpeza_estado
+import log_assincrono
+import pomodoro
+import salas
+
+logger = logging.getLogger(__name__)
+
+# IDs de usuários do Telegram autorizados a usar os comandos de diagnóstico (ex: "123,456")
+ADMIN_IDS = {
+    int(uid) for uid in os.getenv("ADMIN_IDS", "").replace(";", ",").split(",") if uid.strip().isdigit()
+}
+
+DURACAO_PADRAO = 30  # segundos
+DURACAO_MAXIMA = 600  # segundos
+# Só entram no relatório do cProfile as funções dos módulos do bot e da biblioteca do Telegram
+FILTRO_MODULOS = r"agenda|pomodoro|main|diagnostico|telegram"
+LIMITE_LINHAS_RELATORIO = 80
+LIMITE_ALOCADORES = 25
+
+# Garante que só exista uma sessão de profiling por vez (cProfile/tracemalloc são globais ao processo)
+_sessao_lock = asyncio.Lock()
+
+
+def _eh_admin(update: Update) -> bool:
+    user = update.effective_user
+    return user is not None and user.id in ADMIN_IDS
+
+
+def contar_objetos(application) -> dict:
+    """Conta os objetos de estado que mais crescem em produção (sessões, jobs e tarefas)."""
+    tarefas_avulsas = 0
+    for dados in application.user_data.values():
+        tarefas_avulsas += len(dados.get('tasks', []))
+
+    job_queue = application.job_queue
+    repositorio = agenda.get_repositorio()
+    registro = pomodoro.get_registro()
+    gerenciador_salas = salas.get_gerenciador()
+    varredor = limpeza_estado.get_varredor()
+    caixa = caixa_saida.get_caixa_saida()
+
+    contagens = {
+        "jobs_apscheduler": len(agenda.get_scheduler().get_jobs()),
+        "jobs_job_queue": len(job_queue.jobs()) if job_queue else 0,
+        "usuarios_em_user_data": len(application.user_data),
+        "tarefas_avulsas_total": tarefas_avulsas,
+    }
+    if registro is not None:
+        contagens.update(registro.estatisticas())
+    if gerenciador_salas is not None:
+        contagens.update(gerenciador_salas.estatisticas())
+    if varredor is not None:
+        contagens.update(varredor.estatisticas())
+    if caixa is not None:
+        contagens.update(caixa.estatisticas())
+    if repositorio is not None:
+        contagens["usuarios_com_rotina"] = repositorio.contar_usuarios()
+        contagens.update(repositorio.estatisticas())
+    contagens.update(conexoes.estatisticas())
+    contagens.update(log_assincrono.estatisticas())
+    return contagens
+
+
+def _formatar_contagens(contagens: dict) -> str:
+    return "\n".join(f"{nome}: {valor}" for nome, valor in contagens.items())
+
+
+async def _perfilar_cpu(segundos: int) -> str:
+    """Liga o cProfile no loop de eventos por `segundos` e devolve o relatório por tempo cumulativo."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        await asyncio.sleep(segundos)
+    finally:
+        profiler.disable()
+
+    buffer = io.StringIO()
+    stats = pstats.Stats(profiler, stream=buffer)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+    buffer.write(f"# cProfile de {segundos}s — funções de agenda/pomodoro/telegram, ordenado por tempo cumulativo\n")
+    stats.print_stats(FILTRO_MODULOS, LIMITE_LINHAS_RELATORIO)
+    buffer.write("\n# Top geral (todas as funções)\n")
+    stats.print_stats(LIMITE_LINHAS_RELATORIO // 2)
+    return buffer.getvalue()
+
+
+async def _perfilar_memoria(segundos: int) -> str:
+    """Rastreia alocações com tracemalloc por `segundos` e devolve os maiores alocadores."""
+    ja_rastreando = tracemalloc.is_tracing()
+    if not ja_rastreando:
+        tracemalloc.start(10)
+    try:
+        inicio = tracemalloc.take_snapshot()
+        await asyncio.sleep(segundos)
+        fim = tracemalloc.take_snapshot()
+    finally:
+        if not ja_rastreando:
+            tracemalloc.stop()
+
+    filtros = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ]
+    inicio = inicio.filter_traces(filtros)
+    fim = fim.filter_traces(filtros)
+
+    buffer = io.StringIO()
+    buffer.write(f"# tracemalloc — maiores alocadores vivos ao fim de {segundos}s\n")
+    for stat in fim.statistics('lineno')[:LIMITE_ALOCADORES]:
+        buffer.write(f"{stat}\n")
+    buffer.write(f"\n# Crescimento durante os {segundos}s\n")
+    for stat in fim.compare_to(inicio, 'lineno')[:LIMITE_ALOCADORES]:
+        buffer.write(f"{stat}\n")
+    return buffer.getvalue()
+
+
+async def _executar_sessao(context: ContextTypes.DEFAULT_TYPE, chat_id: int, segundos: int, modo: str) -> None:
+    """Roda a sessão de profiling em segundo plano e envia o relatório como documento."""
+    async with _sessao_lock:
+        logger.info("Sessão de profiling '%s' de %ss iniciada a pedido do chat %s.", modo, segundos, chat_id)
+        try:
+            if modo == "mem":
+                relatorio = await _perfilar_memoria(segundos)
+            else:
+                relatorio = await _perfilar_cpu(segundos)
+
+            contagens = _formatar_contagens(contar_objetos(context.application))
+            conteudo = f"{relatorio}\n# Contagem de objetos\n{contagens}\n"
+            nome_arquivo = f"profile_{modo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+
+            await context.bot.send_document(
+                chat_id=chat_id,
+                document=io.BytesIO(conteudo.encode('utf-8')),
+                filename=nome_arquivo,
+                caption=f"📈 Relatório de profiling ({modo}, {segundos}s)"
+            )
+            logger.info("Relatório de profiling '%s' enviado para o chat %s.", modo, chat_id)
+        except Exception as e:
+            logger.error("Erro durante a sessão de profiling para o chat %s: %s", chat_id, e, exc_info=True)
+            await context.bot.send_message(chat_id, f"❌ Falha ao gerar o relatório de profiling: {e}")
+
+
+async def debug_profile(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    /debug_profile [segundos] [cpu|mem]
+    Liga o cProfile (padrão) ou o tracemalloc por alguns segundos e devolve o relatório como documento.
+    """
+    if not _eh_admin(update):
+        logger.warning("Usuário %s tentou usar /debug_profile sem permissão.",
+                       update.effective_user.id if update.effective_user else '?')
+        return
+
+    segundos = DURACAO_PADRAO
+    modo = "cpu"
+    for arg in context.args or []:
+        if arg.isdigit():
+            segundos = min(max(int(arg), 1), DURACAO_MAXIMA)
+        elif arg.lower() in ("cpu", "mem"):
+            modo = arg.lower()
+        else:
+            await update.message.reply_text("Uso: /debug_profile [segundos] [cpu|mem]")
+            return
+
+    if _sessao_lock.locked():
+        await update.message.reply_text("⏳ Já existe uma sessão de profiling em andamento. Aguarde o relatório.")
+        return
+
+    # Roda em segundo plano: o handler precisa retornar para que os updates continuem sendo processados
+    # (e apareçam no relatório) enquanto o profiler está ligado.
+    context.application.create_task(
+        _executar_sessao(context, update.effective_chat.id, segundos, modo), update=update
+    )
+    await update.message.reply_text(f"🔬 Profiling '{modo}' ligado por {segundos}s. O relatório chega como documento.")
+
+
+def get_debug_profile_handler() -> CommandHandler:
+    """Retorna o handler do comando administrativo /debug_profile."""
+    return CommandHandler("debug_profile", debug_profile)
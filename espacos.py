@@ -0,0 +1,22 @@
+"""
+Espaço de nomes do bot atual, para vários bots (marcas) no mesmo processo (ver multibot.py).
+
+Cada bot roda nas suas próprias tarefas asyncio com `espaco_atual` valendo o nome dele, e as
+tarefas criadas a partir delas (processamento dos updates, timers do Pomodoro, carga das
+rotinas) herdam o valor. O estado que os módulos guardam em variáveis globais (repositório de
+rotinas, caches por chat_id, registros de sessões) fica separado por espaço.
+
+No modo de um bot só o espaço é "" e os nomes de arquivos não mudam.
+"""
+import os
+from contextvars import ContextVar
+
+espaco_atual: ContextVar[str] = ContextVar("espaco_atual", default="")
+
+
+def arquivo_do_espaco(caminho: str, espaco: str) -> str:
+    """'rotinas.sqlite3' -> 'rotinas.marca.sqlite3'; 'bot_persistence' -> 'bot_persistence.marca'."""
+    if not espaco:
+        return caminho
+    raiz, ext = os.path.splitext(caminho)
+    return f"{raiz}.{espaco}{ext}"
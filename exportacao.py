@@ -0,0 +1,182 @@
+"""
+/exportar: os dados do usuário (tarefas avulsas, rotinas semanais e contadores do Pomodoro)
+como documento CSV ou JSONL.
+
+Os registros saem de geradores, uma linha por vez, para um SpooledTemporaryFile: até
+EXPORTACAO_MAX_MEMORIA bytes ficam em memória, acima disso o buffer vai para o disco. Nenhuma
+lista com o histórico inteiro é montada. O filtro de datas usa o índice por horário das
+tarefas avulsas (busca binária), sem percorrer a lista toda.
+
+O upload em si (InputFile do PTB) lê o arquivo pronto de uma vez; por isso o tamanho é
+limitado aos 50 MB aceitos pela Bot API.
+"""
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from tempfile import SpooledTemporaryFile
+from typing import Iterator, Optional
+
+from telegram import Update
+from telegram.ext import CommandHandler, ContextTypes
+
+import agenda
+import pomodoro
+
+logger = logging.getLogger(__name__)
+
+# Parte do arquivo mantida em memória antes de transbordar para o disco
+EXPORTACAO_MAX_MEMORIA = int(os.getenv('EXPORTACAO_MAX_MEMORIA', str(256 * 1024)))
+# Limite de upload de documentos da Bot API
+EXPORTACAO_MAX_BYTES = 50 * 1024 * 1024
+# Linhas escritas entre duas devoluções de controle ao loop de eventos
+LINHAS_POR_LOTE = 1000
+
+FORMATOS = ("csv", "jsonl")
+COLUNAS_CSV = (
+    "registro", "id", "descricao", "agendada_para", "concluida", "motivo_nao_conclusao",
+    "dia", "tipo", "inicio", "fim", "periodo", "campo", "valor",
+)
+USO_EXPORTAR = "Uso: /exportar [csv|jsonl] [AAAA-MM-DD] [AAAA-MM-DD] — datas filtram as tarefas avulsas (início e fim inclusivos)."
+
+
+class ExportacaoGrandeDemais(Exception):
+    """O arquivo passou do limite de upload da Bot API."""
+
+
+def registros_tarefas(tasks: list, inicio: datetime = None, fim: datetime = None) -> Iterator[dict]:
+    """Tarefas avulsas (lista ordenada por horário) no intervalo, em ordem de horário."""
+    for i in agenda.faixa_tarefas_avulsas(tasks, inicio, fim):
+        task = tasks[i]
+        yield {
+            "registro": "tarefa",
+            "id": task['id'],
+            "descricao": task['description'],
+            "agendada_para": task['scheduled_time'],
+            "concluida": task['completed'],
+            "motivo_nao_conclusao": task.get('not_completed_reason'),
+        }
+
+
+def registros_rotinas(tarefas_rotina: list) -> Iterator[dict]:
+    """Tarefas da rotina semanal (TarefaRotina), na ordem dos dias."""
+    for tarefa in tarefas_rotina:
+        yield {
+            "registro": "rotina",
+            "id": tarefa.id,
+            "descricao": tarefa.descricao,
+            "dia": tarefa.dia_nome,
+            "tipo": tarefa.tipo.nome,
+            "inicio": tarefa.inicio_str,
+            "fim": tarefa.fim_str,
+            "periodo": tarefa.periodo,
+        }
+
+
+def registros_pomodoro(dados_pomodoro: dict) -> Iterator[dict]:
+    """Configuração e contadores do Pomodoro (valores padrão incluídos)."""
+    for campo, padrao in pomodoro.Pomodoro.CAMPOS_PERSISTIDOS.items():
+        if campo.startswith('_'):
+            continue
+        yield {"registro": "pomodoro", "campo": campo, "valor": dados_pomodoro.get(campo, padrao)}
+
+
+def linhas_csv(registros: Iterator[dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=COLUNAS_CSV, extrasaction='ignore')
+    escritor.writeheader()
+    for registro in registros:
+        escritor.writerow(registro)
+        # Uma linha por vez: o StringIO nunca acumula mais que um registro
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def linhas_jsonl(registros: Iterator[dict]) -> Iterator[str]:
+    for registro in registros:
+        yield json.dumps(registro, ensure_ascii=False) + "\n"
+
+
+async def escrever_exportacao(arquivo, linhas: Iterator[str]) -> int:
+    """Escreve as linhas em `arquivo` (binário), cedendo o loop a cada lote. Retorna os bytes escritos."""
+    total = 0
+    for n, linha in enumerate(linhas, 1):
+        dados = linha.encode("utf-8")
+        total += len(dados)
+        if total > EXPORTACAO_MAX_BYTES:
+            raise ExportacaoGrandeDemais()
+        arquivo.write(dados)
+        if n % LINHAS_POR_LOTE == 0:
+            await asyncio.sleep(0)
+    return total
+
+
+def _dados_pomodoro(update: Update, context: ContextTypes.DEFAULT_TYPE) -> dict:
+    registro = pomodoro.get_registro()
+    sessao = registro.existente(update.effective_chat.id) if registro else None
+    if sessao is not None:
+        return {campo: getattr(sessao, campo) for campo in pomodoro.Pomodoro.CAMPOS_PERSISTIDOS}
+    return (context.chat_data or {}).get(pomodoro.CHAVE_SESSAO_SALVA, {})
+
+
+def _ler_data(texto: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(texto, "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+async def exportar(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/exportar [csv|jsonl] [AAAA-MM-DD] [AAAA-MM-DD]"""
+    chat_id = update.effective_chat.id
+    formato = "csv"
+    datas = []
+    for arg in context.args or []:
+        if arg.lower() in FORMATOS:
+            formato = arg.lower()
+        elif _ler_data(arg) and len(datas) < 2:
+            datas.append(_ler_data(arg))
+        else:
+            await update.message.reply_text(USO_EXPORTAR)
+            return
+    inicio = datas[0] if datas else None
+    # A data final é inclusiva: vai até o fim do dia
+    fim = datas[1] + timedelta(days=1) if len(datas) == 2 else None
+
+    try:
+        await agenda.aguardar_rotinas()
+        repositorio = agenda.get_repositorio()
+        tarefas_rotina = await repositorio.obter(chat_id) if repositorio else []
+
+        def registros():
+            yield from registros_tarefas(agenda.tarefas_ordenadas(context.user_data), inicio, fim)
+            yield from registros_rotinas(tarefas_rotina)
+            yield from registros_pomodoro(_dados_pomodoro(update, context))
+
+        gerar_linhas = linhas_csv if formato == "csv" else linhas_jsonl
+        with SpooledTemporaryFile(max_size=EXPORTACAO_MAX_MEMORIA, mode="w+b") as arquivo:
+            total = await escrever_exportacao(arquivo, gerar_linhas(registros()))
+            arquivo.seek(0)
+            nome_arquivo = f"exportacao_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato}"
+            await context.bot.send_document(
+                chat_id=chat_id,
+                document=arquivo,
+                filename=nome_arquivo,
+                caption="📦 Aqui estão seus dados: tarefas avulsas, rotinas semanais e Pomodoro."
+            )
+        logger.info("Exportação %s de %s bytes enviada para o chat %s.", formato, total, chat_id)
+    except ExportacaoGrandeDemais:
+        await update.message.reply_text("Seus dados passaram de 50 MB, o limite do Telegram. Tente um intervalo de datas menor. 📅")
+    except Exception as e:
+        logger.error("Erro ao exportar dados do chat %s: %s", chat_id, e, exc_info=True)
+        await update.message.reply_text("Ops! Não consegui gerar a exportação agora. Tente novamente mais tarde. 😥")
+
+
+def get_exportar_handler() -> CommandHandler:
+    """Retorna o handler do comando /exportar."""
+    return CommandHandler("exportar", exportar)
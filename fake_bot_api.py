@@ -0,0 +1,239 @@
+"""
+Servidor falso da Bot API do Telegram para testes locais e de carga.
+
+Responde aos métodos que o bot usa (getMe, getUpdates, sendMessage, editMessageText,
+answerCallbackQuery, sendDocument, ...) e permite injetar updates sintéticos.
+Aponte o bot para ele com BOT_API_BASE_URL=http://127.0.0.1:8081/bot
+
+Uso isolado:
+    python fake_bot_api.py --port 8081
+
+Endpoints de controle:
+    POST /_inject/<token>   corpo: um update (ou lista de updates) em JSON, sem update_id
+    GET  /_stats            contagem de chamadas por método
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import time
+from collections import Counter, defaultdict
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import parse_qsl, urlsplit
+
+from sharding import extrair_chat_id
+
+logger = logging.getLogger(__name__)
+
+BOT_USER = {"id": 1000000001, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+
+
+def gerar_update_mensagem(chat_id: int, texto: str) -> dict:
+    """Monta um update de mensagem de texto (comandos recebem a entidade bot_command)."""
+    mensagem = {
+        "message_id": 1,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": f"User{chat_id}"},
+        "text": texto,
+    }
+    if texto.startswith("/"):
+        comando = texto.split()[0]
+        mensagem["entities"] = [{"type": "bot_command", "offset": 0, "length": len(comando)}]
+    return {"message": mensagem}
+
+
+def gerar_update_callback(chat_id: int, data: str, message_id: int = 1) -> dict:
+    """Monta um update de clique em botão inline."""
+    return {
+        "callback_query": {
+            "id": f"{chat_id}-{time.monotonic_ns()}",
+            "chat_instance": str(chat_id),
+            "from": {"id": chat_id, "is_bot": False, "first_name": f"User{chat_id}"},
+            "data": data,
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": BOT_USER,
+                "text": "menu",
+            },
+        }
+    }
+
+
+class FakeBotAPI:
+    """Servidor HTTP/1.1 mínimo (keep-alive) que imita a Bot API."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8081, latencia: float = 0.0):
+        self.host = host
+        self.port = port
+        # Atraso (s) de cada resposta, exceto getUpdates, para simular a rede até o Telegram
+        self.latencia = latencia
+        self.contagem_metodos = Counter()
+        self.conexoes_abertas = 0
+        self.conexoes_total = 0
+        # Callback opcional chamado a cada resposta do bot: on_chamada(metodo, chat_id, params)
+        self.on_chamada = None
+        self._filas = defaultdict(list)  # token -> updates pendentes
+        self._novos_updates = defaultdict(asyncio.Event)
+        self._proximo_update_id = itertools.count(1)
+        self._proximo_message_id = itertools.count(1000)
+        self._callback_chat = {}  # callback_query_id -> chat_id
+        self._server = None
+
+    # --- Controle ---
+
+    def injetar(self, token: str, update: dict) -> int:
+        """Enfileira um update para o bot dono de `token` e devolve o update_id atribuído."""
+        update = dict(update, update_id=next(self._proximo_update_id))
+        if "callback_query" in update:
+            self._callback_chat[update["callback_query"]["id"]] = extrair_chat_id(update)
+        self._filas[token].append(update)
+        self._novos_updates[token].set()
+        return update["update_id"]
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._atender_conexao, self.host, self.port)
+        logger.info("Fake Bot API ouvindo em http://%s:%s", self.host, self.port)
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    # --- HTTP ---
+
+    async def _atender_conexao(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.conexoes_abertas += 1
+        self.conexoes_total += 1
+        try:
+            while True:
+                linha = await reader.readline()
+                if not linha:
+                    break
+                metodo_http, alvo, _ = linha.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    nome, _, valor = h.decode("latin-1").partition(":")
+                    headers[nome.strip().lower()] = valor.strip()
+                corpo = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, resposta = await self._rotear(metodo_http, alvo, headers, corpo)
+                payload = json.dumps(resposta).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\nConnection: keep-alive\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self.conexoes_abertas -= 1
+            writer.close()
+
+    def _parse_params(self, alvo: str, headers: dict, corpo: bytes) -> dict:
+        params = dict(parse_qsl(urlsplit(alvo).query))
+        tipo = headers.get("content-type", "")
+        if tipo.startswith("application/x-www-form-urlencoded"):
+            params.update(parse_qsl(corpo.decode()))
+        elif tipo.startswith("application/json") and corpo:
+            params.update(json.loads(corpo))
+        elif tipo.startswith("multipart/form-data"):
+            msg = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {tipo}\r\n\r\n".encode() + corpo)
+            for parte in msg.iter_parts():
+                nome = parte.get_param("name", header="content-disposition")
+                if parte.get_filename():
+                    params[nome] = f"<arquivo {parte.get_filename()} {len(parte.get_payload(decode=True))} bytes>"
+                else:
+                    params[nome] = parte.get_content()
+        return params
+
+    async def _rotear(self, metodo_http: str, alvo: str, headers: dict, corpo: bytes):
+        caminho = urlsplit(alvo).path
+        if caminho.startswith("/_inject/"):
+            token = caminho[len("/_inject/"):]
+            dados = json.loads(corpo)
+            ids = [self.injetar(token, u) for u in (dados if isinstance(dados, list) else [dados])]
+            return 200, {"ok": True, "result": ids}
+        if caminho == "/_stats":
+            return 200, {"ok": True, "result": dict(self.contagem_metodos)}
+
+        # /bot<token>/<metodo>
+        try:
+            _, token_parte, metodo = caminho.split("/", 2)
+        except ValueError:
+            return 404, {"ok": False, "error_code": 404, "description": "Not Found"}
+        token = token_parte[3:]
+        params = self._parse_params(alvo, headers, corpo)
+        self.contagem_metodos[metodo] += 1
+
+        if metodo == "getUpdates":
+            return 200, {"ok": True, "result": await self._get_updates(token, params)}
+
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        resultado = self._responder(metodo, params)
+        if self.on_chamada is not None:
+            chat_id = params.get("chat_id")
+            if chat_id is None and "callback_query_id" in params:
+                chat_id = self._callback_chat.pop(params["callback_query_id"], None)
+            self.on_chamada(metodo, int(chat_id) if chat_id is not None else None, params)
+        return 200, {"ok": True, "result": resultado}
+
+    async def _get_updates(self, token: str, params: dict):
+        offset = int(params.get("offset", 0) or 0)
+        timeout = float(params.get("timeout", 0) or 0)
+        limite = int(params.get("limit", 100) or 100)
+        fila = self._filas[token]
+        if offset:
+            # Confirma (descarta) tudo que veio antes do offset, como a API real
+            while fila and fila[0]["update_id"] < offset:
+                fila.pop(0)
+        if not fila and timeout:
+            evento = self._novos_updates[token]
+            evento.clear()
+            try:
+                await asyncio.wait_for(evento.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return fila[:limite]
+
+    def _responder(self, metodo: str, params: dict):
+        if metodo == "getMe":
+            return BOT_USER
+        if metodo in ("sendMessage", "editMessageText", "sendDocument"):
+            chat_id = int(params.get("chat_id", 0))
+            message_id = int(params["message_id"]) if "message_id" in params else next(self._proximo_message_id)
+            return {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", ""),
+            }
+        # deleteWebhook, answerCallbackQuery, deleteMessage, setMyCommands, close, ...
+        return True
+
+
+async def _main(host: str, port: int):
+    api = FakeBotAPI(host, port)
+    await api.start()
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Servidor falso da Bot API do Telegram")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_main(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
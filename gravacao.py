@@ -0,0 +1,168 @@
+"""
+Gravação do fluxo real de updates para reproduzir depois (benchmarks/replay_updates.py).
+
+Com GRAVAR_UPDATES=<arquivo> cada update recebido vira uma linha JSON compacta com o
+instante de chegada, e o arquivo pode ser reproduzido contra o fake_bot_api a 1x, 10x ou na
+velocidade máxima, para comparar a latência de duas versões com a forma da carga de
+produção (rotinas coladas na segunda de manhã, Pomodoros na hora do almoço, ...).
+Terminado em .gz, o arquivo é gravado comprimido.
+
+Formato: uma linha de cabeçalho {"formato": "gravacao_updates", "versao": 1, "inicio": epoch}
+e depois {"t": segundos desde o início, "u": update} por update, na ordem de chegada.
+
+Dados pessoais saem antes da gravação:
+- ids de usuários e chats viram pseudônimos sequenciais, estáveis dentro da gravação (a
+  ordem por chat se mantém, o id real não vai para o disco);
+- nomes, username, idioma, telefone, mídias e localização são removidos;
+- textos têm as letras trocadas por "x", com o mesmo comprimento (os offsets das entidades
+  continuam valendo); comandos, números, pontuação, emojis e as palavras que o parser de
+  rotinas reconhece (dias da semana, "Livre", "Noite", o "h" de 08h30, ...) ficam, para a
+  reprodução percorrer os mesmos caminhos do código. O callback_data é do próprio bot e fica.
+"""
+import gzip
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+from espacos import arquivo_do_espaco, espaco_atual
+
+logger = logging.getLogger(__name__)
+
+GRAVAR_UPDATES = os.getenv('GRAVAR_UPDATES', '')
+VERSAO_FORMATO = 1
+# Segundos entre flushes do arquivo (o resto fica no buffer até o próximo ou até fechar)
+INTERVALO_FLUSH = 2.0
+
+CAMPOS_REMOVIDOS = frozenset({
+    "last_name", "username", "language_code", "is_premium", "phone_number", "bio", "title",
+    "invite_link", "photo", "document", "audio", "voice", "video", "video_note", "animation",
+    "sticker", "contact", "location", "venue", "caption_entities", "via_bot",
+})
+# Objetos cujo "id" é de um usuário ou chat
+CAMPOS_COM_ID_PESSOAL = frozenset({
+    "from", "chat", "user", "sender_chat", "forward_from", "forward_from_chat",
+})
+CAMPOS_TEXTO = frozenset({"text", "caption", "query"})
+VOCABULARIO_PRESERVADO = frozenset({
+    "segunda", "terça", "quarta", "quinta", "sexta", "feira", "sábado", "domingo",
+    "livre", "descanso", "pausa", "tempo", "relax", "lazer", "completo", "total", "até",
+    "manhã", "tarde", "noite", "dia", "fim", "de", "semana", "h", "min",
+})
+PALAVRA = re.compile(r"[^\W\d_]+")
+PRIMEIRO_PSEUDONIMO = 1_000_000_000
+
+
+def mascarar_texto(texto: str) -> str:
+    """Troca as letras das palavras fora do vocabulário por "x"; o comando inicial (/foco) fica."""
+    comando = ""
+    if texto.startswith("/"):
+        comando, _, texto = texto.partition(" ")
+        if texto:
+            comando += " "
+    return comando + PALAVRA.sub(
+        lambda m: m.group(0) if m.group(0).lower() in VOCABULARIO_PRESERVADO else "x" * len(m.group(0)),
+        texto,
+    )
+
+
+class GravadorUpdates:
+    """Grava updates (dicts da Bot API) já sem dados pessoais, num arquivo JSONL."""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._pseudonimos: Dict[int, int] = {}
+        self._inicio = time.time()
+        self._ultimo_flush = time.monotonic()
+        self.gravados = 0
+        abrir = gzip.open if caminho.endswith(".gz") else open
+        self._arquivo = abrir(caminho, "wt", encoding="utf-8")
+        self._escrever({"formato": "gravacao_updates", "versao": VERSAO_FORMATO, "inicio": round(self._inicio, 3)})
+        logger.info("Gravando updates em %s.", caminho)
+
+    def _pseudonimo(self, id_real: int) -> int:
+        pseudonimo = self._pseudonimos.get(abs(id_real))
+        if pseudonimo is None:
+            pseudonimo = self._pseudonimos[abs(id_real)] = PRIMEIRO_PSEUDONIMO + len(self._pseudonimos)
+        # Grupos têm id negativo: o sinal fica
+        return -pseudonimo if id_real < 0 else pseudonimo
+
+    def limpar(self, valor, campo: str = ""):
+        """Cópia do update sem os dados pessoais (ver docstring do módulo)."""
+        if isinstance(valor, list):
+            return [self.limpar(item, campo) for item in valor]
+        if not isinstance(valor, dict):
+            return valor
+        limpo = {}
+        for chave, item in valor.items():
+            # Booleanos falsos são o padrão da Bot API (to_dict os inclui); is_bot é obrigatório
+            if chave in CAMPOS_REMOVIDOS or (item is False and chave != "is_bot"):
+                continue
+            if chave == "id" and campo in CAMPOS_COM_ID_PESSOAL and not valor.get("is_bot"):
+                limpo[chave] = self._pseudonimo(item)
+            elif chave == "first_name" and not valor.get("is_bot"):
+                limpo[chave] = "Usuário"
+            elif chave in CAMPOS_TEXTO and isinstance(item, str):
+                limpo[chave] = mascarar_texto(item)
+            else:
+                limpo[chave] = self.limpar(item, chave)
+        return limpo
+
+    def _escrever(self, registro: dict) -> None:
+        self._arquivo.write(json.dumps(registro, ensure_ascii=False, separators=(",", ":")))
+        self._arquivo.write("\n")
+
+    def gravar(self, dados: dict) -> None:
+        self._escrever({"t": round(time.time() - self._inicio, 3), "u": self.limpar(dados)})
+        self.gravados += 1
+        agora = time.monotonic()
+        if agora - self._ultimo_flush >= INTERVALO_FLUSH:
+            self._ultimo_flush = agora
+            self._arquivo.flush()
+
+    def fechar(self) -> None:
+        if not self._arquivo.closed:
+            self._arquivo.close()
+            logger.info("Gravação de updates encerrada: %s updates em %s.", self.gravados, self.caminho)
+
+
+def ler_gravacao(caminho: str) -> Iterator[Tuple[float, dict]]:
+    """(segundos desde o início, update) na ordem gravada, lendo o arquivo aos poucos."""
+    abrir = gzip.open if caminho.endswith(".gz") else open
+    with abrir(caminho, "rt", encoding="utf-8") as f:
+        cabecalho = json.loads(f.readline())
+        if cabecalho.get("formato") != "gravacao_updates" or cabecalho.get("versao") != VERSAO_FORMATO:
+            raise ValueError(f"{caminho} não é uma gravação de updates na versão {VERSAO_FORMATO}")
+        for linha in f:
+            if linha.strip():
+                registro = json.loads(linha)
+                yield registro["t"], registro["u"]
+
+
+_gravadores: Dict[str, GravadorUpdates] = {}
+
+
+def instalar_gravador(application) -> Optional[GravadorUpdates]:
+    """Com GRAVAR_UPDATES definido, registra o handler que grava os updates da aplicação."""
+    # Nos workers do modo sharded quem grava é o front, que vê o fluxo inteiro
+    if not GRAVAR_UPDATES or application.updater is None:
+        return None
+    from telegram import Update
+    from telegram.ext import TypeHandler
+
+    espaco = espaco_atual.get()
+    gravador = _gravadores[espaco] = GravadorUpdates(arquivo_do_espaco(GRAVAR_UPDATES, espaco))
+
+    async def gravar(update: Update, context) -> None:
+        gravador.gravar(update.to_dict())
+
+    # Grupo só dele, antes de todos: o PTB roda um handler por grupo, e o -2 é do rastreador de
+    # atividade do VarredorEstado (limpeza_estado.py), o -1 do medidor do primeiro update
+    application.add_handler(TypeHandler(Update, gravar), group=-3)
+    return gravador
+
+
+def get_gravador() -> Optional[GravadorUpdates]:
+    return _gravadores.get(espaco_atual.get())
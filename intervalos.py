@@ -0,0 +1,91 @@
+"""
+Intervalos das rotinas semanais: conflitos entre horários fixos e horários livres de cada dia.
+
+Só tarefas HORARIO_FIXO com início e fim ocupam tempo ("Livre até 14h" e os períodos gerais
+são texto). Cada uma vira um intervalo [início, início + duração) em minutos da semana; a que
+atravessa a meia-noite continua no dia seguinte, e a de domingo à noite é dividida em dois
+pedaços (fim da semana e começo da segunda-feira).
+
+Os conflitos saem de uma varredura pelos intervalos ordenados por início, com um heap dos que
+ainda estão abertos: O(n log n + k) para k conflitos. Os horários livres são o complemento da
+união dos intervalos, recortado por dia.
+"""
+import heapq
+from operator import itemgetter
+
+from rotinas import MINUTOS_POR_DIA, MINUTOS_POR_SEMANA, TipoTarefa, minuto_da_semana
+
+# Sobras menores que isso entre dois compromissos não contam como horário livre
+MIN_MINUTOS_LIVRES = 15
+
+
+def intervalos_ocupados(tarefas) -> list:
+    """(início, fim, tarefa) em minutos da semana, ordenados pelo início."""
+    intervalos = []
+    for tarefa in tarefas:
+        if tarefa.tipo is not TipoTarefa.HORARIO_FIXO or not tarefa.duracao_minutos:
+            continue
+        inicio = minuto_da_semana(tarefa.dia, tarefa.inicio)
+        fim = inicio + tarefa.duracao_minutos
+        if fim > MINUTOS_POR_SEMANA:
+            intervalos.append((inicio, MINUTOS_POR_SEMANA, tarefa))
+            intervalos.append((0, fim - MINUTOS_POR_SEMANA, tarefa))
+        else:
+            intervalos.append((inicio, fim, tarefa))
+    intervalos.sort(key=itemgetter(0))
+    return intervalos
+
+
+def conflitos_por_dia(intervalos: list) -> dict:
+    """{dia: [(tarefa, tarefa_que_começa_durante_ela), ...]}, cada par uma única vez."""
+    conflitos = {}
+    vistos = set()
+    abertos = []  # heap de (fim, ordem, tarefa)
+    for ordem, (inicio, fim, tarefa) in enumerate(intervalos):
+        while abertos and abertos[0][0] <= inicio:
+            heapq.heappop(abertos)
+        for _, _, outra in abertos:
+            par = (outra._id, tarefa._id)
+            if outra is not tarefa and par not in vistos:
+                vistos.add(par)
+                conflitos.setdefault(inicio // MINUTOS_POR_DIA, []).append((outra, tarefa))
+        heapq.heappush(abertos, (fim, ordem, tarefa))
+    return conflitos
+
+
+def horarios_livres(intervalos: list, minimo: int = MIN_MINUTOS_LIVRES) -> dict:
+    """{dia: [(início, fim), ...]} em minutos desde a meia-noite, fora de qualquer intervalo."""
+    livres = {dia: [] for dia in range(7)}
+    cursor = 0
+    for inicio, fim, _ in intervalos + [(MINUTOS_POR_SEMANA, MINUTOS_POR_SEMANA, None)]:
+        # Uma lacuna pode cruzar a meia-noite: vira um pedaço em cada dia
+        while cursor < inicio:
+            dia = cursor // MINUTOS_POR_DIA
+            fim_pedaco = min(inicio, (dia + 1) * MINUTOS_POR_DIA)
+            if fim_pedaco - cursor >= minimo:
+                livres[dia].append((cursor - dia * MINUTOS_POR_DIA, fim_pedaco - dia * MINUTOS_POR_DIA))
+            cursor = fim_pedaco
+        cursor = max(cursor, fim)
+    return livres
+
+
+class AnaliseRotina:
+    """Conflitos e horários livres de uma rotina, calculados de uma vez."""
+
+    __slots__ = ('conflitos', 'livres')
+
+    def __init__(self, tarefas):
+        intervalos = intervalos_ocupados(tarefas)
+        self.conflitos = conflitos_por_dia(intervalos)
+        self.livres = horarios_livres(intervalos)
+
+    def conflitos_do_dia(self, dia: int) -> list:
+        return self.conflitos.get(dia, [])
+
+    def conflitos_com(self, tarefas) -> list:
+        """Conflitos em que alguma das `tarefas` está envolvida."""
+        ids = {tarefa._id for tarefa in tarefas}
+        return [
+            par for pares in self.conflitos.values() for par in pares
+            if par[0]._id in ids or par[1]._id in ids
+        ]
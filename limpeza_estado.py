@@ -0,0 +1,165 @@
+"""
+Varredura de estado esquecido por fluxos abandonados.
+
+Chaves como `aguardando_rotina_texto` ou `task_to_delete_id` só fazem sentido no meio de uma
+conversa. Se o usuário abandona o fluxo elas ficam em user_data (e são regravadas na
+persistência a cada flush), assim como o estado do ConversationHandler fica na memória.
+
+O VarredorEstado registra o horário da última atividade de cada usuário (handler no grupo -2,
+antes de todos) e, periodicamente, apaga em lotes as chaves transitórias e os estados de
+conversa de quem está inativo há mais de ESTADO_TTL segundos. user_data que fica vazio é
+removido por inteiro. O volume liberado é medido pelo tamanho em pickle do que saiu.
+"""
+import asyncio
+import logging
+import os
+import pickle
+import time
+from typing import Dict, Optional
+
+from telegram import Update
+from telegram.ext import ContextTypes, ConversationHandler, TypeHandler
+
+from espacos import espaco_atual
+
+logger = logging.getLogger(__name__)
+
+# Inatividade (segundos) a partir da qual o estado transitório do usuário é descartado
+ESTADO_TTL = int(os.getenv('ESTADO_TTL', str(2 * 3600)))
+ESTADO_INTERVALO_VARREDURA = int(os.getenv('ESTADO_INTERVALO_VARREDURA', '600'))
+# Usuários verificados entre duas devoluções de controle ao loop de eventos
+TAMANHO_LOTE_VARREDURA = 500
+
+# Chaves de user_data que pertencem a um fluxo em andamento
+CHAVES_TRANSITORIAS = (
+    'aguardando_rotina_texto',  # agenda: esperando o texto da rotina
+    'rotinas_pagina',           # agenda: página atual do gerenciador de rotinas
+    'current_task_for_reason',  # agenda: tarefa aguardando o motivo de não conclusão
+    'task_to_delete_id',        # agenda: tarefa aguardando confirmação de exclusão
+    'config_type',              # pomodoro: configuração aguardando o valor digitado
+)
+
+
+def _tamanho_persistido(valor) -> int:
+    try:
+        return len(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+class VarredorEstado:
+    """Rastreia a atividade dos usuários e expira o estado transitório de quem sumiu."""
+
+    def __init__(self, application, ttl: int = ESTADO_TTL):
+        self.application = application
+        self.ttl = ttl
+        # user_id -> time.monotonic() da última atividade. Usuários sem registro (ex: estado
+        # carregado da persistência após um reinício) contam a partir da primeira varredura.
+        self._ultima_atividade: Dict[int, float] = {}
+        self.chaves_expiradas = 0
+        self.conversas_expiradas = 0
+        self.user_data_removidos = 0
+        self.bytes_liberados = 0
+
+    async def registrar_atividade(self, update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if isinstance(update, Update) and update.effective_user:
+            self._ultima_atividade[update.effective_user.id] = time.monotonic()
+
+    def _inativo(self, user_id: int, agora: float) -> bool:
+        ultima = self._ultima_atividade.setdefault(user_id, agora)
+        return agora - ultima >= self.ttl
+
+    def _conversation_handlers(self):
+        for handlers in self.application.handlers.values():
+            for handler in handlers:
+                if isinstance(handler, ConversationHandler):
+                    yield handler
+
+    def _expirar_user_data(self, user_id: int, dados: dict) -> int:
+        liberados = 0
+        for chave in CHAVES_TRANSITORIAS:
+            if chave in dados:
+                liberados += _tamanho_persistido({chave: dados.pop(chave)})
+                self.chaves_expiradas += 1
+        if liberados:
+            if dados:
+                self.application.mark_data_for_update_persistence(user_ids=user_id)
+            else:
+                self.application.drop_user_data(user_id)
+                self.user_data_removidos += 1
+        return liberados
+
+    def _expirar_conversas(self, agora: float) -> int:
+        liberados = 0
+        for conversa in self._conversation_handlers():
+            if not conversa.per_user:
+                continue
+            posicao_usuario = 1 if conversa.per_chat else 0
+            # Acesso direto ao dict interno: é o único jeito de descartar um estado sem um update
+            conversas = conversa._conversations
+            expiradas = [
+                chave for chave in list(conversas)
+                if self._inativo(chave[posicao_usuario], agora)
+            ]
+            for chave in expiradas:
+                liberados += _tamanho_persistido((chave, conversas.pop(chave, None)))
+            self.conversas_expiradas += len(expiradas)
+        return liberados
+
+    async def varrer(self, agora: Optional[float] = None) -> int:
+        """Uma varredura completa, em lotes. Retorna os bytes (em pickle) liberados."""
+        agora = time.monotonic() if agora is None else agora
+        liberados = self._expirar_conversas(agora)
+        usuarios = list(self.application.user_data.items())
+        for inicio in range(0, len(usuarios), TAMANHO_LOTE_VARREDURA):
+            for user_id, dados in usuarios[inicio:inicio + TAMANHO_LOTE_VARREDURA]:
+                if any(chave in dados for chave in CHAVES_TRANSITORIAS) and self._inativo(user_id, agora):
+                    liberados += self._expirar_user_data(user_id, dados)
+            await asyncio.sleep(0)
+        # Quem está inativo e não tem mais nada a expirar não precisa continuar rastreado
+        for user_id in [u for u, ultima in self._ultima_atividade.items() if agora - ultima >= self.ttl]:
+            del self._ultima_atividade[user_id]
+        self.bytes_liberados += liberados
+        return liberados
+
+    async def _varrer_job(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        try:
+            liberados = await self.varrer()
+            if liberados:
+                logger.info("Varredura de estado transitório liberou %s bytes (%s no total desde o início).",
+                            liberados, self.bytes_liberados)
+        except Exception as e:
+            logger.error("Erro na varredura de estado transitório: %s", e, exc_info=True)
+
+    def instalar(self, intervalo: int = ESTADO_INTERVALO_VARREDURA) -> None:
+        """Registra o rastreador de atividade (grupo -2) e agenda a varredura periódica."""
+        self.application.add_handler(TypeHandler(Update, self.registrar_atividade), group=-2)
+        job_queue = self.application.job_queue
+        if job_queue is None:
+            logger.warning("JobQueue indisponível: o estado transitório de user_data não será expirado.")
+            return
+        job_queue.run_repeating(self._varrer_job, interval=intervalo, first=intervalo, name="varredura_estado")
+
+    def estatisticas(self) -> dict:
+        return {
+            "estado_usuarios_rastreados": len(self._ultima_atividade),
+            "estado_chaves_expiradas": self.chaves_expiradas,
+            "estado_conversas_expiradas": self.conversas_expiradas,
+            "estado_user_data_removidos": self.user_data_removidos,
+            "estado_bytes_liberados": self.bytes_liberados,
+        }
+
+
+# espaço do bot -> VarredorEstado (ver espacos.py)
+_varredores: Dict[str, VarredorEstado] = {}
+
+
+def instalar_varredor(application) -> VarredorEstado:
+    """Cria o VarredorEstado da aplicação e registra seus handlers e jobs."""
+    varredor = _varredores[espaco_atual.get()] = VarredorEstado(application)
+    varredor.instalar()
+    return varredor
+
+
+def get_varredor() -> Optional[VarredorEstado]:
+    return _varredores.get(espaco_atual.get())
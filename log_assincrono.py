@@ -0,0 +1,149 @@
+"""
+Logging sem I/O no loop de eventos.
+
+`configurar_logging` põe um QueueHandler na raiz: quem loga só enfileira o LogRecord, e um
+QueueListener numa thread formata e escreve na saída. Os módulos usam formatação preguiçosa
+(modelo com "%s" + argumentos): com o nível desligado nada é formatado, e o texto final só é
+montado na thread do listener.
+
+O FiltroAmostragem roda antes de enfileirar e limita mensagens repetidas de nível INFO ou
+abaixo: por chave (logger + modelo da mensagem) passam no máximo LOG_AMOSTRAGEM_MAX a cada
+LOG_AMOSTRAGEM_JANELA segundos, e as descartadas são resumidas numa linha quando a janela
+fecha. WARNING e acima sempre passam.
+
+LOG_FILA=0 volta ao StreamHandler síncrono (útil para comparar no harness de carga).
+
+Todo registro leva o espaço do bot que logou em `espaco` (ver espacos.py): o modo multibot usa
+FORMATO_MULTIBOT para separar as linhas de cada bot.
+"""
+import atexit
+import logging
+import os
+import queue
+import sys
+import time
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from espacos import espaco_atual
+
+FORMATO_PADRAO = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+FORMATO_MULTIBOT = '%(asctime)s - %(espaco)s - %(name)s - %(levelname)s - %(message)s'
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FILA = os.getenv('LOG_FILA', '1') != '0'
+# Mensagens com a mesma chave aceitas por janela (0 desliga a amostragem)
+LOG_AMOSTRAGEM_MAX = int(os.getenv('LOG_AMOSTRAGEM_MAX', '20'))
+LOG_AMOSTRAGEM_JANELA = float(os.getenv('LOG_AMOSTRAGEM_JANELA', '60'))
+
+logger = logging.getLogger(__name__)
+
+
+class FiltroAmostragem(logging.Filter):
+    """Deixa passar até `maximo` registros por chave (logger, modelo) a cada `janela` segundos."""
+
+    def __init__(self, maximo: int = LOG_AMOSTRAGEM_MAX, janela: float = LOG_AMOSTRAGEM_JANELA,
+                 nivel_maximo: int = logging.INFO):
+        super().__init__()
+        self.maximo = maximo
+        self.janela = janela
+        self.nivel_maximo = nivel_maximo
+        self._contagens = Counter()
+        self._inicio_janela = time.monotonic()
+        self.suprimidos = 0
+
+    def _fechar_janela(self, agora: float) -> None:
+        excedentes = {chave: n - self.maximo for chave, n in self._contagens.items() if n > self.maximo}
+        self._contagens.clear()
+        self._inicio_janela = agora
+        if excedentes:
+            (nome, modelo), mais_frequente = max(excedentes.items(), key=lambda item: item[1])
+            # Passa por este mesmo filtro, já com a janela nova
+            logger.info("%s registros repetidos suprimidos nos últimos %.0fs (mais frequente: %s, %r, %s vezes).",
+                        sum(excedentes.values()), self.janela, nome, modelo, mais_frequente)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.nivel_maximo or self.maximo <= 0:
+            return True
+        agora = time.monotonic()
+        if agora - self._inicio_janela >= self.janela:
+            self._fechar_janela(agora)
+        chave = (record.name, record.msg)
+        self._contagens[chave] += 1
+        if self._contagens[chave] <= self.maximo:
+            return True
+        self.suprimidos += 1
+        return False
+
+
+class FiltroEspaco(logging.Filter):
+    """Anota o espaço do bot atual no registro, na tarefa de quem loga (o listener não o conhece)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.espaco = espaco_atual.get() or "-"
+        return True
+
+
+class QueueHandlerPreguicoso(QueueHandler):
+    """
+    QueueHandler que enfileira o registro sem formatá-lo. O QueueHandler padrão formata na
+    thread de quem loga (para o registro poder ir para outro processo); aqui a fila é do
+    próprio processo, então a formatação fica toda com o listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_fila: Optional[queue.SimpleQueue] = None
+_listener: Optional[QueueListener] = None
+_filtro: Optional[FiltroAmostragem] = None
+
+
+def configurar_logging(formato: str = FORMATO_PADRAO, nivel: str = LOG_LEVEL, stream=None,
+                       forcar: bool = False) -> None:
+    """
+    Configura o logging do processo (uma vez; `forcar` refaz, ex: nos workers do modo sharded).
+    Substitui o logging.basicConfig que main.py e agenda.py faziam.
+    """
+    global _fila, _listener, _filtro
+    if _filtro is not None and not forcar:
+        return
+    parar_logging()
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+        handler.close()
+    raiz.setLevel(getattr(logging, nivel, logging.INFO))
+
+    saida = logging.StreamHandler(stream or sys.stderr)
+    saida.setFormatter(logging.Formatter(formato))
+    _filtro = FiltroAmostragem()
+    if LOG_FILA:
+        _fila = queue.SimpleQueue()
+        entrada = QueueHandlerPreguicoso(_fila)
+        entrada.addFilter(FiltroEspaco())
+        entrada.addFilter(_filtro)
+        raiz.addHandler(entrada)
+        _listener = QueueListener(_fila, saida, respect_handler_level=True)
+        _listener.start()
+        atexit.register(parar_logging)
+    else:
+        saida.addFilter(FiltroEspaco())
+        saida.addFilter(_filtro)
+        raiz.addHandler(saida)
+
+
+def parar_logging() -> None:
+    """Para o listener depois de escrever o que ainda está na fila."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def estatisticas() -> dict:
+    return {
+        "log_fila_pendentes": _fila.qsize() if _fila is not None and _listener is not None else 0,
+        "log_suprimidos": _filtro.suprimidos if _filtro is not None else 0,
+    }
@@ -1,34 +1,35 @@
 # main.py
+# Só módulos leves no topo: a configuração é lida antes de carregar telegram.ext e as
+# funcionalidades (importadas dentro das funções), para a inicialização ser rápida.
+from __future__ import annotations
+
 import logging
 import os
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import (
-    Application,
-    CommandHandler,
-    CallbackQueryHandler,
-    ConversationHandler,
-    ContextTypes,
-    MessageHandler,
-    filters,
-    PicklePersistence
-)
-
-# Importar os módulos das funcionalidades
-from agenda import AgendaManager, start_all_scheduled_jobs
-from pomodoro import Pomodoro
-
-# Configuração de logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+import time
+from typing import TYPE_CHECKING, Callable, Optional
+
+# Marca o início do processo para medir o tempo até o primeiro update atendido
+INICIO_PROCESSO = time.perf_counter()
+
+if TYPE_CHECKING:
+    from telegram import Update
+    from telegram.ext import Application, ApplicationBuilder, ContextTypes
+
+# Configuração de logging: escrita numa thread própria (ver log_assincrono.py)
+from log_assincrono import configurar_logging
+
+configurar_logging()
 logger = logging.getLogger(__name__)
 
 # Estados do menu principal
 MAIN_MENU = 0
 
+PERSISTENCE_FILE = os.getenv("PERSISTENCE_FILE", "bot_persistence")
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Inicia o bot e mostra o menu principal."""
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
     keyboard = [
         [
             InlineKeyboardButton("🗓️ Rotinas Semanais", callback_data="open_rotinas_semanais_menu"),
@@ -64,7 +65,15 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         "Eu posso te ajudar a organizar sua rotina e melhorar sua produtividade! "
         "Aqui estão os principais comandos:\n\n"
         "• /start - Mostra o menu principal\n"
-        "• /ajuda - Exibe esta mensagem de ajuda\n\n"
+        "• /ajuda - Exibe esta mensagem de ajuda\n"
+        "• /agora - O que está na sua rotina agora e no resto do dia\n"
+        "• /proximo - A próxima tarefa da sua rotina\n"
+        "• /resumo - Um resumo diário da rotina no lugar de um lembrete por tarefa\n"
+        "• /foco 50 10 20 4 - Inicia o Pomodoro (foco, pausa curta, pausa longa em minutos e ciclos; todos opcionais)\n"
+        "• /pausa - Pausa o Pomodoro (/foco retoma)\n"
+        "• /lembrar 30 ligar pro cliente - Lembrete daqui a 30 minutos\n"
+        "• /sala - Pomodoro sincronizado em grupo (salas de foco)\n"
+        "• /exportar - Baixa seus dados em CSV ou JSONL\n\n"
         "Principais funcionalidades:\n"
         "🍅 *Pomodoro* - Técnica de gestão de tempo com períodos de foco e descanso\n"
         "🗓️ *Rotinas Semanais* - Agenda suas atividades recorrentes\n"
@@ -81,25 +90,96 @@ async def main_menu_return(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 
 async def post_init(application: Application) -> None:
     """Executa após a inicialização da aplicação."""
-    await start_all_scheduled_jobs(application)
-    logger.info("Agendamentos de rotinas iniciados")
+    from agenda import start_all_scheduled_jobs
+    from caixa_saida import get_caixa_saida
 
-def main() -> None:
-    """Inicia o bot."""
-    # Configurar token (use variável de ambiente para segurança)
-    token = os.getenv("BOT_TOKEN")
-    if not token:
-        raise ValueError("Por favor, defina a variável de ambiente TELEGRAM_BOT_TOKEN")
+    # As rotinas e a caixa de saída são carregadas em segundo plano: o polling começa sem esperar por elas
+    application.create_task(start_all_scheduled_jobs(application))
+    application.create_task(get_caixa_saida().iniciar())
+    logger.info("Aplicação inicializada %.2fs após o início do processo.", time.perf_counter() - INICIO_PROCESSO)
+
+async def post_stop(application: Application) -> None:
+    """Executa depois que a aplicação para de processar updates."""
+    from caixa_saida import get_caixa_saida
+    from gravacao import get_gravador
+
+    # O que ficou na fila continua no arquivo e sai no próximo início
+    await get_caixa_saida().parar()
+    gravador = get_gravador()
+    if gravador is not None:
+        gravador.fechar()
+
+def _medidor_primeiro_update():
+    """Cria o callback que mede o tempo do início do processo até o primeiro update atendido."""
+    medido = False
+
+    async def registrar(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+        nonlocal medido
+        if not medido:
+            medido = True
+            logger.info("Primeiro update atendido %.2fs após o início do processo.", time.perf_counter() - INICIO_PROCESSO)
+
+    return registrar
+
+def construir_aplicacao(token: str, persistence_path: str = PERSISTENCE_FILE, com_updater: bool = True,
+                        ajustar_builder: Optional[Callable[[ApplicationBuilder], ApplicationBuilder]] = None) -> Application:
+    """
+    Monta a Application com persistência e todos os handlers registrados. `ajustar_builder`
+    recebe o builder antes do build (no modo multibot: scheduler, conexões e limitador compartilhados).
+    """
+    from telegram.ext import Application, CommandHandler, TypeHandler
+
+    # Importar os módulos das funcionalidades
+    from callbacks import RoteadorCallbacks
+    from agenda import AgendaManager
+    from pomodoro import PomodoroManager
+    from salas import SalasManager
+    from diagnostico import get_debug_profile_handler
+    from limpeza_estado import instalar_varredor
+    from caixa_saida import instalar_caixa_saida
+    from conexoes import nova_requisicao_saida, nova_requisicao_updates
+    from exportacao import get_exportar_handler
+    from gravacao import instalar_gravador
+    from persistencia import nova_persistencia
+    from concorrencia import ChatSerializedApplication, MAX_UPDATES_CONCORRENTES, MAX_UPDATES_EM_VOO
+
+    # Configurar persistência de dados (pickle ou snapshot, ver persistencia.py)
+    persistence = nova_persistencia(persistence_path)
 
-    # Configurar persistência de dados
-    persistence = PicklePersistence(filepath="bot_persistence")
-    
     # Criar aplicação
-    application = Application.builder().token(token).persistence(persistence).post_init(post_init).build()
+    builder = Application.builder().token(token).persistence(persistence).post_init(post_init).post_stop(post_stop)
+    # Pools separados: o long-polling não disputa conexão com os envios (ver conexoes.py)
+    builder = builder.request(nova_requisicao_saida())
+    base_url = os.getenv("BOT_API_BASE_URL")
+    if base_url:
+        # Ex: servidor local (fake_bot_api.py) para testes de carga
+        builder = builder.base_url(base_url)
+    if MAX_UPDATES_CONCORRENTES > 0:
+        # Chats diferentes em paralelo; updates do mesmo chat continuam em ordem (BOT_CONCURRENT_UPDATES=0 desliga)
+        builder = builder.concurrent_updates(MAX_UPDATES_EM_VOO).application_class(ChatSerializedApplication)
+    if not com_updater:
+        # Nos workers do modo sharded quem faz o polling é o processo front
+        builder = builder.updater(None)
+    else:
+        builder = builder.get_updates_request(nova_requisicao_updates())
+    if ajustar_builder is not None:
+        builder = ajustar_builder(builder)
+    application = builder.build()
+    logger.info("Aplicação construída %.2fs após o início do processo.", time.perf_counter() - INICIO_PROCESSO)
+
+    # Grupo -1: roda antes (e independente) dos handlers das funcionalidades
+    application.add_handler(TypeHandler(object, _medidor_primeiro_update()), group=-1)
+
+    # GRAVAR_UPDATES: grava o fluxo de updates para reprodução (ver gravacao.py)
+    instalar_gravador(application)
+
+    # Notificações passam pela caixa de saída durável (usada pelo AgendaManager)
+    instalar_caixa_saida(application)
 
     # Inicializar managers
     agenda_manager = AgendaManager(application)
-    pomodoro_manager = Pomodoro()
+    pomodoro_manager = PomodoroManager(application)
+    salas_manager = SalasManager(application)
 
     # Obter handlers
     agenda_handler = agenda_manager.get_agenda_conversation_handler()
@@ -109,15 +189,54 @@ def main() -> None:
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("ajuda", help_command))
     application.add_handler(CommandHandler("help", help_command))
+    # Comando administrativo de diagnóstico (restrito aos IDs em ADMIN_IDS)
+    application.add_handler(get_debug_profile_handler())
     
     # Handler para retornar ao menu principal
-    application.add_handler(CallbackQueryHandler(main_menu_return, pattern="^main_menu_return$"))
+    application.add_handler(RoteadorCallbacks({"main_menu_return": main_menu_return}))
     
+    # Consultas e atalhos da rotina e do Pomodoro, salas de foco e exportação: antes dos ConversationHandlers, cujos fallbacks capturam qualquer comando
+    for handler in agenda_manager.get_comandos_rotina_handlers():
+        application.add_handler(handler)
+    for handler in pomodoro_manager.get_comandos_handlers():
+        application.add_handler(handler)
+    for handler in salas_manager.get_handlers():
+        application.add_handler(handler)
+    application.add_handler(get_exportar_handler())
+
     # Adicionar handlers específicos
     application.add_handler(agenda_handler)
     application.add_handler(pomodoro_handler)
 
+    # Expira chaves de user_data e estados de conversa de fluxos abandonados
+    instalar_varredor(application)
+    return application
+
+def main() -> None:
+    """Inicia o bot."""
+    # Modo multibot: vários bots (tokens) no mesmo processo e no mesmo loop de eventos
+    bots_config = os.getenv("BOTS_CONFIG")
+    if bots_config:
+        from multibot import carregar_configuracao, executar_multibot
+        executar_multibot(carregar_configuracao(bots_config))
+        return
+
+    # Configurar token (use variável de ambiente para segurança)
+    token = os.getenv("BOT_TOKEN")
+    if not token:
+        raise ValueError("Por favor, defina a variável de ambiente TELEGRAM_BOT_TOKEN")
+
+    # Modo sharded: um processo front + N workers, cada um dono de parte dos chats
+    num_shards = int(os.getenv("BOT_SHARDS", "1"))
+    if num_shards > 1:
+        from sharding import executar_sharded
+        executar_sharded(token, num_shards)
+        return
+
+    application = construir_aplicacao(token)
+
     # Iniciar o bot
+    from telegram import Update
     application.run_polling(allowed_updates=Update.ALL_TYPES)
 
 if __name__ == "__main__":
@@ -0,0 +1,252 @@
+"""
+Vários bots (marcas) servidos por um só processo e um só loop de eventos.
+
+Cada bot continua com a sua Application, o seu token, o seu arquivo de persistência e o seu
+banco de rotinas (arquivos com o nome do bot, ver espacos.arquivo_do_espaco), mas o processo
+tem um único:
+- AsyncIOScheduler: o das rotinas (agenda.get_scheduler()), também usado pelos JobQueues do
+  PTB, com um jobstore por bot;
+- pool de conexões HTTP para as chamadas de saída à Bot API (conexoes.py; o getUpdates de
+  cada bot segue no seu pool de long-polling);
+- limitador de saída: cada bot respeita o seu limite (a Bot API aceita ~30 mensagens/s por
+  bot) e todos juntos respeitam o teto do processo.
+
+Cada bot roda numa tarefa própria com espacos.espaco_atual valendo o nome dele, e o estado
+global dos módulos (repositório de rotinas, caches, registros de sessões) fica separado por
+espaço.
+
+Ativado em main.py com BOTS_CONFIG: caminho de um arquivo JSON (ou o próprio JSON) com a
+lista de bots, ex:
+    [{"nome": "marca_a", "token_env": "TOKEN_MARCA_A"},
+     {"nome": "marca_b", "token": "123:abc", "envios_por_segundo": 20}]
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import signal
+from typing import List
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter, JobQueue
+
+from conexoes import RequisicaoMedida, nova_requisicao_saida
+from espacos import arquivo_do_espaco, espaco_atual
+
+logger = logging.getLogger(__name__)
+
+# Limite padrão de chamadas de saída por bot e teto do processo, em chamadas por segundo
+ENVIOS_POR_SEGUNDO_BOT = float(os.getenv('BOT_ENVIOS_POR_SEGUNDO', '30'))
+ENVIOS_POR_SEGUNDO_PROCESSO = float(os.getenv('MULTIBOT_ENVIOS_POR_SEGUNDO', '100'))
+# Novas tentativas quando a Bot API responde 429 (RetryAfter)
+MAX_TENTATIVAS_429 = 2
+# Chamadas que não são envios de mensagem e não passam pelo limitador
+METODOS_SEM_LIMITE = frozenset({"getMe", "deleteWebhook", "getWebhookInfo", "answerCallbackQuery", "getFile"})
+
+NOME_VALIDO = re.compile(r"^[a-z0-9_-]{1,32}$")
+
+
+class ConfigBot:
+    """Um bot do processo: `nome` dá o espaço (arquivos, jobs, logs) e precisa ser único."""
+
+    __slots__ = ('nome', 'token', 'envios_por_segundo')
+
+    def __init__(self, nome: str, token: str, envios_por_segundo: float = ENVIOS_POR_SEGUNDO_BOT):
+        self.nome = nome
+        self.token = token
+        self.envios_por_segundo = envios_por_segundo
+
+
+def carregar_configuracao(valor: str) -> List[ConfigBot]:
+    """Lê BOTS_CONFIG (JSON em linha ou caminho do arquivo) e valida nomes e tokens."""
+    texto = valor if valor.lstrip().startswith("[") else open(valor, encoding="utf-8").read()
+    configs = []
+    for item in json.loads(texto):
+        nome = str(item.get("nome", "")).lower()
+        if not NOME_VALIDO.match(nome):
+            raise ValueError(f"Nome de bot inválido em BOTS_CONFIG: {nome!r} (use a-z, 0-9, _ e -)")
+        if any(config.nome == nome for config in configs):
+            raise ValueError(f"Nome de bot repetido em BOTS_CONFIG: {nome!r}")
+        token = item.get("token") or os.getenv(item.get("token_env", ""), "")
+        if not token:
+            raise ValueError(f"Bot {nome!r} sem token (defina 'token' ou 'token_env')")
+        configs.append(ConfigBot(nome, token, float(item.get("envios_por_segundo", ENVIOS_POR_SEGUNDO_BOT))))
+    if not configs:
+        raise ValueError("BOTS_CONFIG não tem nenhum bot")
+    return configs
+
+
+# --- Recursos compartilhados ---
+
+class LimitadorEnvios(BaseRateLimiter):
+    """Limitador de saída de um bot: espera a vez no limite do bot e depois no teto do processo."""
+
+    def __init__(self, por_segundo: float, processo=None):
+        from salas import LimitadorTaxa
+
+        self._do_bot = LimitadorTaxa(por_segundo)
+        self._processo = processo
+        self.esperas_429 = 0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        if endpoint in METODOS_SEM_LIMITE:
+            return await callback(*args, **kwargs)
+        for tentativa in range(MAX_TENTATIVAS_429 + 1):
+            await self._do_bot.aguardar()
+            if self._processo is not None:
+                await self._processo.aguardar()
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if tentativa == MAX_TENTATIVAS_429:
+                    raise
+                self.esperas_429 += 1
+                logger.warning("%s recebeu 429: nova tentativa em %ss.", endpoint, e.retry_after)
+                await asyncio.sleep(e.retry_after)
+
+
+class RequisicaoCompartilhada(RequisicaoMedida):
+    """
+    Pool de saída de vários bots: o pool é aberto no primeiro initialize e fechado só no último
+    shutdown (cada Bot chama os dois no seu ciclo de vida).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._usuarios = 0
+
+    async def initialize(self) -> None:
+        self._usuarios += 1
+        if self._usuarios == 1:
+            await super().initialize()
+
+    async def shutdown(self) -> None:
+        self._usuarios -= 1
+        if self._usuarios == 0:
+            await super().shutdown()
+
+
+class _SchedulerDoBot:
+    """Vista do scheduler compartilhado restrita ao jobstore de um bot (é o que o JobQueue enxerga)."""
+
+    __slots__ = ('_scheduler', '_jobstore')
+
+    def __init__(self, scheduler, jobstore: str):
+        from apscheduler.jobstores.memory import MemoryJobStore
+
+        self._scheduler = scheduler
+        self._jobstore = jobstore
+        scheduler.add_jobstore(MemoryJobStore(), alias=jobstore)
+
+    def add_job(self, *args, **kwargs):
+        kwargs.setdefault("jobstore", self._jobstore)
+        return self._scheduler.add_job(*args, **kwargs)
+
+    def get_jobs(self, jobstore=None, pending=None):
+        return self._scheduler.get_jobs(jobstore or self._jobstore, pending)
+
+    def remove_all_jobs(self, jobstore=None):
+        self._scheduler.remove_all_jobs(jobstore or self._jobstore)
+
+    def __getattr__(self, nome):
+        return getattr(self._scheduler, nome)
+
+
+class JobQueueCompartilhada(JobQueue):
+    """JobQueue do PTB sobre o scheduler do processo, com os jobs do bot num jobstore próprio."""
+
+    def __init__(self, scheduler, jobstore: str):
+        # Sem super().__init__(): ele criaria um AsyncIOScheduler só para este bot
+        self._application = None
+        self._executor = None
+        self.scheduler = _SchedulerDoBot(scheduler, jobstore)
+
+    async def stop(self, wait: bool = True) -> None:
+        # O scheduler é de todos os bots: só os jobs deste saem; quem o desliga é _rodar_bots
+        self.scheduler.remove_all_jobs()
+
+
+class RecursosCompartilhados:
+    """Scheduler, pool de saída e teto de envios do processo, aplicados ao builder de cada bot."""
+
+    def __init__(self, envios_por_segundo: float = ENVIOS_POR_SEGUNDO_PROCESSO):
+        from agenda import get_scheduler
+        from salas import LimitadorTaxa
+
+        self.scheduler = get_scheduler()
+        self.requisicao = nova_requisicao_saida(RequisicaoCompartilhada)
+        self.limitador_processo = LimitadorTaxa(envios_por_segundo) if envios_por_segundo > 0 else None
+
+    def ajustar_builder(self, config: ConfigBot, builder):
+        return (
+            builder.request(self.requisicao)
+            .rate_limiter(LimitadorEnvios(config.envios_por_segundo, self.limitador_processo))
+            .job_queue(JobQueueCompartilhada(self.scheduler, config.nome))
+        )
+
+
+# --- Execução ---
+
+async def _rodar_bot(config: ConfigBot, recursos: RecursosCompartilhados, parar: asyncio.Event) -> None:
+    """Ciclo de vida de um bot, na tarefa que define o seu espaço."""
+    from telegram import Update
+    import main
+
+    espaco_atual.set(config.nome)
+    application = main.construir_aplicacao(
+        config.token,
+        persistence_path=arquivo_do_espaco(main.PERSISTENCE_FILE, config.nome),
+        ajustar_builder=lambda builder: recursos.ajustar_builder(config, builder),
+    )
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+        await application.start()
+        logger.info("Bot %s pronto.", config.nome)
+        await parar.wait()
+    finally:
+        logger.info("Encerrando bot %s...", config.nome)
+        if application.updater.running:
+            await application.updater.stop()
+        if application.running:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+        await application.shutdown()
+
+
+async def _rodar_bots(configs: List[ConfigBot]) -> None:
+    recursos = RecursosCompartilhados()
+    parar = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    # Plataformas como o Railway encerram o container com SIGTERM
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sinal, parar.set)
+
+    # Uma tarefa por bot: o espaço definido em cada uma vale só para ela e para as que ela criar
+    tarefas = [asyncio.create_task(_rodar_bot(config, recursos, parar), name=f"bot-{config.nome}") for config in configs]
+    try:
+        for config, resultado in zip(configs, await asyncio.gather(*tarefas, return_exceptions=True)):
+            if isinstance(resultado, Exception):
+                logger.error("Bot %s terminou com erro: %s", config.nome, resultado, exc_info=resultado)
+    finally:
+        if recursos.scheduler.running:
+            recursos.scheduler.shutdown(wait=False)
+
+
+def executar_multibot(configs: List[ConfigBot]) -> None:
+    """Serve todos os bots no processo atual até Ctrl+C/SIGTERM."""
+    from log_assincrono import FORMATO_MULTIBOT, configurar_logging
+
+    configurar_logging(formato=FORMATO_MULTIBOT, forcar=True)
+    logger.info("Iniciando %s bots no mesmo processo: %s.", len(configs), ", ".join(c.nome for c in configs))
+    asyncio.run(_rodar_bots(configs))
@@ -0,0 +1,76 @@
+"""
+Persistência do PTB gravada no formato snapshot (snapshot.py) em vez de pickle.
+
+Com BOT_PERSISTENCIA=snapshot, construir_aplicacao usa a PersistenciaSnapshot: mesma semântica
+do PicklePersistence (um arquivo só, gravado no flush ou a cada update_interval), mas com um
+registro msgpack por usuário, chat e conversa, comprimido, e gravado num arquivo temporário
+que só substitui o anterior no fim. Objetos que o msgpack não representa (raros no estado do
+bot) vão em pickle dentro do registro, com o Bot trocado por referência como no PTB.
+
+Na primeira carga, um arquivo ainda em pickle é lido normalmente, convertido e guardado como
+<arquivo>.pickle. Para voltar ao pickle: python snapshot.py <arquivo> <arquivo>.pickle.
+"""
+import logging
+import os
+import pickle
+
+from telegram.ext import PicklePersistence
+# Os (un)picklers do PicklePersistence: trocam o Bot por uma referência e o restauram na carga
+from telegram.ext._picklepersistence import _BotPickler, _BotUnpickler
+
+from snapshot import SNAPSHOT_COMPRIMIR, Codec, eh_snapshot, gravar_persistencia, ler_persistencia
+
+logger = logging.getLogger(__name__)
+
+BOT_PERSISTENCIA = os.getenv('BOT_PERSISTENCIA', 'pickle')
+
+
+class PersistenciaSnapshot(PicklePersistence):
+    """PicklePersistence (single_file) que lê e grava snapshots."""
+
+    def __init__(self, filepath, comprimir: bool = SNAPSHOT_COMPRIMIR, **kwargs):
+        super().__init__(filepath, single_file=True, **kwargs)
+        self.comprimir = comprimir
+
+    def _codec(self) -> Codec:
+        return Codec(
+            pickler=lambda arquivo: _BotPickler(self.bot, arquivo, protocol=pickle.HIGHEST_PROTOCOL),
+            unpickler=lambda arquivo: _BotUnpickler(self.bot, arquivo),
+        )
+
+    def _load_singlefile(self) -> None:
+        if self.filepath.exists() and not eh_snapshot(self.filepath):
+            # Formato antigo: carrega como o PicklePersistence e já grava o snapshot
+            super()._load_singlefile()
+            legado = f"{self.filepath}.pickle"
+            os.replace(self.filepath, legado)
+            self._dump_singlefile()
+            logger.info("Persistência convertida para snapshot: %s (o pickle ficou em %s).", self.filepath, legado)
+            return
+        try:
+            dados = ler_persistencia(self.filepath, self._codec())
+        except FileNotFoundError:
+            dados = {}
+        except ValueError as exc:
+            raise TypeError(f"{self.filepath.name} não é um snapshot de persistência válido") from exc
+        self.user_data = dados.get("user_data", {})
+        self.chat_data = dados.get("chat_data", {})
+        self.bot_data = dados.get("bot_data") if dados.get("bot_data") is not None else self.context_types.bot_data()
+        self.callback_data = dados.get("callback_data")
+        self.conversations = dados.get("conversations", {})
+
+    def _dump_singlefile(self) -> None:
+        gravar_persistencia(self.filepath, {
+            "conversations": self.conversations,
+            "user_data": self.user_data,
+            "chat_data": self.chat_data,
+            "bot_data": self.bot_data,
+            "callback_data": self.callback_data,
+        }, self._codec(), self.comprimir)
+
+
+def nova_persistencia(caminho: str) -> PicklePersistence:
+    """A persistência configurada em BOT_PERSISTENCIA ("pickle", o padrão, ou "snapshot")."""
+    if BOT_PERSISTENCIA == 'snapshot':
+        return PersistenciaSnapshot(filepath=caminho)
+    return PicklePersistence(filepath=caminho)
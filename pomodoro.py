@@ -1,17 +1,23 @@
-import time
 import asyncio
+import os
+from functools import lru_cache
+from typing import Dict, Optional
 import logging # <-- Importar logging
 import traceback # <-- Importar traceback para detalhes de erro
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import (
-    CallbackQueryHandler,
+    CommandHandler,
     MessageHandler,
     filters,
     ConversationHandler,
     ContextTypes,
 )
 
+import relogio
+from callbacks import RoteadorCallbacks, montar
+from espacos import espaco_atual
+
 # --- Configuração do Logger para este módulo ---
 # Garante que os logs de 'pomodoro' apareçam na saída padrão do Railway
 logger = logging.getLogger(__name__)
@@ -19,20 +25,85 @@ logger = logging.getLogger(__name__)
 # Se não for definido, o padrão será INFO (definido no main.py)
 
 
+# Sessões sem timer rodando e sem interação há mais que isso são desidratadas (segundos)
+POMODORO_TTL_OCIOSO = int(os.getenv('POMODORO_TTL_OCIOSO', '900'))
+# Intervalo da varredura que desidrata as sessões ociosas (segundos)
+POMODORO_INTERVALO_VARREDURA = int(os.getenv('POMODORO_INTERVALO_VARREDURA', '60'))
+# Chave do estado desidratado em chat_data (dict simples, sem Bot nem tarefas asyncio)
+CHAVE_SESSAO_SALVA = 'pomodoro'
+# Chave usada antes do registro de sessões, quando a instância inteira ficava em user_data
+# (a forma desidratada também ficou em user_data[CHAVE_SESSAO_SALVA] antes de ir para chat_data)
+CHAVE_SESSAO_LEGADA = 'pomodoro_instance'
+
+ESTADOS_RODANDO = ("foco", "pausa_curta", "pausa_longa")
+# Argumentos de /foco, na ordem (minutos, e o número de ciclos até a pausa longa)
+CONFIGS_COMANDO_FOCO = ("foco", "pausa_curta", "pausa_longa", "ciclos")
+USO_FOCO = "Uso: /foco [foco] [pausa curta] [pausa longa] [ciclos], tempos em minutos. Ex: /foco 50 10 20 4"
+
+
+@lru_cache(maxsize=None)
+def teclado_menu_pomodoro() -> InlineKeyboardMarkup:
+    """Teclado inline do menu principal do Pomodoro (o mesmo objeto para todas as sessões)."""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton("▶️ Iniciar", callback_data="pomodoro_iniciar"),
+         InlineKeyboardButton("⏸️ Pausar", callback_data="pomodoro_pausar")],
+        [InlineKeyboardButton("⏹️ Parar", callback_data="pomodoro_parar"),
+         InlineKeyboardButton("📊 Status", callback_data="pomodoro_status")],
+        [InlineKeyboardButton("⚙️ Configurar", callback_data="pomodoro_configurar")],
+        [InlineKeyboardButton("⬅️ Voltar ao Início", callback_data="main_menu_return")],
+    ])
+
+
+@lru_cache(maxsize=None)
+def teclado_config_pomodoro() -> InlineKeyboardMarkup:
+    """Teclado inline do menu de configuração do Pomodoro."""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton("Foco", callback_data=montar("pomodoro_config", "foco")),
+         InlineKeyboardButton("Pausa Curta", callback_data=montar("pomodoro_config", "pausa_curta"))],
+        [InlineKeyboardButton("Pausa Longa", callback_data=montar("pomodoro_config", "pausa_longa")),
+         InlineKeyboardButton("Ciclos", callback_data=montar("pomodoro_config", "ciclos"))],
+        [InlineKeyboardButton("🔔 Som na troca de fase", callback_data="pomodoro_aviso")],
+        [InlineKeyboardButton("⬅️ Voltar ao Pomodoro", callback_data="pomodoro_menu")],
+    ])
+
+
 class Pomodoro:
-    # --- Conversation States for Pomodoro ---
-    POMODORO_MENU_STATE = 0
-    CONFIG_MENU_STATE = 1
-    SET_FOCUS_TIME_STATE = 2
-    SET_SHORT_BREAK_TIME_STATE = 3
-    SET_LONG_BREAK_TIME_STATE = 4
-    SET_CYCLES_STATE = 5
+    """
+    Estado e temporizador da sessão Pomodoro de um chat. As instâncias pertencem ao
+    PomodoroSessionRegistry; os handlers do Telegram ficam em PomodoroManager.
+    """
+
+    __slots__ = (
+        'foco_tempo', 'pausa_curta_tempo', 'pausa_longa_tempo', 'ciclos_para_pausa_longa',
+        'estado', 'tempo_restante', 'ciclos_completados', 'tipo_atual',
+        'historico_foco_total', 'historico_pausa_curta_total', 'historico_pausa_longa_total',
+        'historico_ciclos_completados', '_timer_task', '_current_status_message_id',
+        'transicao_silenciosa', 'bot', 'chat_id', 'ultimo_uso',
+    )
+
+    # Campos que sobrevivem à desidratação, com o valor padrão (omitido do dict salvo)
+    CAMPOS_PERSISTIDOS = {
+        'foco_tempo': 25 * 60,
+        'pausa_curta_tempo': 5 * 60,
+        'pausa_longa_tempo': 15 * 60,
+        'ciclos_para_pausa_longa': 4,
+        'estado': "ocioso",
+        'tempo_restante': 0,
+        'ciclos_completados': 0,
+        'tipo_atual': None,
+        'historico_foco_total': 0,
+        'historico_pausa_curta_total': 0,
+        'historico_pausa_longa_total': 0,
+        'historico_ciclos_completados': 0,
+        '_current_status_message_id': None,
+        'transicao_silenciosa': False,
+    }
 
     # Intervalo para atualização da mensagem de status no Telegram (em segundos)
     ATUALIZACAO_STATUS_INTERVAL = 1
 
     def __init__(self, bot=None, chat_id=None):
-        logger.info(f"Inicializando instância Pomodoro para chat_id: {chat_id}")
+        logger.info("Inicializando instância Pomodoro para chat_id: %s", chat_id)
         try:
             self.foco_tempo = 25 * 60
             self.pausa_curta_tempo = 5 * 60
@@ -51,12 +122,41 @@ class Pomodoro:
 
             self._timer_task = None
             self._current_status_message_id = None
+            # Troca de fase sem som: edita a mensagem de status em vez de enviar uma nova
+            self.transicao_silenciosa = False
 
             self.bot = bot
             self.chat_id = chat_id
+            self.ultimo_uso = relogio.monotonic()
             logger.info("Instância Pomodoro inicializada com sucesso.")
         except Exception as e:
-            logger.error(f"Erro na inicialização da classe Pomodoro: {e}", exc_info=True)
+            logger.error("Erro na inicialização da classe Pomodoro: %s", e, exc_info=True)
+
+    def timer_ativo(self) -> bool:
+        return self._timer_task is not None and not self._timer_task.done()
+
+    def para_dict(self) -> dict:
+        """Forma desidratada: só os campos diferentes do padrão, sem Bot nem tarefa do timer."""
+        dados = {}
+        for campo, padrao in self.CAMPOS_PERSISTIDOS.items():
+            valor = getattr(self, campo)
+            if valor != padrao:
+                dados[campo] = valor
+        if dados.get('estado') in ESTADOS_RODANDO:
+            # O timer não sobrevive à desidratação (nem a um reinício): volta como pausado
+            dados['estado'] = "pausado"
+        return dados
+
+    @classmethod
+    def de_dict(cls, dados: dict, bot=None, chat_id=None) -> "Pomodoro":
+        """Reidrata uma sessão salva por para_dict."""
+        sessao = cls(bot=bot, chat_id=chat_id)
+        for campo in cls.CAMPOS_PERSISTIDOS:
+            if campo in dados:
+                setattr(sessao, campo, dados[campo])
+        if sessao.estado in ESTADOS_RODANDO:
+            sessao.estado = "pausado"
+        return sessao
 
     def _formatar_tempo(self, segundos):
         """Formata segundos em MM:SS."""
@@ -65,7 +165,7 @@ class Pomodoro:
             sec = segundos % 60
             return f"{min:02d}:{sec:02d}"
         except Exception as e:
-            logger.error(f"Erro ao formatar tempo ({segundos} segundos): {e}", exc_info=True)
+            logger.error("Erro ao formatar tempo (%s segundos): %s", segundos, e, exc_info=True)
             return "00:00" # Retorna um valor padrão em caso de erro
 
     async def _rodar_temporizador(self):
@@ -73,7 +173,7 @@ class Pomodoro:
         Função assíncrona interna para gerenciar a contagem regressiva e atualização da mensagem.
         Esta função roda diretamente no loop de eventos do bot como uma tarefa.
         """
-        logger.info(f"Iniciando _rodar_temporizador para chat {self.chat_id} no estado {self.estado}")
+        logger.info("Iniciando _rodar_temporizador para chat %s no estado %s", self.chat_id, self.estado)
         try:
             while self.tempo_restante > 0:
                 if self._current_status_message_id and self.bot and self.chat_id:
@@ -82,64 +182,54 @@ class Pomodoro:
                             chat_id=self.chat_id,
                             message_id=self._current_status_message_id,
                             text=self.status(),
-                            reply_markup=self._get_pomodoro_menu_keyboard(),
+                            reply_markup=teclado_menu_pomodoro(),
                             parse_mode='Markdown'
                         )
-                        logger.debug(f"Mensagem de status atualizada para chat {self.chat_id}. Tempo restante: {self._formatar_tempo(self.tempo_restante)}")
+                        logger.debug("Mensagem de status atualizada para chat %s. Tempo restante: %ss", self.chat_id, self.tempo_restante)
                     except Exception as e:
                         error_str = str(e).lower()
                         if "message to edit not found" in error_str or "message can't be edited" in error_str:
-                            logger.warning(f"Mensagem de status não encontrada ou não pode ser editada para chat {self.chat_id}. Limpando ID: {e}")
+                            logger.warning("Mensagem de status não encontrada ou não pode ser editada para chat %s. Limpando ID: %s", self.chat_id, e)
                             self._current_status_message_id = None
                             # Se a mensagem foi perdida, podemos tentar enviar uma nova para continuar o feedback
                             try:
                                 new_msg = await self.bot.send_message(
                                     chat_id=self.chat_id,
                                     text=self.status(),
-                                    reply_markup=self._get_pomodoro_menu_keyboard(),
+                                    reply_markup=teclado_menu_pomodoro(),
                                     parse_mode='Markdown'
                                 )
                                 self._current_status_message_id = new_msg.message_id
-                                logger.info(f"Nova mensagem de status enviada após perda da anterior para chat {self.chat_id}.")
+                                logger.info("Nova mensagem de status enviada após perda da anterior para chat %s.", self.chat_id)
                             except Exception as new_e:
-                                logger.error(f"Falha ao enviar nova mensagem de status para {self.chat_id}: {new_e}", exc_info=True)
+                                logger.error("Falha ao enviar nova mensagem de status para %s: %s", self.chat_id, new_e, exc_info=True)
                         elif "message is not modified" not in error_str:
-                            logger.error(f"Erro inesperado ao atualizar mensagem de status para chat {self.chat_id}: {e}", exc_info=True)
+                            logger.error("Erro inesperado ao atualizar mensagem de status para chat %s: %s", self.chat_id, e, exc_info=True)
                         # else: Apenas "message is not modified", é um comportamento esperado, não precisa de log.
 
-                await asyncio.sleep(self.ATUALIZACAO_STATUS_INTERVAL)
+                await relogio.dormir(self.ATUALIZACAO_STATUS_INTERVAL)
                 self.tempo_restante -= self.ATUALIZACAO_STATUS_INTERVAL
 
             self.tempo_restante = 0 # Garante que o tempo restante não seja negativo
 
-            # Envia a última atualização de status quando o tempo chega a zero
-            if self._current_status_message_id and self.bot and self.chat_id:
-                try:
-                    await self.bot.edit_message_text(
-                        chat_id=self.chat_id,
-                        message_id=self._current_status_message_id,
-                        text=self.status(),
-                        reply_markup=self._get_pomodoro_menu_keyboard(),
-                        parse_mode='Markdown'
-                    )
-                    logger.info(f"Última atualização de status enviada (tempo zerado) para chat {self.chat_id}.")
-                except Exception as e:
-                    logger.warning(f"Erro ao enviar última atualização de status (tempo zerado) para chat {self.chat_id}: {e}")
-            
+            # Sem edição com o tempo zerado: _proximo_estado substitui a mensagem de status logo em seguida
             await self._proximo_estado()
-            logger.info(f"Temporizador concluído e transição para o próximo estado para chat {self.chat_id}.")
+            logger.info("Temporizador concluído e transição para o próximo estado para chat %s.", self.chat_id)
 
         except asyncio.CancelledError:
-            logger.info(f"Temporizador do Pomodoro cancelado para chat {self.chat_id}.")
+            logger.info("Temporizador do Pomodoro cancelado para chat %s.", self.chat_id)
         except Exception as e:
-            logger.critical(f"Erro CRÍTICO no _rodar_temporizador para chat {self.chat_id}: {e}", exc_info=True)
+            logger.critical("Erro CRÍTICO no _rodar_temporizador para chat %s: %s", self.chat_id, e, exc_info=True)
         finally:
-            self._timer_task = None # Limpa a tarefa do temporizador quando ela termina o ciclo ou é cancelada
+            # Limpa a tarefa do temporizador quando ela termina o ciclo ou é cancelada, a menos que
+            # _proximo_estado já tenha criado a tarefa da próxima fase
+            if self._timer_task is asyncio.current_task():
+                self._timer_task = None
 
 
     async def _proximo_estado(self):
         """Lógica para transição para o próximo estado do Pomodoro (foco, pausa curta, pausa longa)."""
-        logger.info(f"Iniciando _proximo_estado para chat {self.chat_id}. Estado atual: {self.estado}")
+        logger.info("Iniciando _proximo_estado para chat %s. Estado atual: %s", self.chat_id, self.estado)
         msg_notificacao = ""
         try:
             if self.estado == "foco":
@@ -152,13 +242,13 @@ class Pomodoro:
                     self.tempo_restante = self.pausa_longa_tempo
                     self.tipo_atual = "pausa_longa"
                     msg_notificacao = "🎉 UAU! Hora da Pausa Longa! Respire fundo, você mereceu essa pausa! 🧘‍♀️"
-                    logger.info(f"Ciclo de foco completo. Transição para Pausa Longa para chat {self.chat_id}.")
+                    logger.info("Ciclo de foco completo. Transição para Pausa Longa para chat %s.", self.chat_id)
                 else:
                     self.estado = "pausa_curta"
                     self.tempo_restante = self.pausa_curta_tempo
                     self.tipo_atual = "pausa_curta"
                     msg_notificacao = "☕ Hora da Pausa Curta! Estique as pernas, tome uma água. Você está indo muito bem! ✨"
-                    logger.info(f"Ciclo de foco completo. Transição para Pausa Curta para chat {self.chat_id}.")
+                    logger.info("Ciclo de foco completo. Transição para Pausa Curta para chat %s.", self.chat_id)
 
             elif self.estado in ["pausa_curta", "pausa_longa"]:
                 if self.estado == "pausa_curta":
@@ -170,55 +260,83 @@ class Pomodoro:
                 self.tempo_restante = self.foco_tempo
                 self.tipo_atual = "foco"
                 msg_notificacao = "🚀 De volta ao Foco! Vamos lá, a produtividade te espera! 💪"
-                logger.info(f"Período de pausa completo. Transição para Foco para chat {self.chat_id}.")
+                logger.info("Período de pausa completo. Transição para Foco para chat %s.", self.chat_id)
             else:
                 self.estado = "ocioso"
                 self.tempo_restante = 0
                 self.tipo_atual = None
                 msg_notificacao = "Pomodoro concluído! Pronto para o próximo ciclo? 🎉"
-                logger.info(f"Estado Pomodoro resetado para ocioso para chat {self.chat_id}.")
+                logger.info("Estado Pomodoro resetado para ocioso para chat %s.", self.chat_id)
 
             if self.bot and self.chat_id and msg_notificacao:
-                try:
-                    await self.bot.send_message(self.chat_id, msg_notificacao)
-                    logger.info(f"Notificação de estado enviada para chat {self.chat_id}: {msg_notificacao}")
-                except Exception as e:
-                    logger.error(f"Erro ao enviar mensagem de notificação de próximo estado para {self.chat_id}: {e}", exc_info=True)
+                await self._anunciar_transicao(msg_notificacao)
 
                 if self.estado != "ocioso":
-                    try:
-                        status_msg = await self.bot.send_message(
-                            self.chat_id,
-                            self.status(),
-                            reply_markup=self._get_pomodoro_menu_keyboard(),
-                            parse_mode='Markdown'
-                        )
-                        self._current_status_message_id = status_msg.message_id
-                        logger.info(f"Mensagem de status inicial do próximo ciclo enviada para chat {self.chat_id}. ID: {self._current_status_message_id}")
-
-                        self._timer_task = asyncio.create_task(self._rodar_temporizador())
-                        logger.info(f"Nova tarefa de temporizador criada para chat {self.chat_id}.")
-                    except Exception as e:
-                        logger.error(f"Erro ao enviar mensagem de status ou iniciar nova tarefa do timer para {self.chat_id}: {e}", exc_info=True)
-                        self._current_status_message_id = None
+                    self._timer_task = asyncio.create_task(self._rodar_temporizador())
+                    logger.info("Nova tarefa de temporizador criada para chat %s.", self.chat_id)
                 else:
                     self._current_status_message_id = None
-                    logger.info(f"Pomodoro no estado ocioso. _current_status_message_id limpo para chat {self.chat_id}.")
+                    logger.info("Pomodoro no estado ocioso. _current_status_message_id limpo para chat %s.", self.chat_id)
 
         except Exception as e:
-            logger.critical(f"Erro CRÍTICO na lógica de transição de _proximo_estado para chat {self.chat_id}: {e}", exc_info=True)
+            logger.critical("Erro CRÍTICO na lógica de transição de _proximo_estado para chat %s: %s", self.chat_id, e, exc_info=True)
+
 
+    async def _anunciar_transicao(self, msg_notificacao: str):
+        """
+        Mostra a troca de fase numa única mensagem (aviso + status da nova fase).
+        Silenciosa: edita a mensagem de status atual (edições não notificam). Com som: envia uma
+        mensagem nova, que passa a ser a de status, e apaga a anterior para não deixá-la parada no chat.
+        """
+        texto = msg_notificacao if self.estado == "ocioso" else f"{msg_notificacao}\n\n{self.status()}"
+        anterior = self._current_status_message_id
+        if self.transicao_silenciosa and anterior:
+            try:
+                await self.bot.edit_message_text(
+                    chat_id=self.chat_id,
+                    message_id=anterior,
+                    text=texto,
+                    reply_markup=teclado_menu_pomodoro(),
+                    parse_mode='Markdown'
+                )
+                logger.info("Troca de fase mostrada na mensagem de status %s do chat %s.", anterior, self.chat_id)
+                return
+            except Exception as e:
+                # Mensagem apagada pelo usuário ou antiga demais: cai no envio de uma nova, sem som
+                logger.warning("Não foi possível editar a mensagem de status na troca de fase para chat %s: %s", self.chat_id, e)
+                anterior = None
 
-    async def iniciar(self):
-        """Inicia ou retoma o temporizador Pomodoro."""
-        logger.info(f"Chamada para iniciar/retomar Pomodoro para chat {self.chat_id}.")
+        try:
+            nova = await self.bot.send_message(
+                self.chat_id,
+                texto,
+                reply_markup=teclado_menu_pomodoro(),
+                parse_mode='Markdown',
+                disable_notification=self.transicao_silenciosa
+            )
+            self._current_status_message_id = nova.message_id
+            logger.info("Troca de fase enviada para chat %s. ID: %s", self.chat_id, nova.message_id)
+        except Exception as e:
+            logger.error("Erro ao enviar a troca de fase para %s: %s", self.chat_id, e, exc_info=True)
+            self._current_status_message_id = None
+            return
+
+        if anterior:
+            try:
+                await self.bot.delete_message(chat_id=self.chat_id, message_id=anterior)
+            except Exception as e:
+                logger.debug("Mensagem de status anterior %s do chat %s não foi apagada: %s", anterior, self.chat_id, e)
+
+    async def iniciar(self, aviso: str = ""):
+        """Inicia ou retoma o temporizador Pomodoro. `aviso` vai antes do texto da mensagem de status."""
+        logger.info("Chamada para iniciar/retomar Pomodoro para chat %s.", self.chat_id)
         try:
             if not self.bot or not self.chat_id:
-                logger.error(f"Bot ou chat_id não definidos para iniciar Pomodoro. Bot: {self.bot}, Chat ID: {self.chat_id}")
+                logger.error("Bot ou chat_id não definidos para iniciar Pomodoro. Bot: %s, Chat ID: %s", self.bot, self.chat_id)
                 return "Ops! O bot não foi inicializado corretamente para o Pomodoro. Tente novamente mais tarde. 😢"
 
             if self._timer_task and not self._timer_task.done():
-                logger.info(f"Pomodoro já está rodando para chat {self.chat_id}.")
+                logger.info("Pomodoro já está rodando para chat %s.", self.chat_id)
                 return "O Pomodoro já está rodando! Mantenha o foco. 🎯"
 
             response = ""
@@ -230,16 +348,19 @@ class Pomodoro:
                 self.tipo_atual = "foco"
                 response = "🎉 Pomodoro iniciado! Hora de focar e brilhar! ✨"
                 initial_status_msg_text = f"🌟 Iniciando seu período de {self.tipo_atual.capitalize()}! Tempo: {self._formatar_tempo(self.foco_tempo)} 🎉"
-                logger.info(f"Novo Pomodoro iniciado (estado ocioso -> foco) para chat {self.chat_id}.")
+                logger.info("Novo Pomodoro iniciado (estado ocioso -> foco) para chat %s.", self.chat_id)
             elif self.estado == "pausado":
                 self.estado = self.tipo_atual
                 response = "▶️ Pomodoro retomado! Vamos continuar firme! 💪"
                 initial_status_msg_text = f"🚀 Retomando seu período de {self.tipo_atual.capitalize()}! Tempo restante: {self._formatar_tempo(self.tempo_restante)} ⏳"
-                logger.info(f"Pomodoro retomado (estado pausado -> {self.tipo_atual}) para chat {self.chat_id}.")
+                logger.info("Pomodoro retomado (estado pausado -> %s) para chat %s.", self.tipo_atual, self.chat_id)
             else:
-                logger.warning(f"Tentativa de iniciar Pomodoro em estado inesperado ({self.estado}) para chat {self.chat_id}.")
+                logger.warning("Tentativa de iniciar Pomodoro em estado inesperado (%s) para chat %s.", self.estado, self.chat_id)
                 return "O Pomodoro já está em andamento. Use o botão 'Parar' para finalizar ou 'Pausar'. ⏯️"
             
+            if aviso:
+                initial_status_msg_text = f"{aviso}\n\n{initial_status_msg_text}"
+
             # Envia a mensagem de status inicial e armazena seu ID
             try:
                 if self._current_status_message_id:
@@ -247,21 +368,21 @@ class Pomodoro:
                         chat_id=self.chat_id,
                         message_id=self._current_status_message_id,
                         text=initial_status_msg_text,
-                        reply_markup=self._get_pomodoro_menu_keyboard(),
+                        reply_markup=teclado_menu_pomodoro(),
                         parse_mode='Markdown'
                     )
-                    logger.info(f"Mensagem de status inicial editada para chat {self.chat_id}. ID: {self._current_status_message_id}")
+                    logger.info("Mensagem de status inicial editada para chat %s. ID: %s", self.chat_id, self._current_status_message_id)
                 else:
                     status_message = await self.bot.send_message(
                         self.chat_id,
                         initial_status_msg_text,
-                        reply_markup=self._get_pomodoro_menu_keyboard(),
+                        reply_markup=teclado_menu_pomodoro(),
                         parse_mode='Markdown'
                     )
-                    logger.info(f"Nova mensagem de status inicial enviada para chat {self.chat_id}.")
+                    logger.info("Nova mensagem de status inicial enviada para chat %s.", self.chat_id)
                 self._current_status_message_id = status_message.message_id
             except Exception as e:
-                logger.error(f"Erro ao enviar/editar mensagem inicial do Pomodoro para {self.chat_id}: {e}", exc_info=True)
+                logger.error("Erro ao enviar/editar mensagem inicial do Pomodoro para %s: %s", self.chat_id, e, exc_info=True)
                 # Tenta enviar uma nova mensagem sem rastreá-la se a edição falhar
                 try:
                     await self.bot.send_message(
@@ -270,20 +391,20 @@ class Pomodoro:
                     )
                     self._current_status_message_id = None # Garante que não está rastreando uma mensagem inválida
                 except Exception as send_e:
-                    logger.critical(f"Erro FATAL: Não foi possível enviar nem a mensagem de fallback para {self.chat_id}: {send_e}", exc_info=True)
+                    logger.critical("Erro FATAL: Não foi possível enviar nem a mensagem de fallback para %s: %s", self.chat_id, send_e, exc_info=True)
                     # Não há muito o que fazer aqui se nem a mensagem de fallback for...
                     return "Erro grave ao iniciar Pomodoro. Tente novamente mais tarde. 😭"
 
             self._timer_task = asyncio.create_task(self._rodar_temporizador())
-            logger.info(f"Tarefa do temporizador iniciada para chat {self.chat_id}.")
+            logger.info("Tarefa do temporizador iniciada para chat %s.", self.chat_id)
             return response
         except Exception as e:
-            logger.critical(f"Erro CRÍTICO na função iniciar() do Pomodoro para chat {self.chat_id}: {e}", exc_info=True)
+            logger.critical("Erro CRÍTICO na função iniciar() do Pomodoro para chat %s: %s", self.chat_id, e, exc_info=True)
             return "Ocorreu um erro inesperado ao tentar iniciar o Pomodoro. Por favor, tente novamente. 😭"
 
     async def pausar(self):
         """Pausa o temporizador Pomodoro."""
-        logger.info(f"Chamada para pausar Pomodoro para chat {self.chat_id}. Estado atual: {self.estado}")
+        logger.info("Chamada para pausar Pomodoro para chat %s. Estado atual: %s", self.chat_id, self.estado)
         try:
             if self.estado in ["foco", "pausa_curta", "pausa_longa"]:
                 if self._timer_task and not self._timer_task.done():
@@ -291,31 +412,31 @@ class Pomodoro:
                     try:
                         await self._timer_task
                     except asyncio.CancelledError:
-                        logger.info(f"Tarefa do temporizador cancelada com sucesso para chat {self.chat_id}.")
+                        logger.info("Tarefa do temporizador cancelada com sucesso para chat %s.", self.chat_id)
                     except Exception as e:
-                        logger.error(f"Erro inesperado ao aguardar cancelamento da tarefa para chat {self.chat_id}: {e}", exc_info=True)
+                        logger.error("Erro inesperado ao aguardar cancelamento da tarefa para chat %s: %s", self.chat_id, e, exc_info=True)
                     self._timer_task = None
                 else:
-                    logger.warning(f"Tentativa de pausar Pomodoro, mas _timer_task não está ativo para chat {self.chat_id}.")
+                    logger.warning("Tentativa de pausar Pomodoro, mas _timer_task não está ativo para chat %s.", self.chat_id)
                 self.estado = "pausado"
-                logger.info(f"Pomodoro pausado para chat {self.chat_id}.")
+                logger.info("Pomodoro pausado para chat %s.", self.chat_id)
                 return "⏸️ Pomodoro pausado. Você pode retomar a qualquer momento! 😌"
             elif self.estado == "pausado":
-                logger.info(f"Tentativa de pausar Pomodoro que já está pausado para chat {self.chat_id}.")
+                logger.info("Tentativa de pausar Pomodoro que já está pausado para chat %s.", self.chat_id)
                 return "O Pomodoro já está pausado. Que tal retomar? ▶️"
             else:
-                logger.info(f"Tentativa de pausar Pomodoro que não está ativo para chat {self.chat_id}. Estado: {self.estado}")
+                logger.info("Tentativa de pausar Pomodoro que não está ativo para chat %s. Estado: %s", self.chat_id, self.estado)
                 return "Não há Pomodoro ativo para pausar. Que tal começar um? 🚀"
         except Exception as e:
-            logger.critical(f"Erro CRÍTICO na função pausar() do Pomodoro para chat {self.chat_id}: {e}", exc_info=True)
+            logger.critical("Erro CRÍTICO na função pausar() do Pomodoro para chat %s: %s", self.chat_id, e, exc_info=True)
             return "Ocorreu um erro inesperado ao tentar pausar o Pomodoro. 😥"
 
     async def parar(self):
         """Para o temporizador Pomodoro, reseta o estado e gera um relatório."""
-        logger.info(f"Chamada para parar Pomodoro para chat {self.chat_id}. Estado atual: {self.estado}")
+        logger.info("Chamada para parar Pomodoro para chat %s. Estado atual: %s", self.chat_id, self.estado)
         try:
             if self.estado == "ocioso":
-                logger.info(f"Tentativa de parar Pomodoro que já está ocioso para chat {self.chat_id}.")
+                logger.info("Tentativa de parar Pomodoro que já está ocioso para chat %s.", self.chat_id)
                 return "Não há Pomodoro ativo para parar. Seu dia está livre! 🎉"
 
             if self._timer_task and not self._timer_task.done():
@@ -323,15 +444,15 @@ class Pomodoro:
                 try:
                     await self._timer_task
                 except asyncio.CancelledError:
-                    logger.info(f"Tarefa do temporizador cancelada com sucesso ao parar para chat {self.chat_id}.")
+                    logger.info("Tarefa do temporizador cancelada com sucesso ao parar para chat %s.", self.chat_id)
                 except Exception as e:
-                    logger.error(f"Erro inesperado ao aguardar cancelamento da tarefa ao parar para chat {self.chat_id}: {e}", exc_info=True)
+                    logger.error("Erro inesperado ao aguardar cancelamento da tarefa ao parar para chat %s: %s", self.chat_id, e, exc_info=True)
                 self._timer_task = None
             else:
-                logger.warning(f"Tentativa de parar Pomodoro, mas _timer_task não está ativo para chat {self.chat_id}.")
+                logger.warning("Tentativa de parar Pomodoro, mas _timer_task não está ativo para chat %s.", self.chat_id)
 
             report = self.gerar_relatorio()
-            logger.info(f"Relatório gerado para chat {self.chat_id}.")
+            logger.info("Relatório gerado para chat %s.", self.chat_id)
 
             self.estado = "ocioso"
             self.tempo_restante = 0
@@ -343,11 +464,11 @@ class Pomodoro:
             self.historico_pausa_longa_total = 0
             self.historico_ciclos_completados = 0
             self._current_status_message_id = None
-            logger.info(f"Pomodoro resetado e histórico limpo para chat {self.chat_id}.")
+            logger.info("Pomodoro resetado e histórico limpo para chat %s.", self.chat_id)
 
             return "⏹️ Pomodoro parado! Aqui está o resumo da sua sessão:\n\n" + report + "\n\nInicie um novo ciclo quando estiver pronto para arrasar de novo! ✨"
         except Exception as e:
-            logger.critical(f"Erro CRÍTICO na função parar() do Pomodoro para chat {self.chat_id}: {e}", exc_info=True)
+            logger.critical("Erro CRÍTICO na função parar() do Pomodoro para chat %s: %s", self.chat_id, e, exc_info=True)
             return "Ocorreu um erro inesperado ao tentar parar o Pomodoro. 😥"
 
     def status(self):
@@ -364,19 +485,19 @@ class Pomodoro:
                         f"Tempo restante: *{self._formatar_tempo(self.tempo_restante)}* | "
                         f"Ciclos de foco completos: *{self.ciclos_completados}*. Continue firme! 🔥")
         except Exception as e:
-            logger.error(f"Erro ao gerar status do Pomodoro para chat {self.chat_id}: {e}", exc_info=True)
+            logger.error("Erro ao gerar status do Pomodoro para chat %s: %s", self.chat_id, e, exc_info=True)
             return "Ops! Não consegui carregar o status. 😟"
 
     async def configurar(self, tipo_config, valor):
         """Permite configurar os tempos do Pomodoro."""
-        logger.info(f"Chamada para configurar Pomodoro para chat {self.chat_id}. Tipo: {tipo_config}, Valor: {valor}")
+        logger.info("Chamada para configurar Pomodoro para chat %s. Tipo: %s, Valor: %s", self.chat_id, tipo_config, valor)
         try:
             if self.estado != "ocioso":
-                logger.warning(f"Tentativa de configurar Pomodoro ativo/pausado para chat {self.chat_id}. Estado: {self.estado}")
+                logger.warning("Tentativa de configurar Pomodoro ativo/pausado para chat %s. Estado: %s", self.chat_id, self.estado)
                 return False, "Ops! Não é possível configurar enquanto o Pomodoro está ativo ou pausado. Por favor, pare-o primeiro. 🛑"
 
             if not isinstance(valor, int) or valor <= 0:
-                logger.warning(f"Valor de configuração inválido ({valor}) para chat {self.chat_id}. Tipo: {type(valor)}")
+                logger.warning("Valor de configuração inválido (%s) para chat %s. Tipo: %s", valor, self.chat_id, type(valor))
                 return False, "Por favor, insira um número inteiro positivo! 🙏"
 
             if tipo_config == "foco":
@@ -388,14 +509,14 @@ class Pomodoro:
             elif tipo_config == "ciclos":
                 self.ciclos_para_pausa_longa = valor
             else:
-                logger.error(f"Tipo de configuração desconhecido ({tipo_config}) para chat {self.chat_id}.")
+                logger.error("Tipo de configuração desconhecido (%s) para chat %s.", tipo_config, self.chat_id)
                 return False, "Tipo de configuração desconhecido. 😕"
             
-            logger.info(f"Configuração '{tipo_config}' atualizada para {valor} para chat {self.chat_id}.")
+            logger.info("Configuração '%s' atualizada para %s para chat %s.", tipo_config, valor, self.chat_id)
             return True, (f"✨ Configuração de *{tipo_config.replace('_', ' ').capitalize()}* "
                             f"atualizada para *{valor} min* (ou ciclos)! Perfeito! ✅")
         except Exception as e:
-            logger.critical(f"Erro CRÍTICO na função configurar() do Pomodoro para chat {self.chat_id}: {e}", exc_info=True)
+            logger.critical("Erro CRÍTICO na função configurar() do Pomodoro para chat %s: %s", self.chat_id, e, exc_info=True)
             return False, "Ocorreu um erro inesperado ao configurar o Pomodoro. 😥"
 
     def get_config_status(self):
@@ -405,14 +526,15 @@ class Pomodoro:
                     f"🍅 *Foco:* {self.foco_tempo // 60} min\n"
                     f"☕ *Pausa Curta:* {self.pausa_curta_tempo // 60} min\n"
                     f"🛋️ *Pausa Longa:* {self.pausa_longa_tempo // 60} min\n"
-                    f"🔄 *Ciclos para Pausa Longa:* {self.ciclos_para_pausa_longa}")
+                    f"🔄 *Ciclos para Pausa Longa:* {self.ciclos_para_pausa_longa}\n"
+                    f"🔔 *Troca de fase:* {'silenciosa (atualiza a mensagem)' if self.transicao_silenciosa else 'com som'}")
         except Exception as e:
-            logger.error(f"Erro ao obter status de configuração do Pomodoro para chat {self.chat_id}: {e}", exc_info=True)
+            logger.error("Erro ao obter status de configuração do Pomodoro para chat %s: %s", self.chat_id, e, exc_info=True)
             return "Ops! Não consegui carregar as configurações. 😟"
 
     def gerar_relatorio(self):
         """Calcula e retorna o relatório final de tempo de foco, pausas e ciclos."""
-        logger.info(f"Gerando relatório Pomodoro para chat {self.chat_id}.")
+        logger.info("Gerando relatório Pomodoro para chat %s.", self.chat_id)
         try:
             total_foco_min = self.historico_foco_total // 60
             total_pausa_curta_min = self.historico_pausa_curta_total // 60
@@ -434,7 +556,7 @@ class Pomodoro:
 
             if self.historico_foco_total == 0 and self.historico_pausa_curta_total == 0 and \
                self.historico_pausa_longa_total == 0 and self.historico_ciclos_completados == 0:
-                logger.info(f"Relatório vazio gerado para chat {self.chat_id}.")
+                logger.info("Relatório vazio gerado para chat %s.", self.chat_id)
                 return "Parece que você ainda não completou nenhum ciclo ou período de foco. Que tal começar um? 🚀"
 
             relatorio = (f"--- 📊 Relatório da Sua Sessão de Produtividade! ---\n"
@@ -443,66 +565,146 @@ class Pomodoro:
                          f"**Pausa Longa total:** {horas_pausa_longa}h {min_pausa_longa}min 🧘‍♀️\n"
                          f"**Ciclos de foco completos:** {self.historico_ciclos_completados} 🏆\n"
                          f"**Tempo total da sessão:** {horas_geral}h {min_geral}min ✅")
-            logger.info(f"Relatório gerado com sucesso para chat {self.chat_id}.")
+            logger.info("Relatório gerado com sucesso para chat %s.", self.chat_id)
             return relatorio
         except Exception as e:
-            logger.critical(f"Erro CRÍTICO ao gerar relatório do Pomodoro para chat {self.chat_id}: {e}", exc_info=True)
+            logger.critical("Erro CRÍTICO ao gerar relatório do Pomodoro para chat %s: %s", self.chat_id, e, exc_info=True)
             return "Ops! Ocorreu um erro ao gerar o relatório. 😥"
 
-    # --- Métodos para Gerar Menus de Botões Inline ---
 
-    def _get_pomodoro_menu_keyboard(self):
-        """Retorna o teclado inline para o menu principal do Pomodoro."""
-        try:
-            keyboard = [
-                [InlineKeyboardButton("▶️ Iniciar", callback_data="pomodoro_iniciar"),
-                 InlineKeyboardButton("⏸️ Pausar", callback_data="pomodoro_pausar")],
-                [InlineKeyboardButton("⏹️ Parar", callback_data="pomodoro_parar"),
-                 InlineKeyboardButton("📊 Status", callback_data="pomodoro_status")],
-                [InlineKeyboardButton("⚙️ Configurar", callback_data="pomodoro_configurar")],
-                [InlineKeyboardButton("⬅️ Voltar ao Início", callback_data="main_menu_return")],
-            ]
-            return InlineKeyboardMarkup(keyboard)
-        except Exception as e:
-            logger.error(f"Erro ao gerar teclado do menu Pomodoro para chat {self.chat_id}: {e}", exc_info=True)
-            return InlineKeyboardMarkup([]) # Retorna teclado vazio para evitar travamento
+class PomodoroSessionRegistry:
+    """
+    Dono das sessões Pomodoro em memória, indexadas por chat_id.
+
+    Só ficam vivas as sessões com timer rodando ou usadas há menos de `ttl_ocioso` segundos.
+    As demais são desidratadas (Pomodoro.para_dict) em chat_data[CHAVE_SESSAO_SALVA] e
+    reidratadas no próximo toque. A sessão é do chat: num grupo, todos os membros controlam o
+    mesmo timer e reidratam a mesma cópia. chat_data guarda só dicts simples, então a
+    persistência consegue copiá-lo (a instância antiga, com o Bot dentro, quebrava o deepcopy).
+    """
+
+    def __init__(self, application, ttl_ocioso: int = POMODORO_TTL_OCIOSO):
+        self.application = application
+        self.ttl_ocioso = ttl_ocioso
+        self._ativas: Dict[int, Pomodoro] = {}
+        self.reidratadas = 0
+        self.desidratadas = 0
+
+    def obter(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> Pomodoro:
+        """Sessão do chat do update, reidratada de chat_data se necessário."""
+        chat_id = update.effective_chat.id
+        sessao = self._ativas.get(chat_id)
+        if sessao is None:
+            user_data = context.user_data
+            user_data.pop(CHAVE_SESSAO_LEGADA, None)
+            # Cópia gravada em user_data por versões anteriores: migra para o chat se ele não tem a sua
+            legada = user_data.pop(CHAVE_SESSAO_SALVA, None)
+            salva = context.chat_data.get(CHAVE_SESSAO_SALVA) or legada
+            if salva:
+                sessao = Pomodoro.de_dict(salva, bot=context.bot, chat_id=chat_id)
+                self.reidratadas += 1
+                logger.debug("Sessão Pomodoro reidratada para chat %s.", chat_id)
+            else:
+                sessao = Pomodoro(bot=context.bot, chat_id=chat_id)
+            self._ativas[chat_id] = sessao
+        sessao.bot = context.bot
+        sessao.ultimo_uso = relogio.monotonic()
+        return sessao
+
+    def existente(self, chat_id: int) -> Optional[Pomodoro]:
+        """Sessão viva do chat, sem reidratar nem criar."""
+        return self._ativas.get(chat_id)
+
+    def salvar(self, sessao: Pomodoro, chat_data: dict) -> None:
+        """Atualiza a cópia desidratada em chat_data (chamado após cada ação do usuário)."""
+        dados = sessao.para_dict()
+        if dados:
+            chat_data[CHAVE_SESSAO_SALVA] = dados
+        else:
+            chat_data.pop(CHAVE_SESSAO_SALVA, None)
+
+    def varrer(self, agora: Optional[float] = None) -> int:
+        """Desidrata as sessões ociosas há mais de ttl_ocioso. Retorna quantas saíram da memória."""
+        agora = relogio.monotonic() if agora is None else agora
+        ociosas = [
+            chat_id for chat_id, sessao in self._ativas.items()
+            if not sessao.timer_ativo() and agora - sessao.ultimo_uso >= self.ttl_ocioso
+        ]
+        for chat_id in ociosas:
+            sessao = self._ativas.pop(chat_id)
+            # O timer pode ter avançado histórico/ciclos depois da última ação salva
+            self.salvar(sessao, self.application.chat_data[chat_id])
+            self.application.mark_data_for_update_persistence(chat_ids=chat_id)
+        self.desidratadas += len(ociosas)
+        return len(ociosas)
+
+    async def _varrer_job(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        removidas = self.varrer()
+        if removidas:
+            logger.info("%s sessões Pomodoro ociosas desidratadas; %s ativas.", removidas, len(self._ativas))
+
+    def agendar_varredura(self, intervalo: int = POMODORO_INTERVALO_VARREDURA) -> None:
+        job_queue = self.application.job_queue
+        if job_queue is None:
+            logger.warning("JobQueue indisponível: sessões Pomodoro ociosas não serão desidratadas.")
+            return
+        job_queue.run_repeating(self._varrer_job, interval=intervalo, first=intervalo, name="pomodoro_varredura")
+
+    def estatisticas(self) -> dict:
+        return {
+            "sessoes_pomodoro": len(self._ativas),
+            "timers_pomodoro_ativos": sum(1 for sessao in self._ativas.values() if sessao.timer_ativo()),
+            "sessoes_pomodoro_reidratadas": self.reidratadas,
+            "sessoes_pomodoro_desidratadas": self.desidratadas,
+        }
+
+
+# espaço do bot -> registro de sessões (um por Application; ver espacos.py)
+_registros: Dict[str, PomodoroSessionRegistry] = {}
+
+
+def get_registro() -> Optional[PomodoroSessionRegistry]:
+    """Registro de sessões do bot atual (None antes de PomodoroManager ser construído)."""
+    return _registros.get(espaco_atual.get())
+
+
+class PomodoroManager:
+    """Handlers do Telegram para o Pomodoro; as sessões vêm do PomodoroSessionRegistry."""
 
-    def _get_config_menu_keyboard(self):
-        """Retorna o teclado inline para o menu de configuração do Pomodoro."""
-        try:
-            keyboard = [
-                [InlineKeyboardButton("Foco", callback_data="config_foco"),
-                 InlineKeyboardButton("Pausa Curta", callback_data="config_pausa_curta")],
-                [InlineKeyboardButton("Pausa Longa", callback_data="config_pausa_longa"),
-                 InlineKeyboardButton("Ciclos", callback_data="config_ciclos")],
-                [InlineKeyboardButton("⬅️ Voltar ao Pomodoro", callback_data="pomodoro_menu")],
-            ]
-            return InlineKeyboardMarkup(keyboard)
-        except Exception as e:
-            logger.error(f"Erro ao gerar teclado de configuração do Pomodoro para chat {self.chat_id}: {e}", exc_info=True)
-            return InlineKeyboardMarkup([])
+    # --- Conversation States for Pomodoro ---
+    POMODORO_MENU_STATE = 0
+    CONFIG_MENU_STATE = 1
+    SET_FOCUS_TIME_STATE = 2
+    SET_SHORT_BREAK_TIME_STATE = 3
+    SET_LONG_BREAK_TIME_STATE = 4
+    SET_CYCLES_STATE = 5
+
+    def __init__(self, application):
+        self.registro = PomodoroSessionRegistry(application)
+        self.registro.agendar_varredura()
+        _registros[espaco_atual.get()] = self.registro
 
     # --- Handlers de Callback do Pomodoro ---
 
     async def _show_pomodoro_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Exibe o menu principal do Pomodoro."""
-        logger.info(f"Exibindo menu Pomodoro para chat {update.effective_chat.id}.")
+        logger.info("Exibindo menu Pomodoro para chat %s.", update.effective_chat.id)
         try:
             query = update.callback_query
             if not query:
-                logger.warning(f"CallbackQuery nulo em _show_pomodoro_menu para update {update}.")
+                logger.warning("CallbackQuery nulo em _show_pomodoro_menu para update %s.", update)
                 if update.message:
                     await update.message.reply_text("Ops! Não consegui exibir o menu Pomodoro. Tente usar os botões. 😅")
                 return self.POMODORO_MENU_STATE
 
             await query.edit_message_text(
                 "Bem-vindo ao seu assistente Pomodoro! 🍅 Escolha uma ação e vamos ser produtivos! ✨",
-                reply_markup=self._get_pomodoro_menu_keyboard()
+                reply_markup=teclado_menu_pomodoro()
             )
-            logger.info(f"Menu Pomodoro exibido com sucesso para chat {update.effective_chat.id}.")
+            logger.info("Menu Pomodoro exibido com sucesso para chat %s.", update.effective_chat.id)
             return self.POMODORO_MENU_STATE
         except Exception as e:
-            logger.error(f"Erro em _show_pomodoro_menu para chat {update.effective_chat.id}: {e}", exc_info=True)
+            logger.error("Erro em _show_pomodoro_menu para chat %s: %s", update.effective_chat.id, e, exc_info=True)
             if query:
                 await query.answer("Ops! Não consegui exibir o menu Pomodoro. 😥")
                 await query.edit_message_text("Ocorreu um erro ao carregar o menu. Por favor, tente novamente mais tarde. 😭")
@@ -512,229 +714,189 @@ class Pomodoro:
 
     async def _pomodoro_iniciar_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler para o botão 'Iniciar'."""
-        logger.info(f"Callback 'pomodoro_iniciar' recebido para chat {update.effective_chat.id}.")
+        logger.info("Callback 'pomodoro_iniciar' recebido para chat %s.", update.effective_chat.id)
         try:
             query = update.callback_query
             if not query:
-                logger.warning(f"CallbackQuery nulo em _pomodoro_iniciar_callback para update {update}.")
+                logger.warning("CallbackQuery nulo em _pomodoro_iniciar_callback para update %s.", update)
                 return self.POMODORO_MENU_STATE # Não tem query para responder, tenta voltar ao estado
 
             await query.answer()
 
-            if 'pomodoro_instance' not in context.user_data:
-                logger.warning(f"Instância Pomodoro não encontrada em user_data ao iniciar para chat {update.effective_chat.id}. Criando nova.")
-                context.user_data['pomodoro_instance'] = Pomodoro(bot=context.bot, chat_id=update.effective_chat.id)
-                await query.edit_message_text(
-                    "Ops! Tive que reiniciar seu Pomodoro. Por favor, tente novamente a ação desejada. 🚀",
-                    reply_markup=self._get_pomodoro_menu_keyboard()
-                )
-                return self.POMODORO_MENU_STATE
-
-            pomodoro_instance = context.user_data['pomodoro_instance']
-            
-            # Garante que bot e chat_id estão atualizados na instância, caso haja uma nova sessão
-            pomodoro_instance.bot = context.bot
-            pomodoro_instance.chat_id = update.effective_chat.id
-            logger.debug(f"Instância Pomodoro atualizada com bot e chat_id para chat {update.effective_chat.id}.")
+            pomodoro_instance = self.registro.obter(update, context)
 
             response = await pomodoro_instance.iniciar()
+            self.registro.salvar(pomodoro_instance, context.chat_data)
             await query.edit_message_text(
                 response,
-                reply_markup=self._get_pomodoro_menu_keyboard(),
+                reply_markup=teclado_menu_pomodoro(),
                 parse_mode='Markdown'
             )
-            logger.info(f"Comando 'iniciar' processado com sucesso para chat {update.effective_chat.id}. Resposta: {response[:50]}...")
+            logger.info("Comando 'iniciar' processado com sucesso para chat %s. Resposta: %s...", update.effective_chat.id, response[:50])
             return self.POMODORO_MENU_STATE
         except Exception as e:
-            logger.error(f"Erro em _pomodoro_iniciar_callback para chat {update.effective_chat.id}: {e}", exc_info=True)
+            logger.error("Erro em _pomodoro_iniciar_callback para chat %s: %s", update.effective_chat.id, e, exc_info=True)
             if query:
                 await query.answer("Ops! Ocorreu um erro ao iniciar o Pomodoro. 😥")
-                await query.edit_message_text("Desculpe, não consegui iniciar o Pomodoro agora. Por favor, tente novamente. 😭", reply_markup=self._get_pomodoro_menu_keyboard())
+                await query.edit_message_text("Desculpe, não consegui iniciar o Pomodoro agora. Por favor, tente novamente. 😭", reply_markup=teclado_menu_pomodoro())
             return self.POMODORO_MENU_STATE
 
 
     async def _pomodoro_pausar_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler para o botão 'Pausar'."""
-        logger.info(f"Callback 'pomodoro_pausar' recebido para chat {update.effective_chat.id}.")
+        logger.info("Callback 'pomodoro_pausar' recebido para chat %s.", update.effective_chat.id)
         try:
             query = update.callback_query
             if not query:
-                logger.warning(f"CallbackQuery nulo em _pomodoro_pausar_callback para update {update}.")
+                logger.warning("CallbackQuery nulo em _pomodoro_pausar_callback para update %s.", update)
                 return self.POMODORO_MENU_STATE
 
             await query.answer()
 
-            if 'pomodoro_instance' not in context.user_data:
-                logger.warning(f"Instância Pomodoro não encontrada em user_data ao pausar para chat {update.effective_chat.id}. Criando nova.")
-                context.user_data['pomodoro_instance'] = Pomodoro(bot=context.bot, chat_id=update.effective_chat.id)
-                await query.edit_message_text(
-                    "Ops! Tive que reiniciar seu Pomodoro. Por favor, tente novamente a ação desejada. 🚀",
-                    reply_markup=self._get_pomodoro_menu_keyboard()
-                )
-                return self.POMODORO_MENU_STATE
-
-            pomodoro_instance = context.user_data['pomodoro_instance']
-            pomodoro_instance.bot = context.bot # Atualiza bot/chat_id também aqui
-            pomodoro_instance.chat_id = update.effective_chat.id
-            
+            pomodoro_instance = self.registro.obter(update, context)
             response = await pomodoro_instance.pausar()
-            await query.edit_message_text(response, reply_markup=self._get_pomodoro_menu_keyboard(), parse_mode='Markdown')
-            logger.info(f"Comando 'pausar' processado com sucesso para chat {update.effective_chat.id}. Resposta: {response[:50]}...")
+            self.registro.salvar(pomodoro_instance, context.chat_data)
+            await query.edit_message_text(response, reply_markup=teclado_menu_pomodoro(), parse_mode='Markdown')
+            logger.info("Comando 'pausar' processado com sucesso para chat %s. Resposta: %s...", update.effective_chat.id, response[:50])
             return self.POMODORO_MENU_STATE
         except Exception as e:
-            logger.error(f"Erro em _pomodoro_pausar_callback para chat {update.effective_chat.id}: {e}", exc_info=True)
+            logger.error("Erro em _pomodoro_pausar_callback para chat %s: %s", update.effective_chat.id, e, exc_info=True)
             if query:
                 await query.answer("Ops! Ocorreu um erro ao pausar o Pomodoro. 😥")
-                await query.edit_message_text("Desculpe, não consegui pausar o Pomodoro agora. Por favor, tente novamente. 😭", reply_markup=self._get_pomodoro_menu_keyboard())
+                await query.edit_message_text("Desculpe, não consegui pausar o Pomodoro agora. Por favor, tente novamente. 😭", reply_markup=teclado_menu_pomodoro())
             return self.POMODORO_MENU_STATE
 
     async def _pomodoro_parar_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler para o botão 'Parar' e exibição do relatório."""
-        logger.info(f"Callback 'pomodoro_parar' recebido para chat {update.effective_chat.id}.")
+        logger.info("Callback 'pomodoro_parar' recebido para chat %s.", update.effective_chat.id)
         try:
             query = update.callback_query
             if not query:
-                logger.warning(f"CallbackQuery nulo em _pomodoro_parar_callback para update {update}.")
+                logger.warning("CallbackQuery nulo em _pomodoro_parar_callback para update %s.", update)
                 return self.POMODORO_MENU_STATE
 
             await query.answer()
 
-            if 'pomodoro_instance' not in context.user_data:
-                logger.warning(f"Instância Pomodoro não encontrada em user_data ao parar para chat {update.effective_chat.id}. Criando nova.")
-                context.user_data['pomodoro_instance'] = Pomodoro(bot=context.bot, chat_id=update.effective_chat.id)
-                await query.edit_message_text(
-                    "Ops! Tive que reiniciar seu Pomodoro. Por favor, tente novamente a ação desejada. 🚀",
-                    reply_markup=self._get_pomodoro_menu_keyboard()
-                )
-                return self.POMODORO_MENU_STATE
-
-            pomodoro_instance = context.user_data['pomodoro_instance']
-            pomodoro_instance.bot = context.bot # Atualiza bot/chat_id também aqui
-            pomodoro_instance.chat_id = update.effective_chat.id
-            
+            pomodoro_instance = self.registro.obter(update, context)
             response = await pomodoro_instance.parar()
-            await query.edit_message_text(response, parse_mode='Markdown', reply_markup=self._get_pomodoro_menu_keyboard())
-            logger.info(f"Comando 'parar' processado com sucesso para chat {update.effective_chat.id}. Resposta: {response[:50]}...")
+            self.registro.salvar(pomodoro_instance, context.chat_data)
+            await query.edit_message_text(response, parse_mode='Markdown', reply_markup=teclado_menu_pomodoro())
+            logger.info("Comando 'parar' processado com sucesso para chat %s. Resposta: %s...", update.effective_chat.id, response[:50])
             return self.POMODORO_MENU_STATE
         except Exception as e:
-            logger.error(f"Erro em _pomodoro_parar_callback para chat {update.effective_chat.id}: {e}", exc_info=True)
+            logger.error("Erro em _pomodoro_parar_callback para chat %s: %s", update.effective_chat.id, e, exc_info=True)
             if query:
                 await query.answer("Ops! Ocorreu um erro ao parar o Pomodoro. 😥")
-                await query.edit_message_text("Desculpe, não consegui parar o Pomodoro agora. Por favor, tente novamente. 😭", reply_markup=self._get_pomodoro_menu_keyboard())
+                await query.edit_message_text("Desculpe, não consegui parar o Pomodoro agora. Por favor, tente novamente. 😭", reply_markup=teclado_menu_pomodoro())
             return self.POMODORO_MENU_STATE
 
     async def _pomodoro_status_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler para o botão 'Status'. Atualiza com contagem regressiva em tempo real."""
-        logger.info(f"Callback 'pomodoro_status' recebido para chat {update.effective_chat.id}.")
+        logger.info("Callback 'pomodoro_status' recebido para chat %s.", update.effective_chat.id)
         try:
             query = update.callback_query
             if not query:
-                logger.warning(f"CallbackQuery nulo em _pomodoro_status_callback para update {update}.")
+                logger.warning("CallbackQuery nulo em _pomodoro_status_callback para update %s.", update)
                 return self.POMODORO_MENU_STATE
 
             await query.answer("Atualizando status...")
             
-            if 'pomodoro_instance' not in context.user_data:
-                logger.warning(f"Instância Pomodoro não encontrada em user_data ao verificar status para chat {update.effective_chat.id}. Criando nova.")
-                context.user_data['pomodoro_instance'] = Pomodoro(bot=context.bot, chat_id=update.effective_chat.id)
-                await query.edit_message_text(
-                    "Ops! Tive que reiniciar seu Pomodoro. Por favor, tente novamente a ação desejada. 🚀",
-                    reply_markup=self._get_pomodoro_menu_keyboard()
-                )
-                return self.POMODORO_MENU_STATE
-
-            pomodoro_instance = context.user_data['pomodoro_instance']
-            pomodoro_instance.bot = context.bot # Atualiza bot/chat_id também aqui
-            pomodoro_instance.chat_id = update.effective_chat.id
-            
+            pomodoro_instance = self.registro.obter(update, context)
             response = pomodoro_instance.status()
             try:
                 message = await query.edit_message_text(
                     response,
-                    reply_markup=pomodoro_instance._get_pomodoro_menu_keyboard(),
+                    reply_markup=teclado_menu_pomodoro(),
                     parse_mode='Markdown'
                 )
                 # Ao clicar em "Status", queremos que esta seja a mensagem que o timer vai atualizar.
                 pomodoro_instance._current_status_message_id = message.message_id
-                logger.info(f"Status do Pomodoro exibido/atualizado para chat {update.effective_chat.id}. Mensagem ID: {message.message_id}")
+                logger.info("Status do Pomodoro exibido/atualizado para chat %s. Mensagem ID: %s", update.effective_chat.id, message.message_id)
             except Exception as e:
                 error_str = str(e).lower()
                 if "message is not modified" not in error_str:
-                    logger.warning(f"Não conseguiu editar a mensagem de status para chat {update.effective_chat.id}. Tentando enviar nova: {e}", exc_info=True)
+                    logger.warning("Não conseguiu editar a mensagem de status para chat %s. Tentando enviar nova: %s", update.effective_chat.id, e, exc_info=True)
                     new_message = await query.message.reply_text( # Usa query.message.reply_text
                         "Não consegui atualizar a mensagem anterior. Aqui está o novo status:\n" + response,
-                        reply_markup=pomodoro_instance._get_pomodoro_menu_keyboard(),
+                        reply_markup=teclado_menu_pomodoro(),
                         parse_mode='Markdown'
                     )
                     pomodoro_instance._current_status_message_id = new_message.message_id
-                    logger.info(f"Nova mensagem de status enviada após falha na edição para chat {update.effective_chat.id}. ID: {new_message.message_id}")
+                    logger.info("Nova mensagem de status enviada após falha na edição para chat %s. ID: %s", update.effective_chat.id, new_message.message_id)
                 else:
-                    logger.debug(f"Mensagem de status não modificada, ignorado para chat {update.effective_chat.id}.")
+                    logger.debug("Mensagem de status não modificada, ignorado para chat %s.", update.effective_chat.id)
+            self.registro.salvar(pomodoro_instance, context.chat_data)
             return self.POMODORO_MENU_STATE
         except Exception as e:
-            logger.error(f"Erro em _pomodoro_status_callback para chat {update.effective_chat.id}: {e}", exc_info=True)
+            logger.error("Erro em _pomodoro_status_callback para chat %s: %s", update.effective_chat.id, e, exc_info=True)
             if query:
                 await query.answer("Ops! Ocorreu um erro ao obter o status do Pomodoro. 😥")
-                await query.edit_message_text("Desculpe, não consegui obter o status agora. Por favor, tente novamente. 😭", reply_markup=self._get_pomodoro_menu_keyboard())
+                await query.edit_message_text("Desculpe, não consegui obter o status agora. Por favor, tente novamente. 😭", reply_markup=teclado_menu_pomodoro())
             return self.POMODORO_MENU_STATE
 
 
     async def _show_config_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler para o botão 'Configurar', mostrando o menu de configuração."""
-        logger.info(f"Callback 'pomodoro_configurar' recebido para chat {update.effective_chat.id}.")
+        logger.info("Callback 'pomodoro_configurar' recebido para chat %s.", update.effective_chat.id)
         try:
             query = update.callback_query
             if not query:
-                logger.warning(f"CallbackQuery nulo em _show_config_menu para update {update}.")
+                logger.warning("CallbackQuery nulo em _show_config_menu para update %s.", update)
                 return self.CONFIG_MENU_STATE
 
             await query.answer()
 
-            if 'pomodoro_instance' not in context.user_data:
-                logger.warning(f"Instância Pomodoro não encontrada em user_data ao configurar para chat {update.effective_chat.id}. Criando nova.")
-                context.user_data['pomodoro_instance'] = Pomodoro(bot=context.bot, chat_id=update.effective_chat.id)
-                await query.edit_message_text(
-                    "Ops! Tive que reiniciar seu Pomodoro. Por favor, tente novamente a ação desejada. 🚀",
-                    reply_markup=self._get_pomodoro_menu_keyboard()
-                )
-                return self.POMODORO_MENU_STATE
-
-            pomodoro_instance = context.user_data['pomodoro_instance']
-            pomodoro_instance.bot = context.bot # Atualiza bot/chat_id também aqui
-            pomodoro_instance.chat_id = update.effective_chat.id
+            pomodoro_instance = self.registro.obter(update, context)
 
             current_config = pomodoro_instance.get_config_status()
             await query.edit_message_text(
                 f"⚙️ Configurar Pomodoro:\n{current_config}\n\nEscolha o que deseja alterar: ✨",
-                reply_markup=self._get_config_menu_keyboard(), parse_mode='Markdown'
+                reply_markup=teclado_config_pomodoro(), parse_mode='Markdown'
             )
-            logger.info(f"Menu de configuração Pomodoro exibido para chat {update.effective_chat.id}.")
+            logger.info("Menu de configuração Pomodoro exibido para chat %s.", update.effective_chat.id)
             return self.CONFIG_MENU_STATE
         except Exception as e:
-            logger.error(f"Erro em _show_config_menu para chat {update.effective_chat.id}: {e}", exc_info=True)
+            logger.error("Erro em _show_config_menu para chat %s: %s", update.effective_chat.id, e, exc_info=True)
             if query:
                 await query.answer("Ops! Ocorreu um erro ao abrir as configurações. 😥")
-                await query.edit_message_text("Desculpe, não consegui abrir as configurações agora. Por favor, tente novamente. 😭", reply_markup=self._get_pomodoro_menu_keyboard())
+                await query.edit_message_text("Desculpe, não consegui abrir as configurações agora. Por favor, tente novamente. 😭", reply_markup=teclado_menu_pomodoro())
             return self.POMODORO_MENU_STATE
 
 
+    async def _alternar_som_transicao(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Botão '🔔 Som na troca de fase': alterna entre troca de fase com som e silenciosa."""
+        query = update.callback_query
+        try:
+            pomodoro_instance = self.registro.obter(update, context)
+            pomodoro_instance.transicao_silenciosa = not pomodoro_instance.transicao_silenciosa
+            self.registro.salvar(pomodoro_instance, context.chat_data)
+            logger.info("Troca de fase %s para chat %s.", 'silenciosa' if pomodoro_instance.transicao_silenciosa else 'com som', update.effective_chat.id)
+            return await self._show_config_menu(update, context)
+        except Exception as e:
+            logger.error("Erro em _alternar_som_transicao para chat %s: %s", update.effective_chat.id, e, exc_info=True)
+            if query:
+                await query.answer("Ops! Ocorreu um erro ao alterar o som da troca de fase. 😥")
+                await query.edit_message_text("Desculpe, não consegui alterar o som agora. Por favor, tente novamente. 😭", reply_markup=teclado_config_pomodoro())
+            return self.CONFIG_MENU_STATE
+
+
     async def _request_config_value(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Solicita ao usuário que envie o novo valor para a configuração selecionada."""
-        logger.info(f"Callback para solicitar valor de configuração para chat {update.effective_chat.id}.")
+        logger.info("Callback para solicitar valor de configuração para chat %s.", update.effective_chat.id)
         try:
             query = update.callback_query
-            if not query or not query.data:
-                logger.warning(f"CallbackQuery ou query.data nulo em _request_config_value para update {update}.")
+            if not query or not context.args:
+                logger.warning("CallbackQuery ou argumento nulo em _request_config_value para update %s.", update)
                 return self.CONFIG_MENU_STATE
 
             await query.answer()
-            config_type = query.data.replace("config_", "")
+            config_type = context.args[0] # callback "pomodoro_config:<tipo>"
             context.user_data['config_type'] = config_type
             
             prompt_text = (f"Por favor, envie o novo valor (número inteiro em minutos) "
                             f"para '{config_type.replace('_', ' ').capitalize()}': 🔢")
             await query.edit_message_text(prompt_text)
-            logger.info(f"Solicitação de valor para '{config_type}' enviada para chat {update.effective_chat.id}.")
+            logger.info("Solicitação de valor para '%s' enviada para chat %s.", config_type, update.effective_chat.id)
             
             # Retorna o estado apropriado para aguardar a entrada do usuário
             state_map = {
@@ -745,99 +907,140 @@ class Pomodoro:
             }
             return state_map.get(config_type, self.CONFIG_MENU_STATE) # Fallback para CONFIG_MENU_STATE
         except Exception as e:
-            logger.error(f"Erro em _request_config_value para chat {update.effective_chat.id}: {e}", exc_info=True)
+            logger.error("Erro em _request_config_value para chat %s: %s", update.effective_chat.id, e, exc_info=True)
             if query:
                 await query.answer("Ops! Ocorreu um erro ao solicitar a configuração. 😥")
-                await query.edit_message_text("Desculpe, não consegui pedir a configuração agora. Tente novamente. 😭", reply_markup=self._get_config_menu_keyboard())
+                await query.edit_message_text("Desculpe, não consegui pedir a configuração agora. Tente novamente. 😭", reply_markup=teclado_config_pomodoro())
             return self.CONFIG_MENU_STATE
 
     async def _set_config_value(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Recebe o valor de configuração digitado pelo usuário e o aplica."""
-        logger.info(f"Recebendo valor de configuração para chat {update.effective_chat.id}.")
+        logger.info("Recebendo valor de configuração para chat %s.", update.effective_chat.id)
         config_type = context.user_data.get('config_type')
         
         if not config_type:
-            logger.warning(f"config_type não encontrado em user_data para chat {update.effective_chat.id}.")
+            logger.warning("config_type não encontrado em user_data para chat %s.", update.effective_chat.id)
             if update.message:
-                await update.message.reply_text("Ops! O tipo de configuração não foi encontrado. Tente novamente! 🤔", reply_markup=self._get_pomodoro_menu_keyboard())
+                await update.message.reply_text("Ops! O tipo de configuração não foi encontrado. Tente novamente! 🤔", reply_markup=teclado_menu_pomodoro())
             return self.POMODORO_MENU_STATE
 
         try:
             if not update.message or not update.message.text:
-                logger.warning(f"Mensagem ou texto da mensagem nulo em _set_config_value para update {update}.")
+                logger.warning("Mensagem ou texto da mensagem nulo em _set_config_value para update %s.", update)
                 if update.message:
-                    await update.message.reply_text("Por favor, envie um número. 🔢", reply_markup=self._get_config_menu_keyboard())
+                    await update.message.reply_text("Por favor, envie um número. 🔢", reply_markup=teclado_config_pomodoro())
                 return self.CONFIG_MENU_STATE
 
             value = int(update.message.text)
-            if 'pomodoro_instance' not in context.user_data:
-                logger.warning(f"Instância Pomodoro não encontrada em user_data ao definir config para chat {update.effective_chat.id}. Criando nova.")
-                context.user_data['pomodoro_instance'] = Pomodoro(bot=context.bot, chat_id=update.effective_chat.id)
-                await update.message.reply_text(
-                    "Ops! Tive que reiniciar seu Pomodoro. Por favor, tente novamente a ação desejada. 🚀",
-                    reply_markup=self._get_pomodoro_menu_keyboard()
-                )
-                return self.POMODORO_MENU_STATE
-
-            pomodoro_instance = context.user_data['pomodoro_instance']
-            pomodoro_instance.bot = context.bot # Atualiza bot/chat_id também aqui
-            pomodoro_instance.chat_id = update.effective_chat.id
+            pomodoro_instance = self.registro.obter(update, context)
 
             success, message = await pomodoro_instance.configurar(config_type, value)
             if success:
-                await update.message.reply_text(message, reply_markup=self._get_config_menu_keyboard(), parse_mode='Markdown')
-                logger.info(f"Configuração '{config_type}' definida para {value} para chat {update.effective_chat.id}.")
+                self.registro.salvar(pomodoro_instance, context.chat_data)
+                await update.message.reply_text(message, reply_markup=teclado_config_pomodoro(), parse_mode='Markdown')
+                logger.info("Configuração '%s' definida para %s para chat %s.", config_type, value, update.effective_chat.id)
             else:
-                await update.message.reply_text(message, reply_markup=self._get_config_menu_keyboard())
-                logger.warning(f"Falha na configuração '{config_type}' com valor {value} para chat {update.effective_chat.id}. Mensagem: {message}")
+                await update.message.reply_text(message, reply_markup=teclado_config_pomodoro())
+                logger.warning("Falha na configuração '%s' com valor %s para chat %s. Mensagem: %s", config_type, value, update.effective_chat.id, message)
         except ValueError:
-            logger.warning(f"Valor de configuração não numérico recebido ('{update.message.text}') para chat {update.effective_chat.id}.")
-            await update.message.reply_text("Isso não parece um número válido! Por favor, envie um número inteiro. 🔢", reply_markup=self._get_config_menu_keyboard())
+            logger.warning("Valor de configuração não numérico recebido ('%s') para chat %s.", update.message.text, update.effective_chat.id)
+            await update.message.reply_text("Isso não parece um número válido! Por favor, envie um número inteiro. 🔢", reply_markup=teclado_config_pomodoro())
         except Exception as e:
-            logger.error(f"Erro em _set_config_value para chat {update.effective_chat.id}: {e}", exc_info=True)
+            logger.error("Erro em _set_config_value para chat %s: %s", update.effective_chat.id, e, exc_info=True)
             if update.message:
-                await update.message.reply_text(f"Ocorreu um erro ao configurar: {e}. Por favor, tente novamente! 😥", reply_markup=self._get_config_menu_keyboard())
+                await update.message.reply_text(f"Ocorreu um erro ao configurar: {e}. Por favor, tente novamente! 😥", reply_markup=teclado_config_pomodoro())
         
         # Limpa o tipo de configuração após o uso
         if 'config_type' in context.user_data:
             del context.user_data['config_type']
-            logger.debug(f"config_type limpo do user_data para chat {update.effective_chat.id}.")
+            logger.debug("config_type limpo do user_data para chat %s.", update.effective_chat.id)
         
         return self.CONFIG_MENU_STATE
 
     async def _exit_pomodoro_conversation(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler para o botão 'Voltar ao Início'."""
-        logger.info(f"Callback 'main_menu_return' recebido para chat {update.effective_chat.id}. Saindo do Pomodoro.")
+        logger.info("Callback 'main_menu_return' recebido para chat %s. Saindo do Pomodoro.", update.effective_chat.id)
         try:
             query = update.callback_query
             if not query:
-                logger.warning(f"CallbackQuery nulo em _exit_pomodoro_conversation para update {update}.")
+                logger.warning("CallbackQuery nulo em _exit_pomodoro_conversation para update %s.", update)
                 return ConversationHandler.END # Tenta encerrar mesmo sem query
 
             await query.answer("Saindo do Pomodoro. Voltando ao menu principal! 👋")
             
-            if 'pomodoro_instance' in context.user_data:
-                pomodoro_instance = context.user_data['pomodoro_instance']
-                if pomodoro_instance._timer_task and not pomodoro_instance._timer_task.done():
+            pomodoro_instance = self.registro.existente(update.effective_chat.id)
+            if pomodoro_instance is not None:
+                if pomodoro_instance.timer_ativo():
                     pomodoro_instance._timer_task.cancel()
                     try:
                         await pomodoro_instance._timer_task
                     except asyncio.CancelledError:
-                        logger.info(f"Tarefa do temporizador cancelada ao sair para chat {update.effective_chat.id}.")
+                        logger.info("Tarefa do temporizador cancelada ao sair para chat %s.", update.effective_chat.id)
                     except Exception as e:
-                        logger.error(f"Erro inesperado ao aguardar cancelamento da tarefa ao sair para chat {update.effective_chat.id}: {e}", exc_info=True)
+                        logger.error("Erro inesperado ao aguardar cancelamento da tarefa ao sair para chat %s: %s", update.effective_chat.id, e, exc_info=True)
                     pomodoro_instance._timer_task = None
                 pomodoro_instance._current_status_message_id = None
-                logger.info(f"Instância Pomodoro limpa ao sair para chat {update.effective_chat.id}.")
+                self.registro.salvar(pomodoro_instance, context.chat_data)
+                logger.info("Instância Pomodoro limpa ao sair para chat %s.", update.effective_chat.id)
             return ConversationHandler.END
         except Exception as e:
-            logger.error(f"Erro em _exit_pomodoro_conversation para chat {update.effective_chat.id}: {e}", exc_info=True)
+            logger.error("Erro em _exit_pomodoro_conversation para chat %s: %s", update.effective_chat.id, e, exc_info=True)
             if query:
                 await query.answer("Ops! Ocorreu um erro ao sair do Pomodoro. 😥")
                 await query.edit_message_text("Desculpe, não consegui voltar ao menu principal agora. Tente novamente. 😭")
             return ConversationHandler.END
 
 
+    # --- Comandos diretos: uma mensagem, uma resposta, sem passar pelos menus ---
+
+    async def comando_foco(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """/foco [foco] [pausa curta] [pausa longa] [ciclos]: configura e inicia (ou retoma) o Pomodoro."""
+        chat_id = update.effective_chat.id
+        args = context.args or []
+        if len(args) > len(CONFIGS_COMANDO_FOCO) or not all(arg.isdigit() and int(arg) > 0 for arg in args):
+            await update.message.reply_text(USO_FOCO)
+            return
+        try:
+            sessao = self.registro.obter(update, context)
+            if sessao.timer_ativo():
+                await update.message.reply_text("O Pomodoro já está rodando! Mantenha o foco. 🎯 Use /pausa para pausar.")
+                return
+            for tipo_config, valor in zip(CONFIGS_COMANDO_FOCO, args):
+                sucesso, mensagem = await sessao.configurar(tipo_config, int(valor))
+                if not sucesso:
+                    await update.message.reply_text(mensagem)
+                    return
+            # A mensagem de status do iniciar() é a resposta: sempre nova, logo abaixo do comando
+            sessao._current_status_message_id = None
+            resposta = await sessao.iniciar(aviso=sessao.get_config_status() if args else "")
+            self.registro.salvar(sessao, context.chat_data)
+            if not sessao.timer_ativo():
+                await update.message.reply_text(resposta)
+            logger.info("/foco processado para chat %s com %s.", chat_id, args)
+        except Exception as e:
+            logger.error("Erro em comando_foco para chat %s: %s", chat_id, e, exc_info=True)
+            await update.message.reply_text("Desculpe, não consegui iniciar o Pomodoro agora. Por favor, tente novamente. 😭")
+
+    async def comando_pausa(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """/pausa: pausa o Pomodoro em andamento (/foco retoma)."""
+        chat_id = update.effective_chat.id
+        try:
+            sessao = self.registro.obter(update, context)
+            resposta = await sessao.pausar()
+            self.registro.salvar(sessao, context.chat_data)
+            await update.message.reply_text(resposta, reply_markup=teclado_menu_pomodoro())
+            logger.info("/pausa processado para chat %s.", chat_id)
+        except Exception as e:
+            logger.error("Erro em comando_pausa para chat %s: %s", chat_id, e, exc_info=True)
+            await update.message.reply_text("Desculpe, não consegui pausar o Pomodoro agora. Por favor, tente novamente. 😭")
+
+    def get_comandos_handlers(self) -> list:
+        """Handlers de /foco e /pausa."""
+        return [
+            CommandHandler("foco", self.comando_foco),
+            CommandHandler("pausa", self.comando_pausa),
+        ]
+
     # --- Método para Obter o ConversationHandler do Pomodoro ---
 
     def get_pomodoro_conversation_handler(self):
@@ -847,23 +1050,26 @@ class Pomodoro:
         """
         logger.info("Configurando ConversationHandler para Pomodoro.")
         try:
+            rotas_menu = {
+                "pomodoro_iniciar": self._pomodoro_iniciar_callback,
+                "pomodoro_pausar": self._pomodoro_pausar_callback,
+                "pomodoro_parar": self._pomodoro_parar_callback,
+                "pomodoro_status": self._pomodoro_status_callback,
+                "pomodoro_configurar": self._show_config_menu,
+                "pomodoro_menu": self._show_pomodoro_menu, # 'Voltar ao Pomodoro' do menu de config
+            }
             return ConversationHandler(
-                entry_points=[CallbackQueryHandler(self._show_pomodoro_menu, pattern="^open_pomodoro_menu$")],
+                # Os botões do menu também abrem a conversa: as respostas de /foco e /pausa (e as
+                # mensagens de status do temporizador) trazem o teclado do menu fora dela
+                entry_points=[RoteadorCallbacks({"open_pomodoro_menu": self._show_pomodoro_menu, **rotas_menu})],
                 states={
-                    self.POMODORO_MENU_STATE: [
-                        CallbackQueryHandler(self._pomodoro_iniciar_callback, pattern="^pomodoro_iniciar$"),
-                        CallbackQueryHandler(self._pomodoro_pausar_callback, pattern="^pomodoro_pausar$"),
-                        CallbackQueryHandler(self._pomodoro_parar_callback, pattern="^pomodoro_parar$"),
-                        CallbackQueryHandler(self._pomodoro_status_callback, pattern="^pomodoro_status$"),
-                        CallbackQueryHandler(self._show_config_menu, pattern="^pomodoro_configurar$"),
-                        CallbackQueryHandler(self._show_pomodoro_menu, pattern="^pomodoro_menu$"), # Adicionado para 'Voltar ao Pomodoro' do menu de config
-                    ],
+                    self.POMODORO_MENU_STATE: [RoteadorCallbacks(rotas_menu)],
                     self.CONFIG_MENU_STATE: [
-                        CallbackQueryHandler(self._request_config_value, pattern="^config_foco$"),
-                        CallbackQueryHandler(self._request_config_value, pattern="^config_pausa_curta$"),
-                        CallbackQueryHandler(self._request_config_value, pattern="^config_pausa_longa$"),
-                        CallbackQueryHandler(self._request_config_value, pattern="^config_ciclos$"),
-                        CallbackQueryHandler(self._show_pomodoro_menu, pattern="^pomodoro_menu$"),
+                        RoteadorCallbacks({
+                            "pomodoro_config": self._request_config_value,
+                            "pomodoro_aviso": self._alternar_som_transicao,
+                            "pomodoro_menu": self._show_pomodoro_menu,
+                        }),
                     ],
                     self.SET_FOCUS_TIME_STATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, self._set_config_value)],
                     self.SET_SHORT_BREAK_TIME_STATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, self._set_config_value)],
@@ -871,7 +1077,7 @@ class Pomodoro:
                     self.SET_CYCLES_STATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, self._set_config_value)],
                 },
                 fallbacks=[
-                    CallbackQueryHandler(self._exit_pomodoro_conversation, pattern="^main_menu_return$"),
+                    RoteadorCallbacks({"main_menu_return": self._exit_pomodoro_conversation}),
                     MessageHandler(filters.COMMAND | filters.TEXT, self._show_pomodoro_menu) # Fallback para qualquer comando/texto não mapeado
                 ],
                 map_to_parent={
@@ -879,9 +1085,9 @@ class Pomodoro:
                 }
             )
         except Exception as e:
-            logger.critical(f"Erro CRÍTICO ao configurar ConversationHandler do Pomodoro: {e}", exc_info=True)
+            logger.critical("Erro CRÍTICO ao configurar ConversationHandler do Pomodoro: %s", e, exc_info=True)
             # Retorna um ConversationHandler mínimo para não travar o bot principal
             return ConversationHandler(
-                entry_points=[CallbackQueryHandler(self._show_pomodoro_menu, pattern="^open_pomodoro_menu$")],
-                states={}, fallbacks=[CallbackQueryHandler(self._exit_pomodoro_conversation, pattern="^main_menu_return$")]
+                entry_points=[RoteadorCallbacks({"open_pomodoro_menu": self._show_pomodoro_menu})],
+                states={}, fallbacks=[RoteadorCallbacks({"main_menu_return": self._exit_pomodoro_conversation})]
             )
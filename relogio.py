@@ -0,0 +1,104 @@
+"""
+Fonte de tempo dos lembretes de rotina e do temporizador do Pomodoro.
+
+Em produção é o relógio do sistema (datetime.now, time.monotonic, asyncio.sleep). Uma
+simulação troca por um RelogioVirtual com `usar_relogio()`: o tempo só anda quando ela chama
+`avancar_ate()`, que acorda na ordem certa quem está em `dormir()`. Assim uma semana de
+rotinas ou uma sequência de Pomodoros de horas roda em segundos, com os instantes exatos
+(ver benchmarks/simulacao_semana.py, que também dispara os jobs do APScheduler pelos triggers
+no tempo virtual).
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime, timedelta
+
+
+class RelogioReal:
+    """O relógio do sistema."""
+
+    __slots__ = ()
+
+    def agora(self) -> datetime:
+        """Data e hora locais (as mesmas do APScheduler)."""
+        return datetime.now()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    async def dormir(self, segundos: float) -> None:
+        await asyncio.sleep(segundos)
+
+
+class RelogioVirtual:
+    """Relógio que só anda com avancar_ate(). `agora()` parte de `inicio` (hora local, sem fuso)."""
+
+    # Voltas do loop de eventos depois de acordar quem dormia: o suficiente para as tarefas
+    # acordadas (e as que elas criam) rodarem até o próximo dormir(), sem I/O de verdade
+    VOLTAS_DO_LOOP = 5
+
+    def __init__(self, inicio: datetime):
+        self.inicio = inicio
+        self._segundos = 0.0
+        self._dormindo = []  # heap de (instante, sequência, future)
+        self._sequencia = itertools.count()
+        self.despertares = 0
+
+    def agora(self) -> datetime:
+        return self.inicio + timedelta(seconds=self._segundos)
+
+    def monotonic(self) -> float:
+        return self._segundos
+
+    async def dormir(self, segundos: float) -> None:
+        if segundos <= 0:
+            await asyncio.sleep(0)
+            return
+        futuro = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._dormindo, (self._segundos + segundos, next(self._sequencia), futuro))
+        await futuro
+
+    def proximo_despertar(self):
+        """Instante (datetime) do próximo dormir() a terminar, ou None."""
+        return self.inicio + timedelta(seconds=self._dormindo[0][0]) if self._dormindo else None
+
+    async def avancar_ate(self, alvo: datetime) -> None:
+        """Anda até `alvo`, acordando em ordem, instante por instante, quem dorme até lá."""
+        limite = (alvo - self.inicio).total_seconds()
+        while self._dormindo and self._dormindo[0][0] <= limite:
+            instante = self._dormindo[0][0]
+            self._segundos = instante
+            while self._dormindo and self._dormindo[0][0] == instante:
+                futuro = heapq.heappop(self._dormindo)[2]
+                if not futuro.done():
+                    futuro.set_result(None)
+                    self.despertares += 1
+            for _ in range(self.VOLTAS_DO_LOOP):
+                await asyncio.sleep(0)
+        self._segundos = max(self._segundos, limite)
+
+
+_relogio = RelogioReal()
+
+
+def usar_relogio(relogio) -> None:
+    """Troca a fonte de tempo do processo (RelogioVirtual nas simulações)."""
+    global _relogio
+    _relogio = relogio
+
+
+def get_relogio():
+    return _relogio
+
+
+def agora() -> datetime:
+    return _relogio.agora()
+
+
+def monotonic() -> float:
+    return _relogio.monotonic()
+
+
+async def dormir(segundos: float) -> None:
+    await _relogio.dormir(segundos)
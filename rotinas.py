@@ -0,0 +1,506 @@
+"""
+Representação compacta das rotinas semanais em memória.
+
+Cada tarefa é um `TarefaRotina` com __slots__: horários em minutos desde a meia-noite,
+dia da semana como inteiro (0 = Segunda-feira), tipo como IntEnum, id guardado como inteiro
+e descrição internada. A duração é calculada quando pedida. As rotinas de um usuário são uma
+lista única ordenada por dia, e o dicionário global é indexado pelo chat_id inteiro.
+
+O JSON continua no formato antigo (dia por extenso, "HH:MM", `duracao` como texto):
+`tarefas_de_json`/`tarefas_para_json` fazem a conversão na leitura e na gravação.
+
+`RotinasRepositorio` guarda as rotinas por usuário num SQLite e mantém em memória só um
+cache LRU limitado pelo número de tarefas: o uso de memória depende do tamanho do cache,
+não da quantidade de usuários. Para levar o banco inteiro de um lugar para outro há o snapshot
+binário (snapshot.py): `exportar_snapshot` / `importar_snapshot`.
+"""
+import asyncio
+import json
+import re
+import sqlite3
+import sys
+import threading
+import uuid
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from enum import IntEnum
+from itertools import chain, groupby
+from operator import attrgetter, itemgetter
+
+DIAS_DA_SEMANA_ORDEM = [
+    "Segunda-feira", "Terça-feira", "Quarta-feira", "Quinta-feira",
+    "Sexta-feira", "Sábado", "Domingo"
+]
+_INDICE_DIA = {nome: i for i, nome in enumerate(DIAS_DA_SEMANA_ORDEM)}
+_ID_HEX = re.compile(r"[0-9a-f]{32}")
+
+MINUTOS_POR_DIA = 24 * 60
+MINUTOS_POR_SEMANA = 7 * MINUTOS_POR_DIA
+
+
+class TipoTarefa(IntEnum):
+    HORARIO_FIXO = 0
+    PERIODO_LIVRE = 1
+    PERIODO_GERAL = 2
+    DESCRICAO_SIMPLES = 3
+
+    @property
+    def nome(self) -> str:
+        """Nome usado no JSON e nos dicts antigos ("horario_fixo", ...)."""
+        return _NOME_POR_TIPO[self]
+
+    @classmethod
+    def de_nome(cls, nome: str) -> "TipoTarefa":
+        return _TIPO_POR_NOME.get(nome, cls.DESCRICAO_SIMPLES)
+
+
+_NOME_POR_TIPO = {
+    TipoTarefa.HORARIO_FIXO: "horario_fixo",
+    TipoTarefa.PERIODO_LIVRE: "periodo_livre",
+    TipoTarefa.PERIODO_GERAL: "periodo_geral",
+    TipoTarefa.DESCRICAO_SIMPLES: "descricao_simples",
+}
+_TIPO_POR_NOME = {nome: tipo for tipo, nome in _NOME_POR_TIPO.items()}
+
+
+# --- Horários e duração ---
+
+def horario_para_minutos(horario):
+    """'HH:MM' (ou 'HHhMM') -> minutos desde a meia-noite. Retorna None se ausente ou inválido."""
+    if not horario:
+        return None
+    try:
+        hora, minuto = horario.replace('h', ':').split(':')
+        hora, minuto = int(hora), int(minuto)
+    except ValueError:
+        return None
+    if not (0 <= hora < 24 and 0 <= minuto < 60):
+        return None
+    return hora * 60 + minuto
+
+
+def minutos_para_horario(minutos):
+    """Minutos desde a meia-noite -> 'HH:MM' (None continua None)."""
+    if minutos is None:
+        return None
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def minuto_da_semana(dia: int, minutos: int) -> int:
+    """Dia (0 = Segunda-feira) e minutos desde a meia-noite -> minutos desde segunda 00:00."""
+    return dia * MINUTOS_POR_DIA + minutos
+
+
+def formatar_duracao(minutos: int) -> str:
+    """Mesmo formato que o parser sempre gravou: '45m' ou '1h 30m'."""
+    return f"{minutos // 60}h {minutos % 60}m" if minutos >= 60 else f"{minutos}m"
+
+
+def _compactar_id(tarefa_id: str):
+    # uuid4().hex ocupa 81 bytes como str e 44 como int; ids em outro formato ficam como estão
+    return int(tarefa_id, 16) if _ID_HEX.fullmatch(tarefa_id) else sys.intern(tarefa_id)
+
+
+class TarefaRotina:
+    """
+    Uma tarefa da rotina semanal. Imutável depois de criada (é compartilhada com os índices), com
+    exceção da marca `importante`, que só decide quais lembretes continuam no modo resumo diário.
+    """
+
+    __slots__ = ('_id', 'dia', 'tipo', 'inicio', 'fim', 'descricao', 'periodo', 'importante')
+
+    def __init__(self, dia: int, tipo: TipoTarefa, descricao: str, inicio=None, fim=None,
+                 periodo=None, tarefa_id=None, importante: bool = False):
+        self._id = _compactar_id(tarefa_id or uuid.uuid4().hex)
+        self.dia = dia
+        self.tipo = tipo
+        # Para PERIODO_LIVRE, inicio/fim guardam o horário sugerido (inicio_sugerido/fim_sugerido no JSON)
+        self.inicio = inicio
+        self.fim = fim
+        self.descricao = sys.intern(descricao)
+        self.periodo = sys.intern(periodo) if periodo else None
+        self.importante = importante
+
+    @property
+    def id(self) -> str:
+        return f"{self._id:032x}" if isinstance(self._id, int) else self._id
+
+    @property
+    def dia_nome(self) -> str:
+        return DIAS_DA_SEMANA_ORDEM[self.dia]
+
+    @property
+    def inicio_str(self):
+        return minutos_para_horario(self.inicio)
+
+    @property
+    def fim_str(self):
+        return minutos_para_horario(self.fim)
+
+    @property
+    def duracao_minutos(self):
+        """Duração em minutos (atravessando a meia-noite se preciso), ou None sem início e fim."""
+        if self.inicio is None or self.fim is None:
+            return None
+        return (self.fim - self.inicio) % MINUTOS_POR_DIA
+
+    @property
+    def duracao(self):
+        """Duração formatada ('1h 30m'), ou None quando não se aplica."""
+        minutos = self.duracao_minutos
+        return formatar_duracao(minutos) if minutos is not None else None
+
+    def chave_duplicata(self) -> tuple:
+        """Identifica tarefas iguais (ignorando o id) ao colar a mesma rotina de novo."""
+        return (self.dia, self.tipo, self.inicio, self.fim, self.descricao)
+
+    def to_dict(self) -> dict:
+        """Dict no formato do JSON (e dos handlers antigos)."""
+        tipo = self.tipo
+        dados = {"id": self.id, "tipo": tipo.nome}
+        if tipo is TipoTarefa.HORARIO_FIXO:
+            dados.update(inicio=self.inicio_str, fim=self.fim_str, descricao=self.descricao,
+                         duracao=self.duracao or "N/A")
+        elif tipo is TipoTarefa.PERIODO_LIVRE:
+            dados.update(descricao=self.descricao, inicio_sugerido=self.inicio_str,
+                         fim_sugerido=self.fim_str, duracao=self.duracao)
+        elif tipo is TipoTarefa.PERIODO_GERAL:
+            dados.update(periodo=self.periodo, descricao=self.descricao)
+        else:
+            dados["descricao"] = self.descricao
+        if self.importante:
+            dados["importante"] = True
+        return dados
+
+    @classmethod
+    def from_dict(cls, dados: dict, dia: int) -> "TarefaRotina":
+        tipo = TipoTarefa.de_nome(dados.get('tipo'))
+        if tipo is TipoTarefa.PERIODO_LIVRE:
+            inicio, fim = dados.get('inicio_sugerido'), dados.get('fim_sugerido')
+        else:
+            inicio, fim = dados.get('inicio'), dados.get('fim')
+        return cls(
+            dia, tipo, dados.get('descricao') or "",
+            inicio=horario_para_minutos(inicio),
+            fim=horario_para_minutos(fim),
+            periodo=dados.get('periodo'),
+            tarefa_id=dados.get('id'),
+            importante=bool(dados.get('importante')),
+        )
+
+    def __repr__(self) -> str:
+        return f"TarefaRotina({self.dia_nome}, {self.tipo.nome}, {self.inicio_str}-{self.fim_str}, {self.descricao!r})"
+
+
+# --- Coleções de tarefas de um usuário (lista ordenada por dia) ---
+
+_chave_dia = attrgetter('dia')
+
+
+def inserir_tarefa(tarefas: list, tarefa: TarefaRotina) -> None:
+    """Insere mantendo a ordem por dia (e a ordem de chegada dentro do dia)."""
+    tarefas.insert(bisect_right(tarefas, tarefa.dia, key=_chave_dia), tarefa)
+
+
+def tarefas_do_dia(tarefas: list, dia: int) -> list:
+    """Fatia de `tarefas` (ordenada por dia) com as tarefas do `dia`, por busca binária."""
+    return tarefas[bisect_left(tarefas, dia, key=_chave_dia):bisect_right(tarefas, dia, key=_chave_dia)]
+
+
+def tarefas_por_dia(tarefas: list):
+    """Gera (dia, [tarefas do dia]) na ordem da semana, só para os dias com tarefas."""
+    for dia, grupo in groupby(tarefas, key=_chave_dia):
+        yield dia, list(grupo)
+
+
+def tarefas_de_json(dias: dict) -> list:
+    """{"Segunda-feira": [dict, ...], ...} -> [TarefaRotina, ...] ordenada por dia."""
+    tarefas = [
+        TarefaRotina.from_dict(tarefa, _INDICE_DIA[dia_nome])
+        for dia_nome, lista in dias.items() if dia_nome in _INDICE_DIA
+        for tarefa in lista
+    ]
+    tarefas.sort(key=_chave_dia)
+    return tarefas
+
+
+def tarefas_para_json(tarefas: list) -> dict:
+    """Inverso de `tarefas_de_json`."""
+    return {DIAS_DA_SEMANA_ORDEM[dia]: [t.to_dict() for t in grupo] for dia, grupo in tarefas_por_dia(tarefas)}
+
+
+def tarefa_para_registro(tarefa: TarefaRotina) -> list:
+    """Forma compacta do snapshot (snapshot.py): [dia, tipo, inicio, fim, descricao, periodo, id, importante]."""
+    # O id inteiro (uuid) tem 128 bits, além do que o msgpack guarda como inteiro: vai em 16 bytes
+    id_ = tarefa._id.to_bytes(16, "big") if isinstance(tarefa._id, int) else tarefa._id
+    return [tarefa.dia, int(tarefa.tipo), tarefa.inicio, tarefa.fim, tarefa.descricao, tarefa.periodo, id_,
+            tarefa.importante]
+
+
+def tarefa_de_registro(registro: list) -> TarefaRotina:
+    """Inverso de `tarefa_para_registro`."""
+    dia, tipo, inicio, fim, descricao, periodo, id_, importante = registro
+    return TarefaRotina(dia, TipoTarefa(tipo), descricao, inicio=inicio, fim=fim, periodo=periodo,
+                        tarefa_id=id_.hex() if isinstance(id_, bytes) else id_, importante=importante)
+
+
+def rotinas_de_json(dados: dict) -> dict:
+    """{"chat_id": {"Segunda-feira": [dict, ...]}} -> {chat_id: [TarefaRotina, ...]}."""
+    rotinas = {}
+    for chat_id, dias in dados.items():
+        tarefas = tarefas_de_json(dias)
+        if tarefas:
+            rotinas[int(chat_id)] = tarefas
+    return rotinas
+
+
+def rotinas_para_json(rotinas: dict) -> dict:
+    """Inverso de `rotinas_de_json`: gera o dict no formato do arquivo."""
+    return {str(chat_id): tarefas_para_json(tarefas) for chat_id, tarefas in rotinas.items()}
+
+
+# --- Índice por minuto da semana (/agora, /proximo) ---
+
+class IndiceSemanal:
+    """
+    Tarefas com horário de início de um usuário, ordenadas pelo minuto da semana em que
+    começam (duas listas paralelas: minutos e tarefas). "Agora", "próxima" e "resto do dia"
+    são buscas binárias; `inserir`/`remover` mantêm a ordem sem reconstruir o índice.
+    Tarefas sem início (períodos gerais, descrições) não entram.
+    """
+
+    __slots__ = ('_inicios', '_tarefas')
+
+    def __init__(self, tarefas=()):
+        pares = sorted(
+            ((minuto_da_semana(t.dia, t.inicio), t) for t in tarefas if t.inicio is not None),
+            key=itemgetter(0),
+        )
+        self._inicios = [minuto for minuto, _ in pares]
+        self._tarefas = [tarefa for _, tarefa in pares]
+
+    def __len__(self) -> int:
+        return len(self._tarefas)
+
+    def inserir(self, tarefa: TarefaRotina) -> None:
+        if tarefa.inicio is None:
+            return
+        minuto = minuto_da_semana(tarefa.dia, tarefa.inicio)
+        i = bisect_right(self._inicios, minuto)
+        self._inicios.insert(i, minuto)
+        self._tarefas.insert(i, tarefa)
+
+    def remover(self, tarefa: TarefaRotina) -> None:
+        """Remove pelo id (a tarefa pode ser outra instância, relida do banco)."""
+        if tarefa.inicio is None:
+            return
+        minuto = minuto_da_semana(tarefa.dia, tarefa.inicio)
+        for i in range(bisect_left(self._inicios, minuto), bisect_right(self._inicios, minuto)):
+            if self._tarefas[i]._id == tarefa._id:
+                del self._inicios[i]
+                del self._tarefas[i]
+                return
+
+    def _faixa(self, de: int, ate: int):
+        """Índices com início em [de, ate). `de` negativo continua no fim da semana anterior."""
+        if de < 0:
+            return chain(
+                range(bisect_left(self._inicios, de + MINUTOS_POR_SEMANA), len(self._inicios)),
+                range(bisect_left(self._inicios, ate)),
+            )
+        return range(bisect_left(self._inicios, de), bisect_left(self._inicios, ate))
+
+    def atuais(self, minuto: int) -> list:
+        """Tarefas em andamento no `minuto` da semana. Sem fim, a tarefa dura só o minuto em que começa."""
+        # Nenhuma tarefa dura mais que um dia: só as que começaram nas últimas 24 h são candidatas
+        em_andamento = []
+        for i in self._faixa(minuto - MINUTOS_POR_DIA + 1, minuto + 1):
+            tarefa = self._tarefas[i]
+            decorridos = (minuto - self._inicios[i]) % MINUTOS_POR_SEMANA
+            if decorridos < (tarefa.duracao_minutos or 1):
+                em_andamento.append(tarefa)
+        return em_andamento
+
+    def proxima(self, minuto: int):
+        """(tarefa, minutos até ela começar) da primeira tarefa depois do `minuto`, ou None sem tarefas."""
+        if not self._inicios:
+            return None
+        i = bisect_right(self._inicios, minuto)
+        if i == len(self._inicios):
+            # Passou da última da semana: a próxima é a primeira da semana seguinte
+            return self._tarefas[0], self._inicios[0] + MINUTOS_POR_SEMANA - minuto
+        return self._tarefas[i], self._inicios[i] - minuto
+
+    def restante_do_dia(self, minuto: int) -> list:
+        """Tarefas que ainda vão começar no dia do `minuto`, em ordem de horário."""
+        fim_do_dia = (minuto // MINUTOS_POR_DIA + 1) * MINUTOS_POR_DIA
+        return self._tarefas[bisect_right(self._inicios, minuto):bisect_left(self._inicios, fim_do_dia)]
+
+
+# --- Armazenamento por usuário ---
+
+class RotinasRepositorio:
+    """
+    Rotinas de cada usuário num SQLite (uma linha por chat, com o JSON do usuário) e um cache
+    LRU em memória limitado a `max_tarefas_cache` tarefas.
+
+    Os métodos assíncronos fazem o acesso ao disco numa thread. As listas devolvidas por
+    `obter` são as do cache: quem as altera deve segurar o lock de rotinas do chamador e
+    depois chamar `salvar` com a mesma lista.
+    """
+
+    def __init__(self, caminho: str, max_tarefas_cache: int = 50_000):
+        self.caminho = caminho
+        self.max_tarefas_cache = max_tarefas_cache
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS rotinas (chat_id INTEGER PRIMARY KEY, dados TEXT NOT NULL)")
+        self._db_lock = threading.Lock()
+        self._cache = OrderedDict()  # chat_id -> [TarefaRotina, ...] (lista vazia = usuário sem rotina)
+        self._tamanhos = {}  # chat_id -> tarefas contabilizadas no cache (mínimo 1)
+        self.tarefas_em_cache = 0
+        self.acertos = 0
+        self.faltas = 0
+
+    # --- Cache ---
+
+    def _guardar_no_cache(self, chat_id: int, tarefas: list) -> None:
+        # Usuário sem rotina também ocupa uma vaga, senão o cache cresceria sem limite com eles
+        custo = len(tarefas) or 1
+        self.tarefas_em_cache += custo - self._tamanhos.get(chat_id, 0)
+        self._tamanhos[chat_id] = custo
+        self._cache[chat_id] = tarefas
+        self._cache.move_to_end(chat_id)
+        # Despeja os menos usados até caber (o usuário atual sempre fica)
+        while self.tarefas_em_cache > self.max_tarefas_cache and len(self._cache) > 1:
+            antigo, _ = self._cache.popitem(last=False)
+            self.tarefas_em_cache -= self._tamanhos.pop(antigo)
+
+    def em_cache(self, chat_id: int) -> bool:
+        return chat_id in self._cache
+
+    # --- Disco (chamados numa thread) ---
+
+    def _ler(self, chat_id: int) -> list:
+        with self._db_lock:
+            linha = self._conn.execute("SELECT dados FROM rotinas WHERE chat_id = ?", (chat_id,)).fetchone()
+        return tarefas_de_json(json.loads(linha[0])) if linha else []
+
+    def _gravar(self, chat_id: int, tarefas: list) -> None:
+        dados = json.dumps(tarefas_para_json(tarefas), ensure_ascii=False) if tarefas else None
+        with self._db_lock:
+            if dados is None:
+                self._conn.execute("DELETE FROM rotinas WHERE chat_id = ?", (chat_id,))
+            else:
+                self._conn.execute("INSERT OR REPLACE INTO rotinas (chat_id, dados) VALUES (?, ?)", (chat_id, dados))
+
+    def _ler_lote(self, depois_de, limite: int) -> list:
+        with self._db_lock:
+            linhas = self._conn.execute(
+                "SELECT chat_id, dados FROM rotinas WHERE chat_id > ? ORDER BY chat_id LIMIT ?", (depois_de, limite)
+            ).fetchall()
+        return [(chat_id, tarefas_de_json(json.loads(dados))) for chat_id, dados in linhas]
+
+    # --- API ---
+
+    async def obter(self, chat_id: int) -> list:
+        """Tarefas do usuário (lista vazia se ele não tem rotina), do cache ou do disco."""
+        tarefas = self._cache.get(chat_id)
+        if tarefas is not None:
+            self.acertos += 1
+            self._cache.move_to_end(chat_id)
+            return tarefas
+        self.faltas += 1
+        tarefas = await asyncio.to_thread(self._ler, chat_id)
+        # Outro update pode ter carregado o mesmo usuário enquanto líamos
+        if chat_id in self._cache:
+            return self._cache[chat_id]
+        self._guardar_no_cache(chat_id, tarefas)
+        return tarefas
+
+    async def salvar(self, chat_id: int, tarefas: list) -> None:
+        """Atualiza o cache e grava as tarefas do usuário no disco (apaga a linha se a lista estiver vazia)."""
+        self._guardar_no_cache(chat_id, tarefas)
+        await asyncio.to_thread(self._gravar, chat_id, tarefas)
+
+    async def iterar_todos(self, tamanho_lote: int = 500):
+        """Percorre todos os usuários do disco em lotes, sem passar pelo cache. Gera (chat_id, tarefas)."""
+        ultimo = -(2 ** 63)
+        while True:
+            lote = await asyncio.to_thread(self._ler_lote, ultimo, tamanho_lote)
+            if not lote:
+                return
+            for chat_id, tarefas in lote:
+                yield chat_id, tarefas
+            ultimo = lote[-1][0]
+
+    def contar_usuarios(self) -> int:
+        with self._db_lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rotinas").fetchone()[0]
+
+    def importar_json(self, caminho_json: str) -> int:
+        """Importa um arquivo de rotinas no formato antigo (um único JSON com todos os usuários)."""
+        with open(caminho_json, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        linhas = [
+            (int(chat_id), json.dumps(dias, ensure_ascii=False))
+            for chat_id, dias in dados.items() if any(dias.values())
+        ]
+        self.inserir_linhas(linhas)
+        return len(linhas)
+
+    def importar_snapshot(self, caminho: str, tamanho_lote: int = 500) -> int:
+        """
+        Importa um snapshot de rotinas (snapshot.py) lendo em fluxo: cada lote de usuários é
+        gravado assim que é lido, sem carregar o arquivo inteiro.
+        """
+        from snapshot import ler_rotinas
+
+        importados = 0
+        lote = []
+        for chat_id, tarefas in ler_rotinas(caminho):
+            lote.append((chat_id, json.dumps(tarefas_para_json(tarefas), ensure_ascii=False)))
+            if len(lote) >= tamanho_lote:
+                self.inserir_linhas(lote)
+                importados += len(lote)
+                lote = []
+        if lote:
+            self.inserir_linhas(lote)
+            importados += len(lote)
+        return importados
+
+    def exportar_snapshot(self, caminho: str, comprimir: bool = True, tamanho_lote: int = 500) -> int:
+        """Grava todas as rotinas do banco num snapshot, lendo em lotes. Retorna quantos usuários."""
+        from snapshot import gravar_rotinas
+
+        def todos():
+            ultimo = -(2 ** 63)
+            while True:
+                lote = self._ler_lote(ultimo, tamanho_lote)
+                if not lote:
+                    return
+                yield from lote
+                ultimo = lote[-1][0]
+
+        return gravar_rotinas(caminho, todos(), comprimir)
+
+    def inserir_linhas(self, linhas: list) -> None:
+        """Grava (chat_id, json do usuário) em uma única transação, sem passar pelo cache."""
+        with self._db_lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR REPLACE INTO rotinas (chat_id, dados) VALUES (?, ?)", linhas)
+            self._conn.execute("COMMIT")
+
+    def estatisticas(self) -> dict:
+        return {
+            "usuarios_em_cache": len(self._cache),
+            "tarefas_em_cache": self.tarefas_em_cache,
+            "limite_tarefas_cache": self.max_tarefas_cache,
+            "acertos_cache": self.acertos,
+            "faltas_cache": self.faltas,
+        }
+
+    def fechar(self) -> None:
+        with self._db_lock:
+            self._conn.close()
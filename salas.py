@@ -0,0 +1,367 @@
+"""
+Salas de foco: um Pomodoro compartilhado por vários chats.
+
+Cada sala tem um único temporizador (uma tarefa asyncio que dorme até o fim da fase, sem tique
+por segundo). Nas trocas de fase a mensagem vai para todos os participantes em lotes, passando
+por um limitador de taxa comum a todas as salas. O tempo restante é consultado sob demanda pelo
+botão 📊 (resposta do callback, sem editar mensagens). Assim o custo cresce com o número de
+salas e de trocas de fase, não com participantes × segundos.
+
+As salas vivem na memória do processo (no modo sharded, só entram chats do mesmo worker).
+"""
+import asyncio
+import logging
+import os
+import secrets
+import time
+from typing import Dict, Optional
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.error import BadRequest, Forbidden
+from telegram.ext import CommandHandler, ContextTypes
+
+from callbacks import RoteadorCallbacks, montar
+from espacos import espaco_atual
+
+logger = logging.getLogger(__name__)
+
+MAX_PARTICIPANTES_SALA = int(os.getenv('SALA_MAX_PARTICIPANTES', '500'))
+# Mensagens por segundo somando todas as salas (a Bot API aceita ~30/s por bot)
+ENVIOS_POR_SEGUNDO = float(os.getenv('SALA_ENVIOS_POR_SEGUNDO', '25'))
+# Participantes notificados em paralelo por vez
+TAMANHO_LOTE_ENVIO = 25
+
+ALFABETO_CODIGO = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"  # sem 0/O e 1/I
+TAMANHO_CODIGO = 6
+
+NOMES_FASE = {"foco": "Foco", "pausa_curta": "Pausa Curta", "pausa_longa": "Pausa Longa"}
+
+USO_SALA = (
+    "👥 *Salas de foco* — um Pomodoro sincronizado para o time todo.\n\n"
+    "• /sala criar [foco] [pausa curta] [pausa longa] [ciclos] — cria uma sala (minutos)\n"
+    "• /sala entrar CÓDIGO — entra numa sala\n"
+    "• /sala iniciar | pausar | parar — controla o timer (só quem criou)\n"
+    "• /sala status — tempo restante da fase atual\n"
+    "• /sala sair — sai da sala"
+)
+
+
+# espaço do bot -> SalasManager (ver espacos.py)
+_gerenciadores: Dict[str, "SalasManager"] = {}
+
+
+class LimitadorTaxa:
+    """Espaça chamadas para no máximo `por_segundo` por segundo, somando todos os chamadores."""
+
+    def __init__(self, por_segundo: float):
+        self.intervalo = 1 / por_segundo
+        self._proximo = 0.0
+
+    async def aguardar(self) -> None:
+        agora = time.monotonic()
+        horario = max(agora, self._proximo)
+        self._proximo = horario + self.intervalo
+        if horario > agora:
+            await asyncio.sleep(horario - agora)
+
+
+class SalaFoco:
+    """Estado de uma sala. `fim_fase` é um instante de time.monotonic(); `restante` vale quando pausada."""
+
+    __slots__ = (
+        'codigo', 'dono_chat_id', 'participantes', 'foco_tempo', 'pausa_curta_tempo',
+        'pausa_longa_tempo', 'ciclos_para_pausa_longa', 'fase', 'ciclos_completados',
+        'fim_fase', 'restante', '_timer_task',
+    )
+
+    def __init__(self, codigo: str, dono_chat_id: int, foco_min: int = 25, pausa_curta_min: int = 5,
+                 pausa_longa_min: int = 15, ciclos: int = 4):
+        self.codigo = codigo
+        self.dono_chat_id = dono_chat_id
+        self.participantes = {dono_chat_id}
+        self.foco_tempo = foco_min * 60
+        self.pausa_curta_tempo = pausa_curta_min * 60
+        self.pausa_longa_tempo = pausa_longa_min * 60
+        self.ciclos_para_pausa_longa = ciclos
+        self.fase = None  # None = ociosa
+        self.ciclos_completados = 0
+        self.fim_fase = 0.0
+        self.restante = 0.0
+        self._timer_task = None
+
+    @property
+    def rodando(self) -> bool:
+        return self._timer_task is not None and not self._timer_task.done()
+
+    def duracao(self, fase: str) -> int:
+        return {"foco": self.foco_tempo, "pausa_curta": self.pausa_curta_tempo,
+                "pausa_longa": self.pausa_longa_tempo}[fase]
+
+    def segundos_restantes(self) -> int:
+        if self.rodando:
+            return max(0, round(self.fim_fase - time.monotonic()))
+        return round(self.restante)
+
+    def proxima_fase(self) -> str:
+        if self.fase != "foco":
+            return "foco"
+        if self.ciclos_completados % self.ciclos_para_pausa_longa == 0:
+            return "pausa_longa"
+        return "pausa_curta"
+
+    def status(self) -> str:
+        participantes = len(self.participantes)
+        if self.fase is None:
+            return f"Sala *{self.codigo}* parada. {participantes} participante(s). Aguardando o início. ⏳"
+        minutos, segundos = divmod(self.segundos_restantes(), 60)
+        situacao = "em andamento" if self.rodando else "pausada"
+        return (f"Sala *{self.codigo}* — *{NOMES_FASE[self.fase]}* {situacao} | "
+                f"Tempo restante: *{minutos:02d}:{segundos:02d}* | Ciclos de foco: *{self.ciclos_completados}* | "
+                f"{participantes} participante(s)")
+
+
+def _teclado_sala(codigo: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton("📊 Status", callback_data=montar("sala_status", codigo)),
+        InlineKeyboardButton("🚪 Sair", callback_data=montar("sala_sair", codigo)),
+    ]])
+
+
+class SalasManager:
+    """Salas ativas (codigo -> SalaFoco), o índice chat -> sala e os handlers do comando /sala."""
+
+    def __init__(self, application, envios_por_segundo: float = ENVIOS_POR_SEGUNDO):
+        self.application = application
+        self.salas: Dict[str, SalaFoco] = {}
+        self.sala_do_chat: Dict[int, str] = {}
+        self.limitador = LimitadorTaxa(envios_por_segundo)
+        self.mensagens_enviadas = 0
+        self.trocas_de_fase = 0
+        _gerenciadores[espaco_atual.get()] = self
+
+    # --- Ciclo de vida das salas ---
+
+    def _novo_codigo(self) -> str:
+        while True:
+            codigo = "".join(secrets.choice(ALFABETO_CODIGO) for _ in range(TAMANHO_CODIGO))
+            if codigo not in self.salas:
+                return codigo
+
+    def criar(self, dono_chat_id: int, *tempos: int) -> SalaFoco:
+        self.sair(dono_chat_id)
+        sala = SalaFoco(self._novo_codigo(), dono_chat_id, *tempos)
+        self.salas[sala.codigo] = sala
+        self.sala_do_chat[dono_chat_id] = sala.codigo
+        logger.info("Sala de foco %s criada pelo chat %s.", sala.codigo, dono_chat_id)
+        return sala
+
+    def entrar(self, chat_id: int, codigo: str) -> Optional[SalaFoco]:
+        """Adiciona o chat à sala. Retorna None se a sala não existe ou está cheia."""
+        sala = self.salas.get(codigo.upper())
+        if sala is None or (chat_id not in sala.participantes and len(sala.participantes) >= MAX_PARTICIPANTES_SALA):
+            return None
+        if self.sala_do_chat.get(chat_id) != sala.codigo:
+            self.sair(chat_id)
+        sala.participantes.add(chat_id)
+        self.sala_do_chat[chat_id] = sala.codigo
+        return sala
+
+    def sair(self, chat_id: int) -> Optional[SalaFoco]:
+        """Tira o chat da sala em que estiver. A sala que fica vazia é encerrada."""
+        codigo = self.sala_do_chat.pop(chat_id, None)
+        sala = self.salas.get(codigo) if codigo else None
+        if sala is None:
+            return None
+        sala.participantes.discard(chat_id)
+        if not sala.participantes:
+            self._encerrar(sala)
+        elif sala.dono_chat_id == chat_id:
+            # Qualquer participante restante assume o controle
+            sala.dono_chat_id = next(iter(sala.participantes))
+        return sala
+
+    def _encerrar(self, sala: SalaFoco) -> None:
+        if sala.rodando:
+            sala._timer_task.cancel()
+        for chat_id in sala.participantes:
+            self.sala_do_chat.pop(chat_id, None)
+        self.salas.pop(sala.codigo, None)
+        logger.info("Sala de foco %s encerrada.", sala.codigo)
+
+    # --- Temporizador (um por sala) ---
+
+    def _agendar_fase(self, sala: SalaFoco, segundos: float) -> None:
+        sala.fim_fase = time.monotonic() + segundos
+        sala._timer_task = asyncio.create_task(self._rodar_temporizador(sala, segundos))
+
+    async def _rodar_temporizador(self, sala: SalaFoco, segundos: float) -> None:
+        try:
+            while True:
+                await asyncio.sleep(segundos)
+                if sala.fase == "foco":
+                    sala.ciclos_completados += 1
+                sala.fase = sala.proxima_fase()
+                segundos = sala.duracao(sala.fase)
+                sala.fim_fase = time.monotonic() + segundos
+                self.trocas_de_fase += 1
+                logger.info("Sala %s: nova fase %s para %s participantes.", sala.codigo, sala.fase, len(sala.participantes))
+                # A difusão roda à parte: o relógio da sala não espera os envios
+                self.application.create_task(self._difundir(sala, self._texto_fase(sala)))
+        except asyncio.CancelledError:
+            logger.debug("Temporizador da sala %s cancelado.", sala.codigo)
+        except Exception as e:
+            logger.critical("Erro CRÍTICO no temporizador da sala %s: %s", sala.codigo, e, exc_info=True)
+
+    @staticmethod
+    def _texto_fase(sala: SalaFoco) -> str:
+        minutos = sala.duracao(sala.fase) // 60
+        if sala.fase == "foco":
+            return f"🚀 Sala *{sala.codigo}*: hora do *Foco* ({minutos} min)! Bora juntos! 💪"
+        if sala.fase == "pausa_longa":
+            return f"🎉 Sala *{sala.codigo}*: *Pausa Longa* ({minutos} min). Vocês mereceram! 🧘‍♀️"
+        return f"☕ Sala *{sala.codigo}*: *Pausa Curta* ({minutos} min). Estiquem as pernas! ✨"
+
+    async def iniciar(self, sala: SalaFoco) -> str:
+        if sala.rodando:
+            return "A sala já está rodando! 🎯"
+        if sala.fase is None:
+            sala.fase = "foco"
+            self._agendar_fase(sala, sala.foco_tempo)
+        else:
+            self._agendar_fase(sala, sala.restante)
+        self.application.create_task(self._difundir(sala, self._texto_fase(sala)))
+        return "▶️ Timer da sala iniciado!"
+
+    async def pausar(self, sala: SalaFoco) -> str:
+        if not sala.rodando:
+            return "A sala não está rodando. ⏸️"
+        sala.restante = max(0.0, sala.fim_fase - time.monotonic())
+        sala._timer_task.cancel()
+        sala._timer_task = None
+        self.application.create_task(self._difundir(sala, f"⏸️ Sala *{sala.codigo}* pausada."))
+        return "⏸️ Sala pausada."
+
+    async def parar(self, sala: SalaFoco) -> str:
+        if sala.rodando:
+            sala._timer_task.cancel()
+        sala._timer_task = None
+        sala.fase = None
+        sala.restante = 0.0
+        ciclos, sala.ciclos_completados = sala.ciclos_completados, 0
+        self.application.create_task(self._difundir(sala, f"⏹️ Sala *{sala.codigo}* parada após *{ciclos}* ciclo(s) de foco. 👏"))
+        return "⏹️ Timer da sala parado."
+
+    # --- Difusão em lotes com limite de taxa ---
+
+    async def _enviar(self, sala: SalaFoco, chat_id: int, texto: str) -> None:
+        await self.limitador.aguardar()
+        try:
+            await self.application.bot.send_message(
+                chat_id, texto, reply_markup=_teclado_sala(sala.codigo), parse_mode='Markdown'
+            )
+            self.mensagens_enviadas += 1
+        except (Forbidden, BadRequest) as e:
+            # Chat bloqueou o bot ou não existe mais: sai da sala para não gastar envios
+            logger.warning("Removendo chat %s da sala %s: %s", chat_id, sala.codigo, e)
+            if self.sala_do_chat.get(chat_id) == sala.codigo:
+                self.sair(chat_id)
+
+    async def _difundir(self, sala: SalaFoco, texto: str) -> None:
+        participantes = list(sala.participantes)
+        for i in range(0, len(participantes), TAMANHO_LOTE_ENVIO):
+            lote = participantes[i:i + TAMANHO_LOTE_ENVIO]
+            resultados = await asyncio.gather(*(self._enviar(sala, chat_id, texto) for chat_id in lote), return_exceptions=True)
+            for chat_id, resultado in zip(lote, resultados):
+                if isinstance(resultado, Exception):
+                    logger.error("Erro ao notificar chat %s da sala %s: %s", chat_id, sala.codigo, resultado)
+
+    # --- Handlers ---
+
+    async def comando_sala(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """/sala <criar|entrar|sair|iniciar|pausar|parar|status> [argumentos]"""
+        chat_id = update.effective_chat.id
+        args = context.args or []
+        acao = args[0].lower() if args else "status"
+        try:
+            if acao == "criar":
+                tempos = [int(a) for a in args[1:5]]
+                if any(t <= 0 for t in tempos):
+                    raise ValueError
+                sala = self.criar(chat_id, *tempos)
+                await update.message.reply_text(
+                    f"👥 Sala criada! Código: *{sala.codigo}*\nCompartilhe com o time: `/sala entrar {sala.codigo}`\n"
+                    f"Quando todos estiverem dentro, use /sala iniciar.",
+                    parse_mode='Markdown', reply_markup=_teclado_sala(sala.codigo)
+                )
+                return
+            if acao == "entrar":
+                if len(args) < 2:
+                    await update.message.reply_text("Informe o código: /sala entrar CÓDIGO 🔑")
+                    return
+                sala = self.entrar(chat_id, args[1])
+                if sala is None:
+                    await update.message.reply_text("Sala não encontrada ou cheia. Confira o código! 🤔")
+                    return
+                await update.message.reply_text(f"✅ Você entrou na sala!\n{sala.status()}", parse_mode='Markdown',
+                                                reply_markup=_teclado_sala(sala.codigo))
+                return
+            if acao == "sair":
+                sala = self.sair(chat_id)
+                await update.message.reply_text("🚪 Você saiu da sala." if sala else "Você não está em nenhuma sala.")
+                return
+
+            codigo = self.sala_do_chat.get(chat_id)
+            sala = self.salas.get(codigo) if codigo else None
+            if sala is None:
+                await update.message.reply_text(USO_SALA, parse_mode='Markdown')
+                return
+            if acao == "status":
+                await update.message.reply_text(sala.status(), parse_mode='Markdown', reply_markup=_teclado_sala(sala.codigo))
+            elif acao in ("iniciar", "pausar", "parar"):
+                if sala.dono_chat_id != chat_id:
+                    await update.message.reply_text("Só quem criou a sala pode controlar o timer. 🙏")
+                    return
+                resposta = await getattr(self, acao)(sala)
+                await update.message.reply_text(resposta)
+            else:
+                await update.message.reply_text(USO_SALA, parse_mode='Markdown')
+        except ValueError:
+            await update.message.reply_text("Os tempos precisam ser números inteiros positivos (minutos). 🔢")
+        except Exception as e:
+            logger.error("Erro em /sala para chat %s: %s", chat_id, e, exc_info=True)
+            await update.message.reply_text("Ops! Não consegui processar o comando da sala. 😥")
+
+    async def _status_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        query = update.callback_query
+        sala = self.salas.get(context.args[0]) if context.args else None
+        if sala is None or update.effective_chat.id not in sala.participantes:
+            await query.answer("Essa sala não está mais ativa para você. 👋")
+            return
+        # Resposta do callback (alerta): nenhuma mensagem é editada
+        await query.answer(sala.status().replace("*", ""), show_alert=True)
+
+    async def _sair_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        query = update.callback_query
+        sala = self.sair(update.effective_chat.id)
+        await query.answer("🚪 Você saiu da sala." if sala else "Você não está em nenhuma sala.")
+
+    def get_handlers(self) -> list:
+        """Handlers de /sala e dos botões das salas (registrar antes dos ConversationHandlers)."""
+        return [
+            CommandHandler("sala", self.comando_sala),
+            RoteadorCallbacks({"sala_status": self._status_callback, "sala_sair": self._sair_callback}),
+        ]
+
+    def estatisticas(self) -> dict:
+        return {
+            "salas_foco": len(self.salas),
+            "salas_foco_rodando": sum(1 for sala in self.salas.values() if sala.rodando),
+            "participantes_salas": len(self.sala_do_chat),
+            "salas_trocas_de_fase": self.trocas_de_fase,
+            "salas_mensagens_enviadas": self.mensagens_enviadas,
+        }
+
+
+def get_gerenciador() -> Optional["SalasManager"]:
+    """SalasManager do bot atual (None antes de ser construído)."""
+    return _gerenciadores.get(espaco_atual.get())
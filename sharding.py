@@ -0,0 +1,302 @@
+"""
+Modo de implantação particionado (sharding) por chat_id.
+
+Um processo "front" faz o long-polling do getUpdates e encaminha cada update, pelo hash do
+chat_id, para um de N processos "worker". Cada worker roda uma Application completa (sem
+Updater), com seu próprio scheduler, arquivo de rotinas e arquivo de persistência, e responde
+diretamente à Bot API. Assim os timers do Pomodoro, rotinas e lembretes de um usuário vivem
+sempre no mesmo processo.
+
+Ativado em main.py com BOT_SHARDS=N (N > 1).
+"""
+import asyncio
+import json
+import logging
+import multiprocessing as mp
+import os
+import pickle
+import signal
+import sqlite3
+import zlib
+from collections import defaultdict
+
+import httpx
+
+from gravacao import GRAVAR_UPDATES, GravadorUpdates
+from snapshot import carregar_arquivo_persistencia, eh_snapshot, gravar_arquivo_persistencia
+
+logger = logging.getLogger(__name__)
+
+POLL_TIMEOUT = 30  # segundos de long-polling do front
+ESPERA_MAXIMA_FRONT = 60  # segundos entre tentativas do getUpdates com erro seguido
+# Arquivos configurados para o processo único (mesmas variáveis e padrões de main.py, agenda.py e
+# caixa_saida.py): cada worker usa o seu, derivado com arquivo_do_shard
+ROTINAS_FILE_BASE = os.getenv('ROTINAS_FILE', 'rotinas_semanais_data.json')
+ROTINAS_DB_BASE = os.getenv('ROTINAS_DB', os.path.splitext(ROTINAS_FILE_BASE)[0] + '.sqlite3')
+ROTINAS_SNAPSHOT_BASE = os.getenv('ROTINAS_SNAPSHOT', os.path.splitext(ROTINAS_FILE_BASE)[0] + '.snap')
+CAIXA_SAIDA_FILE_BASE = os.getenv('CAIXA_SAIDA_FILE', 'notificacoes_pendentes.jsonl')
+PERSISTENCE_FILE_BASE = os.getenv('PERSISTENCE_FILE', 'bot_persistence')
+
+
+def shard_do_chat(chat_id, num_shards: int) -> int:
+    """Shard responsável por um chat. Estável entre reinícios (não usa hash() do Python)."""
+    return zlib.crc32(str(chat_id).encode()) % num_shards
+
+
+def extrair_chat_id(update: dict):
+    """Extrai o chat_id de um update cru (dict da Bot API). Retorna None se não houver chat."""
+    for chave, payload in update.items():
+        if chave == "update_id" or not isinstance(payload, dict):
+            continue
+        if "chat" in payload:
+            return payload["chat"]["id"]
+        if isinstance(payload.get("message"), dict):
+            return payload["message"]["chat"]["id"]
+        if "from" in payload:
+            return payload["from"]["id"]
+    return None
+
+
+def arquivo_do_shard(caminho: str, indice: int) -> str:
+    """'rotinas.json' -> 'rotinas.shard2.json'; 'bot_persistence' -> 'bot_persistence.shard2'."""
+    raiz, ext = os.path.splitext(caminho)
+    return f"{raiz}.shard{indice}{ext}"
+
+
+# --- Divisão dos arquivos de um deploy de processo único ---
+
+class _ReferenciaPersistente:
+    """Preserva os IDs persistentes (objetos Bot) gravados pelo PicklePersistence ao dividir o arquivo."""
+
+    def __init__(self, pid):
+        self.pid = pid
+
+
+class _Unpickler(pickle.Unpickler):
+    def persistent_load(self, pid):
+        return _ReferenciaPersistente(pid)
+
+
+class _Pickler(pickle.Pickler):
+    def persistent_id(self, obj):
+        return obj.pid if isinstance(obj, _ReferenciaPersistente) else None
+
+
+def _dividir_rotinas_legadas(indice: int, num_shards: int) -> None:
+    destino = arquivo_do_shard(ROTINAS_FILE_BASE, indice)
+    if os.path.exists(destino) or not os.path.exists(ROTINAS_FILE_BASE):
+        return
+    with open(ROTINAS_FILE_BASE, 'r', encoding='utf-8') as f:
+        dados = json.load(f)
+    meus = {chat_id: dias for chat_id, dias in dados.items() if shard_do_chat(chat_id, num_shards) == indice}
+    with open(destino, 'w', encoding='utf-8') as f:
+        json.dump(meus, f, indent=4, ensure_ascii=False)
+    logger.info("Shard %s: %s usuários copiados de %s para %s.", indice, len(meus), ROTINAS_FILE_BASE, destino)
+
+
+def _dividir_banco_rotinas_legado(indice: int, num_shards: int) -> None:
+    """Divide o banco de rotinas de um deploy de processo único que já importou o JSON."""
+    from rotinas import RotinasRepositorio
+
+    origem = ROTINAS_DB_BASE
+    destino = arquivo_do_shard(ROTINAS_DB_BASE, indice)
+    if os.path.exists(destino) or not os.path.exists(origem):
+        return
+    with sqlite3.connect(origem) as conn:
+        linhas = [
+            (chat_id, dados) for chat_id, dados in conn.execute("SELECT chat_id, dados FROM rotinas")
+            if shard_do_chat(chat_id, num_shards) == indice
+        ]
+    repositorio = RotinasRepositorio(destino)
+    repositorio.inserir_linhas(linhas)
+    repositorio.fechar()
+    logger.info("Shard %s: %s usuários copiados de %s para %s.", indice, len(linhas), origem, destino)
+
+
+def _dividir_snapshot_rotinas_legado(indice: int, num_shards: int) -> None:
+    """Divide o snapshot de rotinas que o worker importaria num banco ainda inexistente."""
+    from snapshot import gravar_rotinas, ler_rotinas
+
+    destino = arquivo_do_shard(ROTINAS_SNAPSHOT_BASE, indice)
+    if (os.path.exists(destino) or os.path.exists(arquivo_do_shard(ROTINAS_DB_BASE, indice))
+            or not os.path.exists(ROTINAS_SNAPSHOT_BASE)):
+        return
+    meus = gravar_rotinas(destino, (
+        (chat_id, tarefas) for chat_id, tarefas in ler_rotinas(ROTINAS_SNAPSHOT_BASE)
+        if shard_do_chat(chat_id, num_shards) == indice
+    ))
+    logger.info("Shard %s: %s usuários copiados de %s para %s.", indice, meus, ROTINAS_SNAPSHOT_BASE, destino)
+
+
+def _dividir_persistencia_legada(indice: int, num_shards: int) -> None:
+    destino = arquivo_do_shard(PERSISTENCE_FILE_BASE, indice)
+    if os.path.exists(destino) or not os.path.exists(PERSISTENCE_FILE_BASE):
+        return
+    como_snapshot = eh_snapshot(PERSISTENCE_FILE_BASE)
+    if como_snapshot:
+        dados = carregar_arquivo_persistencia(PERSISTENCE_FILE_BASE)
+    else:
+        with open(PERSISTENCE_FILE_BASE, 'rb') as f:
+            dados = _Unpickler(f).load()
+
+    def meu(chave) -> bool:
+        return shard_do_chat(chave, num_shards) == indice
+
+    dados['user_data'] = {k: v for k, v in (dados.get('user_data') or {}).items() if meu(k)}
+    dados['chat_data'] = {k: v for k, v in (dados.get('chat_data') or {}).items() if meu(k)}
+    # As chaves das conversas começam pelo chat_id (per_chat=True é o padrão)
+    dados['conversations'] = {
+        nome: {chave: estado for chave, estado in conversas.items() if meu(chave[0])}
+        for nome, conversas in (dados.get('conversations') or {}).items()
+    }
+    if como_snapshot:
+        gravar_arquivo_persistencia(destino, dados, como_snapshot=True)
+    else:
+        with open(destino, 'wb') as f:
+            _Pickler(f, protocol=pickle.HIGHEST_PROTOCOL).dump(dados)
+    logger.info("Shard %s: persistência dividida de %s para %s.", indice, PERSISTENCE_FILE_BASE, destino)
+
+
+# --- Worker ---
+
+def _processo_worker(indice: int, token: str, fila) -> None:
+    """Ponto de entrada de cada processo worker."""
+    # O front é quem trata Ctrl+C e avisa os workers pela fila
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from log_assincrono import configurar_logging
+    configurar_logging(formato=f'%(asctime)s - shard{indice} - %(name)s - %(levelname)s - %(message)s', forcar=True)
+    asyncio.run(_rodar_worker(indice, token, fila))
+
+
+async def _rodar_worker(indice: int, token: str, fila) -> None:
+    from telegram import Update
+    import main
+
+    application = main.construir_aplicacao(
+        token, persistence_path=arquivo_do_shard(PERSISTENCE_FILE_BASE, indice), com_updater=False
+    )
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    logger.info("Shard %s pronto para receber updates.", indice)
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            lote = await loop.run_in_executor(None, fila.get)
+            if lote is None:
+                break
+            for dados in lote:
+                await application.update_queue.put(Update.de_json(dados, application.bot))
+    finally:
+        logger.info("Encerrando shard %s...", indice)
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+
+
+# --- Front ---
+
+async def _rodar_front(token: str, filas: list) -> None:
+    base_url = os.getenv("BOT_API_BASE_URL", "https://api.telegram.org/bot")
+    url = f"{base_url}{token}/"
+    num_shards = len(filas)
+    offset = 0
+    # Os workers não têm updater e não gravam: o front grava o fluxo inteiro
+    gravador = GravadorUpdates(GRAVAR_UPDATES) if GRAVAR_UPDATES else None
+
+    try:
+        async with httpx.AsyncClient(timeout=POLL_TIMEOUT + 10) as client:
+            await client.post(url + "deleteWebhook")
+            logger.info("Front iniciado: encaminhando updates para %s shards.", num_shards)
+            espera = 0.0
+            while True:
+                try:
+                    resposta = await client.post(url + "getUpdates", data={"offset": offset, "timeout": POLL_TIMEOUT})
+                    corpo = resposta.json()
+                except (httpx.HTTPError, ValueError) as e:
+                    espera = min(max(espera * 2, 1.0), ESPERA_MAXIMA_FRONT)
+                    logger.warning("Erro no getUpdates do front: %s. Tentando novamente em %.0fs.", e, espera)
+                    await asyncio.sleep(espera)
+                    continue
+                if not isinstance(corpo, dict) or not corpo.get("ok"):
+                    # Ex: 409 (outro processo fazendo polling com o mesmo token), 401, 429. Sem esperar,
+                    # o front martelaria a Bot API em loop; no 429 vale o retry_after do Telegram
+                    corpo = corpo if isinstance(corpo, dict) else {}
+                    espera = min(max(espera * 2, 1.0), ESPERA_MAXIMA_FRONT)
+                    espera = max(espera, float((corpo.get("parameters") or {}).get("retry_after") or 0))
+                    logger.warning("getUpdates do front recusado (%s): %s. Tentando novamente em %.0fs.",
+                                   corpo.get("error_code", resposta.status_code), corpo.get("description"), espera)
+                    await asyncio.sleep(espera)
+                    continue
+                espera = 0.0
+                updates = corpo.get("result", [])
+
+                # Um lote por shard por resposta do getUpdates: menos mensagens entre processos
+                lotes = defaultdict(list)
+                for update in updates:
+                    if gravador is not None:
+                        gravador.gravar(update)
+                    chat_id = extrair_chat_id(update)
+                    lotes[shard_do_chat(chat_id, num_shards) if chat_id is not None else 0].append(update)
+                    offset = update["update_id"] + 1
+                for indice, lote in lotes.items():
+                    filas[indice].put(lote)
+    finally:
+        if gravador is not None:
+            gravador.fechar()
+
+
+def executar_sharded(token: str, num_shards: int) -> None:
+    """Sobe N workers e roda o front no processo atual até Ctrl+C."""
+    for indice in range(num_shards):
+        _dividir_rotinas_legadas(indice, num_shards)
+        _dividir_snapshot_rotinas_legado(indice, num_shards)
+        _dividir_banco_rotinas_legado(indice, num_shards)
+        _dividir_persistencia_legada(indice, num_shards)
+
+    ctx = mp.get_context("spawn")
+    filas = [ctx.Queue() for _ in range(num_shards)]
+    workers = []
+    # agenda e caixa_saida leem os caminhos do ambiente quando são importados: os arquivos do
+    # shard vão no ambiente herdado pelo filho (explícitos, para um ROTINAS_DB configurado não
+    # ser o mesmo banco em todos os workers)
+    arquivos_base = {
+        'ROTINAS_FILE': ROTINAS_FILE_BASE,
+        'ROTINAS_DB': ROTINAS_DB_BASE,
+        'ROTINAS_SNAPSHOT': ROTINAS_SNAPSHOT_BASE,
+        'CAIXA_SAIDA_FILE': CAIXA_SAIDA_FILE_BASE,
+        'PERSISTENCE_FILE': PERSISTENCE_FILE_BASE,
+    }
+    originais = {nome: os.environ.get(nome) for nome in arquivos_base}
+    for indice in range(num_shards):
+        for nome, base in arquivos_base.items():
+            os.environ[nome] = arquivo_do_shard(base, indice)
+        worker = ctx.Process(target=_processo_worker, args=(indice, token, filas[indice]), name=f"shard-{indice}")
+        worker.start()
+        workers.append(worker)
+    for nome, original in originais.items():
+        if original is None:
+            os.environ.pop(nome, None)
+        else:
+            os.environ[nome] = original
+
+    def _sigterm(signum, frame):
+        raise KeyboardInterrupt
+
+    # Plataformas como o Railway encerram o container com SIGTERM
+    signal.signal(signal.SIGTERM, _sigterm)
+    try:
+        asyncio.run(_rodar_front(token, filas))
+    except KeyboardInterrupt:
+        logger.info("Encerrando front e workers...")
+    finally:
+        for fila in filas:
+            fila.put(None)
+        for worker in workers:
+            worker.join(timeout=30)
+            if worker.is_alive():
+                logger.warning("%s não encerrou a tempo. Terminando à força.", worker.name)
+                worker.terminate()
@@ -0,0 +1,346 @@
+"""
+Snapshot binário do estado do bot: registros msgpack com prefixo de tamanho, num arquivo
+versionado e opcionalmente comprimido.
+
+Substitui, quando ativado, os dois formatos grandes e lentos de carregar:
+- o pickle do PicklePersistence (BOT_PERSISTENCIA=snapshot, ver persistencia.py), que o bot
+  converte sozinho na primeira carga (o original fica em <arquivo>.pickle);
+- o JSON de rotinas com indent=4, como formato de exportação/importação do banco de rotinas
+  (RotinasRepositorio.exportar_snapshot / importar_snapshot e ROTINAS_SNAPSHOT em agenda.py).
+
+Formato (versão 1):
+- cabeçalho de 8 bytes: b"BSNP", versão, compressão (0 nenhuma, 1 zlib) e 2 bytes reservados;
+- depois, comprimida em fluxo se for o caso, uma sequência de registros, cada um com o tamanho
+  (uint32 big-endian) seguido do msgpack de [seção, chave, valor];
+- o primeiro registro é ["meta", tipo, {"versao": ..., "criado": epoch}], com o tipo do
+  conteúdo ("persistencia" ou "rotinas").
+
+A leitura (ler_snapshot) é em fluxo: lê pedaços do arquivo e gera cada registro assim que ele
+está completo, então cada usuário (um registro) fica disponível sem esperar o resto do arquivo
+e sem montar o arquivo inteiro na memória.
+
+Valores fora dos tipos do msgpack vão como ExtType (ver Codec): tuplas (as chaves das conversas
+do PTB), sets, datetimes e, como último recurso, qualquer objeto em pickle.
+
+Conversão pela linha de comando (a partir da raiz do repositório):
+    python snapshot.py bot_persistence bot_persistence.snap
+    python snapshot.py rotinas_semanais_data.json rotinas_semanais_data.snap
+    python snapshot.py bot_persistence.snap bot_persistence.pickle   # volta para o pickle
+"""
+import argparse
+import io
+import json
+import os
+import pickle
+import struct
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Iterator, Tuple
+
+import msgpack
+
+MAGIA = b"BSNP"
+VERSAO_FORMATO = 1
+SEM_COMPRESSAO = 0
+COMPRESSAO_ZLIB = 1
+_CABECALHO = struct.Struct(">4sBB2x")
+_TAMANHO = struct.Struct(">I")
+TAMANHO_PEDACO = 64 * 1024
+SNAPSHOT_COMPRIMIR = os.getenv('SNAPSHOT_COMPRIMIR', '1') != '0'
+# Nível 1: a gravação roda no loop de eventos a cada flush da persistência; acima disso o
+# arquivo diminui pouco e a gravação fica bem mais lenta
+SNAPSHOT_NIVEL_ZLIB = int(os.getenv('SNAPSHOT_NIVEL_ZLIB', '1'))
+
+TIPO_PERSISTENCIA = "persistencia"
+TIPO_ROTINAS = "rotinas"
+
+EXT_TUPLA = 1
+EXT_SET = 2
+EXT_FROZENSET = 3
+EXT_DATETIME = 4
+EXT_PICKLE = 127
+
+
+class Codec:
+    """
+    msgpack com os tipos que o estado do bot usa além dos nativos. `pickler`/`unpickler`
+    recebem um arquivo e devolvem o (un)pickler do último recurso (EXT_PICKLE): a persistência
+    passa os do PTB, que trocam o objeto Bot por uma referência.
+    """
+
+    def __init__(self, pickler=None, unpickler=None):
+        self._pickler = pickler or (lambda arquivo: pickle.Pickler(arquivo, protocol=pickle.HIGHEST_PROTOCOL))
+        self._unpickler = unpickler or pickle.Unpickler
+
+    def empacotar(self, valor) -> bytes:
+        # strict_types: subclasses (IntEnum, defaultdict, ...) não viram o tipo base em silêncio
+        return msgpack.packb(valor, default=self._default, use_bin_type=True, strict_types=True)
+
+    def desempacotar(self, dados: bytes):
+        return msgpack.unpackb(dados, raw=False, strict_map_key=False, ext_hook=self._ext_hook)
+
+    def _default(self, valor):
+        tipo = type(valor)
+        if tipo is tuple:
+            return msgpack.ExtType(EXT_TUPLA, self.empacotar(list(valor)))
+        if tipo is set or tipo is frozenset:
+            return msgpack.ExtType(EXT_SET if tipo is set else EXT_FROZENSET, self.empacotar(list(valor)))
+        if tipo is datetime:
+            return msgpack.ExtType(EXT_DATETIME, valor.isoformat().encode())
+        buffer = io.BytesIO()
+        self._pickler(buffer).dump(valor)
+        return msgpack.ExtType(EXT_PICKLE, buffer.getvalue())
+
+    def _ext_hook(self, codigo: int, dados: bytes):
+        if codigo == EXT_TUPLA:
+            return tuple(self.desempacotar(dados))
+        if codigo == EXT_SET:
+            return set(self.desempacotar(dados))
+        if codigo == EXT_FROZENSET:
+            return frozenset(self.desempacotar(dados))
+        if codigo == EXT_DATETIME:
+            return datetime.fromisoformat(dados.decode())
+        if codigo == EXT_PICKLE:
+            return self._unpickler(io.BytesIO(dados)).load()
+        return msgpack.ExtType(codigo, dados)
+
+
+class EscritorSnapshot:
+    """
+    Grava um snapshot registro a registro. O arquivo é escrito ao lado (.tmp) e só substitui
+    `caminho` em fechar(): uma queda no meio da gravação não estraga o snapshot anterior.
+    """
+
+    def __init__(self, caminho, tipo: str, comprimir: bool = SNAPSHOT_COMPRIMIR, codec: Codec = None):
+        self.caminho = os.fspath(caminho)
+        self.codec = codec or Codec()
+        self.registros = 0
+        self._temporario = f"{self.caminho}.tmp"
+        self._arquivo = open(self._temporario, "wb")
+        self._arquivo.write(_CABECALHO.pack(MAGIA, VERSAO_FORMATO, COMPRESSAO_ZLIB if comprimir else SEM_COMPRESSAO))
+        self._compressor = zlib.compressobj(SNAPSHOT_NIVEL_ZLIB) if comprimir else None
+        self._buffer = bytearray()
+        self.gravar("meta", tipo, {"versao": VERSAO_FORMATO, "criado": round(time.time(), 3)})
+
+    def gravar(self, secao: str, chave, valor) -> None:
+        dados = self.codec.empacotar([secao, chave, valor])
+        self._buffer += _TAMANHO.pack(len(dados))
+        self._buffer += dados
+        self.registros += 1
+        if len(self._buffer) >= TAMANHO_PEDACO:
+            self._descarregar()
+
+    def _descarregar(self) -> None:
+        dados = bytes(self._buffer)
+        self._buffer.clear()
+        self._arquivo.write(self._compressor.compress(dados) if self._compressor else dados)
+
+    def fechar(self) -> None:
+        self._descarregar()
+        if self._compressor:
+            self._arquivo.write(self._compressor.flush())
+        self._arquivo.close()
+        os.replace(self._temporario, self.caminho)
+
+    def descartar(self) -> None:
+        self._arquivo.close()
+        os.remove(self._temporario)
+
+    def __enter__(self) -> "EscritorSnapshot":
+        return self
+
+    def __exit__(self, tipo_excecao, excecao, traceback) -> None:
+        if tipo_excecao is None:
+            self.fechar()
+        else:
+            self.descartar()
+
+
+def eh_snapshot(caminho) -> bool:
+    """True se o arquivo existe e começa com o cabeçalho de snapshot."""
+    try:
+        with open(caminho, "rb") as f:
+            return f.read(len(MAGIA)) == MAGIA
+    except OSError:
+        return False
+
+
+def ler_snapshot(caminho, tipo: str = None, codec: Codec = None) -> Iterator[Tuple[str, Any, Any]]:
+    """Gera (seção, chave, valor) na ordem gravada, lendo e descomprimindo o arquivo aos poucos."""
+    codec = codec or Codec()
+    with open(caminho, "rb") as f:
+        cabecalho = f.read(_CABECALHO.size)
+        if len(cabecalho) < _CABECALHO.size or cabecalho[:len(MAGIA)] != MAGIA:
+            raise ValueError(f"{caminho} não é um snapshot")
+        _, versao, compressao = _CABECALHO.unpack(cabecalho)
+        if versao != VERSAO_FORMATO:
+            raise ValueError(f"{caminho}: snapshot na versão {versao}, esperada {VERSAO_FORMATO}")
+        descompressor = zlib.decompressobj() if compressao == COMPRESSAO_ZLIB else None
+        buffer = bytearray()
+        posicao = 0
+        primeiro = True
+        while True:
+            lido = f.read(TAMANHO_PEDACO)
+            pedaco = lido
+            if descompressor:
+                # Um pedaço comprimido pode render zero bytes: o fim é quando nada mais sai do arquivo
+                pedaco = descompressor.decompress(lido) if lido else descompressor.flush()
+            if not lido and not pedaco:
+                break
+            # Descarta o que já foi lido antes de acrescentar (o buffer fica do tamanho de um pedaço)
+            del buffer[:posicao]
+            posicao = 0
+            buffer += pedaco
+            while len(buffer) - posicao >= _TAMANHO.size:
+                (tamanho,) = _TAMANHO.unpack_from(buffer, posicao)
+                fim = posicao + _TAMANHO.size + tamanho
+                if fim > len(buffer):
+                    break
+                secao, chave, valor = codec.desempacotar(buffer[posicao + _TAMANHO.size:fim])
+                posicao = fim
+                if primeiro:
+                    primeiro = False
+                    if secao != "meta" or (tipo is not None and chave != tipo):
+                        raise ValueError(f"{caminho}: snapshot de {chave!r}, esperado {tipo!r}")
+                    continue
+                yield secao, chave, valor
+        if len(buffer) > posicao:
+            raise ValueError(f"{caminho}: snapshot truncado ({len(buffer) - posicao} bytes sobrando)")
+
+
+# --- Persistência do PTB (user_data, chat_data, bot_data, callback_data, conversas) ---
+
+def gravar_persistencia(caminho, dados: dict, codec: Codec = None, comprimir: bool = SNAPSHOT_COMPRIMIR) -> None:
+    """Grava o dict do PicklePersistence (single_file) com um registro por usuário, chat e conversa."""
+    with EscritorSnapshot(caminho, TIPO_PERSISTENCIA, comprimir, codec) as escritor:
+        for secao in ("user_data", "chat_data"):
+            for chave, valor in (dados.get(secao) or {}).items():
+                escritor.gravar(secao, chave, valor)
+        for nome, conversas in (dados.get("conversations") or {}).items():
+            escritor.gravar("conversations", nome, conversas)
+        escritor.gravar("bot_data", None, dados.get("bot_data"))
+        escritor.gravar("callback_data", None, dados.get("callback_data"))
+
+
+def ler_persistencia(caminho, codec: Codec = None) -> dict:
+    """Inverso de gravar_persistencia: o dict no formato do PicklePersistence."""
+    dados = {"user_data": {}, "chat_data": {}, "conversations": {}}
+    for secao, chave, valor in ler_snapshot(caminho, TIPO_PERSISTENCIA, codec):
+        if secao in ("user_data", "chat_data", "conversations"):
+            dados[secao][chave] = valor
+        else:
+            dados[secao] = valor
+    return dados
+
+
+class ReferenciaPersistente:
+    """Objeto Bot gravado pelo PicklePersistence, mantido como referência fora do bot (conversões)."""
+
+    def __init__(self, pid):
+        self.pid = pid
+
+
+class _UnpicklerReferencias(pickle.Unpickler):
+    def persistent_load(self, pid):
+        return ReferenciaPersistente(pid)
+
+
+class _PicklerReferencias(pickle.Pickler):
+    def persistent_id(self, obj):
+        return obj.pid if isinstance(obj, ReferenciaPersistente) else None
+
+
+def codec_sem_bot() -> Codec:
+    """Codec para ler e gravar a persistência fora do bot, preservando as referências ao Bot."""
+    return Codec(
+        pickler=lambda arquivo: _PicklerReferencias(arquivo, protocol=pickle.HIGHEST_PROTOCOL),
+        unpickler=_UnpicklerReferencias,
+    )
+
+
+def carregar_arquivo_persistencia(caminho) -> dict:
+    """Dict da persistência, do pickle do PTB ou de um snapshot, sem precisar do Bot."""
+    if eh_snapshot(caminho):
+        return ler_persistencia(caminho, codec_sem_bot())
+    with open(caminho, "rb") as f:
+        return _UnpicklerReferencias(f).load()
+
+
+def gravar_arquivo_persistencia(caminho, dados: dict, como_snapshot: bool) -> None:
+    if como_snapshot:
+        gravar_persistencia(caminho, dados, codec_sem_bot())
+        return
+    with open(caminho, "wb") as f:
+        _PicklerReferencias(f, protocol=pickle.HIGHEST_PROTOCOL).dump(dados)
+
+
+# --- Rotinas ---
+
+def gravar_rotinas(caminho, rotinas, comprimir: bool = SNAPSHOT_COMPRIMIR) -> int:
+    """Grava (chat_id, [TarefaRotina, ...]) de um iterável, um registro por usuário. Retorna quantos."""
+    from rotinas import tarefa_para_registro
+
+    with EscritorSnapshot(caminho, TIPO_ROTINAS, comprimir) as escritor:
+        for chat_id, tarefas in rotinas:
+            if tarefas:
+                escritor.gravar("rotina", chat_id, [tarefa_para_registro(tarefa) for tarefa in tarefas])
+        return escritor.registros - 1
+
+
+def ler_rotinas(caminho) -> Iterator[Tuple[int, list]]:
+    """Gera (chat_id, [TarefaRotina, ...]) conforme o arquivo é lido."""
+    from rotinas import tarefa_de_registro
+
+    for secao, chat_id, registros in ler_snapshot(caminho, TIPO_ROTINAS):
+        if secao == "rotina":
+            yield chat_id, [tarefa_de_registro(registro) for registro in registros]
+
+
+# --- Conversores ---
+
+def converter(origem: str, destino: str) -> str:
+    """
+    Converte entre os formatos, detectando o de origem: pickle do PTB -> snapshot, JSON de
+    rotinas -> snapshot, e snapshot -> formato antigo (pickle ou JSON) para voltar atrás.
+    """
+    if eh_snapshot(origem):
+        if ler_meta(origem)[1] == TIPO_ROTINAS:
+            from rotinas import rotinas_para_json
+            with open(destino, "w", encoding="utf-8") as f:
+                json.dump(rotinas_para_json(dict(ler_rotinas(origem))), f, indent=4, ensure_ascii=False)
+            return "snapshot de rotinas -> JSON"
+        gravar_arquivo_persistencia(destino, carregar_arquivo_persistencia(origem), como_snapshot=False)
+        return "snapshot de persistência -> pickle"
+    with open(origem, "rb") as f:
+        inicio = f.read(1)
+    if inicio in (b"{", b" ", b"\n"):
+        from rotinas import rotinas_de_json
+        with open(origem, "r", encoding="utf-8") as f:
+            rotinas = rotinas_de_json(json.load(f))
+        gravar_rotinas(destino, rotinas.items())
+        return "JSON de rotinas -> snapshot"
+    gravar_arquivo_persistencia(destino, carregar_arquivo_persistencia(origem), como_snapshot=True)
+    return "pickle de persistência -> snapshot"
+
+
+def ler_meta(caminho) -> tuple:
+    """O registro ("meta", tipo, {...}) do snapshot, sem ler o resto do arquivo."""
+    with open(caminho, "rb") as f:
+        _, _, compressao = _CABECALHO.unpack(f.read(_CABECALHO.size))
+        dados = f.read(TAMANHO_PEDACO)
+    if compressao == COMPRESSAO_ZLIB:
+        dados = zlib.decompressobj().decompress(dados)
+    (tamanho,) = _TAMANHO.unpack_from(dados)
+    return tuple(Codec().desempacotar(dados[_TAMANHO.size:_TAMANHO.size + tamanho]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converte a persistência ou as rotinas de/para snapshot")
+    parser.add_argument("origem", help="pickle do PicklePersistence, JSON de rotinas ou snapshot")
+    parser.add_argument("destino")
+    args = parser.parse_args()
+    inicio = time.perf_counter()
+    conversao = converter(args.origem, args.destino)
+    print(f"{conversao}: {os.path.getsize(args.origem)} -> {os.path.getsize(args.destino)} bytes "
+          f"em {time.perf_counter() - inicio:.2f}s")